@@ -0,0 +1,2 @@
+# 模块级文档字符串：运维命令
+"""Operational commands, run with ``python -m app.commands.<name>``."""
@@ -0,0 +1,110 @@
+# 模块级文档字符串：回填类型化字段值列
+"""
+Backfill typed value columns for field values stored before typed storage.
+
+Usage::
+
+    python -m app.commands.backfill_typed_values [--batch-size 5000]
+
+Rows whose text cannot be converted to the field type are left untouched
+and counted as skipped. The command is idempotent and can be re-run.
+"""
+
+# 导入命令行参数解析
+import argparse
+
+# 导入 SQLAlchemy 更新语句
+from sqlalchemy import update
+
+# 导入数据库会话工厂
+from app.core.database import SessionLocal
+# 导入报表相关模型
+from app.models.report_models import ReportField, ReportFieldValue
+# 导入字段值转换工具
+from app.services.field_values import coerce_value, typed_column
+
+
+# 回填入口
+def backfill(batch_size: int = 5000) -> dict:
+    # 函数文档：逐字段、分批回填类型化列
+    """Convert stored text values into typed columns; returns counters."""
+    # 统计计数
+    counters = {"converted": 0, "skipped": 0}
+    # 创建会话
+    db = SessionLocal()
+    # 确保会话关闭
+    try:
+        # 只处理类型化字段
+        fields = [field for field in db.query(ReportField) if typed_column(field.field_type)]
+        # 逐个字段回填
+        for field in fields:
+            # 字段对应的类型化列
+            column = getattr(ReportFieldValue, typed_column(field.field_type))
+            # 上一批最后一行 ID
+            last_id = 0
+            # 分批处理
+            while True:
+                # 读取一批尚未回填的值
+                batch = (
+                    # 查询 ID 与文本值
+                    db.query(ReportFieldValue.id, ReportFieldValue.value)
+                    # 限定字段、未回填且有文本值，按 ID 键集分页
+                    .filter(
+                        ReportFieldValue.field_id == field.id,
+                        column.is_(None),
+                        ReportFieldValue.value.isnot(None),
+                        ReportFieldValue.id > last_id,
+                    )
+                    # 按 ID 排序
+                    .order_by(ReportFieldValue.id)
+                    # 限制条数
+                    .limit(batch_size)
+                    # 执行查询
+                    .all()
+                )
+                # 没有数据则处理下一个字段
+                if not batch:
+                    break
+                # 记录本批最后一行
+                last_id = batch[-1].id
+                # 本批更新参数
+                updates = []
+                # 逐行转换
+                for value_id, text in batch:
+                    # 尝试转换
+                    try:
+                        updates.append({"id": value_id, column.key: coerce_value(field.field_type, text)})
+                    # 无法转换则跳过
+                    except ValueError:
+                        counters["skipped"] += 1
+                # 按主键批量更新
+                if updates:
+                    db.execute(update(ReportFieldValue), updates)
+                # 每批提交一次
+                db.commit()
+                # 累加转换数
+                counters["converted"] += len(updates)
+    # 最终关闭会话
+    finally:
+        db.close()
+    # 返回计数
+    return counters
+
+
+# 命令行入口
+def main() -> None:
+    # 函数文档：解析参数并执行回填
+    """Parse arguments and run the backfill."""
+    # 定义命令行参数
+    parser = argparse.ArgumentParser(description=__doc__)
+    # 每批行数
+    parser.add_argument("--batch-size", type=int, default=5000)
+    # 解析参数
+    args = parser.parse_args()
+    # 执行回填并输出结果
+    print(backfill(args.batch_size))
+
+
+# 脚本入口
+if __name__ == "__main__":
+    main()
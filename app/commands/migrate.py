@@ -0,0 +1,61 @@
+# 模块级文档字符串：执行版本化的数据库结构迁移
+"""
+Apply the pending schema migrations in ``app/migrations``.
+
+Usage::
+
+    python -m app.commands.migrate [--to VERSION] [--list] [--check]
+
+Run it once per deployment, before starting the app workers; the app
+itself no longer creates tables at startup. ``--list`` shows each
+migration and whether it is applied, ``--check`` exits with status 1 when
+migrations are pending (for deployment pipelines) without applying them.
+"""
+
+# 导入命令行参数解析
+import argparse
+
+# 导入数据库引擎
+from app.core.database import engine
+# 导入迁移工具
+from app.migrations import applied_versions, discover, migrate, pending
+
+
+# 命令行入口
+def main() -> None:
+    # 函数文档：解析参数并执行迁移
+    """Parse arguments and apply, list or check migrations."""
+    # 定义命令行参数
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    # 目标版本
+    parser.add_argument("--to", type=int, default=None, help="stop after this version")
+    # 列出迁移
+    parser.add_argument("--list", action="store_true", help="list migrations and their state")
+    # 只检查
+    parser.add_argument("--check", action="store_true", help="exit 1 if migrations are pending")
+    # 解析参数
+    args = parser.parse_args()
+    # 列出迁移
+    if args.list:
+        # 已应用的版本
+        with engine.connect() as connection:
+            applied = applied_versions(connection)
+        # 逐个输出
+        for migration in discover():
+            print(f"{migration.version:04d} {migration.name:<30} {'applied' if migration.version in applied else 'pending'}")
+        return
+    # 只检查
+    if args.check:
+        # 待应用的迁移
+        waiting = pending(engine, args.to)
+        # 输出结果
+        print({"pending": [migration.version for migration in waiting]})
+        # 有待应用的迁移时失败
+        raise SystemExit(1 if waiting else 0)
+    # 执行迁移并输出结果
+    print({"applied": [migration.version for migration in migrate(engine, args.to)]})
+
+
+# 脚本入口
+if __name__ == "__main__":
+    main()
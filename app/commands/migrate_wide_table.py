@@ -0,0 +1,215 @@
+# 模块级文档字符串：把报表类型从 EAV 迁移到宽表存储
+"""
+Move a report type's field values from EAV rows into its wide table.
+
+Usage::
+
+    python -m app.commands.migrate_wide_table --report-type-id 3 [--batch-size 2000] [--purge-eav]
+
+Values are copied in keyset batches while the type keeps serving from EAV.
+The final transaction first sets the type to ``wide``; that row lock waits
+for in-flight EAV writes of the type (writers hold a shared lock on it, see
+``SchemaRegistry.get_for_write``) and holds back new ones, so the catch-up
+copy of every report still lacking a wide row sees all of them. Writers on
+other workers re-read the mode under that lock and switch to wide, but
+readers may use their cached EAV schema for up to
+``SCHEMA_REGISTRY_CHECK_SECONDS``, so the EAV rows are kept. Once that
+interval has passed, run again with ``--purge-eav`` to copy any report still
+missing a wide row and delete the type's EAV rows; a ``--purge-eav`` run
+that performs the switch itself waits out the interval first. The command can be re-run after an interruption.
+Typed fields are copied from the typed value columns, so run
+``app.commands.backfill_typed_values`` first on data written before typed
+storage existed.
+"""
+
+# 导入命令行参数解析
+import argparse
+# 导入计时工具
+import time
+# 导入类型注解
+from typing import Dict, List
+
+# 导入 SQLAlchemy 语句构造工具
+from sqlalchemy import delete, insert, select
+# 导入 SQLAlchemy 会话类型
+from sqlalchemy.orm import Session
+
+# 导入配置
+from app.core.config import settings
+# 导入数据库会话工厂
+from app.core.database import SessionLocal
+# 导入报表相关模型
+from app.models.report_models import STORAGE_MODE_WIDE, Report, ReportField, ReportFieldValue, ReportType
+# 导入字段值转换工具
+from app.services.field_values import typed_column
+# 导入报表响应缓存
+from app.services.report_cache import report_cache
+# 导入报表结构缓存
+from app.services.schema_registry import schema_registry
+# 导入宽表工具
+from app.services.wide_tables import create_wide_table, wide_column_name
+
+
+# 迁移入口
+def migrate(report_type_id: int, batch_size: int = 2000, purge_eav: bool = False) -> dict:
+    # 函数文档：执行迁移并返回计数
+    """Migrate one report type to wide storage; returns counters."""
+    # 统计计数
+    counters = {"copied": 0, "deleted_values": 0}
+    # 创建会话
+    db = SessionLocal()
+    # 确保会话关闭
+    try:
+        # 查询报表类型
+        report_type = db.get(ReportType, report_type_id)
+        # 类型不存在
+        if report_type is None:
+            raise SystemExit(f"Report type {report_type_id} not found")
+        # 字段定义
+        fields = db.query(ReportField).filter(ReportField.report_type_id == report_type_id).all()
+        # 建表（已存在则跳过）
+        table = create_wide_table(db.connection(), report_type_id, fields)
+        # 提交建表
+        db.commit()
+        # 本次是否切换了存储模式
+        switched = report_type.storage_mode != STORAGE_MODE_WIDE
+        # 尚未切换时复制并切换
+        if switched:
+            # 分批复制尚无宽表行的报表，期间类型仍由 EAV 提供服务
+            counters["copied"] += _copy_missing(db, table, report_type_id, fields, batch_size, commit=True)
+            # 最后一个事务：先改写存储模式，行锁等待在途的 EAV 写入并阻塞新的写入
+            report_type.storage_mode = STORAGE_MODE_WIDE
+            # 立即写入以取得锁
+            db.flush()
+            # 补齐迁移期间提交的报表（ID 可能小于已复制的报表）
+            counters["copied"] += _copy_missing(db, table, report_type_id, fields, batch_size, commit=False)
+            # 通知各进程刷新结构缓存
+            schema_registry.bump(db)
+            # 提交切换
+            db.commit()
+        # 只切换时保留 EAV 行，由单独的步骤清理
+        if not purge_eav:
+            return counters
+        # 刚切换时等待各进程的结构缓存过期（期间它们仍可能从 EAV 读取）
+        if switched:
+            time.sleep(settings.schema_registry_check_seconds)
+        # 删除前再补齐仍没有宽表行的报表
+        counters["copied"] += _copy_missing(db, table, report_type_id, fields, batch_size, commit=True)
+        # 删除已迁移的 EAV 行
+        field_ids = [field.id for field in fields]
+        # 分批删除，避免长事务
+        while field_ids:
+            # 一批待删除的行 ID
+            value_ids = db.execute(
+                # 查询该类型字段的值
+                select(ReportFieldValue.id).where(ReportFieldValue.field_id.in_(field_ids)).limit(batch_size)
+            ).scalars().all()
+            # 没有更多数据
+            if not value_ids:
+                break
+            # 删除本批
+            db.execute(delete(ReportFieldValue).where(ReportFieldValue.id.in_(value_ids)))
+            # 每批提交一次
+            db.commit()
+            # 累加计数
+            counters["deleted_values"] += len(value_ids)
+    # 最终关闭会话
+    finally:
+        db.close()
+    # 返回计数
+    return counters
+
+
+# 复制全部尚无宽表行的报表
+def _copy_missing(
+    db: Session, table, report_type_id: int, fields: List[ReportField], batch_size: int, commit: bool
+) -> int:
+    # 函数文档：按 ID 分批复制，commit 为假时留在调用方事务中
+    """Copy every report of the type that has no wide row yet; returns the count."""
+    # 复制总数
+    total = 0
+    # 从头按 ID 键集分页
+    last_id = 0
+    # 逐批复制
+    while True:
+        # 复制一批
+        copied, last_id = _copy_batch(db, table, report_type_id, fields, last_id, batch_size)
+        # 按需每批提交一次
+        if commit:
+            db.commit()
+        # 累加计数
+        total += copied
+        # 没有更多数据
+        if copied < batch_size:
+            return total
+
+
+# 复制一批报表
+def _copy_batch(db: Session, table, report_type_id: int, fields: List[ReportField], last_id: int, batch_size: int):
+    # 函数文档：把一批报表的 EAV 值转成宽表行写入
+    """Copy the EAV values of the next batch of reports without a wide row; returns (count, last report id)."""
+    # 下一批报表 ID
+    report_ids = db.execute(
+        # 按 ID 键集分页
+        select(Report.id)
+        # 限定报表类型与位置
+        .where(Report.report_type_id == report_type_id, Report.id > last_id)
+        # 跳过已有宽表行的报表
+        .where(~select(table.c.report_id).where(table.c.report_id == Report.id).exists())
+        # 按 ID 排序
+        .order_by(Report.id)
+        # 限制条数
+        .limit(batch_size)
+    ).scalars().all()
+    # 没有数据
+    if not report_ids:
+        return 0, last_id
+    # 字段 ID 到字段定义
+    fields_by_id = {field.id: field for field in fields}
+    # 每个报表一行，先全部置空
+    rows: Dict[int, dict] = {
+        # 报表 ID 到行参数
+        report_id: {"report_id": report_id, **{wide_column_name(field.id): None for field in fields}}
+        # 遍历本批报表
+        for report_id in report_ids
+    }
+    # 读取本批报表的 EAV 值
+    for value in db.query(ReportFieldValue).filter(ReportFieldValue.report_id.in_(report_ids)):
+        # 字段定义
+        field = fields_by_id.get(value.field_id)
+        # 跳过不属于该类型的字段
+        if field is None:
+            continue
+        # 类型化列
+        column = typed_column(field.field_type)
+        # 类型化字段取类型化值（未回填时为空），文本字段取文本值
+        rows[value.report_id][wide_column_name(field.id)] = getattr(value, column) if column else value.value
+    # 批量写入宽表
+    db.execute(insert(table), list(rows.values()))
+    # 提交后使这些报表的缓存失效
+    report_cache.invalidate_on_commit(db, report_ids)
+    # 返回本批数量与最后一个报表 ID
+    return len(report_ids), report_ids[-1]
+
+
+# 命令行入口
+def main() -> None:
+    # 函数文档：解析参数并执行迁移
+    """Parse arguments and run the migration."""
+    # 定义命令行参数
+    parser = argparse.ArgumentParser(description=__doc__)
+    # 报表类型 ID
+    parser.add_argument("--report-type-id", type=int, required=True)
+    # 每批报表数
+    parser.add_argument("--batch-size", type=int, default=2000)
+    # 删除已迁移的 EAV 行
+    parser.add_argument("--purge-eav", action="store_true")
+    # 解析参数
+    args = parser.parse_args()
+    # 执行迁移并输出结果
+    print(migrate(args.report_type_id, args.batch_size, args.purge_eav))
+
+
+# 脚本入口
+if __name__ == "__main__":
+    main()
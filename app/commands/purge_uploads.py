@@ -0,0 +1,38 @@
+# 模块级文档字符串：清理过期的可续传上传
+"""
+Delete resumable upload sessions idle for longer than
+``UPLOAD_SESSION_TTL_SECONDS`` together with their received bytes.
+
+Usage::
+
+    python -m app.commands.purge_uploads
+
+``POST /uploads`` already runs the same sweep every
+``UPLOAD_GC_INTERVAL_SECONDS``; schedule this command when uploads are rare.
+"""
+
+# 导入命令行参数解析
+import argparse
+
+# 导入数据库会话工厂
+from app.core.database import SessionLocal
+# 导入上传会话清理
+from app.services.upload_sessions import purge_expired_uploads
+
+
+# 命令行入口
+def main() -> None:
+    # 函数文档：解析参数并执行清理
+    """Parse arguments and purge expired upload sessions."""
+    # 定义命令行参数
+    parser = argparse.ArgumentParser(description=__doc__)
+    # 解析参数
+    parser.parse_args()
+    # 执行清理并输出结果
+    with SessionLocal() as db:
+        print({"purged": purge_expired_uploads(db)})
+
+
+# 脚本入口
+if __name__ == "__main__":
+    main()
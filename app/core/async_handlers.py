@@ -0,0 +1,83 @@
+# 模块级文档字符串：在异步引擎上运行数据库路由处理器
+"""
+Run database route handlers on the async engine.
+
+Handlers are written once against a sync ``Session``. :func:`db_endpoint`
+registers them unchanged by default (FastAPI runs them in its thread pool).
+With ``DATABASE_ASYNC`` it turns them into ``async def`` endpoints that
+receive an ``AsyncSession`` and run the handler body through
+``AsyncSession.run_sync``: the body runs in a greenlet on the event loop and
+each query awaits the async driver, so no thread is parked while the
+database works.
+
+Handlers must return schemas or fully loaded objects: FastAPI serializes
+the result after ``run_sync`` has returned, where a lazy load fails.
+Only use it for handlers whose blocking work is database I/O. Storage
+reads and writes, multipart parsing and other file I/O would stall the
+event loop, so those routes stay on the thread pool.
+"""
+
+# 导入函数签名工具
+import inspect
+# 导入类型注解
+from typing import Any, Callable
+
+# 导入 FastAPI 依赖工具与参数类型
+from fastapi import Depends, params
+# 导入异步会话类型
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# 导入配置
+from app.core.config import settings
+# 导入同步与异步会话依赖
+from app.core.database import get_async_db, get_async_read_db, get_db, get_read_db
+
+# 同步会话依赖对应的异步依赖
+_ASYNC_DEPENDENCIES = {get_db: get_async_db, get_read_db: get_async_read_db}
+
+
+# 按配置选择同步或异步处理器
+def db_endpoint(func: Callable[..., Any]) -> Callable[..., Any]:
+    # 函数文档：未开启异步模式时原样返回
+    """
+    Return ``func`` as is, or with ``DATABASE_ASYNC`` an ``async def``
+    endpoint with the same parameters whose ``Depends(get_db)`` (or
+    ``Depends(get_read_db)``) session is replaced by an ``AsyncSession`` from
+    the matching async dependency and whose body runs via ``run_sync``.
+    Apply it below the route decorator.
+    """
+    # 同步模式
+    if not settings.database_async:
+        return func
+    # 原签名
+    signature = inspect.signature(func)
+    # 接收会话的参数
+    session_param = next(
+        param
+        for param in signature.parameters.values()
+        if isinstance(param.default, params.Depends) and param.default.dependency in _ASYNC_DEPENDENCIES
+    )
+    # 参数名
+    name = session_param.name
+    # 对应的异步依赖
+    dependency = _ASYNC_DEPENDENCIES[session_param.default.dependency]
+
+    # 异步处理器
+    async def endpoint(**kwargs: Any) -> Any:
+        # 取出异步会话
+        db: AsyncSession = kwargs.pop(name)
+        # 在会话的 greenlet 中以同步会话运行原处理器
+        return await db.run_sync(lambda session: func(**kwargs, **{name: session}))
+
+    # 同样的参数，会话改由异步依赖提供
+    endpoint.__signature__ = signature.replace(
+        parameters=[
+            param.replace(default=Depends(dependency), annotation=AsyncSession) if param.name == name else param
+            for param in signature.parameters.values()
+        ]
+    )
+    # 保留名称与文档（OpenAPI 使用）
+    for attribute in ("__module__", "__name__", "__qualname__", "__doc__"):
+        setattr(endpoint, attribute, getattr(func, attribute))
+    # 返回异步处理器
+    return endpoint
@@ -1,6 +1,9 @@
 # 模块级文档字符串：应用配置来自环境变量
 """Application configuration backed by environment variables."""
 
+# 导入类型注解
+from typing import Literal, Optional
+
 # 导入 Pydantic 字段工具
 from pydantic import Field
 # 导入 Pydantic Settings 基类与配置字典
@@ -41,8 +44,88 @@ class Settings(BaseSettings):
             "PWD=6225112Wx..;"
             "TrustServerCertificate=yes;"
         ),
-        # 字段描述：FILETABLE 的 ODBC 连接
-        description="ODBC connection string for FILETABLE operations",
+        # 字段描述：已不再使用，附件写入借用 database_url 的连接池
+        description="Deprecated: FILETABLE writes now use pooled connections of database_url",
+    )
+    # 连接池常驻连接数
+    db_pool_size: int = Field(
+        # 默认常驻连接数
+        default=10,
+        # 字段描述：池大小
+        description="Persistent connections kept by the database pool",
+    )
+    # 连接池高峰时的额外连接数
+    db_max_overflow: int = Field(
+        # 默认溢出上限
+        default=20,
+        # 字段描述：溢出连接数
+        description="Extra connections the pool may open under load",
+    )
+    # 等待空闲连接的超时（秒）
+    db_pool_timeout: float = Field(
+        # 默认等待 30 秒
+        default=30.0,
+        # 字段描述：检出超时
+        description="Seconds to wait for a free pooled connection",
+    )
+    # 连接回收周期（秒），-1 表示不回收
+    db_pool_recycle: int = Field(
+        # 默认 30 分钟
+        default=1800,
+        # 字段描述：连接最长存活时间
+        description="Recycle pooled connections older than this many seconds",
+    )
+    # 检出前是否探活
+    db_pool_pre_ping: bool = Field(
+        # 默认开启
+        default=True,
+        # 字段描述：检出前探活
+        description="Ping pooled connections before handing them out",
+    )
+    # 是否以异步引擎与 async def 处理器提供查询类接口
+    database_async: bool = Field(
+        # 默认同步（线程池）
+        default=False,
+        # 字段描述：异步模式
+        description=(
+            "Serve database-only routes with async handlers on an async engine "
+            "(aioodbc for SQL Server, aiosqlite for SQLite) instead of the thread pool"
+        ),
+    )
+    # 异步引擎的连接字符串（为空时由 database_url 推导）
+    async_database_url: Optional[str] = Field(
+        # 默认推导：mssql+pyodbc → mssql+aioodbc，sqlite → sqlite+aiosqlite
+        default=None,
+        # 字段描述：异步连接字符串
+        description="Async SQLAlchemy URL; derived from database_url when empty",
+    )
+    # 只读副本的连接字符串（为空时全部请求使用主库）
+    replica_database_url: Optional[str] = Field(
+        # 默认不使用副本
+        default=None,
+        # 字段描述：副本连接字符串
+        description=(
+            "SQLAlchemy URL of a read-only replica serving the read endpoints "
+            "(e.g. an Always On secondary with ApplicationIntent=ReadOnly)"
+        ),
+    )
+    # 副本连接失败后改用主库的时长（秒）
+    replica_retry_seconds: float = Field(
+        # 默认 30 秒后重试副本
+        default=30.0,
+        # 字段描述：重试间隔
+        description="Seconds to route reads to the primary after the replica failed",
+        # 必须大于 0
+        gt=0,
+    )
+    # 写请求后读请求继续使用主库的时长（秒）
+    read_your_writes_seconds: float = Field(
+        # 默认 5 秒，覆盖常见的复制延迟
+        default=5.0,
+        # 字段描述：写后读主库的时长
+        description="Seconds after a successful write during which the client's reads go to the primary",
+        # 不能为负（0 表示关闭）
+        ge=0,
     )
     # 产品完整报表附件的本地文件夹路径
     product_report_storage_dir: str = Field(
@@ -51,6 +134,199 @@ class Settings(BaseSettings):
         # 字段描述：附件根目录
         description="Root folder for product full report attachments",
     )
+    # 产品完整报表附件的存储后端（默认沿用本地文件夹）
+    product_report_storage_backend: Literal["filetable", "local"] = Field(
+        # 默认本地文件系统
+        default="local",
+        # 字段描述：产品报表附件后端
+        description="Storage backend for product full report attachments",
+    )
+    # 报表附件的存储后端
+    storage_backend: Literal["filetable", "local"] = Field(
+        # 默认 SQL Server FILETABLE
+        default="filetable",
+        # 字段描述：报表附件后端
+        description="Storage backend for report attachments",
+    )
+    # 本地存储后端的根目录
+    storage_local_root: str = Field(
+        # 默认相对工作目录
+        default="data/attachments",
+        # 字段描述：本地后端根目录
+        description="Root folder of the local storage backend for report attachments",
+    )
+    # 存储后端每次读写的块大小（单个上传的内存占用上限）
+    filetable_chunk_size: int = Field(
+        # 默认 1 MiB
+        default=1024 * 1024,
+        # 字段描述：分块写入大小
+        description="Bytes per chunk when streaming attachments to and from a storage backend",
+        # 必须为正数
+        gt=0,
+    )
+    # 单个请求中同时写入存储后端的附件数
+    storage_upload_concurrency: int = Field(
+        # 默认最多 4 个
+        default=4,
+        # 字段描述：并发写入数（FILETABLE 每个并发写入占用一个池连接）
+        description=(
+            "Attachments of one request written to the storage backend at once; "
+            "concurrent FILETABLE writes each use a pooled connection"
+        ),
+        # 至少为 1（1 表示逐个写入）
+        ge=1,
+    )
+    # 附件压缩：off（默认）、auto（有 zstandard 时用 zstd，否则 gzip）、gzip 或 zstd
+    storage_compression: Literal["off", "auto", "gzip", "zstd"] = Field(
+        # 默认不压缩
+        default="off",
+        # 字段描述：压缩算法（已压缩的格式始终原样保存）
+        description=(
+            "Compress compressible attachments (text, TIFF, BMP, legacy Office) when storing them; "
+            "already-compressed formats are stored as-is"
+        ),
+    )
+    # 附件写入方式：sync（请求内写入）或 background（落盘后由后台队列写入）
+    attachment_ingest_mode: Literal["sync", "background"] = Field(
+        # 默认请求内写入
+        default="sync",
+        # 字段描述：POST /reports 的附件写入方式
+        description="Write attachments during POST /reports (sync) or from a background queue (background)",
+    )
+    # 后台写入前附件的本地暂存目录
+    attachment_spool_dir: str = Field(
+        # 默认相对工作目录
+        default="data/spool",
+        # 字段描述：暂存目录
+        description="Local folder where uploads wait for background ingestion",
+    )
+    # 后台写入线程数
+    attachment_ingest_workers: int = Field(
+        # 默认 2 个
+        default=2,
+        # 字段描述：工作线程数
+        description="Worker threads of the background attachment ingestion queue",
+        # 至少 1 个
+        ge=1,
+    )
+    # 后台写入的最大尝试次数
+    attachment_ingest_max_attempts: int = Field(
+        # 默认 3 次
+        default=3,
+        # 字段描述：超过后标记为 failed
+        description="Attempts per attachment before it is marked failed",
+        # 至少 1 次
+        ge=1,
+    )
+    # 重试前的等待时间（秒），每次翻倍
+    attachment_ingest_retry_seconds: float = Field(
+        # 默认 2 秒
+        default=2.0,
+        # 字段描述：重试退避
+        description="Delay before the first retry; doubled on every further attempt",
+        # 不可为负
+        ge=0,
+    )
+
+    # 可续传上传的暂存目录
+    upload_session_dir: str = Field(
+        # 默认相对工作目录
+        default="data/uploads",
+        # 字段描述：分块暂存目录
+        description="Local folder holding the received bytes of resumable uploads",
+    )
+    # 可续传上传的最大字节数
+    upload_max_bytes: int = Field(
+        # 默认 8 GiB
+        default=8 * 1024 * 1024 * 1024,
+        # 字段描述：单个上传上限
+        description="Largest file accepted by the resumable upload API",
+        # 必须为正数
+        gt=0,
+    )
+    # 上传会话无活动后的保留时间（秒）
+    upload_session_ttl_seconds: float = Field(
+        # 默认 24 小时
+        default=24 * 3600,
+        # 字段描述：过期后被清理
+        description="Idle time after which an upload session and its data are garbage-collected",
+    )
+    # 请求中顺带清理过期会话的最小间隔（秒）
+    upload_gc_interval_seconds: float = Field(
+        # 默认 5 分钟
+        default=300,
+        # 字段描述：清理频率
+        description="Minimum seconds between expired-session sweeps triggered by POST /uploads",
+    )
+
+    # 单次批量创建允许的最大报表数
+    report_batch_max_items: int = Field(
+        # 默认上限
+        default=5000,
+        # 字段描述：批量创建上限
+        description="Maximum number of reports accepted by POST /reports/batch",
+    )
+
+    # 报表结构缓存检查数据库版本号的间隔（秒）
+    schema_registry_check_seconds: float = Field(
+        # 默认每秒最多检查一次
+        default=1.0,
+        # 字段描述：多进程间结构缓存的最大滞后
+        description="How often each worker re-reads the report schema version from the database",
+    )
+
+    # 单个报表响应缓存的后端：memory（进程内）、redis（共享）或 none（禁用）
+    report_cache_backend: Literal["memory", "redis", "none"] = Field(
+        # 默认进程内缓存
+        default="memory",
+        # 字段描述：GET /reports/{id} 的缓存后端
+        description="Backend of the GET /reports/{id} payload cache",
+    )
+    # 进程内缓存的最大条目数
+    report_cache_max_entries: int = Field(
+        # 默认条目数
+        default=10000,
+        # 字段描述：超出后按 LRU 淘汰
+        description="Maximum cached report payloads per worker (LRU eviction)",
+    )
+    # 缓存条目的过期时间（秒），为空表示不过期
+    report_cache_ttl_seconds: Optional[float] = Field(
+        # 默认不过期，依赖写入时失效
+        default=None,
+        # 字段描述：条目存活时间
+        description="Optional time-to-live of cached report payloads",
+    )
+    # 共享缓存的连接地址
+    report_cache_url: str = Field(
+        # 默认本机 redis
+        default="redis://localhost:6379/0",
+        # 字段描述：redis 后端地址
+        description="Connection URL of the shared report cache",
+    )
+
+    # 是否统计每个请求的 SQL 次数、耗时与行数
+    sql_instrumentation: bool = Field(
+        # 默认开启
+        default=True,
+        # 字段描述：Server-Timing 头与 app.sql 日志
+        description="Count queries, database time and fetched rows per request (Server-Timing header, app.sql log)",
+    )
+    # 是否提供 /metrics（Prometheus 文本格式）
+    metrics_enabled: bool = Field(
+        # 默认开启
+        default=True,
+        # 字段描述：请求、连接池、线程池与存储指标
+        description="Record request, pool, thread-pool and storage metrics and serve them at GET /metrics",
+    )
+    # 严格模式：同一语句在一个请求中允许执行的最多次数
+    sql_repeat_limit: Optional[int] = Field(
+        # 默认关闭
+        default=None,
+        # 字段描述：超过时请求失败，用于测试中发现 N+1 查询
+        description="Fail a request that runs the same SQL statement more than this many times (tests only)",
+        # 必须为正数
+        gt=0,
+    )
 
 
 # 创建全局单例设置对象供应用使用
@@ -1,20 +1,202 @@
 # 模块级文档字符串：数据库引擎、会话工厂与依赖工具
-"""Database engine, session factory, and dependency helpers."""
+"""
+Database engine, session factory, and dependency helpers.
 
-# 导入 SQLAlchemy 引擎创建函数
-from sqlalchemy import create_engine
-# 导入声明式基类与会话工厂
-from sqlalchemy.orm import declarative_base, sessionmaker
+With ``DATABASE_ASYNC`` an async engine (aioodbc for SQL Server, aiosqlite
+for SQLite) and :func:`get_async_db` are created next to the sync ones. The
+sync engine is always available: storage backends, worker threads and
+streaming uploads keep using it.
+
+With ``REPLICA_DATABASE_URL`` read endpoints take their session from
+:func:`get_read_db` (or :func:`get_async_read_db`), which returns a replica
+session unless the replica is down or the client just wrote (see
+``app/core/replica.py``); everything else stays on the primary.
+"""
+
+# 导入类型注解
+from typing import Optional
+
+# 导入 FastAPI 请求类型
+from fastapi import Request
+# 导入 SQLAlchemy 引擎创建函数、URL 解析与事件工具
+from sqlalchemy import URL, create_engine, event, make_url
+# 导入数据库驱动异常基类
+from sqlalchemy.exc import DBAPIError
+# 导入异步引擎与会话工厂
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+# 导入声明式基类、会话类型与会话工厂
+from sqlalchemy.orm import Session, declarative_base, sessionmaker
 
 # 导入配置设置
 from app.core.config import settings
+# 导入带等待统计的连接池
+from app.core.pool import TimedAsyncQueuePool, TimedQueuePool
+# 导入按请求的 SQL 统计
+from app.core.query_stats import instrument
+# 导入副本健康状态与写后读判断
+from app.core.replica import ReplicaHealth, wants_primary
+
+# 各数据库对应的异步驱动
+_ASYNC_DRIVERS = {"mssql": "aioodbc", "sqlite": "aiosqlite"}
+
+
+# 连接池配置（主库、副本及各自的异步引擎相同，连接池彼此独立）
+_pool_options = dict(
+    # 常驻连接数
+    pool_size=settings.db_pool_size,
+    # 高峰时允许的额外连接数
+    max_overflow=settings.db_max_overflow,
+    # 等待空闲连接的超时（秒）
+    pool_timeout=settings.db_pool_timeout,
+    # 连接回收周期（秒）
+    pool_recycle=settings.db_pool_recycle,
+    # 检出前探活
+    pool_pre_ping=settings.db_pool_pre_ping,
+)
 
 
-# 创建 SQLAlchemy 引擎
-engine = create_engine(settings.database_url, pool_pre_ping=True, future=True)
+# 驱动相关选项
+def _driver_options(url: URL) -> dict:
+    # 函数文档：SQL Server + pyodbc/aioodbc 下启用 fast_executemany，加速批量插入
+    """Return driver-specific engine options for ``url``."""
+    # 只有 ODBC 驱动支持
+    return {"fast_executemany": True} if url.get_driver_name() in ("pyodbc", "aioodbc") else {}
+
+
+# 解析连接字符串以判断驱动
+_database_url = make_url(settings.database_url)
+# 创建 SQLAlchemy 引擎（附件写入也借用该连接池）
+engine = create_engine(
+    # 连接字符串
+    _database_url,
+    # 记录检出等待时间的连接池
+    poolclass=TimedQueuePool,
+    # 启用 2.0 风格
+    future=True,
+    # 连接池配置
+    **_pool_options,
+    # 驱动相关选项
+    **_driver_options(_database_url),
+)
 # 创建请求级数据库会话工厂
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+# 推导异步连接字符串
+def _async_database_url(url: URL, override: Optional[str] = None) -> URL:
+    # 函数文档：优先使用显式配置，否则把驱动换成对应的异步驱动
+    """Return ``override`` or ``url`` with its driver swapped for the async one."""
+    # 显式配置
+    if override:
+        return make_url(override)
+    # 对应的异步驱动
+    driver = _ASYNC_DRIVERS.get(url.get_backend_name())
+    # 无法推导
+    if driver is None:
+        raise RuntimeError(f"Set ASYNC_DATABASE_URL: no known async driver for {url.drivername}")
+    # 替换驱动
+    return url.set(drivername=f"{url.get_backend_name()}+{driver}")
+
+
+# 创建异步引擎
+def _create_async_engine(url: URL) -> AsyncEngine:
+    # 函数文档：记录检出等待时间的异步连接池，容量配置与同步池相同
+    """Create an async engine for ``url`` with the shared pool settings."""
+    # 创建异步引擎
+    return create_async_engine(
+        # 异步连接字符串
+        url,
+        # 记录检出等待时间的异步连接池
+        poolclass=TimedAsyncQueuePool,
+        # 连接池配置
+        **_pool_options,
+        # 驱动相关选项
+        **_driver_options(url),
+    )
+
+
+# 创建异步引擎（未开启异步模式时为 None）
+async_engine = (
+    _create_async_engine(_async_database_url(_database_url, settings.async_database_url))
+    if settings.database_async
+    else None
+)
+# 异步会话工厂：内部同步会话沿用 SessionLocal 的类，会话事件（版本号、缓存失效）照常触发
+AsyncSessionLocal = (
+    async_sessionmaker(async_engine, sync_session_class=SessionLocal.class_, autoflush=False)
+    if async_engine is not None
+    else None
+)
+
+# 副本健康状态
+replica_health = ReplicaHealth(settings.replica_retry_seconds)
+# 解析副本连接字符串（未配置时为 None）
+_replica_url = make_url(settings.replica_database_url) if settings.replica_database_url else None
+# 只读副本引擎（未配置时为 None）
+replica_engine = (
+    create_engine(
+        # 副本连接字符串
+        _replica_url,
+        # 记录检出等待时间的连接池
+        poolclass=TimedQueuePool,
+        # 启用 2.0 风格
+        future=True,
+        # 连接池配置
+        **_pool_options,
+        # 驱动相关选项
+        **_driver_options(_replica_url),
+    )
+    if _replica_url is not None
+    else None
+)
+# 副本的异步引擎（异步模式且配置了副本时创建）
+async_replica_engine = (
+    _create_async_engine(_async_database_url(_replica_url))
+    if _replica_url is not None and async_engine is not None
+    else None
+)
+# 副本会话工厂：info 中记录主库，供必须读最新数据的查询（如结构版本号）改走主库
+ReadSessionLocal = (
+    sessionmaker(autocommit=False, autoflush=False, bind=replica_engine, info={"primary_bind": engine})
+    if replica_engine is not None
+    else None
+)
+# 副本的异步会话工厂
+AsyncReadSessionLocal = (
+    async_sessionmaker(
+        # 副本异步引擎
+        async_replica_engine,
+        # 不自动刷新
+        autoflush=False,
+        # 主库为异步引擎的同步代理
+        info={"primary_bind": async_engine.sync_engine},
+    )
+    if async_replica_engine is not None
+    else None
+)
+
+
+# 副本连接出错时标记失败
+def _replica_error(context) -> None:
+    # 连接断开类错误说明副本不可用
+    if context.is_disconnect:
+        replica_health.mark_down()
+
+
+# 为副本引擎注册错误监听
+if replica_engine is not None:
+    event.listen(replica_engine, "handle_error", _replica_error)
+# 异步副本引擎在其同步代理上注册
+if async_replica_engine is not None:
+    event.listen(async_replica_engine.sync_engine, "handle_error", _replica_error)
+
+# 按请求统计各引擎的 SQL（异步引擎在其同步代理上注册）
+if settings.sql_instrumentation:
+    for _engine in (engine, replica_engine, async_engine, async_replica_engine):
+        # 未创建的引擎跳过
+        if _engine is not None:
+            instrument(_engine.sync_engine if isinstance(_engine, AsyncEngine) else _engine, settings.sql_repeat_limit)
+
 # 创建 ORM 模型的声明式基类
 Base = declarative_base()
 
@@ -33,3 +215,114 @@ def get_db():
     finally:
         # 关闭数据库会话
         db.close()
+
+
+# 提供异步数据库会话的依赖函数
+async def get_async_db():
+    # 函数文档：仅在 DATABASE_ASYNC 开启时可用
+    """Yield an ``AsyncSession`` (requires ``DATABASE_ASYNC``) and close it after use."""
+    # 创建并在使用后关闭
+    async with AsyncSessionLocal() as db:
+        # 以生成器形式返回会话
+        yield db
+
+
+# 提供只读数据库会话的依赖函数
+def get_read_db(request: Request):
+    # 函数文档：可用时使用副本，否则使用主库
+    """
+    Yield a session for a read-only endpoint: a replica session when a
+    replica is configured, healthy and the client did not just write,
+    otherwise a primary session. Close it after use.
+    """
+    # 打开会话
+    db = open_read_session(primary=wants_primary(request))
+    # 尝试把会话交给调用者
+    try:
+        # 以生成器形式返回会话
+        yield db
+    # 最终确保会话关闭
+    finally:
+        db.close()
+
+
+# 打开只读会话
+def open_read_session(primary: bool = False) -> Session:
+    # 函数文档：副本连接失败时标记失败并改用主库
+    """
+    Return a replica session, or a primary session when ``primary`` is set,
+    no replica is configured or it is marked down. The replica connection is
+    opened eagerly so a failure falls back to the primary instead of failing
+    the request.
+    """
+    # 使用主库
+    if primary or ReadSessionLocal is None or not replica_health.available():
+        return SessionLocal()
+    # 副本会话
+    db = ReadSessionLocal()
+    # 立即检出连接
+    try:
+        db.connection()
+    # 副本不可用
+    except DBAPIError:
+        # 关闭副本会话
+        db.close()
+        # 重试间隔内改用主库
+        replica_health.mark_down()
+        # 返回主库会话
+        return SessionLocal()
+    # 返回副本会话
+    return db
+
+
+# 提供异步只读数据库会话的依赖函数
+async def get_async_read_db(request: Request):
+    # 函数文档：get_read_db 的异步版本（需要 DATABASE_ASYNC）
+    """Async counterpart of :func:`get_read_db` (requires ``DATABASE_ASYNC``)."""
+    # 打开会话并在使用后关闭
+    async with await _open_async_read_session(wants_primary(request)) as db:
+        # 以生成器形式返回会话
+        yield db
+
+
+# 打开异步只读会话
+async def _open_async_read_session(primary: bool) -> AsyncSession:
+    # 使用主库
+    if primary or AsyncReadSessionLocal is None or not replica_health.available():
+        return AsyncSessionLocal()
+    # 副本会话
+    db = AsyncReadSessionLocal()
+    # 立即检出连接
+    try:
+        await db.connection()
+    # 副本不可用
+    except DBAPIError:
+        # 关闭副本会话
+        await db.close()
+        # 重试间隔内改用主库
+        replica_health.mark_down()
+        # 返回主库会话
+        return AsyncSessionLocal()
+    # 返回副本会话
+    return db
+
+
+# 会话是否连接副本
+def is_replica(db: Session) -> bool:
+    # 函数文档：副本会话在 info 中记录了主库
+    """Return True for sessions created from the replica session factories."""
+    # 检查会话信息
+    return "primary_bind" in db.info
+
+
+# 让语句改走主库的执行参数
+def primary_bind_arguments(db: Session) -> dict:
+    # 函数文档：副本会话返回指向主库的 bind，主库会话返回空字典
+    """
+    Return ``bind_arguments`` that run a statement of ``db`` on the primary:
+    for reads that must not lag behind this process's own writes.
+    """
+    # 副本会话记录的主库
+    bind = db.info.get("primary_bind")
+    # 主库会话无需指定
+    return {"bind": bind} if bind is not None else {}
@@ -0,0 +1,175 @@
+# 模块级文档字符串：支持 Range 与零拷贝的文件响应
+"""HTTP Range parsing and a streaming file response with zero-copy support."""
+
+# 导入类型注解
+from typing import Callable, Iterator, Optional, Tuple
+# 导入 URL 编码工具
+from urllib.parse import quote
+
+# 导入 Starlette 线程池迭代工具
+from starlette.concurrency import iterate_in_threadpool
+# 导入 Starlette 响应基类
+from starlette.responses import Response
+# 导入 ASGI 类型
+from starlette.types import Receive, Scope, Send
+
+# ASGI 零拷贝发送扩展（服务器声明支持时使用 sendfile）
+ZEROCOPY_EXTENSION = "http.response.zerocopysend"
+# ASGI 按路径发送扩展（仅整文件）
+PATHSEND_EXTENSION = "http.response.pathsend"
+
+
+# 范围不可满足
+class RangeNotSatisfiable(Exception):
+    # 类文档：请求的范围超出文件大小
+    """Raised when a Range header cannot be satisfied for the resource size."""
+
+
+# 解析 Range 请求头
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    # 函数文档：只支持单个字节范围，其余情况返回整文件
+    """
+    Parse a single ``bytes=`` range into an inclusive ``(start, end)``.
+
+    Returns None (serve the whole file) when there is no header, it is
+    malformed, or it asks for several ranges. Raises
+    :class:`RangeNotSatisfiable` when the range lies outside the file.
+    """
+    # 没有 Range 或不是字节单位
+    if not header or not header.strip().lower().startswith("bytes="):
+        return None
+    # 范围说明
+    spec = header.strip()[len("bytes="):].strip()
+    # 多个范围时返回整文件
+    if "," in spec:
+        return None
+    # 拆分起止
+    first, sep, last = spec.partition("-")
+    # 格式错误时忽略
+    if not sep:
+        return None
+    # 解析数字
+    try:
+        # 后缀范围：最后 N 个字节
+        if not first:
+            # 后缀长度
+            suffix = int(last)
+            # 长度为 0 不可满足
+            if suffix <= 0 or size == 0:
+                raise RangeNotSatisfiable(header)
+            # 返回最后 N 个字节
+            return max(0, size - suffix), size - 1
+        # 起点
+        start = int(first)
+        # 显式终点
+        end = int(last) if last else None
+    # 非数字时忽略
+    except ValueError:
+        return None
+    # 起点超出文件（先于缺省终点与格式检查，开放范围也返回 416）
+    if start >= size:
+        raise RangeNotSatisfiable(header)
+    # 终点缺省到末尾
+    if end is None:
+        end = size - 1
+    # 终点小于起点属于格式错误
+    if end < start:
+        return None
+    # 返回截断到文件末尾的范围
+    return start, min(end, size - 1)
+
+
+# 流式文件响应
+class RangedFileResponse(Response):
+    # 类文档：按块发送文件内容，支持 206 与零拷贝
+    """
+    Streams a stored file, whole (200) or as one byte range (206).
+
+    When ``path`` is a local file and the ASGI server advertises the
+    ``http.response.zerocopysend`` extension, the body is handed to the server
+    as a file descriptor so it can use ``sendfile``; whole files may also use
+    ``http.response.pathsend``. Otherwise ``chunks`` is iterated in the thread
+    pool and sent in bounded pieces.
+    """
+
+    # 初始化
+    def __init__(
+        self,
+        # 产出 [start, end] 内容的可调用对象
+        chunks: Callable[[int, int], Iterator[bytes]],
+        # 文件总字节数
+        size: int,
+        # 文件名（Content-Disposition）
+        filename: str,
+        # MIME 类型
+        media_type: Optional[str] = None,
+        # 字节范围（含两端），None 表示整文件
+        byte_range: Optional[Tuple[int, int]] = None,
+        # 本地文件路径（可零拷贝发送时提供）
+        path: Optional[str] = None,
+    ) -> None:
+        # 产出内容的可调用对象
+        self.chunks = chunks
+        # 本地文件路径
+        self.path = path
+        # 发送范围
+        self.start, self.end = byte_range if byte_range else (0, size - 1)
+        # 是否整文件
+        self.whole = byte_range is None
+        # 状态码
+        self.status_code = 200 if self.whole else 206
+        # MIME 类型
+        self.media_type = media_type or "application/octet-stream"
+        # 公共响应头
+        headers = {
+            # 内容长度
+            "content-length": str(max(0, self.end - self.start + 1)),
+            # 声明支持范围请求
+            "accept-ranges": "bytes",
+            # 内联展示，保留原文件名
+            "content-disposition": f"inline; filename*=UTF-8''{quote(filename)}",
+        }
+        # 部分内容时说明范围
+        if not self.whole:
+            headers["content-range"] = f"bytes {self.start}-{self.end}/{size}"
+        # 初始化响应头
+        self.init_headers(headers)
+        # 后台任务
+        self.background = None
+
+    # ASGI 调用
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        # 服务器支持的扩展
+        extensions = scope.get("extensions") or {}
+        # 发送状态与响应头
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        # HEAD 请求或空文件不发送响应体
+        if scope.get("method") == "HEAD" or self.end < self.start:
+            await send({"type": "http.response.body", "body": b""})
+            return
+        # 零拷贝：由服务器对文件描述符调用 sendfile
+        if self.path and ZEROCOPY_EXTENSION in extensions:
+            # 打开文件并交给服务器
+            with open(self.path, "rb") as handle:
+                await send(
+                    {
+                        # 零拷贝消息
+                        "type": ZEROCOPY_EXTENSION,
+                        # 文件对象
+                        "file": handle,
+                        # 起点
+                        "offset": self.start,
+                        # 字节数
+                        "count": self.end - self.start + 1,
+                    }
+                )
+            return
+        # 整文件按路径发送
+        if self.path and self.whole and PATHSEND_EXTENSION in extensions:
+            await send({"type": PATHSEND_EXTENSION, "path": self.path})
+            return
+        # 回退：在线程池中按块读取并发送
+        async for chunk in iterate_in_threadpool(self.chunks(self.start, self.end)):
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        # 结束响应体
+        await send({"type": "http.response.body", "body": b""})
@@ -0,0 +1,37 @@
+# 模块级文档字符串：ETag 条件请求工具
+"""Helpers for ETag / If-None-Match conditional responses."""
+
+# 导入 FastAPI 请求与响应类型
+from fastapi import Request, Response
+
+
+# 构建强 ETag
+def make_etag(*parts: object) -> str:
+    # 函数文档：由版本标记拼接出带引号的强 ETag
+    """Build a strong ETag from cheap version markers, e.g. ``make_etag("report", 7, 3)``."""
+    # 以短横线拼接并加引号
+    return '"' + "-".join(str(part) for part in parts) + '"'
+
+
+# 判断是否命中 If-None-Match
+def etag_matches(request: Request, etag: str) -> bool:
+    # 函数文档：按 RFC 9110 的弱比较判断 If-None-Match 是否包含该 ETag
+    """Return True when the request's If-None-Match lists ``etag`` (or ``*``)."""
+    # 读取请求头
+    header = request.headers.get("if-none-match")
+    # 没有条件请求
+    if not header:
+        return False
+    # 通配符匹配任何现存资源
+    if header.strip() == "*":
+        return True
+    # If-None-Match 使用弱比较，忽略 W/ 前缀
+    return etag in {tag.strip().removeprefix("W/") for tag in header.split(",")}
+
+
+# 构建 304 响应
+def not_modified(etag: str) -> Response:
+    # 函数文档：无响应体的 304，并回传 ETag
+    """Return an empty ``304 Not Modified`` response carrying ``etag``."""
+    # 返回 304
+    return Response(status_code=304, headers={"ETag": etag})
@@ -0,0 +1,426 @@
+# 模块级文档字符串：Prometheus 文本格式的进程内指标
+"""
+In-process metrics rendered in the Prometheus text format (``GET /metrics``).
+
+Counters, gauges and histograms keep one shard per thread: a thread only
+ever updates its own shard, so recording takes no lock and never contends
+(under the GIL each update is a couple of dict operations). Scrapes sum the
+shards; a value read while its thread is updating it may be one update
+behind, which a monitoring scrape tolerates. Shards of finished threads are
+kept because counters are cumulative.
+
+:class:`MetricsMiddleware` records per-route latency histograms, request
+counts, in-flight requests and the body bytes and throughput of multipart
+uploads. Values computed at scrape time (pool and thread-pool occupancy) are
+added by the ``/metrics`` route.
+"""
+
+# 导入二分查找工具
+import bisect
+# 导入线程工具
+import threading
+# 导入计时工具
+from time import perf_counter
+# 导入类型注解
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# 导入 ASGI 类型
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# 默认的延迟分桶（秒）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# 上传吞吐分桶（字节/秒）
+THROUGHPUT_BUCKETS = tuple(float(2**power) for power in range(16, 32, 2))
+# 未匹配任何路由的请求使用的标签（避免按原始路径产生无限标签）
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+# 每线程分片
+class _Shards:
+    # 类文档：每个线程一个字典，只有所属线程写入
+    """One dict per thread; only the owning thread writes to it."""
+
+    # 初始化方法
+    def __init__(self) -> None:
+        # 线程本地存储
+        self._local = threading.local()
+        # 全部分片（仅在新线程首次记录时加锁追加）
+        self._all: List[dict] = []
+        # 保护分片列表的锁
+        self._lock = threading.Lock()
+
+    # 当前线程的分片
+    def local(self) -> dict:
+        # 已创建
+        try:
+            return self._local.shard
+        # 首次使用时创建并登记
+        except AttributeError:
+            # 新分片
+            shard: dict = {}
+            # 登记
+            with self._lock:
+                self._all.append(shard)
+            # 保存到线程本地
+            self._local.shard = shard
+            # 返回分片
+            return shard
+
+    # 全部分片的快照
+    def snapshot(self) -> List[dict]:
+        # 方法文档：复制每个分片（字典复制在 GIL 下是原子的）
+        """Return copies of every shard."""
+        # 复制分片列表
+        with self._lock:
+            shards = list(self._all)
+        # 复制每个分片
+        return [shard.copy() for shard in shards]
+
+
+# 指标基类
+class _Metric:
+    # 类文档：名称、说明与标签名
+    """Name, help text and label names shared by every metric type."""
+
+    # 指标类型
+    kind = "untyped"
+
+    # 初始化方法
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()) -> None:
+        # 指标名称
+        self.name = name
+        # 说明
+        self.documentation = documentation
+        # 标签名
+        self.labels = tuple(labels)
+        # 每线程分片
+        self._shards = _Shards()
+
+    # 输出文本
+    def render(self) -> List[str]:
+        # 方法文档：HELP/TYPE 行与样本行
+        """Return the exposition lines of this metric."""
+        # 头部
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}", *self._samples()]
+
+    # 样本行
+    def _samples(self) -> List[str]:
+        # 汇总各分片
+        totals: Dict[tuple, float] = {}
+        # 累加
+        for shard in self._shards.snapshot():
+            for key, value in shard.items():
+                totals[key] = totals.get(key, 0) + value
+        # 输出
+        return [f"{self.name}{_labels(self.labels, key)} {_number(value)}" for key, value in sorted(totals.items())]
+
+
+# 计数器
+class Counter(_Metric):
+    # 类文档：只增不减
+    """Monotonic counter."""
+
+    # 指标类型
+    kind = "counter"
+
+    # 增加
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        # 方法文档：按标签值增加
+        """Add ``amount`` to the series of ``label_values``."""
+        # 当前线程的分片
+        shard = self._shards.local()
+        # 累加
+        shard[label_values] = shard.get(label_values, 0) + amount
+
+
+# 仪表
+class Gauge(Counter):
+    # 类文档：可增可减（各线程分片之和）
+    """Gauge updated with increments and decrements (summed across threads)."""
+
+    # 指标类型
+    kind = "gauge"
+
+    # 减少
+    def dec(self, *label_values: str, amount: float = 1) -> None:
+        # 方法文档：按标签值减少
+        """Subtract ``amount`` from the series of ``label_values``."""
+        # 负增量
+        self.inc(*label_values, amount=-amount)
+
+
+# 直方图
+class Histogram(_Metric):
+    # 类文档：固定分桶，记录非累积计数，输出时累积
+    """Histogram with fixed buckets."""
+
+    # 指标类型
+    kind = "histogram"
+
+    # 初始化方法
+    def __init__(
+        self, name: str, documentation: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> None:
+        # 初始化基类
+        super().__init__(name, documentation, labels)
+        # 分桶上界（升序）
+        self.buckets = tuple(sorted(buckets))
+
+    # 记录一个观测值
+    def observe(self, value: float, *label_values: str) -> None:
+        # 方法文档：按标签值记录
+        """Record ``value`` in the series of ``label_values``."""
+        # 当前线程的分片
+        shard = self._shards.local()
+        # 本序列的计数：各分桶、+Inf、总和
+        entry = shard.get(label_values)
+        # 首次记录
+        if entry is None:
+            entry = shard[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+        # 落入的分桶（超出全部上界时为 +Inf）
+        entry[bisect.bisect_left(self.buckets, value)] += 1
+        # 累加总和
+        entry[-1] += value
+
+    # 样本行
+    def _samples(self) -> List[str]:
+        # 汇总各分片
+        totals: Dict[tuple, List[float]] = {}
+        # 累加
+        for shard in self._shards.snapshot():
+            for key, entry in shard.items():
+                # 已有的汇总
+                total = totals.setdefault(key, [0] * len(entry))
+                # 逐项相加
+                for index, value in enumerate(list(entry)):
+                    total[index] += value
+        # 输出行
+        lines: List[str] = []
+        # 逐个序列
+        for key, total in sorted(totals.items()):
+            # 累积计数
+            cumulative = 0
+            # 各分桶
+            for bound, count in zip((*self.buckets, float("inf")), total):
+                # 累积
+                cumulative += count
+                # 分桶行
+                lines.append(f"{self.name}_bucket{_labels((*self.labels, 'le'), (*key, _number(bound)))} {cumulative}")
+            # 总和与总数
+            lines.append(f"{self.name}_sum{_labels(self.labels, key)} {_number(total[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.labels, key)} {cumulative}")
+        # 返回
+        return lines
+
+
+# 指标注册表
+class MetricsRegistry:
+    # 类文档：登记指标与抓取时计算的采集函数
+    """Holds the metrics and the scrape-time collectors rendered by ``/metrics``."""
+
+    # 初始化方法
+    def __init__(self) -> None:
+        # 已登记的指标
+        self._metrics: List[_Metric] = []
+        # 抓取时调用的采集函数，返回文本行
+        self._collectors: List[Callable[[], Iterable[str]]] = []
+
+    # 创建计数器
+    def counter(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Counter:
+        # 方法文档：创建并登记
+        """Create and register a :class:`Counter`."""
+        # 登记
+        return self._register(Counter(name, documentation, labels))
+
+    # 创建仪表
+    def gauge(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Gauge:
+        # 方法文档：创建并登记
+        """Create and register a :class:`Gauge`."""
+        # 登记
+        return self._register(Gauge(name, documentation, labels))
+
+    # 创建直方图
+    def histogram(
+        self, name: str, documentation: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> Histogram:
+        # 方法文档：创建并登记
+        """Create and register a :class:`Histogram`."""
+        # 登记
+        return self._register(Histogram(name, documentation, labels, buckets))
+
+    # 登记采集函数
+    def add_collector(self, collector: Callable[[], Iterable[str]]) -> None:
+        # 方法文档：抓取时调用，返回完整的文本行（含 HELP/TYPE）
+        """Register a callable returning exposition lines computed at scrape time."""
+        # 登记
+        self._collectors.append(collector)
+
+    # 输出全部指标
+    def render(self) -> str:
+        # 方法文档：Prometheus 文本格式
+        """Render every metric and collector in the Prometheus text format."""
+        # 指标行
+        lines = [line for metric in self._metrics for line in metric.render()]
+        # 采集函数行
+        for collector in self._collectors:
+            lines.extend(collector())
+        # 以换行结尾
+        return "\n".join(lines) + "\n"
+
+    # 登记指标
+    def _register(self, metric):
+        # 追加
+        self._metrics.append(metric)
+        # 返回指标
+        return metric
+
+
+# 抓取时计算的指标
+def scrape_lines(
+    name: str, documentation: str, samples: Iterable[Tuple[Dict[str, str], float]], kind: str = "gauge"
+) -> List[str]:
+    # 函数文档：供采集函数输出一组带标签的值
+    """Return exposition lines of a ``kind`` metric from ``(labels, value)`` samples."""
+    # 头部
+    lines = [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"]
+    # 样本
+    for labels, value in samples:
+        lines.append(f"{name}{_labels(tuple(labels), tuple(labels.values()))} {_number(value)}")
+    # 返回
+    return lines
+
+
+# 全局注册表
+registry = MetricsRegistry()
+# 请求延迟
+request_seconds = registry.histogram(
+    "rms_http_request_duration_seconds", "HTTP request latency by route.", ("method", "route")
+)
+# 请求数
+requests_total = registry.counter("rms_http_requests_total", "HTTP requests by route and status.", ("method", "route", "status"))
+# 处理中的请求
+requests_in_flight = registry.gauge("rms_http_requests_in_flight", "HTTP requests being handled.", ("method",))
+# 上传字节数
+upload_bytes = registry.counter("rms_upload_bytes_total", "Multipart request body bytes received by route.", ("route",))
+# 上传吞吐
+upload_throughput = registry.histogram(
+    "rms_upload_throughput_bytes_per_second",
+    "Body bytes per second of multipart requests by route.",
+    ("route",),
+    THROUGHPUT_BUCKETS,
+)
+# 存储后端写入耗时
+storage_write_seconds = registry.histogram(
+    "rms_storage_write_duration_seconds", "Time to write one object to the storage backend.", ("backend",)
+)
+
+
+# 请求指标中间件
+class MetricsMiddleware:
+    # 类文档：记录每个请求的延迟、状态与上传字节数
+    """
+    ASGI middleware recording latency, status, in-flight requests and, for
+    multipart requests, body bytes and throughput. The route label is the
+    matched path template (``/reports/{report_id}``), read from the scope
+    after routing.
+    """
+
+    # 初始化方法
+    def __init__(self, app: ASGIApp) -> None:
+        # 下游应用
+        self.app = app
+
+    # ASGI 入口
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        # 非 HTTP 请求直接转发
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        # 请求方法
+        method = scope["method"]
+        # 响应状态码
+        status = 500
+        # 接收的请求体字节数（仅统计 multipart 请求）
+        received: Optional[List[int]] = [0] if _is_multipart(scope) else None
+
+        # 记录状态码
+        async def send_with_status(message: Message) -> None:
+            # 记录状态码
+            nonlocal status
+            # 响应开始消息
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            # 转发消息
+            await send(message)
+
+        # 统计请求体字节数
+        async def counting_receive() -> Message:
+            # 接收消息
+            message = await receive()
+            # 累加请求体长度
+            received[0] += len(message.get("body", b""))
+            # 返回消息
+            return message
+
+        # 处理中的请求加一
+        requests_in_flight.inc(method)
+        # 开始时间
+        started = perf_counter()
+        # 调用下游应用
+        try:
+            await self.app(scope, counting_receive if received is not None else receive, send_with_status)
+        # 记录指标
+        finally:
+            # 耗时
+            elapsed = perf_counter() - started
+            # 处理中的请求减一
+            requests_in_flight.dec(method)
+            # 匹配到的路由模板
+            route = getattr(scope.get("route"), "path", UNMATCHED_ROUTE)
+            # 延迟
+            request_seconds.observe(elapsed, method, route)
+            # 请求数
+            requests_total.inc(method, route, str(status))
+            # 上传字节数与吞吐
+            if received is not None and received[0]:
+                # 字节数
+                upload_bytes.inc(route, amount=received[0])
+                # 吞吐
+                upload_throughput.observe(received[0] / elapsed if elapsed > 0 else 0.0, route)
+
+
+# 是否为 multipart 请求
+def _is_multipart(scope: Scope) -> bool:
+    # 查找 Content-Type 头
+    for name, value in scope["headers"]:
+        if name == b"content-type":
+            return value.startswith(b"multipart/")
+    # 没有 Content-Type
+    return False
+
+
+# 标签文本
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...]) -> str:
+    # 没有标签
+    if not names:
+        return ""
+    # 转义并拼接
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)) + "}"
+
+
+# 转义标签值
+def _escape(value: str) -> str:
+    # 反斜杠、引号与换行
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# 数值文本
+def _number(value: float) -> str:
+    # 正无穷
+    if value == float("inf"):
+        return "+Inf"
+    # 整数值不带小数点
+    if float(value).is_integer():
+        return str(int(value))
+    # 其他按 repr 输出
+    return repr(float(value))
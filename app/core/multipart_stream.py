@@ -0,0 +1,264 @@
+# 模块级文档字符串：流式 multipart/form-data 解析
+"""
+Incremental ``multipart/form-data`` parsing without temporary files.
+
+Starlette's form parser spools every file part to a ``SpooledTemporaryFile``
+before the endpoint runs. :class:`MultipartStream` instead pulls the body
+chunk by chunk (see :func:`blocking_body`), feeds it to python-multipart's
+push parser and hands out each part as a file-like object, so a handler
+running in the thread pool can pipe file parts straight into a storage
+backend. Parts must be read in order; unread data of a part is skipped when
+the next part is requested.
+"""
+
+# 导入双端队列
+from collections import deque
+# 导入类型注解
+from typing import Deque, Dict, Iterator, Optional, Tuple
+
+# 导入 anyio 线程桥接工具
+import anyio.from_thread
+# 导入 python-multipart 增量解析器与头部解析
+from python_multipart.multipart import MultipartParser, parse_options_header
+# 导入 Starlette 请求类型
+from starlette.requests import Request
+
+# 表单字段（非文件部分）的默认最大字节数
+DEFAULT_MAX_FIELD_SIZE = 1024 * 1024
+
+
+# 请求体格式错误
+class MultipartError(Exception):
+    # 类文档：请求体不是合法的 multipart/form-data
+    """Raised when the request body is not valid ``multipart/form-data``."""
+
+
+# 在线程池中同步读取请求体
+def blocking_body(request: Request) -> Iterator[bytes]:
+    # 函数文档：只能在 run_in_threadpool 启动的线程中迭代
+    """
+    Yield the request body chunk by chunk from a worker thread.
+
+    Each chunk is awaited on the event loop with ``anyio.from_thread``, so
+    this must be iterated inside ``run_in_threadpool``.
+    """
+    # 异步请求体流
+    stream = request.stream()
+    # 逐块读取
+    while True:
+        # 在事件循环中取下一块
+        try:
+            chunk = anyio.from_thread.run(stream.__anext__)
+        # 读取完毕
+        except StopAsyncIteration:
+            return
+        # 跳过空块
+        if chunk:
+            yield chunk
+
+
+# 一个表单部分
+class StreamingPart:
+    # 类文档：只读、不可定位的表单部分内容
+    """One part of a streamed form: its headers and a forward-only ``read``."""
+
+    # 初始化
+    def __init__(self, owner: "MultipartStream", name: str, filename: Optional[str], content_type: Optional[str]) -> None:
+        # 所属解析器
+        self._owner = owner
+        # 字段名
+        self.name = name
+        # 文件名（非文件字段为 None）
+        self.filename = filename
+        # MIME 类型
+        self.content_type = content_type
+        # 已解析未读取的数据
+        self._buffer = bytearray()
+        # 本部分是否已结束
+        self.finished = False
+
+    # 读取
+    def read(self, size: int = -1) -> bytes:
+        # 方法文档：最多返回 size 字节，读完返回空字节串
+        """Return up to ``size`` bytes of the part (all remaining if negative); ``b""`` at its end."""
+        # 数据不足时继续解析
+        while not self.finished and (size < 0 or len(self._buffer) < size):
+            self._owner._pump(self)
+        # 本次返回的长度
+        length = len(self._buffer) if size < 0 else min(size, len(self._buffer))
+        # 取出数据
+        chunk = bytes(self._buffer[:length])
+        # 移除已读数据
+        del self._buffer[:length]
+        # 返回数据
+        return chunk
+
+    # 是否可定位
+    def seekable(self) -> bool:
+        # 方法文档：流式部分只能顺序读取
+        """Streamed parts can only be read forward."""
+        # 不可定位
+        return False
+
+    # 读取完整的表单字段
+    def read_field(self, max_size: int = DEFAULT_MAX_FIELD_SIZE) -> str:
+        # 方法文档：按 UTF-8 解码，超过上限时报错
+        """Read the whole part as UTF-8 text, refusing parts larger than ``max_size`` bytes."""
+        # 多读一个字节以判断是否超限
+        data = self.read(max_size + 1)
+        # 超限
+        if len(data) > max_size:
+            raise MultipartError(f"Form field {self.name!r} is larger than {max_size} bytes")
+        # 解码
+        return data.decode("utf-8", errors="replace")
+
+
+# 流式 multipart 解析器
+class MultipartStream:
+    # 类文档：从块迭代器增量解析表单部分
+    """Iterates the parts of a ``multipart/form-data`` body read from ``chunks``."""
+
+    # 初始化
+    def __init__(self, content_type: Optional[str], chunks: Iterator[bytes]) -> None:
+        # 解析 Content-Type
+        media_type, options = parse_options_header(content_type)
+        # 必须是 multipart/form-data 且带边界
+        if media_type != b"multipart/form-data" or b"boundary" not in options:
+            raise MultipartError("Expected a multipart/form-data body with a boundary")
+        # 请求体块
+        self._chunks = chunks
+        # 解析事件：("part", 头部) / ("data", 字节) / ("end", None)
+        self._events: Deque[Tuple[str, object]] = deque()
+        # 当前部分的头部
+        self._headers: Dict[bytes, bytes] = {}
+        # 正在解析的头部名称与值
+        self._header_field = bytearray()
+        self._header_value = bytearray()
+        # 请求体是否已完整解析
+        self._done = False
+        # 增量解析器
+        self._parser = MultipartParser(
+            # 边界
+            options[b"boundary"],
+            # 回调
+            {
+                # 新部分开始
+                "on_part_begin": self._on_part_begin,
+                # 头部名称片段
+                "on_header_field": lambda data, start, end: self._header_field.extend(data[start:end]),
+                # 头部值片段
+                "on_header_value": lambda data, start, end: self._header_value.extend(data[start:end]),
+                # 一个头部结束
+                "on_header_end": self._on_header_end,
+                # 全部头部结束
+                "on_headers_finished": lambda: self._events.append(("part", self._headers)),
+                # 内容片段
+                "on_part_data": lambda data, start, end: self._events.append(("data", data[start:end])),
+                # 部分结束
+                "on_part_end": lambda: self._events.append(("end", None)),
+                # 请求体结束
+                "on_end": self._on_end,
+            },
+        )
+        # 当前部分
+        self._current: Optional[StreamingPart] = None
+
+    # 迭代表单部分
+    def __iter__(self) -> Iterator[StreamingPart]:
+        # 逐个产出
+        while True:
+            # 跳过当前部分未读取的内容
+            if self._current is not None:
+                while not self._current.finished:
+                    # 丢弃已缓冲的数据
+                    self._current._buffer.clear()
+                    # 继续解析
+                    self._pump(self._current)
+            # 下一个事件
+            event = self._next_event()
+            # 请求体结束
+            if event is None:
+                return
+            # 部分之间只会出现部分开始事件
+            if event[0] != "part":
+                raise MultipartError("Unexpected data outside a multipart part")
+            # 构建部分
+            self._current = self._make_part(event[1])
+            # 产出
+            yield self._current
+
+    # 为当前部分解析更多数据
+    def _pump(self, part: StreamingPart) -> None:
+        # 取下一个事件
+        event = self._next_event()
+        # 请求体在部分中途结束
+        if event is None or event[0] == "part":
+            raise MultipartError("Multipart body ended in the middle of a part")
+        # 内容片段
+        if event[0] == "data":
+            part._buffer.extend(event[1])
+        # 部分结束
+        else:
+            part.finished = True
+
+    # 取下一个解析事件
+    def _next_event(self) -> Optional[Tuple[str, object]]:
+        # 事件不足时继续输入请求体
+        while not self._events:
+            # 已解析完毕
+            if self._done:
+                return None
+            # 下一块
+            chunk = next(self._chunks, None)
+            # 请求体提前结束
+            if chunk is None:
+                raise MultipartError("Multipart body ended before the closing boundary")
+            # 输入解析器
+            try:
+                self._parser.write(chunk)
+            # 解析错误
+            except Exception as exc:
+                raise MultipartError(str(exc)) from exc
+        # 返回最早的事件
+        return self._events.popleft()
+
+    # 由头部构建部分
+    def _make_part(self, headers: Dict[bytes, bytes]) -> StreamingPart:
+        # 解析 Content-Disposition
+        _, options = parse_options_header(headers.get(b"content-disposition"))
+        # 必须有字段名
+        if b"name" not in options:
+            raise MultipartError('The Content-Disposition header field "name" must be provided')
+        # 文件名
+        filename = options.get(b"filename")
+        # MIME 类型
+        content_type = headers.get(b"content-type")
+        # 返回部分
+        return StreamingPart(
+            # 所属解析器
+            self,
+            # 字段名
+            options[b"name"].decode("utf-8", errors="replace"),
+            # 文件名
+            filename.decode("utf-8", errors="replace") if filename is not None else None,
+            # MIME 类型
+            content_type.decode("latin-1") if content_type else None,
+        )
+
+    # 新部分开始
+    def _on_part_begin(self) -> None:
+        # 重置头部
+        self._headers = {}
+
+    # 一个头部结束
+    def _on_header_end(self) -> None:
+        # 记录头部（名称小写）
+        self._headers[bytes(self._header_field).lower()] = bytes(self._header_value)
+        # 重置片段
+        self._header_field.clear()
+        self._header_value.clear()
+
+    # 请求体结束
+    def _on_end(self) -> None:
+        # 标记完成
+        self._done = True
@@ -0,0 +1,123 @@
+# 模块级文档字符串：带等待统计的连接池
+"""Connection pool that records checkout counts and wait times."""
+
+# 导入线程锁工具
+import threading
+# 导入计时工具
+import time
+
+# 导入 SQLAlchemy 异常
+from sqlalchemy import exc
+# 导入 SQLAlchemy 队列连接池
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+# 连接池统计
+class PoolStats:
+    # 类文档：线程安全的检出计数与等待时间
+    """Thread-safe checkout and wait-time counters of a pool."""
+
+    # 初始化
+    def __init__(self) -> None:
+        # 保护计数的锁
+        self._lock = threading.Lock()
+        # 成功检出次数
+        self.checkouts = 0
+        # 等待超时次数
+        self.timeouts = 0
+        # 累计等待时间（秒）
+        self.wait_seconds_total = 0.0
+        # 最长等待时间（秒）
+        self.wait_seconds_max = 0.0
+
+    # 记录一次检出
+    def record(self, waited: float, timed_out: bool = False) -> None:
+        # 方法文档：累计一次检出的等待时间
+        """Account for one checkout attempt that waited ``waited`` seconds."""
+        # 加锁更新
+        with self._lock:
+            # 超时与成功分别计数
+            if timed_out:
+                self.timeouts += 1
+            # 成功检出
+            else:
+                self.checkouts += 1
+            # 累计等待
+            self.wait_seconds_total += waited
+            # 更新最长等待
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+    # 快照
+    def snapshot(self) -> dict:
+        # 方法文档：返回计数快照
+        """Return the counters as a dict."""
+        # 加锁读取
+        with self._lock:
+            # 总尝试次数
+            attempts = self.checkouts + self.timeouts
+            # 返回快照
+            return {
+                # 成功检出次数
+                "checkouts": self.checkouts,
+                # 等待超时次数
+                "timeouts": self.timeouts,
+                # 累计等待时间
+                "wait_seconds_total": round(self.wait_seconds_total, 6),
+                # 平均等待时间
+                "wait_seconds_avg": round(self.wait_seconds_total / attempts, 6) if attempts else 0.0,
+                # 最长等待时间
+                "wait_seconds_max": round(self.wait_seconds_max, 6),
+            }
+
+
+# 记录等待时间的队列连接池
+class TimedQueuePool(QueuePool):
+    # 类文档：在 QueuePool 的检出路径上计时
+    """QueuePool that times every checkout, including waits for a free connection."""
+
+    # 初始化
+    def __init__(self, *args, **kwargs) -> None:
+        # 初始化父类
+        super().__init__(*args, **kwargs)
+        # 本池的统计
+        self.stats = PoolStats()
+
+    # 检出连接
+    def _do_get(self):
+        # 记录开始时间
+        started = time.perf_counter()
+        # 从队列取连接（可能等待）
+        try:
+            connection = super()._do_get()
+        # 超时也计入统计
+        except exc.TimeoutError:
+            self.stats.record(time.perf_counter() - started, timed_out=True)
+            raise
+        # 记录等待时间
+        self.stats.record(time.perf_counter() - started)
+        # 返回连接
+        return connection
+
+    # 统计快照
+    def snapshot(self) -> dict:
+        # 方法文档：池容量状态与检出统计
+        """Return pool occupancy together with the checkout counters."""
+        # 合并状态与计数
+        return {
+            # 配置的池大小
+            "size": self.size(),
+            # 当前检出的连接数
+            "checked_out": self.checkedout(),
+            # 当前空闲连接数
+            "checked_in": self.checkedin(),
+            # 当前溢出连接数
+            "overflow": self.overflow(),
+            # 检出计数
+            **self.stats.snapshot(),
+        }
+
+
+# 异步引擎使用的计时连接池
+class TimedAsyncQueuePool(TimedQueuePool, AsyncAdaptedQueuePool):
+    # 类文档：异步驱动（aioodbc / aiosqlite）下的计时连接池
+    """:class:`TimedQueuePool` for async engines; waits happen on the event loop."""
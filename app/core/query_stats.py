@@ -0,0 +1,285 @@
+# 模块级文档字符串：按请求统计 SQL 次数、耗时与行数
+"""
+Per-request SQL instrumentation.
+
+:func:`instrument` hooks an engine's cursor events; while
+:class:`QueryStatsMiddleware` is handling a request, every statement run
+on its behalf (including in the thread pool, the async engine's greenlets
+and streaming generators, which inherit the request's context) adds to
+that request's :class:`QueryStats`. The totals are sent as a
+``Server-Timing: db;dur=...`` header and logged to the ``app.sql`` logger
+when the response is complete. Statements of background workers are not
+attributed to any request.
+
+Strict mode (``SQL_REPEAT_LIMIT``) raises :class:`RepeatedQueryError` as
+soon as one statement text runs more often than the limit within a
+request, which turns lazy-load N+1 regressions into failing requests in
+tests. Batched loads (``selectinload``, ``IN`` lists) use one statement per
+batch and stay under any sensible limit; an executemany split into several
+round trips counts once. Code that loops on purpose calls
+:func:`allow_repeated_queries`.
+"""
+
+# 导入日志工具
+import logging
+# 导入计数器
+from collections import Counter
+# 导入上下文变量
+from contextvars import ContextVar
+# 导入数据类工具
+from dataclasses import dataclass, field
+# 导入计时工具
+from time import perf_counter
+# 导入类型注解
+from typing import Any, List, Optional
+
+# 导入 SQLAlchemy 事件工具
+from sqlalchemy import event
+# 导入 SQLAlchemy 引擎类型
+from sqlalchemy.engine import Engine
+# 导入 ASGI 类型
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# 日志记录器
+logger = logging.getLogger("app.sql")
+# 当前请求的统计（请求之外为 None）
+_current: ContextVar[Optional["QueryStats"]] = ContextVar("query_stats", default=None)
+
+
+# 重复语句异常
+class RepeatedQueryError(RuntimeError):
+    # 类文档：严格模式下同一语句超过次数上限
+    """Raised in strict mode when a statement repeats more than ``SQL_REPEAT_LIMIT`` times."""
+
+
+# 单个请求的统计
+@dataclass
+class QueryStats:
+    # 类文档：语句数、数据库耗时、读取行数与每种语句的次数
+    """Statements, database time and fetched rows of one request."""
+
+    # 语句数
+    queries: int = 0
+    # 数据库耗时（秒）
+    seconds: float = 0.0
+    # 读取的行数
+    rows: int = 0
+    # 每种语句的执行次数
+    shapes: Counter = field(default_factory=Counter)
+    # 是否允许重复语句（严格模式下的有意循环，如分批导出）
+    repeats_allowed: bool = False
+
+    # Server-Timing 头
+    def server_timing(self) -> str:
+        # 方法文档：数据库耗时（毫秒）与语句、行数说明
+        """Return the ``Server-Timing`` header value."""
+        # 返回头内容
+        return f'db;dur={self.seconds * 1000:.1f};desc="{self.queries} queries, {self.rows} rows"'
+
+    # 重复最多的语句
+    def most_repeated(self) -> int:
+        # 方法文档：同一语句的最大执行次数
+        """Return the highest execution count of a single statement."""
+        # 没有语句时为 0
+        return max(self.shapes.values(), default=0)
+
+
+# 当前请求的统计
+def current_stats() -> Optional[QueryStats]:
+    # 函数文档：请求之外返回 None
+    """Return the statistics of the request being handled, if any."""
+    # 读取上下文变量
+    return _current.get()
+
+
+# 允许当前请求重复执行语句
+def allow_repeated_queries() -> None:
+    # 函数文档：供有意按批循环查询的代码豁免严格模式
+    """
+    Exempt the current request from strict mode, for code that repeats a
+    statement on purpose (keyset batches of a streaming export). Stored on
+    the request's statistics rather than in a context variable, so it holds
+    across the thread-pool steps of a streaming generator.
+    """
+    # 当前请求的统计
+    stats = _current.get()
+    # 请求之外无需处理
+    if stats is not None:
+        stats.repeats_allowed = True
+
+
+# 为引擎注册统计事件
+def instrument(engine: Engine, repeat_limit: Optional[int] = None) -> None:
+    # 函数文档：异步引擎传入其 sync_engine
+    """
+    Count the statements of ``engine`` (for an async engine pass its
+    ``sync_engine``) into the current request's statistics; with
+    ``repeat_limit`` enforce strict mode.
+    """
+
+    # 语句执行前
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, _cursor, statement, _parameters, context, _executemany) -> None:
+        # 当前请求的统计
+        stats = _current.get()
+        # 不在请求中
+        if stats is None:
+            return
+        # 累计往返次数
+        stats.queries += 1
+        # 一次执行拆成多批（insertmanyvalues）时只计一次语句
+        if context is None or not getattr(context, "_query_stats_counted", False):
+            # 标记本次执行
+            if context is not None:
+                context._query_stats_counted = True
+            # 语句形状：拆批前的原始语句
+            shape = context.statement if context is not None else statement
+            # 累计同一语句的次数
+            stats.shapes[shape] += 1
+            # 严格模式下超过上限
+            if repeat_limit is not None and not stats.repeats_allowed and stats.shapes[shape] > repeat_limit:
+                raise RepeatedQueryError(
+                    f"Statement executed {stats.shapes[shape]} times in one request "
+                    f"(SQL_REPEAT_LIMIT={repeat_limit}): {shape}"
+                )
+        # 记录开始时间
+        conn.info["query_stats_started"] = perf_counter()
+
+    # 语句执行后
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, _statement, _parameters, context, _executemany) -> None:
+        # 当前请求的统计
+        stats = _current.get()
+        # 不在请求中
+        if stats is None:
+            return
+        # 累计耗时
+        stats.seconds += perf_counter() - conn.info.pop("query_stats_started", perf_counter())
+        # 返回结果集的语句：读取时计数
+        if cursor.description is not None:
+            context.cursor = _CountingCursor(cursor, stats)
+        # 写入语句：累计影响的行数
+        elif cursor.rowcount > 0:
+            stats.rows += cursor.rowcount
+
+
+# 统计读取行数的游标代理
+class _CountingCursor:
+    # 类文档：其余属性与方法转发给 DBAPI 游标
+    """DBAPI cursor proxy that counts rows returned by the fetch methods."""
+
+    # 初始化方法
+    def __init__(self, cursor: Any, stats: QueryStats) -> None:
+        # 原游标
+        self._cursor = cursor
+        # 当前请求的统计
+        self._stats = stats
+
+    # 读取一行
+    def fetchone(self) -> Any:
+        # 读取
+        row = self._cursor.fetchone()
+        # 计数
+        if row is not None:
+            self._stats.rows += 1
+        # 返回
+        return row
+
+    # 读取多行
+    def fetchmany(self, *args: Any) -> List[Any]:
+        # 读取
+        rows = self._cursor.fetchmany(*args)
+        # 计数
+        self._stats.rows += len(rows)
+        # 返回
+        return rows
+
+    # 读取全部
+    def fetchall(self) -> List[Any]:
+        # 读取
+        rows = self._cursor.fetchall()
+        # 计数
+        self._stats.rows += len(rows)
+        # 返回
+        return rows
+
+    # 转发其他属性
+    def __getattr__(self, name: str) -> Any:
+        # 返回原游标的属性
+        return getattr(self._cursor, name)
+
+
+# 请求统计中间件
+class QueryStatsMiddleware:
+    # 类文档：为每个 HTTP 请求建立统计并输出
+    """
+    ASGI middleware giving each HTTP request its own :class:`QueryStats`,
+    adding the ``Server-Timing`` header when the response starts and
+    logging the totals once it is complete. Statements run after the
+    headers were sent (streaming responses) only appear in the log.
+    """
+
+    # 初始化方法
+    def __init__(self, app: ASGIApp) -> None:
+        # 下游应用
+        self.app = app
+
+    # ASGI 入口
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        # 非 HTTP 请求直接转发
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        # 本请求的统计
+        stats = QueryStats()
+        # 设置上下文变量
+        token = _current.set(stats)
+        # 响应状态码
+        status = 500
+        # 开始时间
+        started = perf_counter()
+
+        # 在响应头中附加 Server-Timing
+        async def send_with_timing(message: Message) -> None:
+            # 记录状态码
+            nonlocal status
+            # 响应开始消息
+            if message["type"] == "http.response.start":
+                # 状态码
+                status = message["status"]
+                # 附加头
+                message = {
+                    **message,
+                    "headers": [*message.get("headers", ()), (b"server-timing", stats.server_timing().encode())],
+                }
+            # 转发消息
+            await send(message)
+
+        # 调用下游应用
+        try:
+            await self.app(scope, receive, send_with_timing)
+        # 输出日志并恢复上下文
+        finally:
+            # 恢复上下文变量
+            _current.reset(token)
+            # 结构化日志（logfmt 消息，字段同时放在 extra 中）
+            fields = {
+                # 请求方法
+                "method": scope["method"],
+                # 路径
+                "path": scope["path"],
+                # 状态码
+                "status": status,
+                # 语句数
+                "queries": stats.queries,
+                # 数据库耗时（毫秒）
+                "db_ms": round(stats.seconds * 1000, 1),
+                # 读取行数
+                "rows": stats.rows,
+                # 同一语句的最大次数
+                "max_repeat": stats.most_repeated(),
+                # 请求总耗时（毫秒）
+                "total_ms": round((perf_counter() - started) * 1000, 1),
+            }
+            # 输出
+            logger.info(" ".join(f"{key}={value}" for key, value in fields.items()), extra={"sql": fields})
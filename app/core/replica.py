@@ -0,0 +1,114 @@
+# 模块级文档字符串：只读副本的健康状态与写后读路由
+"""
+Replica health tracking and the read-your-writes cookie.
+
+Read endpoints use the replica configured by ``REPLICA_DATABASE_URL``
+unless:
+
+- the replica failed within the last ``REPLICA_RETRY_SECONDS`` (connection
+  errors and disconnects mark it down, reads fall back to the primary);
+- the client wrote within the last ``READ_YOUR_WRITES_SECONDS``:
+  :class:`ReadYourWritesMiddleware` sets a short-lived cookie on every
+  successful unsafe request, and requests carrying it read from the primary
+  so a client sees its own changes despite replication lag.
+"""
+
+# 导入计时工具
+import time
+
+# 导入 Starlette 请求与 ASGI 类型
+from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# 写后读 Cookie 名称
+PRIMARY_COOKIE = "rms_read_primary"
+# 不修改数据的请求方法
+_SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+# 副本健康状态
+class ReplicaHealth:
+    # 类文档：失败后在重试间隔内不再使用副本
+    """Marks the replica down for ``retry_seconds`` after a failure."""
+
+    # 初始化方法
+    def __init__(self, retry_seconds: float) -> None:
+        # 构造函数文档：初始为可用
+        """Start healthy; a failure routes reads to the primary for ``retry_seconds``."""
+        # 重试间隔
+        self.retry_seconds = retry_seconds
+        # 恢复使用的时间（单调时钟）
+        self._down_until = 0.0
+        # 累计失败次数
+        self.failures = 0
+
+    # 是否可用
+    def available(self) -> bool:
+        # 方法文档：不在失败后的重试间隔内
+        """Return True unless the replica failed within the retry interval."""
+        # 比较当前时间
+        return time.monotonic() >= self._down_until
+
+    # 标记失败
+    def mark_down(self) -> None:
+        # 方法文档：重试间隔内改用主库
+        """Route reads to the primary for the next ``retry_seconds``."""
+        # 记录恢复时间
+        self._down_until = time.monotonic() + self.retry_seconds
+        # 累计失败次数
+        self.failures += 1
+
+    # 状态快照
+    def snapshot(self) -> dict:
+        # 方法文档：供运行状态接口展示
+        """Return availability and the failure count."""
+        # 返回快照
+        return {"available": self.available(), "failures": self.failures}
+
+
+# 请求是否要求读主库
+def wants_primary(request: Request) -> bool:
+    # 函数文档：客户端刚写入过时带有写后读 Cookie
+    """Return True when the request carries the read-your-writes cookie."""
+    # 检查 Cookie
+    return PRIMARY_COOKIE in request.cookies
+
+
+# 写后读中间件
+class ReadYourWritesMiddleware:
+    # 类文档：成功的写请求响应附带短期 Cookie
+    """
+    ASGI middleware adding the read-your-writes cookie to successful
+    (status < 400) responses of unsafe requests. Implemented on raw ASGI
+    messages so streaming responses and uploads pass through untouched.
+    """
+
+    # 初始化方法
+    def __init__(self, app: ASGIApp, max_age: float) -> None:
+        # 构造函数文档：Cookie 有效期为 max_age 秒
+        """Wrap ``app``; the cookie expires after ``max_age`` seconds."""
+        # 下游应用
+        self.app = app
+        # 预先构建 Set-Cookie 头（至少 1 秒）
+        self._header = (
+            b"set-cookie",
+            f"{PRIMARY_COOKIE}=1; Max-Age={max(1, round(max_age))}; Path=/; HttpOnly; SameSite=Lax".encode(),
+        )
+
+    # ASGI 入口
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        # 非 HTTP 或只读请求直接转发
+        if scope["type"] != "http" or scope["method"] in _SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        # 在响应头中附加 Cookie
+        async def send_with_cookie(message: Message) -> None:
+            # 成功的响应开始消息
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                message = {**message, "headers": [*message.get("headers", ()), self._header]}
+            # 转发消息
+            await send(message)
+
+        # 调用下游应用
+        await self.app(scope, receive, send_with_cookie)
@@ -1,17 +1,52 @@
 # 模块级文档字符串：FastAPI 应用入口
 """FastAPI application entrypoint."""
 
+# 导入异步上下文管理工具
+from contextlib import asynccontextmanager
+
 # 导入 FastAPI 框架主类
 from fastapi import FastAPI
 
 # 导入应用配置对象
 from app.core.config import settings
-# 导入数据库 Base 与 engine 以便建表
-from app.core.database import Base, engine
+# 导入异步引擎以便在退出时释放
+from app.core.database import async_engine, async_replica_engine
+# 导入请求指标中间件
+from app.core.metrics import MetricsMiddleware
+# 导入按请求的 SQL 统计中间件
+from app.core.query_stats import QueryStatsMiddleware
+# 导入写后读中间件
+from app.core.replica import ReadYourWritesMiddleware
 # 导入模型模块以确保模型被注册（避免未加载）
-from app.models import product_report_models, report_models  # noqa: F401
+from app.models import attachment_models, product_report_models, report_models, upload_models  # noqa: F401
 # 导入路由模块
-from app.routers import product_reports, report_types, reports
+from app.routers import metrics, product_reports, report_types, reports, system, uploads
+# 导入后台附件写入队列
+from app.services.attachment_ingest import attachment_ingest
+
+
+# 应用生命周期
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    # 函数文档：后台写入模式下恢复未完成的附件，退出时停止工作线程
+    """
+    Resume pending background attachment ingestion on startup; on shutdown
+    stop its workers and close the async engines' connections.
+    """
+    # 后台写入模式
+    if settings.attachment_ingest_mode == "background":
+        attachment_ingest.recover()
+    # 运行应用
+    try:
+        yield
+    # 等待正在进行的写入完成
+    finally:
+        # 停止后台写入
+        attachment_ingest.stop()
+        # 释放异步连接池
+        for pool_engine in (async_engine, async_replica_engine):
+            if pool_engine is not None:
+                await pool_engine.dispose()
 
 
 # 定义创建 FastAPI 应用的工厂函数
@@ -19,10 +54,19 @@ def create_app() -> FastAPI:
     # 函数文档：创建并配置 FastAPI 应用
     """Create and configure the FastAPI application."""
     # 创建 FastAPI 应用实例，并设置标题与调试模式
-    app = FastAPI(title=settings.app_name, debug=settings.debug)
+    app = FastAPI(title=settings.app_name, debug=settings.debug, lifespan=lifespan)
+
+    # 数据库结构由 python -m app.commands.migrate 管理，启动时不访问数据库
 
-    # 启动时确保数据库表已创建
-    Base.metadata.create_all(bind=engine)
+    # 使用只读副本时，写请求成功后该客户端短时间内改读主库
+    if settings.replica_database_url and settings.read_your_writes_seconds:
+        app.add_middleware(ReadYourWritesMiddleware, max_age=settings.read_your_writes_seconds)
+    # 按请求统计 SQL
+    if settings.sql_instrumentation:
+        app.add_middleware(QueryStatsMiddleware)
+    # 请求指标（最后添加，位于最外层，延迟包含其他中间件）
+    if settings.metrics_enabled:
+        app.add_middleware(MetricsMiddleware)
 
     # 注册 API 路由：报表类型
     app.include_router(report_types.router)
@@ -30,6 +74,13 @@ def create_app() -> FastAPI:
     app.include_router(reports.router)
     # 注册 API 路由：产品完整报表
     app.include_router(product_reports.router)
+    # 注册 API 路由：可续传上传
+    app.include_router(uploads.router)
+    # 注册 API 路由：运行状态
+    app.include_router(system.router)
+    # 注册 API 路由：Prometheus 指标
+    if settings.metrics_enabled:
+        app.include_router(metrics.router)
 
     # 返回构建好的应用实例
     return app
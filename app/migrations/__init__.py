@@ -0,0 +1,168 @@
+# 模块级文档字符串：版本化的数据库结构迁移
+"""
+Versioned schema migrations, applied by ``python -m app.commands.migrate``.
+
+Each module ``vNNNN_<name>.py`` in this package defines
+``upgrade(connection)``. :func:`migrate` runs the pending ones in version
+order, each in its own transaction together with its row in
+``schema_migrations``, so an interrupted run resumes at the first
+migration that did not commit. The application never changes the schema
+itself: startup makes no DDL round trips.
+
+``v0001_baseline`` creates the tables of the current models. A fresh
+database therefore already has every column later migrations add, so
+migrations that alter existing tables must check first (see
+:func:`has_column`), the same way ``scripts/sqlserver_upgrade.sql`` does.
+"""
+
+# 导入动态导入工具
+import importlib
+# 导入包遍历工具
+import pkgutil
+# 导入正则工具
+import re
+# 导入数据类工具
+from dataclasses import dataclass
+# 导入时间类型
+from datetime import datetime
+# 导入类型注解
+from typing import Callable, List, Optional, Set
+
+# 导入 SQLAlchemy Core 表定义与查询工具
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, insert, select
+# 导入 SQLAlchemy 连接与引擎类型
+from sqlalchemy.engine import Connection, Engine
+
+# 迁移模块名：v + 四位版本号 + 下划线 + 名称
+_MODULE_PATTERN = re.compile(r"^v(\d{4})_(\w+)$")
+
+# 迁移记录表（独立元数据，不属于模型）
+schema_migrations = Table(
+    # 表名
+    "schema_migrations",
+    # 独立元数据
+    MetaData(),
+    # 版本号
+    Column("version", Integer, primary_key=True, autoincrement=False),
+    # 迁移名称
+    Column("name", String(100), nullable=False),
+    # 应用时间
+    Column("applied_at", DateTime(timezone=True), nullable=False),
+)
+
+
+# 一个迁移
+@dataclass(frozen=True)
+class Migration:
+    # 类文档：版本号、名称与升级函数
+    """A schema migration: its version, name and ``upgrade(connection)``."""
+
+    # 版本号
+    version: int
+    # 名称
+    name: str
+    # 升级函数
+    upgrade: Callable[[Connection], None]
+
+
+# 发现全部迁移
+def discover() -> List[Migration]:
+    # 函数文档：按版本号排序返回本包中的迁移
+    """Return the migrations of this package ordered by version."""
+    # 迁移列表
+    migrations: List[Migration] = []
+    # 遍历模块
+    for module in pkgutil.iter_modules(__path__):
+        # 匹配模块名
+        match = _MODULE_PATTERN.match(module.name)
+        # 跳过非迁移模块
+        if match is None:
+            continue
+        # 导入模块
+        loaded = importlib.import_module(f"{__name__}.{module.name}")
+        # 记录迁移
+        migrations.append(Migration(int(match.group(1)), match.group(2), loaded.upgrade))
+    # 按版本号排序
+    migrations.sort(key=lambda migration: migration.version)
+    # 版本号不能重复
+    versions = [migration.version for migration in migrations]
+    # 重复时报错
+    if len(versions) != len(set(versions)):
+        raise RuntimeError(f"Duplicate migration versions in {__name__}: {versions}")
+    # 返回迁移
+    return migrations
+
+
+# 已应用的版本
+def applied_versions(connection: Connection) -> Set[int]:
+    # 函数文档：记录表不存在时视为空
+    """Return the versions recorded in ``schema_migrations`` (empty before the first run)."""
+    # 记录表不存在
+    if not inspect(connection).has_table(schema_migrations.name):
+        return set()
+    # 查询版本号
+    return set(connection.execute(select(schema_migrations.c.version)).scalars())
+
+
+# 待应用的迁移
+def pending(engine: Engine, target: Optional[int] = None) -> List[Migration]:
+    # 函数文档：返回尚未应用且不超过目标版本的迁移
+    """Return the migrations not applied yet, up to ``target`` when given."""
+    # 读取已应用的版本
+    with engine.connect() as connection:
+        applied = applied_versions(connection)
+    # 过滤
+    return [
+        migration
+        for migration in discover()
+        if migration.version not in applied and (target is None or migration.version <= target)
+    ]
+
+
+# 执行迁移
+def migrate(engine: Engine, target: Optional[int] = None) -> List[Migration]:
+    # 函数文档：按顺序应用待执行的迁移并返回已应用的列表
+    """
+    Apply the pending migrations (up to ``target``) in order and return
+    them. Each migration commits together with its ``schema_migrations`` row;
+    a failing migration rolls back and stops the run.
+    """
+    # 确保记录表存在
+    with engine.begin() as connection:
+        schema_migrations.create(connection, checkfirst=True)
+    # 本次应用的迁移
+    applied: List[Migration] = []
+    # 逐个应用
+    for migration in pending(engine, target):
+        # 每个迁移一个事务
+        with engine.begin() as connection:
+            # 执行升级
+            migration.upgrade(connection)
+            # 记录版本（并发执行时主键冲突使后到者回滚）
+            connection.execute(
+                insert(schema_migrations).values(
+                    # 版本号
+                    version=migration.version,
+                    # 名称
+                    name=migration.name,
+                    # 应用时间
+                    applied_at=datetime.utcnow(),
+                )
+            )
+        # 记录
+        applied.append(migration)
+    # 返回已应用的迁移
+    return applied
+
+
+# 列是否存在
+def has_column(connection: Connection, table: str, column: str) -> bool:
+    # 函数文档：供修改已有表的迁移判断是否需要执行
+    """Return True when ``table`` exists and has ``column``."""
+    # 结构检查器
+    inspector = inspect(connection)
+    # 表不存在
+    if not inspector.has_table(table):
+        return False
+    # 查找列
+    return any(existing["name"] == column for existing in inspector.get_columns(table))
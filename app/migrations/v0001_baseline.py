@@ -0,0 +1,34 @@
+# 模块级文档字符串：初始结构
+"""
+Baseline: create the tables of every model that does not exist yet and
+seed the single row of ``report_schema_versions``.
+
+Databases created before versioned migrations existed keep their tables;
+bring older SQL Server databases up to date with
+``scripts/sqlserver_upgrade.sql`` before the first ``migrate`` run. The
+FILETABLE (``scripts/sqlserver_init.sql``) and per-type wide tables are
+managed outside the models and are not touched.
+"""
+
+# 导入 SQLAlchemy 查询工具
+from sqlalchemy import insert, select
+# 导入 SQLAlchemy 连接类型
+from sqlalchemy.engine import Connection
+
+# 导入声明式基类
+from app.core.database import Base
+# 导入模型模块以注册全部表
+from app.models import attachment_models, product_report_models, report_models, upload_models  # noqa: F401
+
+
+# 升级
+def upgrade(connection: Connection) -> None:
+    # 函数文档：只创建尚不存在的表
+    """Create the missing model tables and the schema version row."""
+    # 已存在的表跳过
+    Base.metadata.create_all(bind=connection, checkfirst=True)
+    # 结构版本表
+    versions = report_models.ReportSchemaVersion.__table__
+    # 初始版本行（与 scripts/sqlserver_upgrade.sql 一致），递增时只需 UPDATE
+    if connection.execute(select(versions.c.id).where(versions.c.id == 1)).first() is None:
+        connection.execute(insert(versions).values(id=1, version=1))
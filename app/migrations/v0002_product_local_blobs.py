@@ -0,0 +1,53 @@
+# 模块级文档字符串：产品报表本地附件改用单独的后端名称
+"""
+Move product report files of the local backend to ``product_local``.
+
+Shared blobs used to record both local roots as ``local``, so a product
+report and a report attachment with the same content could share a blob
+stored under only one of the roots. Blobs referenced only by product
+reports whose file lies under ``PRODUCT_REPORT_STORAGE_DIR`` (and not under
+``STORAGE_LOCAL_ROOT``) now record ``product_local``. Blobs also referenced
+by report attachments keep ``local``; the product reports among their
+references can only be repaired by uploading the file again.
+"""
+
+# 导入 SQLAlchemy 查询工具
+from sqlalchemy import select, update
+# 导入 SQLAlchemy 连接类型
+from sqlalchemy.engine import Connection
+
+# 导入配置
+from app.core.config import settings
+# 导入附件与产品报表模型
+from app.models.attachment_models import AttachmentBlob
+from app.models.product_report_models import ProductFullReport
+from app.models.report_models import ReportAttachment
+# 导入后端名称
+from app.services.storage_backends import BACKEND_LOCAL, BACKEND_PRODUCT_LOCAL, LocalFileBackend
+
+
+# 升级
+def upgrade(connection: Connection) -> None:
+    # 函数文档：只改写文件确实位于产品报表文件夹中的记录
+    """Re-tag ``local`` blobs that only product reports use and that live in the product report folder."""
+    # 两个根目录
+    products = LocalFileBackend(settings.product_report_storage_dir)
+    attachments = LocalFileBackend(settings.storage_local_root)
+    # 只被产品报表引用的本地数据
+    rows = connection.execute(
+        # 数据 ID 与存储键
+        select(AttachmentBlob.id, AttachmentBlob.storage_key)
+        # 本地后端
+        .where(AttachmentBlob.storage_backend == BACKEND_LOCAL)
+        # 被产品报表引用
+        .where(AttachmentBlob.id.in_(select(ProductFullReport.blob_id).where(ProductFullReport.blob_id.is_not(None))))
+        # 未被报表附件引用
+        .where(AttachmentBlob.id.not_in(select(ReportAttachment.blob_id).where(ReportAttachment.blob_id.is_not(None))))
+    ).all()
+    # 文件位于产品报表文件夹的数据
+    moved = [blob_id for blob_id, key in rows if products.stat(key) and not attachments.stat(key)]
+    # 改写后端名称
+    if moved:
+        connection.execute(
+            update(AttachmentBlob).where(AttachmentBlob.id.in_(moved)).values(storage_backend=BACKEND_PRODUCT_LOCAL)
+        )
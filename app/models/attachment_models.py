@@ -0,0 +1,47 @@
+# 模块级文档字符串：按内容寻址的附件数据模型
+"""SQLAlchemy model for content-addressed attachment blobs."""
+
+# 导入时间类型
+from datetime import datetime
+# 导入可选类型注解
+from typing import Optional
+
+# 导入 SQLAlchemy 列类型与约束
+from sqlalchemy import BigInteger, DateTime, Integer, String, UniqueConstraint
+# 导入 ORM 映射工具
+from sqlalchemy.orm import Mapped, mapped_column
+
+# 导入声明式基类
+from app.core.database import Base
+
+
+# 附件数据模型
+class AttachmentBlob(Base):
+    # 类文档：每个后端中每份唯一内容只存一次
+    """
+    One stored copy of a unique attachment content (by SHA-256) in one
+    storage backend, shared by every attachment that references it.
+    """
+    # 对应数据库表名
+    __tablename__ = "attachment_blobs"
+    # 唯一约束：同一后端中同一内容只有一份
+    __table_args__ = (UniqueConstraint("storage_backend", "sha256", name="uq_attachment_blobs_backend_sha256"),)
+
+    # 主键 ID
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    # 存储后端名称
+    storage_backend: Mapped[str] = mapped_column(String(20), nullable=False)
+    # 内容的 SHA-256（十六进制）
+    sha256: Mapped[str] = mapped_column(String(64), nullable=False)
+    # 后端中的存储键
+    storage_key: Mapped[str] = mapped_column(String(500), nullable=False)
+    # 原始内容字节数
+    size: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    # 压缩算法（gzip / zstd，未压缩为空）
+    compression: Mapped[Optional[str]] = mapped_column(String(10))
+    # 后端中实际占用的字节数（未压缩时等于 size）
+    stored_size: Mapped[Optional[int]] = mapped_column(BigInteger)
+    # 引用该内容的附件数
+    ref_count: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
+    # 首次写入时间
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
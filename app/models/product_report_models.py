@@ -6,8 +6,8 @@ from datetime import date
 # 导入可选类型注解
 from typing import Optional
 
-# 导入 SQLAlchemy 列类型
-from sqlalchemy import Date, Integer, String
+# 导入 SQLAlchemy 列类型与外键
+from sqlalchemy import Date, ForeignKey, Integer, String
 # 导入 ORM 映射工具
 from sqlalchemy.orm import Mapped, mapped_column
 
@@ -46,5 +46,7 @@ class ProductFullReport(Base):
     recipe_leader: Mapped[str] = mapped_column(String(100), nullable=False)
     # 数据库列名使用旧字段 FileName
     file_name: Mapped[Optional[str]] = mapped_column("FileName", String(500))
+    # 附件对应的共享数据（去重前写入的旧记录为空）
+    blob_id: Mapped[Optional[int]] = mapped_column(ForeignKey("attachment_blobs.id"))
     # 删除标记
     is_delete: Mapped[int] = mapped_column(Integer, default=0)
@@ -3,17 +3,32 @@
 
 # 导入时间类型
 from datetime import datetime
+# 导入高精度小数类型
+from decimal import Decimal
 # 导入类型注解
 from typing import List, Optional
 
-# 导入 SQLAlchemy 列类型与外键
-from sqlalchemy import DateTime, ForeignKey, Integer, String, Text
+# 导入 SQLAlchemy 列类型、外键与索引
+from sqlalchemy import BigInteger, Boolean, DateTime, ForeignKey, Index, Integer, Numeric, String, Text
 # 导入 ORM 映射工具
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 # 导入声明式基类
 from app.core.database import Base
 
+# 字段值查找键的最大长度（SQL Server 索引键长度限制内）
+VALUE_KEY_LENGTH = 450
+# 存储模式：字段值存于 report_field_values（实体-属性-值）
+STORAGE_MODE_EAV = "eav"
+# 存储模式：每个报表类型一张宽表，每个字段一列
+STORAGE_MODE_WIDE = "wide"
+# 附件状态：已落盘暂存，等待后台写入存储后端
+ATTACHMENT_PENDING = "pending"
+# 附件状态：已写入存储后端
+ATTACHMENT_STORED = "stored"
+# 附件状态：多次重试后仍写入失败
+ATTACHMENT_FAILED = "failed"
+
 
 # 报表类型模型
 class ReportType(Base):
@@ -28,6 +43,8 @@ class ReportType(Base):
     name: Mapped[str] = mapped_column(String(100), unique=True, nullable=False)
     # 类型描述
     description: Mapped[Optional[str]] = mapped_column(String(255))
+    # 字段值存储模式（eav 或 wide）
+    storage_mode: Mapped[str] = mapped_column(String(20), nullable=False, default=STORAGE_MODE_EAV)
 
     # 定义该报表类型结构的字段列表
     fields: Mapped[List["ReportField"]] = relationship(
@@ -38,6 +55,22 @@ class ReportType(Base):
     )
 
 
+# 报表结构版本模型
+class ReportSchemaVersion(Base):
+    # 类文档：报表类型/字段定义的全局版本号
+    """
+    Single-row counter bumped whenever report types or fields change, so
+    every worker process can tell when its cached schema is stale.
+    """
+    # 对应数据库表名
+    __tablename__ = "report_schema_versions"
+
+    # 主键 ID（固定为 1）
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    # 当前版本号
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
 # 报表字段模型
 class ReportField(Base):
     # 类文档：报表类型的单个字段定义
@@ -82,6 +115,13 @@ class Report(Base):
     """Concrete report instance created by users."""
     # 对应数据库表名
     __tablename__ = "reports"
+    # 组合索引：支撑按 (created_at, id) 的键集分页
+    __table_args__ = (
+        # 全量列表的分页索引
+        Index("ix_reports_created_at_id", "created_at", "id"),
+        # 按报表类型过滤时的分页索引
+        Index("ix_reports_type_created_at_id", "report_type_id", "created_at", "id"),
+    )
 
     # 主键 ID
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
@@ -103,6 +143,8 @@ class Report(Base):
         # 默认使用 UTC 时间
         default=datetime.utcnow,
     )
+    # 内容版本号：报表、字段值或附件变更时递增（ETag 依据）
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=1, server_default="1")
 
     # 关联的报表类型定义
     report_type: Mapped[ReportType] = relationship()
@@ -128,6 +170,19 @@ class ReportFieldValue(Base):
     """Stores a value for a specific report field within a report."""
     # 对应数据库表名
     __tablename__ = "report_field_values"
+    # 组合索引：按字段值查找报表时走索引查找而非全表扫描
+    __table_args__ = (
+        # (字段, 查找键, 报表) 覆盖索引
+        Index("ix_report_field_values_field_key", "field_id", "value_key", "report_id"),
+        # 整数值范围查询与排序索引
+        Index("ix_report_field_values_field_int", "field_id", "value_int", "report_id"),
+        # 小数值范围查询与排序索引
+        Index("ix_report_field_values_field_decimal", "field_id", "value_decimal", "report_id"),
+        # 日期值范围查询与排序索引
+        Index("ix_report_field_values_field_date", "field_id", "value_date", "report_id"),
+        # 布尔值过滤索引
+        Index("ix_report_field_values_field_bool", "field_id", "value_bool", "report_id"),
+    )
 
     # 主键 ID
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
@@ -149,6 +204,16 @@ class ReportFieldValue(Base):
     )
     # 字段值内容
     value: Mapped[Optional[str]] = mapped_column(Text)
+    # 可索引的查找键：value 的前 VALUE_KEY_LENGTH 个字符（Text 列无法建索引）
+    value_key: Mapped[Optional[str]] = mapped_column(String(VALUE_KEY_LENGTH))
+    # 类型化值：整数字段
+    value_int: Mapped[Optional[int]] = mapped_column(BigInteger)
+    # 类型化值：小数字段
+    value_decimal: Mapped[Optional[Decimal]] = mapped_column(Numeric(38, 10))
+    # 类型化值：日期 / 日期时间字段
+    value_date: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    # 类型化值：布尔字段
+    value_bool: Mapped[Optional[bool]] = mapped_column(Boolean)
 
     # 关联的报表实例
     report: Mapped[Report] = relationship(back_populates="values")
@@ -158,8 +223,8 @@ class ReportFieldValue(Base):
 
 # 报表附件模型
 class ReportAttachment(Base):
-    # 类文档：存储在 SQL Server FILETABLE 的附件
-    """Represents a file attachment stored in SQL Server FILETABLE."""
+    # 类文档：存储在附件存储后端中的文件
+    """Represents a file attachment stored in an attachment storage backend."""
     # 对应数据库表名
     __tablename__ = "report_attachments"
 
@@ -176,10 +241,22 @@ class ReportAttachment(Base):
     )
     # 文件名
     filename: Mapped[str] = mapped_column(String(255), nullable=False)
-    # 存储路径
+    # 存储路径（后端生成的存储键；后台写入完成前为空字符串）
     storage_path: Mapped[str] = mapped_column(String(500), nullable=False)
+    # 存储后端名称（filetable / local）
+    storage_backend: Mapped[str] = mapped_column(String(20), nullable=False, default="filetable", server_default="filetable")
+    # 共享的附件数据（去重前写入的旧附件为空）
+    blob_id: Mapped[Optional[int]] = mapped_column(ForeignKey("attachment_blobs.id"), index=True)
     # 文件 MIME 类型
     content_type: Mapped[Optional[str]] = mapped_column(String(100))
+    # 原始文件字节数（去重前写入的旧附件为空）
+    size: Mapped[Optional[int]] = mapped_column(BigInteger)
+    # 存储时使用的压缩算法（gzip / zstd，未压缩为空）
+    compression: Mapped[Optional[str]] = mapped_column(String(10))
+    # 写入状态（pending / stored / failed）
+    status: Mapped[str] = mapped_column(String(20), nullable=False, default=ATTACHMENT_STORED, server_default=ATTACHMENT_STORED)
+    # 最后一次写入失败的原因
+    error: Mapped[Optional[str]] = mapped_column(String(500))
 
     # 关联的报表实例
     report: Mapped[Report] = relationship(back_populates="attachments")
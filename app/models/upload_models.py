@@ -0,0 +1,57 @@
+# 模块级文档字符串：可续传上传会话模型
+"""SQLAlchemy model for resumable chunked upload sessions."""
+
+# 导入时间类型
+from datetime import datetime
+# 导入类型注解
+from typing import Optional
+
+# 导入 SQLAlchemy 列类型与外键
+from sqlalchemy import BigInteger, DateTime, ForeignKey, String
+# 导入 ORM 映射工具
+from sqlalchemy.orm import Mapped, mapped_column
+
+# 导入声明式基类
+from app.core.database import Base
+
+# 上传状态：接收分块中
+UPLOAD_OPEN = "open"
+# 上传状态：已完成并挂到报表
+UPLOAD_COMPLETED = "completed"
+
+
+# 上传会话模型
+class UploadSession(Base):
+    # 类文档：一个可分块续传的大文件上传
+    """
+    A resumable upload. Received bytes are kept in a local file named after
+    the session id until the upload is finalized into a report attachment
+    or a product report file.
+    """
+    # 对应数据库表名
+    __tablename__ = "upload_sessions"
+
+    # 主键：随机 ID（同时作为客户端访问凭据）
+    id: Mapped[str] = mapped_column(String(32), primary_key=True)
+    # 文件名
+    filename: Mapped[str] = mapped_column(String(255), nullable=False)
+    # 文件 MIME 类型
+    content_type: Mapped[Optional[str]] = mapped_column(String(100))
+    # 客户端声明的总字节数（可选）
+    size: Mapped[Optional[int]] = mapped_column(BigInteger)
+    # 客户端声明的整文件 SHA-256（可选，完成时校验）
+    sha256: Mapped[Optional[str]] = mapped_column(String(64))
+    # 已确认接收的字节数（即下一个分块的偏移）
+    received: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    # 状态（open / completed）
+    status: Mapped[str] = mapped_column(String(20), nullable=False, default=UPLOAD_OPEN)
+    # 完成后所属的报表
+    report_id: Mapped[Optional[int]] = mapped_column(ForeignKey("reports.id"))
+    # 完成后生成的报表附件
+    attachment_id: Mapped[Optional[int]] = mapped_column(ForeignKey("report_attachments.id"))
+    # 完成后所属的产品完整报表
+    product_report_id: Mapped[Optional[int]] = mapped_column(ForeignKey("product_full_reports.id"))
+    # 创建时间
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
+    # 最后活动时间（超过保留期后被清理）
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow, index=True)
@@ -0,0 +1,96 @@
+# 模块级文档字符串：Prometheus 指标的 API 路由
+"""
+``GET /metrics`` in the Prometheus text format.
+
+Besides the metrics recorded by :mod:`app.core.metrics`, each scrape reads
+the connection pools (occupancy, checkouts, waits, timeouts), the replica's
+health and the occupancy of the thread pool that runs sync handlers.
+"""
+
+# 导入 AnyIO 线程工具（同步处理器所用线程池的容量限制）
+import anyio.to_thread
+# 导入 FastAPI 路由工具
+from fastapi import APIRouter
+# 导入纯文本响应
+from fastapi.responses import PlainTextResponse
+
+# 导入各数据库引擎与副本健康状态
+from app.core.database import async_engine, async_replica_engine, engine, replica_engine, replica_health
+# 导入指标注册表与抓取时指标工具
+from app.core.metrics import registry, scrape_lines
+# 导入带统计的连接池类型
+from app.core.pool import TimedQueuePool
+
+# 创建路由器（无前缀，抓取端默认访问 /metrics）
+router = APIRouter(tags=["system"])
+# Prometheus 文本格式的媒体类型
+_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# 定义 Prometheus 指标的 GET 接口
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    # 函数文档：在事件循环中运行，以便读取线程池占用
+    """Return every metric in the Prometheus text exposition format."""
+    # 渲染并返回
+    return PlainTextResponse(registry.render(), media_type=_CONTENT_TYPE)
+
+
+# 连接池指标
+def _pool_lines() -> list:
+    # 标签为引擎名称的连接池
+    pools = [
+        ({"engine": name}, pool_engine.pool)
+        for name, pool_engine in (
+            ("primary", engine),
+            ("primary_async", async_engine and async_engine.sync_engine),
+            ("replica", replica_engine),
+            ("replica_async", async_replica_engine and async_replica_engine.sync_engine),
+        )
+        if pool_engine is not None and isinstance(pool_engine.pool, TimedQueuePool)
+    ]
+    # 各连接池快照
+    snapshots = [(labels, pool.snapshot()) for labels, pool in pools]
+    # 输出行
+    lines = []
+    # 仪表与计数器
+    for key, name, documentation, kind in (
+        ("size", "rms_db_pool_size", "Configured persistent connections.", "gauge"),
+        ("checked_out", "rms_db_pool_checked_out", "Connections currently checked out.", "gauge"),
+        ("overflow", "rms_db_pool_overflow", "Current overflow connections (negative while below pool size).", "gauge"),
+        ("checkouts", "rms_db_pool_checkouts_total", "Successful checkouts.", "counter"),
+        ("timeouts", "rms_db_pool_timeouts_total", "Checkouts that timed out waiting for a connection.", "counter"),
+        ("wait_seconds_total", "rms_db_pool_wait_seconds_total", "Time spent waiting for connections.", "counter"),
+        ("wait_seconds_max", "rms_db_pool_wait_seconds_max", "Longest wait for a connection.", "gauge"),
+    ):
+        lines.extend(scrape_lines(name, documentation, [(labels, snapshot[key]) for labels, snapshot in snapshots], kind))
+    # 副本健康状态
+    if replica_engine is not None:
+        lines.extend(
+            scrape_lines("rms_db_replica_available", "1 while reads may use the replica.", [({}, replica_health.available())])
+        )
+    # 返回
+    return lines
+
+
+# 线程池指标
+def _threadpool_lines() -> list:
+    # 同步处理器、文件读写共用的线程池容量限制（需在事件循环中读取）
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    # 等待线程的任务数
+    statistics = limiter.statistics()
+    # 输出行
+    return [
+        # 线程上限
+        *scrape_lines("rms_threadpool_threads_limit", "Threads available to sync handlers.", [({}, limiter.total_tokens)]),
+        # 使用中的线程
+        *scrape_lines("rms_threadpool_threads_busy", "Threads currently running sync work.", [({}, statistics.borrowed_tokens)]),
+        # 等待线程的任务
+        *scrape_lines("rms_threadpool_tasks_waiting", "Tasks waiting for a free thread.", [({}, statistics.tasks_waiting)]),
+    ]
+
+
+# 登记抓取时计算的指标
+registry.add_collector(_pool_lines)
+# 登记线程池指标
+registry.add_collector(_threadpool_lines)
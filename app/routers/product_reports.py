@@ -1,24 +1,50 @@
 # 模块级文档字符串：产品报表提交的 API 路由
 """API routes for product report submissions."""
 
+# 导入 MIME 类型推断
+import mimetypes
+# 导入操作系统路径工具
+import os
 # 导入日期类型
 from datetime import date
-# 导入可选类型注解
-from typing import Optional
+# 导入类型注解
+from typing import Dict, Optional, Tuple
 
 # 导入 FastAPI 路由与表单/文件工具
-from fastapi import APIRouter, Depends, File, Form, UploadFile
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Request, UploadFile
+# 导入 FastAPI 请求校验异常
+from fastapi.exceptions import RequestValidationError
+# 导入 Pydantic 校验异常
+from pydantic import ValidationError
 # 导入 SQLAlchemy 会话类型
 from sqlalchemy.orm import Session
+# 导入线程池执行工具
+from starlette.concurrency import run_in_threadpool
 
+# 导入配置
+from app.core.config import settings
 # 导入数据库会话依赖
 from app.core.database import get_db
+# 导入流式表单解析
+from app.core.multipart_stream import MultipartError, MultipartStream, blocking_body
+# 导入附件数据模型
+from app.models.attachment_models import AttachmentBlob
 # 导入产品报表模型
 from app.models.product_report_models import ProductFullReport
-# 导入响应 schema
-from app.schemas.product_report_schemas import ProductFullReportResponse
+# 导入请求与响应 schema
+from app.schemas.product_report_schemas import ProductFullReportCreate, ProductFullReportResponse
+# 导入附件下载响应
+from app.services.attachment_download import attachment_response
+# 导入按内容寻址的存储
+from app.services.blob_store import BlobStore
 # 导入文件存储服务
-from app.services.product_report_storage import save_product_report_file
+from app.services.product_report_storage import (
+    product_report_backend,
+    product_report_backend_name,
+    save_product_report_file,
+)
+# 导入存储后端
+from app.services.storage_backends import StorageBackend, original_filename
 
 
 # 创建路由器并设置前缀与标签
@@ -55,10 +81,12 @@ def submit_full_report(
 ):
     # 函数文档：保存产品完整报表及其附件
     """Persist a product full report and its optional attachment."""
-    # 保存上传文件到文件系统
-    file_path = save_product_report_file(product_code, meetingReport)
-    # 创建报表 ORM 对象
-    report = ProductFullReport(
+    # 产品报表附件的存储后端
+    backend = product_report_backend(db)
+    # 保存上传文件（相同内容只存一份）
+    stored = save_product_report_file(db, backend, meetingReport)
+    # 表单字段
+    form = ProductFullReportCreate(
         # token 字段
         token=token,
         # 操作码字段
@@ -72,15 +100,177 @@ def submit_full_report(
         # 产品编码字段
         product_code=product_code,
         # 创建时间字段
-        creator_time=creatorTime,
+        creatorTime=creatorTime,
         # 复核人字段
         verification_man=verification_man,
         # 项目负责人字段
         pro_leader=pro_leader,
         # 配方负责人字段
         recipe_leader=recipe_leader,
-        # 附件路径字段
-        file_name=file_path,
+    )
+    # 保存报表
+    return _persist_full_report(db, backend, form, stored)
+
+
+# 定义流式提交产品完整报表的 POST 接口
+@router.post("/full-report/stream", response_model=ProductFullReportResponse)
+async def submit_full_report_stream(request: Request, db: Session = Depends(get_db)):
+    # 函数文档：与 /full-report 相同的表单，附件不经临时文件直接写入存储后端
+    """
+    Accept the same form as ``POST /product-reports/full-report`` but parse
+    it incrementally, piping ``meetingReport`` straight into the storage
+    backend. The text fields must precede the file and are validated before
+    it is written.
+    """
+    # 解析与写入在线程池中执行，按需从事件循环读取请求体
+    return await run_in_threadpool(_submit_full_report_from_stream, request, db)
+
+
+# 定义下载产品报表附件的 GET 接口
+@router.get("/{report_id}/file")
+def download_report_file(report_id: int, request: Request, db: Session = Depends(get_db)):
+    # 函数文档：流式下载会议报告附件，支持 Range
+    """Stream a product report's meeting report file; supports single ``Range`` requests."""
+    # 查询报表
+    report = db.get(ProductFullReport, report_id)
+    # 报表或附件不存在
+    if not report or not report.file_name:
+        raise HTTPException(status_code=404, detail="Report file not found")
+    # 存储键
+    key = _storage_key(report.file_name)
+    # 下载文件名（去掉存储键的随机前缀）
+    filename = original_filename(key)
+    # 共享数据记录（记录压缩方式与原始大小；旧记录为空）
+    blob = db.get(AttachmentBlob, report.blob_id) if report.blob_id else None
+    # 返回流式响应
+    return attachment_response(
+        # 当前请求
+        request,
+        # 数据库会话
+        db,
+        # 写入时的存储后端（去重前的旧记录没有数据记录，按当前配置）
+        blob.storage_backend if blob else product_report_backend_name(),
+        # 存储键
+        key,
+        # 文件名
+        filename,
+        # 按扩展名推断 MIME 类型
+        mimetypes.guess_type(filename)[0],
+        # 压缩算法（下载时解压）
+        compression=blob.compression if blob else None,
+        # 原始大小
+        size=blob.size if blob else None,
+    )
+
+
+# 兼容旧记录的存储键
+def _storage_key(file_name: str) -> str:
+    # 函数文档：旧记录保存的是存储目录下的绝对路径，转换为相对键
+    """Map a stored ``FileName`` to a storage key; legacy rows hold absolute paths under the storage dir."""
+    # 非绝对路径即为存储键
+    if not os.path.isabs(file_name):
+        return file_name
+    # 相对存储目录的路径，统一为 / 分隔
+    return os.path.relpath(file_name, settings.product_report_storage_dir).replace(os.sep, "/")
+
+
+# 校验流式表单字段
+def _validate_form(fields: Dict[str, str]) -> ProductFullReportCreate:
+    # 函数文档：校验失败时返回与普通表单相同格式的 422
+    """Validate the text fields of a streamed full report form."""
+    # 按请求 Schema 校验
+    try:
+        return ProductFullReportCreate.model_validate(fields)
+    # 转换为请求校验错误
+    except ValidationError as exc:
+        raise RequestValidationError(exc.errors()) from exc
+
+
+# 从流式表单提交产品完整报表
+def _submit_full_report_from_stream(request: Request, db: Session) -> ProductFullReportResponse:
+    # 函数文档：在线程池中运行，附件直接写入存储后端
+    """Parse the streamed form of ``POST /product-reports/full-report/stream`` and persist it."""
+    # 表单字段
+    fields: Dict[str, str] = {}
+    # 校验后的表单
+    form: Optional[ProductFullReportCreate] = None
+    # 存储后端
+    backend = product_report_backend(db)
+    # 保存的附件
+    stored: Optional[Tuple[AttachmentBlob, bool]] = None
+    # 解析并写入附件
+    try:
+        # 逐个部分处理
+        for part in MultipartStream(request.headers.get("content-type"), blocking_body(request)):
+            # 普通字段
+            if part.filename is None:
+                fields[part.name] = part.read_field()
+            # 会议报告：写入前先校验表单字段
+            elif part.name == "meetingReport" and stored is None and part.filename:
+                # 校验
+                form = _validate_form(fields)
+                # 直接写入存储后端（相同内容只存一份）
+                stored = BlobStore(db, backend).store(part, os.path.basename(part.filename), part.content_type)
+        # 没有附件时读完表单后校验
+        if form is None:
+            form = _validate_form(fields)
+    # 表单格式错误
+    except MultipartError as exc:
+        # 回滚并清理
+        _discard(db, backend, stored)
+        # 返回 400
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    # 其他错误
+    except Exception:
+        # 回滚并清理
+        _discard(db, backend, stored)
+        # 继续抛出
+        raise
+    # 保存报表
+    return _persist_full_report(db, backend, form, stored)
+
+
+# 保存产品完整报表
+def _persist_full_report(
+    # 数据库会话
+    db: Session,
+    # 存储后端
+    backend: StorageBackend,
+    # 表单字段
+    form: ProductFullReportCreate,
+    # 已保存的附件及是否新写入
+    stored: Optional[Tuple[AttachmentBlob, bool]],
+) -> ProductFullReportResponse:
+    # 函数文档：提交报表行，失败时清理本次新写入的附件
+    """Commit a product full report row referencing ``stored``; answer ``state="fail"`` on errors."""
+    # 共享数据
+    blob = stored[0] if stored else None
+    # 创建报表 ORM 对象
+    report = ProductFullReport(
+        # token 字段
+        token=form.token,
+        # 操作码字段
+        operationcode=form.operationcode,
+        # 报表编号字段
+        rp_number=form.rp_number,
+        # 创建人字段
+        creator=form.creator,
+        # 产品名称字段
+        product_name=form.product_name,
+        # 产品编码字段
+        product_code=form.product_code,
+        # 创建时间字段
+        creator_time=form.creatorTime,
+        # 复核人字段
+        verification_man=form.verification_man,
+        # 项目负责人字段
+        pro_leader=form.pro_leader,
+        # 配方负责人字段
+        recipe_leader=form.recipe_leader,
+        # 附件存储键字段
+        file_name=blob.storage_key if blob else None,
+        # 共享数据 ID
+        blob_id=blob.id if blob else None,
         # 删除标记
         is_delete=0,
     )
@@ -95,7 +285,20 @@ def submit_full_report(
         return ProductFullReportResponse(operationcode=45, state="success")
     # 捕获异常并回滚
     except Exception:
-        # 回滚事务
-        db.rollback()
+        # 回滚并清理
+        _discard(db, backend, stored)
         # 返回失败响应
         return ProductFullReportResponse(operationcode=45, state="fail")
+
+
+# 回滚并删除本次新写入的附件
+def _discard(db: Session, backend: StorageBackend, stored: Optional[Tuple[AttachmentBlob, bool]]) -> None:
+    # 函数文档：事务型后端随回滚撤销，非事务后端需删除
+    """Roll back and remove the attachment this request newly wrote to a non-transactional backend."""
+    # 本次新写入的存储键（回滚前读取）
+    created_key = stored[0].storage_key if stored and stored[1] else None
+    # 回滚事务
+    db.rollback()
+    # 非事务后端需删除本次新写入的文件
+    if created_key and not backend.transactional:
+        backend.delete(created_key)
@@ -1,15 +1,19 @@
 # 模块级文档字符串：报表类型与字段的 API 路由
 """API routes for report types and fields."""
 
-# 导入 FastAPI 路由与依赖工具
-from fastapi import APIRouter, Depends, HTTPException
+# 导入 FastAPI 路由、依赖与请求响应工具
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 # 导入 SQLAlchemy 会话类型
 from sqlalchemy.orm import Session
 
+# 导入同步/异步处理器选择
+from app.core.async_handlers import db_endpoint
 # 导入数据库会话依赖
-from app.core.database import get_db
+from app.core.database import get_db, get_read_db
+# 导入 ETag 条件请求工具
+from app.core.http_cache import etag_matches, make_etag, not_modified
 # 导入报表类型与字段模型
-from app.models.report_models import ReportField, ReportType
+from app.models.report_models import STORAGE_MODE_WIDE, ReportField, ReportType
 # 导入请求与响应的 schema
 from app.schemas.report_schemas import (
     # 创建字段请求体
@@ -21,6 +25,10 @@ from app.schemas.report_schemas import (
     # 报表类型返回体
     ReportTypeRead,
 )
+# 导入报表结构缓存
+from app.services.schema_registry import schema_registry
+# 导入宽表建表与加列工具
+from app.services.wide_tables import add_wide_column, create_wide_table
 
 # 创建路由器并设置前缀与标签
 router = APIRouter(prefix="/report-types", tags=["report-types"])
@@ -28,32 +36,60 @@ router = APIRouter(prefix="/report-types", tags=["report-types"])
 
 # 定义创建报表类型的 POST 接口
 @router.post("", response_model=ReportTypeRead)
+# 按配置以同步或异步方式运行
+@db_endpoint
 def create_report_type(payload: ReportTypeCreate, db: Session = Depends(get_db)):
     # 函数文档：创建新的报表类型
     """Create a new report type."""
     # 构建报表类型对象
-    report_type = ReportType(name=payload.name, description=payload.description)
+    report_type = ReportType(
+        # 类型名称
+        name=payload.name,
+        # 类型描述
+        description=payload.description,
+        # 字段值存储模式
+        storage_mode=payload.storage_mode,
+    )
     # 添加到数据库会话
     db.add(report_type)
+    # 宽表模式下在同一事务中建表
+    if report_type.storage_mode == STORAGE_MODE_WIDE:
+        # 写入以生成主键
+        db.flush()
+        # 创建空宽表，字段列随字段创建追加
+        create_wide_table(db.connection(), report_type.id, [])
+    # 在同一事务中递增结构版本号
+    schema_registry.bump(db)
     # 提交事务
     db.commit()
     # 刷新对象以获取数据库状态
     db.refresh(report_type)
-    # 返回创建结果
-    return report_type
+    # 在会话内转换（异步模式下处理器返回后不能再懒加载字段）
+    return ReportTypeRead.model_validate(report_type)
 
 
 # 定义获取报表类型列表的 GET 接口
 @router.get("", response_model=list[ReportTypeRead])
-def list_report_types(db: Session = Depends(get_db)):
-    # 函数文档：列出所有报表类型
-    """List all report types."""
-    # 查询并返回全部报表类型
-    return db.query(ReportType).all()
+# 按配置以同步或异步方式运行
+@db_endpoint
+def list_report_types(request: Request, response: Response, db: Session = Depends(get_read_db)):
+    # 函数文档：列出所有报表类型，ETag 取自结构版本号
+    """List all report types from the schema registry; supports If-None-Match."""
+    # 结构版本号对应的 ETag
+    etag = _schema_etag(db)
+    # 客户端副本未变化时跳过序列化
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    # 回传 ETag
+    response.headers["ETag"] = etag
+    # 从结构缓存返回全部报表类型
+    return schema_registry.all(db)
 
 
 # 定义在报表类型下创建字段的 POST 接口
 @router.post("/{report_type_id}/fields", response_model=ReportFieldRead)
+# 按配置以同步或异步方式运行
+@db_endpoint
 def create_report_field(
     # 路径参数：报表类型 ID
     report_type_id: int,
@@ -85,6 +121,14 @@ def create_report_field(
     )
     # 添加到数据库会话
     db.add(field)
+    # 宽表模式下在同一事务中加列
+    if report_type.storage_mode == STORAGE_MODE_WIDE:
+        # 写入以生成字段 ID（列名依赖字段 ID）
+        db.flush()
+        # 为宽表增加字段列
+        add_wide_column(db.connection(), report_type_id, field)
+    # 在同一事务中递增结构版本号
+    schema_registry.bump(db)
     # 提交事务
     db.commit()
     # 刷新对象
@@ -95,15 +139,27 @@ def create_report_field(
 
 # 定义获取报表字段列表的 GET 接口
 @router.get("/{report_type_id}/fields", response_model=list[ReportFieldRead])
-def list_report_fields(report_type_id: int, db: Session = Depends(get_db)):
-    # 函数文档：列出某个报表类型的字段
-    """List all fields for a given report type."""
-    # 返回对应报表类型的字段列表
-    return (
-        # 查询报表字段
-        db.query(ReportField)
-        # 过滤报表类型 ID
-        .filter(ReportField.report_type_id == report_type_id)
-        # 返回全部结果
-        .all()
-    )
+# 按配置以同步或异步方式运行
+@db_endpoint
+def list_report_fields(report_type_id: int, request: Request, response: Response, db: Session = Depends(get_read_db)):
+    # 函数文档：列出某个报表类型的字段，ETag 取自结构版本号
+    """List all fields for a given report type from the schema registry; supports If-None-Match."""
+    # 结构版本号对应的 ETag
+    etag = _schema_etag(db)
+    # 客户端副本未变化时跳过序列化
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    # 回传 ETag
+    response.headers["ETag"] = etag
+    # 从结构缓存查找报表类型
+    schema = schema_registry.get(db, report_type_id)
+    # 返回字段列表（类型不存在时为空）
+    return list(schema.fields) if schema else []
+
+
+# 报表结构 ETag
+def _schema_etag(db: Session) -> str:
+    # 函数文档：任何类型或字段变更都会递增结构版本号
+    """Build the ETag of report type and field listings from the schema version."""
+    # 返回强 ETag
+    return make_etag("schema", schema_registry.version(db))
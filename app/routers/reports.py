@@ -1,24 +1,105 @@
 # 模块级文档字符串：报表创建与查询的 API 路由
 """API routes for creating and retrieving reports."""
 
+# 导入 CSV 写入工具
+import csv
+# 导入内存文本缓冲
+import io
 # 导入 JSON 处理模块
 import json
+# 导入日期时间类型
+from datetime import datetime
 # 导入类型注解
-from typing import List, Optional
+from typing import Any, Dict, Iterator, List, Literal, Optional, Tuple
 
 # 导入 FastAPI 路由与表单/文件工具
-from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
-# 导入 SQLAlchemy 会话类型
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, Request, UploadFile
+# 导入原始与流式响应
+from fastapi.responses import Response, StreamingResponse
+# 导入 Pydantic 校验异常
+from pydantic import ValidationError
+# 导入 SQLAlchemy 查询构造工具
+from sqlalchemy import insert, select
+# 导入 SQLAlchemy 会话类型与预加载选项
+from sqlalchemy.orm import Session, selectinload
+# 导入线程池执行工具
+from starlette.concurrency import run_in_threadpool
 
-# 导入数据库会话依赖
-from app.core.database import get_db
+# 导入同步/异步处理器选择
+from app.core.async_handlers import db_endpoint
+# 导入配置
+from app.core.config import settings
+# 导入数据库会话依赖与只读会话工具
+from app.core.database import get_db, get_read_db, is_replica, open_read_session
+# 导入 ETag 条件请求工具
+from app.core.http_cache import etag_matches, make_etag, not_modified
+# 导入严格模式豁免
+from app.core.query_stats import allow_repeated_queries
+# 导入流式表单解析
+from app.core.multipart_stream import MultipartError, MultipartStream, blocking_body
 # 导入报表相关模型
-from app.models.report_models import Report, ReportAttachment, ReportField, ReportFieldValue
+from app.models.report_models import (
+    # 附件已写入状态
+    ATTACHMENT_STORED,
+    # 宽表存储模式常量
+    STORAGE_MODE_WIDE,
+    # 报表模型
+    Report,
+    # 附件模型
+    ReportAttachment,
+    # 字段值模型
+    ReportFieldValue,
+)
 # 导入响应 schema
-from app.schemas.report_schemas import ReportRead
-# 导入 FILETABLE 存储服务
-from app.services.storage_service import FileTableStorage
+from app.schemas.report_schemas import (
+    # 附件响应
+    ReportAttachmentRead,
+    # 批量条目结果
+    ReportBatchItemResult,
+    # 批量创建结果
+    ReportBatchResult,
+    # 创建报表请求体
+    ReportCreate,
+    # 分页响应
+    ReportPage,
+    # 报表响应
+    ReportRead,
+)
+# 导入附件下载响应
+from app.services.attachment_download import attachment_response
+# 导入后台附件写入队列
+from app.services.attachment_ingest import attachment_ingest
+# 导入字段值存储转换
+from app.services.field_values import value_columns
+# 导入字段值过滤、排序与游标工具
+from app.services.report_query import (
+    # 排序方式
+    ReportSort,
+    # 键集分页条件
+    after_position,
+    # 应用字段谓词
+    apply_field_predicates,
+    # 解析排序参数
+    apply_sort,
+    # 解析游标
+    decode_cursor,
+    # 生成游标
+    encode_cursor,
+    # 按排序键排序
+    order_query,
+    # 解析字段谓词
+    parse_field_predicates,
+)
+# 导入报表响应缓存
+from app.services.report_cache import report_cache
+# 导入报表结构缓存
+from app.services.schema_registry import FieldSchema, ReportTypeSchema, schema_registry
+# 导入存储后端选择
+from app.services.storage_backends import get_storage_backend
+# 导入附件存储服务
+from app.services.storage_service import AttachmentStorage
+# 导入宽表读写工具
+from app.services.wide_tables import load_wide_values, wide_row, wide_table
 
 # 创建路由器并设置前缀与标签
 router = APIRouter(prefix="/reports", tags=["reports"])
@@ -40,6 +121,322 @@ def create_report(
 ):
     # 函数文档：创建报表并可附带附件
     """Create a report with field values and optional attachments."""
+    # 校验报表类型与字段值
+    schema, value_rows = _validate_report_form(db, report_type_id, values)
+    # 创建报表并写入字段值
+    report = _add_report(db, schema, report_type_id, title, value_rows)
+
+    # 后台写入模式：附件先暂存到本地，提交后由队列写入存储后端
+    background = settings.attachment_ingest_mode == "background"
+    # 同步写入时的附件存储服务
+    storage = None if background else AttachmentStorage(db, get_storage_backend(db))
+    # 后台写入的附件 ID
+    pending_ids: List[int] = []
+    # 保存附件并提交事务
+    try:
+        # 后台写入：创建 pending 附件并暂存文件
+        if background:
+            pending_ids = attachment_ingest.spool_uploads(db, report.id, files or [])
+        # 同步写入：保存文件并持久化元数据
+        else:
+            for attachment in storage.save_files(report.id, files or []):
+                db.add(ReportAttachment(**attachment))
+        # 提交事务
+        db.commit()
+    # 失败时删除不会随回滚撤销的已写入文件
+    except Exception:
+        # 回滚事务
+        db.rollback()
+        # 删除暂存文件
+        attachment_ingest.discard(pending_ids)
+        # 清理已写入存储后端的文件
+        if storage is not None:
+            storage.discard()
+        # 继续抛出
+        raise
+    # 提交后交给后台队列
+    if pending_ids:
+        attachment_ingest.enqueue(pending_ids)
+    # 刷新报表对象
+    db.refresh(report)
+    # 转换为响应 schema
+    return _reports_to_read(db, [report])[0]
+
+
+# 定义流式创建报表的 POST 接口
+@router.post("/stream", response_model=ReportRead)
+async def create_report_stream(request: Request, db: Session = Depends(get_db)):
+    # 函数文档：与 POST /reports 相同的表单，附件不经临时文件直接写入存储后端
+    """
+    Create a report from the same form as ``POST /reports`` while parsing the
+    multipart body incrementally: each ``files`` part is piped straight into
+    the storage backend instead of being spooled to a temporary file first.
+
+    ``report_type_id``, ``title`` and ``values`` must precede the file parts;
+    they are validated before the first file is written.
+    """
+    # 解析与写入在线程池中执行，按需从事件循环读取请求体
+    return await run_in_threadpool(_create_report_from_stream, request, db)
+
+
+# 定义批量创建报表的 POST 接口
+@router.post("/batch", response_model=ReportBatchResult)
+async def create_reports_batch(request: Request, db: Session = Depends(get_db)):
+    # 函数文档：批量创建报表（JSON 数组或 NDJSON）
+    """
+    Create many reports in one transaction.
+
+    The body is either a JSON array of ``ReportCreate`` objects, an object
+    with a ``reports`` array, or NDJSON (``application/x-ndjson``) with one
+    report per line. Items are validated against the field definitions of
+    their report type; valid items are inserted with executemany and every
+    item gets its own result entry.
+    """
+    # 读取请求体
+    body = await request.body()
+    # 解析出原始条目列表
+    raw_items = _parse_batch_body(body, request.headers.get("content-type", ""))
+    # 限制单批数量
+    if len(raw_items) > settings.report_batch_max_items:
+        raise HTTPException(status_code=413, detail="Too many reports in one batch")
+    # 数据库写入在线程池中执行，避免阻塞事件循环
+    return await run_in_threadpool(_ingest_batch, db, raw_items)
+
+
+# 定义流式导出报表的 GET 接口（需在 /{report_id} 之前注册）
+@router.get("/export")
+# 按配置以同步或异步方式运行
+@db_endpoint
+def export_reports(
+    # 报表类型 ID（必填，CSV 列由其字段决定）
+    report_type_id: int = Query(...),
+    # 导出格式：ndjson 或 csv
+    format: Literal["ndjson", "csv"] = Query(default="ndjson"),
+    # 创建时间下限（含）
+    created_from: Optional[datetime] = Query(default=None),
+    # 创建时间上限（不含）
+    created_to: Optional[datetime] = Query(default=None),
+    # 每批从数据库读取的条数
+    batch_size: int = Query(default=500, ge=1, le=5000),
+    # 只读数据库会话依赖（可用时走副本）
+    db: Session = Depends(get_read_db),
+):
+    # 函数文档：按报表类型流式导出报表
+    """Stream every report of a report type as NDJSON or CSV."""
+    # 从结构缓存获取报表类型
+    schema = schema_registry.get(db, report_type_id)
+    # 如果不存在则抛出 404
+    if not schema:
+        raise HTTPException(status_code=404, detail="Report type not found")
+    # CSV 每个字段一列，按字段 ID 排序保证列顺序稳定
+    field_names = [field.name for field in schema.fields]
+    # 选择对应格式的行生成器
+    if format == "csv":
+        # CSV 行生成器
+        rows = _csv_rows(field_names, _iter_report_batches(report_type_id, created_from, created_to, batch_size, is_replica(db)))
+        # CSV 媒体类型
+        media_type = "text/csv; charset=utf-8"
+    # 默认导出 NDJSON
+    else:
+        # NDJSON 行生成器
+        rows = _ndjson_rows(_iter_report_batches(report_type_id, created_from, created_to, batch_size, is_replica(db)))
+        # NDJSON 媒体类型
+        media_type = "application/x-ndjson"
+    # 返回流式响应，边读边写
+    return StreamingResponse(
+        # 行生成器
+        rows,
+        # 媒体类型
+        media_type=media_type,
+        # 下载文件名
+        headers={"Content-Disposition": f'attachment; filename="reports-{report_type_id}.{format}"'},
+    )
+
+
+# 定义获取单个报表的 GET 接口
+@router.get("/{report_id}", response_model=ReportRead)
+# 按配置以同步或异步方式运行
+@db_endpoint
+def get_report(report_id: int, request: Request, db: Session = Depends(get_read_db)):
+    # 函数文档：按 ID 获取报表，支持 ETag 条件请求
+    """
+    Fetch a single report by ID. Responses carry an ETag derived from the
+    report's version; a matching If-None-Match gets ``304`` without loading
+    or serializing the report. Payloads are served from the report cache
+    when possible; only primary reads fill it, so a lagging replica cannot
+    re-cache a version that a write just invalidated.
+    """
+    # 先查缓存：条目为 ETag 与 JSON
+    cached = report_cache.get(report_id)
+    # 命中缓存
+    if cached is not None:
+        # 拆出 ETag 与 JSON
+        etag, _, payload = cached.decode().partition("\n")
+    # 未命中时先用版本号判断是否需要加载
+    else:
+        # 读取前的失效令牌：读取期间报表被修改时不写入缓存
+        token = report_cache.token()
+        # 只读版本号（主键查找）
+        version = db.execute(select(Report.version).where(Report.id == report_id)).scalar()
+        # 如果不存在则抛出 404
+        if version is None:
+            raise HTTPException(status_code=404, detail="Report not found")
+        # 当前版本的 ETag
+        etag = _report_etag(report_id, version)
+        # 客户端副本未变化时跳过加载与序列化
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        # 查询报表并批量预加载字段值与附件
+        report = (
+            # 查询报表
+            db.query(Report)
+            # 批量加载关联数据，避免逐行懒加载
+            .options(*_report_load_options())
+            # 过滤报表 ID
+            .filter(Report.id == report_id)
+            # 取第一条
+            .first()
+        )
+        # 期间被删除
+        if not report:
+            raise HTTPException(status_code=404, detail="Report not found")
+        # 以加载到的版本号为准
+        etag = _report_etag(report_id, report.version)
+        # 序列化为 JSON
+        payload = _reports_to_read(db, [report])[0].model_dump_json()
+        # 写入缓存（副本数据可能落后，不写入）
+        if not is_replica(db):
+            report_cache.set(report_id, f"{etag}\n{payload}".encode(), token)
+    # 客户端副本未变化
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    # 直接返回已序列化的 JSON
+    return Response(content=payload, media_type="application/json", headers={"ETag": etag})
+
+
+# 定义下载报表附件的 GET 接口
+@router.get("/{report_id}/attachments/{attachment_id}")
+def download_attachment(report_id: int, attachment_id: int, request: Request, db: Session = Depends(get_db)):
+    # 函数文档：流式下载附件，支持 Range
+    """
+    Stream an attachment's content. Supports single ``Range`` requests
+    (206 Partial Content) for resuming downloads and seeking in PDFs.
+    """
+    # 查询附件
+    attachment = _get_attachment(db, report_id, attachment_id)
+    # 后台写入尚未完成或已失败
+    if attachment.status != ATTACHMENT_STORED:
+        raise HTTPException(status_code=409, detail=f"Attachment is {attachment.status}")
+    # 返回流式响应
+    return attachment_response(
+        # 当前请求
+        request,
+        # 数据库会话
+        db,
+        # 存储后端名称
+        attachment.storage_backend,
+        # 存储键
+        attachment.storage_path,
+        # 文件名
+        attachment.filename,
+        # MIME 类型
+        attachment.content_type,
+        # 压缩算法（下载时解压）
+        compression=attachment.compression,
+        # 原始大小
+        size=attachment.size,
+    )
+
+
+# 定义查询附件写入状态的 GET 接口
+@router.get("/{report_id}/attachments/{attachment_id}/status", response_model=ReportAttachmentRead)
+# 按配置以同步或异步方式运行
+@db_endpoint
+def get_attachment_status(report_id: int, attachment_id: int, db: Session = Depends(get_db)):
+    # 函数文档：后台写入模式下供客户端轮询
+    """Return an attachment's metadata and ingestion status (pending/stored/failed)."""
+    # 查询附件
+    return _get_attachment(db, report_id, attachment_id)
+
+
+# 定义获取报表列表的 GET 接口
+@router.get("", response_model=ReportPage)
+# 按配置以同步或异步方式运行
+@db_endpoint
+def list_reports(
+    # 按报表类型过滤（可选）
+    report_type_id: Optional[int] = Query(default=None),
+    # 创建时间下限（含）
+    created_from: Optional[datetime] = Query(default=None),
+    # 创建时间上限（不含）
+    created_to: Optional[datetime] = Query(default=None),
+    # 每页条数
+    limit: int = Query(default=50, ge=1, le=500),
+    # 上一页返回的游标
+    cursor: Optional[str] = Query(default=None),
+    # 字段值过滤条件，形如 device_model:eq:ABC-01（可重复）
+    field: List[str] = Query(default=[]),
+    # 排序：created_at 或类型化字段名称，前缀 - 表示降序
+    sort: Optional[str] = Query(default=None),
+    # 只读数据库会话依赖（可用时走副本）
+    db: Session = Depends(get_read_db),
+):
+    # 函数文档：键集分页列出报表
+    """
+    List reports page by page using a keyset cursor on (sort key, id).
+
+    ``field`` filters take the form ``name:op:value`` where ``op`` is
+    ``eq``, ``prefix``, ``in`` (comma-separated values) or one of the range
+    operators ``gt``/``gte``/``lt``/``lte`` on typed fields; all filters must
+    match. ``sort`` is ``created_at`` (default) or a typed field name.
+    """
+    # 构建带过滤条件的基础查询
+    query = _filtered_reports_query(db, report_type_id, created_from, created_to)
+    # 尝试应用字段值过滤、排序与游标
+    try:
+        # 解析并应用字段谓词
+        query = apply_field_predicates(db, query, parse_field_predicates(field), report_type_id)
+        # 解析排序方式
+        query, report_sort = apply_sort(db, query, sort, report_type_id)
+        # 如果带游标则从上一页最后一条之后继续
+        if cursor:
+            query = after_position(query, report_sort, *decode_cursor(report_sort, cursor))
+    # 参数不合法时返回 400
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+    # 多取一条用于判断是否还有下一页
+    rows = (
+        # 按排序键排序并批量加载关联数据
+        order_query(query.options(*_report_load_options()), report_sort)
+        # 限制条数
+        .limit(limit + 1)
+        # 执行查询
+        .all()
+    )
+    # 计算下一页游标
+    next_cursor = None
+    # 超过一页说明还有数据
+    if len(rows) > limit:
+        # 截掉多取的一条
+        rows = rows[:limit]
+        # 本页最后一行的报表与排序键
+        last_report, last_key = rows[-1]
+        # 以本页最后一条生成游标
+        next_cursor = encode_cursor(report_sort, last_key, last_report.id)
+    # 返回分页结果
+    return ReportPage(
+        # 当前页数据
+        items=_reports_to_read(db, [report for report, _ in rows]),
+        # 下一页游标
+        next_cursor=next_cursor,
+    )
+
+
+# 校验创建报表的表单
+def _validate_report_form(db: Session, report_type_id: int, values: str) -> Tuple[ReportTypeSchema, List[Dict[str, Any]]]:
+    # 函数文档：返回报表类型结构与转换后的字段值
+    """Resolve the report type and convert the ``values`` JSON; raise 400/404 on invalid input."""
     # 尝试解析字段值 JSON
     try:
         values_data = json.loads(values)
@@ -47,100 +444,408 @@ def create_report(
     except json.JSONDecodeError as exc:
         raise HTTPException(status_code=400, detail="Invalid JSON for values") from exc
 
+    # 从结构缓存获取报表类型（含字段定义与存储模式），EAV 类型锁定到提交
+    schema = schema_registry.get_for_write(db, report_type_id)
+    # 如果不存在则抛出 404
+    if not schema:
+        raise HTTPException(status_code=404, detail="Report type not found")
+
+    # 按字段类型转换字段值
+    try:
+        value_rows = _prepare_values(schema, values_data)
+    # 值与字段类型不符时返回 400
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    # 返回结构与字段值
+    return schema, value_rows
+
+
+# 创建报表行并写入字段值
+def _add_report(
+    db: Session, schema: ReportTypeSchema, report_type_id: int, title: str, value_rows: List[Dict[str, Any]]
+) -> Report:
+    # 函数文档：在调用方事务中创建报表（未提交）
+    """Add a report and its field values to the session (not committed)."""
     # 先创建报表行以获得 ID
     report = Report(report_type_id=report_type_id, title=title)
     # 添加到数据库会话
     db.add(report)
     # 立即写入以生成主键
     db.flush()
+    # 按存储模式写入字段值
+    _insert_values(db, schema, [{**row, "report_id": report.id} for row in value_rows])
+    # 返回报表
+    return report
 
-    # 构建字段名称到字段定义的映射
-    field_map = {
-        # 键为字段名称，值为字段对象
-        field.name: field
-        # 遍历查询到的字段列表
-        for field in db.query(ReportField)
-        # 过滤报表类型 ID
-        .filter(ReportField.report_type_id == report_type_id)
-        # 取出全部结果
-        .all()
-    }
 
-    # 遍历提交的字段值并保存
-    for field_name, value in values_data.items():
+# 从流式表单创建报表
+def _create_report_from_stream(request: Request, db: Session) -> ReportRead:
+    # 函数文档：在线程池中运行，逐个部分解析并写入附件
+    """Parse the streamed form of ``POST /reports/stream`` and create the report."""
+    # 表单字段
+    fields: Dict[str, str] = {}
+    # 校验结果（首个文件之前或读完表单后得到）
+    validated: Optional[Tuple[ReportTypeSchema, List[Dict[str, Any]]]] = None
+    # 附件存储服务
+    storage = AttachmentStorage(db, get_storage_backend(db))
+    # 附件元数据
+    attachments: List[dict] = []
+    # 解析、写入并提交
+    try:
+        # 逐个部分处理
+        for part in MultipartStream(request.headers.get("content-type"), blocking_body(request)):
+            # 普通字段
+            if part.filename is None:
+                fields[part.name] = part.read_field()
+            # 附件：写入前先校验表单字段
+            elif part.name == "files":
+                # 首个文件前校验
+                if validated is None:
+                    validated = _validate_stream_fields(db, fields)
+                # 直接写入存储后端
+                attachments.append(storage.save_stream(part.filename, part.content_type, part))
+        # 没有附件时读完表单后校验
+        if validated is None:
+            validated = _validate_stream_fields(db, fields)
+        # 创建报表并写入字段值
+        report = _add_report(db, validated[0], int(fields["report_type_id"]), fields["title"], validated[1])
+        # 保存附件元数据
+        for attachment in attachments:
+            db.add(ReportAttachment(**attachment, report_id=report.id))
+        # 提交事务
+        db.commit()
+    # 表单格式错误
+    except MultipartError as exc:
+        # 回滚事务
+        db.rollback()
+        # 清理文件
+        storage.discard()
+        # 返回 400
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    # 其他失败时删除不会随回滚撤销的已写入文件
+    except Exception:
+        # 回滚事务
+        db.rollback()
+        # 清理文件
+        storage.discard()
+        # 继续抛出
+        raise
+    # 刷新报表对象
+    db.refresh(report)
+    # 转换为响应 schema
+    return _reports_to_read(db, [report])[0]
+
+
+# 校验流式表单字段
+def _validate_stream_fields(db: Session, fields: Dict[str, str]) -> Tuple[ReportTypeSchema, List[Dict[str, Any]]]:
+    # 函数文档：必填字段须出现在文件之前
+    """Validate the text fields of a streamed report form; required fields must precede the files."""
+    # 必填字段
+    for name in ("report_type_id", "title"):
+        # 缺失时 422
+        if name not in fields:
+            raise HTTPException(status_code=422, detail=f"Form field {name!r} is required before the files")
+    # 报表类型 ID 必须是整数
+    try:
+        report_type_id = int(fields["report_type_id"])
+    # 非整数时 422
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail="report_type_id must be an integer") from exc
+    # 与普通表单相同的校验
+    return _validate_report_form(db, report_type_id, fields.get("values", "{}"))
+
+
+# 查询报表的附件
+def _get_attachment(db: Session, report_id: int, attachment_id: int) -> ReportAttachment:
+    # 函数文档：附件不存在或不属于该报表时抛出 404
+    """Load an attachment of a report or raise 404."""
+    # 查询附件
+    attachment = (
+        # 查询附件
+        db.query(ReportAttachment)
+        # 附件必须属于该报表
+        .filter(ReportAttachment.id == attachment_id, ReportAttachment.report_id == report_id)
+        # 取第一条
+        .first()
+    )
+    # 如果不存在则抛出 404
+    if not attachment:
+        raise HTTPException(status_code=404, detail="Attachment not found")
+    # 返回附件
+    return attachment
+
+
+# 解析批量请求体
+def _parse_batch_body(body: bytes, content_type: str) -> List[Any]:
+    # 函数文档：把 JSON 或 NDJSON 请求体解析为条目列表
+    """Parse a JSON or NDJSON batch body into a list of raw items."""
+    # 尝试解析请求体
+    try:
+        # NDJSON：每个非空行一条
+        if "ndjson" in content_type:
+            return [json.loads(line) for line in body.splitlines() if line.strip()]
+        # 普通 JSON
+        payload = json.loads(body)
+    # 处理 JSON 解析错误
+    except json.JSONDecodeError as exc:
+        raise HTTPException(status_code=400, detail="Invalid JSON body") from exc
+    # 支持 {"reports": [...]} 包装形式
+    if isinstance(payload, dict):
+        payload = payload.get("reports")
+    # 最终必须是数组
+    if not isinstance(payload, list):
+        raise HTTPException(status_code=400, detail="Expected a list of reports")
+    # 返回条目列表
+    return payload
+
+
+# 执行批量写入
+def _ingest_batch(db: Session, raw_items: List[Any]) -> ReportBatchResult:
+    # 函数文档：校验条目并以批量插入写入报表与字段值
+    """Validate raw batch items and write them with set-based inserts."""
+    # 每个条目的结果，按原始顺序
+    results: List[ReportBatchItemResult] = []
+    # 通过校验的条目：(序号, 条目)
+    accepted: List[Tuple[int, ReportCreate]] = []
+    # 逐条做结构校验
+    for index, raw in enumerate(raw_items):
+        # 尝试按 ReportCreate 校验
+        try:
+            accepted.append((index, ReportCreate.model_validate(raw)))
+        # 结构不合法则记录错误
+        except ValidationError as exc:
+            # 汇总为简短的错误描述
+            error = "; ".join(
+                # 字段路径与错误信息
+                f"{'.'.join(str(part) for part in detail['loc'])}: {detail['msg']}"
+                # 遍历校验错误
+                for detail in exc.errors()
+            )
+            # 记录失败结果
+            results.append(ReportBatchItemResult(index=index, status="error", error=error))
+
+    # 每种报表类型只从结构缓存取一次字段定义
+    known_types: Dict[int, ReportTypeSchema] = {}
+    # 遍历涉及的报表类型
+    for type_id in {item.report_type_id for _, item in accepted}:
+        # 查找报表类型结构（EAV 类型锁定到提交）
+        schema = schema_registry.get_for_write(db, type_id)
+        # 记录存在的类型
+        if schema is not None:
+            known_types[type_id] = schema
+
+    # 按类型校验后的待写入条目：(序号, 条目, 字段值行)
+    valid: List[Tuple[int, ReportCreate, List[Dict[str, Any]]]] = []
+    # 逐条做字段校验
+    for index, item in accepted:
+        # 报表类型不存在
+        if item.report_type_id not in known_types:
+            results.append(ReportBatchItemResult(index=index, status="error", error="Report type not found"))
+            continue
+        # 检查必填字段
+        missing = [
+            # 缺失的字段名称
+            name
+            # 遍历该类型的字段
+            for name, field in known_types[item.report_type_id].field_map.items()
+            # 必填但未提供或为空
+            if field.required and item.values.get(name) is None
+        ]
+        # 缺少必填字段
+        if missing:
+            results.append(
+                ReportBatchItemResult(
+                    # 条目序号
+                    index=index,
+                    # 失败状态
+                    status="error",
+                    # 错误信息
+                    error=f"Missing required fields: {', '.join(sorted(missing))}",
+                )
+            )
+            continue
+        # 按字段类型转换字段值
+        try:
+            value_rows = _prepare_values(known_types[item.report_type_id], item.values)
+        # 值与字段类型不符
+        except ValueError as exc:
+            results.append(ReportBatchItemResult(index=index, status="error", error=str(exc)))
+            continue
+        # 记录为有效条目
+        valid.append((index, item, value_rows))
+
+    # 存在有效条目时执行批量插入
+    if valid:
+        # 整批使用同一个创建时间
+        created_at = datetime.utcnow()
+        # 尝试在一个事务中写入
+        try:
+            # 批量插入报表并按参数顺序返回主键
+            report_ids = db.execute(
+                # 带 RETURNING 的多行插入
+                insert(Report).returning(Report.id, sort_by_parameter_order=True),
+                # 报表行参数
+                [
+                    {"report_type_id": item.report_type_id, "title": item.title, "created_at": created_at}
+                    # 遍历有效条目
+                    for _, item, _ in valid
+                ],
+            ).scalars().all()
+            # 报表类型 ID -> 补上新报表主键的字段值行
+            rows_by_type: Dict[int, List[Dict[str, Any]]] = {}
+            # 遍历有效条目与新主键
+            for (_, item, rows), report_id in zip(valid, report_ids):
+                rows_by_type.setdefault(item.report_type_id, []).extend({**row, "report_id": report_id} for row in rows)
+            # 每种报表类型一次 executemany
+            for type_id, rows in rows_by_type.items():
+                _insert_values(db, known_types[type_id], rows)
+            # Core 写入不经过 flush 事件，提交后显式失效
+            report_cache.invalidate_on_commit(db, report_ids)
+            # 提交事务
+            db.commit()
+        # 写入失败则整体回滚
+        except Exception:
+            # 回滚事务
+            db.rollback()
+            # 继续抛出，由框架返回 500
+            raise
+        # 记录成功结果
+        for (index, _, _), report_id in zip(valid, report_ids):
+            results.append(ReportBatchItemResult(index=index, status="created", id=report_id))
+
+    # 按原始顺序排序结果
+    results.sort(key=lambda result: result.index)
+    # 返回汇总结果
+    return ReportBatchResult(
+        # 成功条数
+        created=len(valid),
+        # 失败条数
+        failed=len(results) - len(valid),
+        # 每个条目的结果
+        results=results,
+    )
+
+
+# 按存储模式准备字段值行
+def _prepare_values(schema: ReportTypeSchema, values: Dict[str, Any]) -> List[Dict[str, Any]]:
+    # 函数文档：EAV 模式每个字段一行，宽表模式每个报表一行
+    """
+    Convert submitted values into rows for the report type's storage mode,
+    without report_id. Raises ``ValueError`` when a value does not fit its
+    field type.
+    """
+    # 宽表模式：一行包含所有字段列
+    if schema.storage_mode == STORAGE_MODE_WIDE:
+        return [wide_row(0, schema.fields, values)]
+    # EAV 模式：每个字段一行
+    return _value_rows(schema.field_map, values)
+
+
+# 按存储模式写入字段值行
+def _insert_values(db: Session, schema: ReportTypeSchema, rows: List[Dict[str, Any]]) -> None:
+    # 函数文档：以一次 executemany 写入字段值
+    """Write prepared value rows with one executemany in the session's transaction."""
+    # 没有数据则跳过
+    if not rows:
+        return
+    # 宽表模式写入类型宽表
+    if schema.storage_mode == STORAGE_MODE_WIDE:
+        db.execute(insert(wide_table(schema.id, schema.fields)), rows)
+    # EAV 模式写入字段值表
+    else:
+        db.execute(insert(ReportFieldValue), rows)
+
+
+# 构建字段值行
+def _value_rows(field_map: Dict[str, FieldSchema], values: Dict[str, Any]) -> List[Dict[str, Any]]:
+    # 函数文档：把提交的字段值转换为 ReportFieldValue 行参数
+    """
+    Convert submitted values into ReportFieldValue column dicts (without
+    report_id). Unknown field names are skipped; raises ``ValueError`` when a
+    value does not fit its field type.
+    """
+    # 转换结果
+    rows: List[Dict[str, Any]] = []
+    # 遍历提交的字段值
+    for field_name, value in values.items():
         # 获取字段定义
         field = field_map.get(field_name)
         # 如果字段不存在则跳过
         if not field:
             continue
-        # 添加字段值记录
-        db.add(
-            ReportFieldValue(
-                # 关联报表 ID
-                report_id=report.id,
-                # 关联字段 ID
-                field_id=field.id,
-                # 字段值转字符串
-                value=str(value) if value is not None else None,
-            )
-        )
+        # 按字段类型转换存储列
+        try:
+            rows.append({"field_id": field.id, **value_columns(field.field_type, value)})
+        # 附带字段名称重新抛出
+        except ValueError as exc:
+            raise ValueError(f"Invalid value for field {field_name!r}: {exc}") from exc
+    # 返回字段值行
+    return rows
 
-    # 保存附件到 FILETABLE 并持久化元数据
-    storage = FileTableStorage()
-    # 保存文件并返回元数据列表
-    attachments = storage.save_files(report.id, files or [])
-    # 遍历附件元数据并保存到数据库
-    for attachment in attachments:
-        db.add(
-            ReportAttachment(
-                # 关联报表 ID
-                report_id=report.id,
-                # 保存文件名
-                filename=attachment["filename"],
-                # 保存存储路径
-                storage_path=attachment["storage_path"],
-                # 保存内容类型
-                content_type=attachment["content_type"],
-            )
-        )
 
-    # 提交事务并返回响应
-    db.commit()
-    # 刷新报表对象
-    db.refresh(report)
-    # 转换为响应 schema
-    return _report_to_read(report)
+# 构建带通用过滤条件的报表查询
+def _filtered_reports_query(
+    # 数据库会话
+    db: Session,
+    # 报表类型 ID（可选）
+    report_type_id: Optional[int],
+    # 创建时间下限（可选）
+    created_from: Optional[datetime],
+    # 创建时间上限（可选）
+    created_to: Optional[datetime],
+):
+    # 函数文档：按报表类型与创建时间范围过滤报表
+    """Build a Report query filtered by report type and created_at range."""
+    # 构建基础查询
+    query = db.query(Report)
+    # 按报表类型过滤
+    if report_type_id is not None:
+        query = query.filter(Report.report_type_id == report_type_id)
+    # 按创建时间下限过滤
+    if created_from is not None:
+        query = query.filter(Report.created_at >= created_from)
+    # 按创建时间上限过滤
+    if created_to is not None:
+        query = query.filter(Report.created_at < created_to)
+    # 返回查询对象
+    return query
 
 
-# 定义获取单个报表的 GET 接口
-@router.get("/{report_id}", response_model=ReportRead)
-def get_report(report_id: int, db: Session = Depends(get_db)):
-    # 函数文档：按 ID 获取报表
-    """Fetch a single report by ID."""
-    # 查询报表
-    report = db.query(Report).filter(Report.id == report_id).first()
-    # 如果不存在则抛出 404
-    if not report:
-        raise HTTPException(status_code=404, detail="Report not found")
-    # 返回转换后的响应
-    return _report_to_read(report)
+# 报表读取时使用的预加载选项
+def _report_load_options() -> tuple:
+    # 函数文档：以固定数量的批量查询加载字段值、字段定义与附件
+    """Loader options that fetch values, fields and attachments in batched queries."""
+    # 返回预加载选项元组
+    return (
+        # 字段值及其字段定义使用 SELECT ... IN 批量加载
+        selectinload(Report.values).selectinload(ReportFieldValue.field),
+        # 附件使用 SELECT ... IN 批量加载
+        selectinload(Report.attachments),
+    )
 
 
-# 定义获取报表列表的 GET 接口
-@router.get("", response_model=list[ReportRead])
-def list_reports(db: Session = Depends(get_db)):
-    # 函数文档：列出所有报表
-    """List all reports."""
-    # 返回所有报表的响应列表
-    return [_report_to_read(report) for report in db.query(Report).all()]
+# 将 ORM 报表对象批量转换为响应 schema
+def _reports_to_read(db: Session, reports: List[Report]) -> List[ReportRead]:
+    # 函数文档：ORM 对象转 ReportRead，字段值按存储模式批量读取
+    """Convert Report ORM objects into ReportRead schemas, loading values per storage mode."""
+    # 批量读取字段值
+    values = _load_values(db, reports)
+    # 返回 ReportRead 列表
+    return [_report_to_read(report, values.get(report.id, {})) for report in reports]
+
+
+# 报表 ETag
+def _report_etag(report_id: int, version: int) -> str:
+    # 函数文档：由报表 ID 与版本号构建 ETag
+    """Build the ETag of a report from its id and content version."""
+    # 返回强 ETag
+    return make_etag("report", report_id, version)
 
 
 # 将 ORM 报表对象转换为响应 schema
-def _report_to_read(report: Report) -> ReportRead:
+def _report_to_read(report: Report, values: Dict[str, Optional[str]]) -> ReportRead:
     # 函数文档：ORM 对象转 ReportRead
-    """Convert a Report ORM object into a ReportRead schema."""
-    # 构建字段名到值的映射
-    values = {value.field.name: value.value for value in report.values}
+    """Convert a Report ORM object and its field values into a ReportRead schema."""
     # 返回 ReportRead 实例
     return ReportRead(
         # 报表 ID
@@ -156,3 +861,158 @@ def _report_to_read(report: Report) -> ReportRead:
         # 附件列表
         attachments=report.attachments,
     )
+
+
+# 批量读取报表字段值
+def _load_values(db: Session, reports: List[Report]) -> Dict[int, Dict[str, Optional[str]]]:
+    # 函数文档：EAV 报表取预加载的字段值，宽表报表按类型一次查询
+    """
+    Map report ids to their field values. EAV reports use the preloaded
+    ``values`` relationship; wide-table reports cost one query per report
+    type on the page.
+    """
+    # 没有报表直接返回
+    if not reports:
+        return {}
+    # 本批报表涉及的宽表类型
+    wide_types = {
+        # 报表类型 ID 到结构
+        schema.id: schema
+        # 遍历本批涉及的类型
+        for schema in (schema_registry.get(db, type_id) for type_id in {report.report_type_id for report in reports})
+        # 只保留宽表模式
+        if schema is not None and schema.storage_mode == STORAGE_MODE_WIDE
+    }
+    # EAV 报表直接使用预加载的字段值
+    values = {report.id: _report_values(report) for report in reports if report.report_type_id not in wide_types}
+    # 宽表报表按类型批量读取
+    for type_id, schema in wide_types.items():
+        # 一次查询读取该类型的所有报表
+        values.update(
+            load_wide_values(
+                # 会话当前连接
+                db.connection(),
+                # 报表类型 ID
+                type_id,
+                # 字段定义
+                schema.fields,
+                # 本批属于该类型的报表 ID
+                [report.id for report in reports if report.report_type_id == type_id],
+            )
+        )
+    # 返回字段值映射
+    return values
+
+
+# 分批读取报表
+def _iter_report_batches(
+    # 报表类型 ID
+    report_type_id: int,
+    # 创建时间下限（可选）
+    created_from: Optional[datetime],
+    # 创建时间上限（可选）
+    created_to: Optional[datetime],
+    # 每批条数
+    batch_size: int,
+    # 是否从副本读取（与请求会话一致）
+    replica: bool = False,
+) -> Iterator[Tuple[List[Report], Dict[int, Dict[str, Optional[str]]]]]:
+    # 函数文档：按键集分批读取报表及其字段值，每批结束后释放对象
+    """
+    Yield (reports, values) in keyset batches using a session owned by the
+    generator; ``values`` maps report ids to their field values.
+
+    The request-scoped session may already be closed while the response is
+    streaming, so the generator opens and closes its own session, on the
+    replica when ``replica`` is set.
+    """
+    # 每批执行相同语句，严格模式下豁免
+    allow_repeated_queries()
+    # 创建生成器专用会话
+    db = open_read_session(primary=not replica)
+    # 确保会话最终关闭
+    try:
+        # 上一批最后一条的位置
+        position: Optional[Tuple[datetime, int]] = None
+        # 按创建时间排序
+        report_sort = ReportSort(name="created_at", descending=False, key=Report.created_at)
+        # 循环读取直到没有数据
+        while True:
+            # 构建带过滤条件的查询
+            query = _filtered_reports_query(db, report_type_id, created_from, created_to)
+            # 从上一批之后继续
+            if position:
+                query = after_position(query, report_sort, *position)
+            # 读取一批报表及关联数据
+            batch = [
+                # 只取报表实体
+                report
+                # 按键集顺序排序并批量加载关联数据
+                for report, _ in order_query(query.options(*_report_load_options()), report_sort)
+                # 限制条数
+                .limit(batch_size)
+            ]
+            # 没有数据则结束
+            if not batch:
+                return
+            # 连同字段值交给调用方输出
+            yield batch, _load_values(db, batch)
+            # 记录本批最后一条的位置
+            position = (batch[-1].created_at, batch[-1].id)
+            # 清空标识映射，使内存占用与总行数无关
+            db.expunge_all()
+    # 最终关闭会话
+    finally:
+        db.close()
+
+
+# 生成 NDJSON 行
+def _ndjson_rows(batches: Iterator[Tuple[List[Report], Dict[int, dict]]]) -> Iterator[str]:
+    # 函数文档：每个报表输出一行 JSON
+    """Render report batches as NDJSON lines."""
+    # 遍历每一批
+    for batch, values in batches:
+        # 每批拼成一个块输出，减少小块写入
+        yield "".join(_report_to_read(report, values.get(report.id, {})).model_dump_json() + "\n" for report in batch)
+
+
+# 生成 CSV 行
+def _csv_rows(field_names: List[str], batches: Iterator[Tuple[List[Report], Dict[int, dict]]]) -> Iterator[str]:
+    # 函数文档：每个字段一列输出 CSV
+    """Render report batches as CSV with one column per report field."""
+    # 复用的内存缓冲区
+    buffer = io.StringIO()
+    # CSV 写入器
+    writer = csv.writer(buffer)
+    # 写入表头
+    writer.writerow(["id", "title", "created_at", *field_names])
+    # 立即输出表头，首字节不必等待第一批查询
+    yield buffer.getvalue()
+    # 重置缓冲区
+    buffer.seek(0)
+    # 截断旧内容
+    buffer.truncate()
+    # 遍历每一批
+    for batch, batch_values in batches:
+        # 遍历本批报表
+        for report in batch:
+            # 复用字段值映射
+            values = batch_values.get(report.id, {})
+            # 写入一行
+            writer.writerow(
+                [report.id, report.title, report.created_at.isoformat(), *(values.get(name) for name in field_names)]
+            )
+        # 输出缓冲内容
+        yield buffer.getvalue()
+        # 重置缓冲区
+        buffer.seek(0)
+        # 截断旧内容
+        buffer.truncate()
+
+
+# 提取报表的字段值映射
+def _report_values(report: Report) -> dict:
+    # 函数文档：构建 EAV 报表字段名到字段值的映射
+    """Map field names to stored values for an EAV report."""
+    # 返回字段名到值的字典
+    return {value.field.name: value.value for value in report.values}
@@ -0,0 +1,59 @@
+# 模块级文档字符串：运行状态与调优信息的 API 路由
+"""API routes exposing runtime statistics for tuning."""
+
+# 导入 FastAPI 路由工具
+from fastapi import APIRouter
+
+# 导入主库、副本及其异步数据库引擎与副本健康状态
+from app.core.database import async_engine, async_replica_engine, engine, replica_engine, replica_health
+# 导入带统计的连接池类型
+from app.core.pool import TimedQueuePool
+# 导入报表响应缓存
+from app.services.report_cache import report_cache
+
+# 创建路由器并设置前缀与标签
+router = APIRouter(prefix="/system", tags=["system"])
+
+
+# 定义查看报表缓存统计的 GET 接口
+@router.get("/cache")
+def get_cache_stats():
+    # 函数文档：返回报表缓存的命中/未命中/淘汰计数
+    """Return hit, miss, eviction and invalidation counters of the report cache."""
+    # 返回统计快照
+    return report_cache.stats()
+
+
+# 定义查看数据库连接池统计的 GET 接口
+@router.get("/pool")
+def get_pool_stats():
+    # 函数文档：返回连接池占用与检出等待统计
+    """
+    Return occupancy, checkout counts and wait times of the database pool;
+    with ``DATABASE_ASYNC`` the async engine's pool is reported under ``async``.
+    With a replica configured its pools and health are reported under
+    ``replica``.
+    """
+    # 同步连接池统计
+    snapshot = _pool_snapshot(engine.pool)
+    # 异步模式下附加异步连接池统计
+    if async_engine is not None:
+        snapshot["async"] = _pool_snapshot(async_engine.sync_engine.pool)
+    # 配置了副本时附加副本连接池与健康状态
+    if replica_engine is not None:
+        # 副本同步连接池与健康状态
+        snapshot["replica"] = {**_pool_snapshot(replica_engine.pool), "health": replica_health.snapshot()}
+        # 异步模式下的副本连接池
+        if async_replica_engine is not None:
+            snapshot["replica"]["async"] = _pool_snapshot(async_replica_engine.sync_engine.pool)
+    # 返回统计快照
+    return snapshot
+
+
+# 单个连接池的统计
+def _pool_snapshot(pool) -> dict:
+    # 非统计池（例如测试时替换）只返回状态描述
+    if not isinstance(pool, TimedQueuePool):
+        return {"status": pool.status()}
+    # 返回统计快照
+    return pool.snapshot()
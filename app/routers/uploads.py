@@ -0,0 +1,219 @@
+# 模块级文档字符串：可续传分块上传的 API 路由
+"""
+API routes for resumable chunked uploads.
+
+1. ``POST /uploads`` starts a session and returns its id;
+2. ``PUT /uploads/{id}`` sends a chunk at ``Upload-Offset`` (optionally with
+   ``Upload-Checksum: sha256 <base64>``);
+3. ``GET``/``HEAD /uploads/{id}`` returns the offset to resume from after a
+   dropped connection;
+4. ``POST /uploads/{id}/finalize`` attaches the file to a report or a
+   product report.
+"""
+
+# 导入可选类型注解
+from typing import Optional
+
+# 导入 FastAPI 路由与依赖工具
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response
+# 导入 SQLAlchemy 会话类型
+from sqlalchemy.orm import Session
+# 导入线程池执行工具
+from starlette.concurrency import run_in_threadpool
+
+# 导入数据库会话依赖
+from app.core.database import get_db
+# 导入流式请求体读取
+from app.core.multipart_stream import blocking_body
+# 导入上传会话模型
+from app.models.upload_models import UploadSession
+# 导入请求与响应 schema
+from app.schemas.upload_schemas import UploadFinalize, UploadSessionCreate, UploadSessionRead
+# 导入上传会话服务
+from app.services.upload_sessions import (
+    # 校验和不符
+    ChecksumMismatch,
+    # 偏移或状态冲突
+    UploadConflict,
+    # 超出大小限制
+    UploadTooLarge,
+    # 写入分块
+    append_chunk,
+    # 取消上传
+    cancel_upload,
+    # 创建会话
+    create_upload,
+    # 过期时间
+    expires_at,
+    # 完成上传
+    finalize_upload,
+    # 按间隔清理过期会话
+    maybe_purge_expired_uploads,
+    # 解析校验和请求头
+    parse_checksum,
+)
+
+# 创建路由器并设置前缀与标签
+router = APIRouter(prefix="/uploads", tags=["uploads"])
+# 校验和不符时的状态码（与 tus 协议一致）
+CHECKSUM_MISMATCH_STATUS = 460
+
+
+# 定义创建上传会话的 POST 接口
+@router.post("", response_model=UploadSessionRead, status_code=201)
+def start_upload(payload: UploadSessionCreate, response: Response, db: Session = Depends(get_db)):
+    # 函数文档：创建会话并顺带清理过期会话
+    """Start a resumable upload; the returned ``id`` addresses all further requests."""
+    # 顺带清理过期会话
+    maybe_purge_expired_uploads(db)
+    # 创建会话
+    try:
+        upload = create_upload(db, payload.filename, payload.content_type, payload.size, payload.sha256)
+    # 声明的大小超出上限
+    except UploadTooLarge as exc:
+        raise HTTPException(status_code=413, detail=str(exc)) from exc
+    # 会话地址
+    response.headers["location"] = f"/uploads/{upload.id}"
+    # 返回会话
+    return _upload_read(upload, response)
+
+
+# 定义查询上传进度的 GET/HEAD 接口
+@router.api_route("/{upload_id}", methods=["GET", "HEAD"], response_model=UploadSessionRead)
+def get_upload(upload_id: str, response: Response, db: Session = Depends(get_db)):
+    # 函数文档：返回续传的偏移
+    """Return the session; ``offset`` (also in ``Upload-Offset``) is where the next chunk starts."""
+    # 返回会话
+    return _upload_read(_get_upload(db, upload_id), response)
+
+
+# 定义上传分块的 PUT 接口
+@router.put("/{upload_id}", response_model=UploadSessionRead)
+async def put_chunk(
+    # 会话 ID
+    upload_id: str,
+    # 当前请求（流式读取请求体）
+    request: Request,
+    # 响应（设置 Upload-Offset）
+    response: Response,
+    # 分块偏移
+    upload_offset: int = Header(..., alias="Upload-Offset", ge=0),
+    # 分块校验和（可选）
+    upload_checksum: Optional[str] = Header(default=None, alias="Upload-Checksum"),
+    # 数据库会话依赖
+    db: Session = Depends(get_db),
+):
+    # 函数文档：按块流式写入磁盘，不在内存中保留整个分块
+    """
+    Append the request body at ``Upload-Offset``. Answers 409 with the
+    current offset when it does not match, 460 when ``Upload-Checksum``
+    fails and 413 beyond the declared size.
+    """
+    # 解析校验和
+    try:
+        checksum = parse_checksum(upload_checksum)
+    # 格式错误
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    # 写入在线程池中执行，按需从事件循环读取请求体
+    return await run_in_threadpool(_put_chunk, db, upload_id, request, response, upload_offset, checksum)
+
+
+# 定义完成上传的 POST 接口
+@router.post("/{upload_id}/finalize", response_model=UploadSessionRead)
+def finish_upload(upload_id: str, payload: UploadFinalize, response: Response, db: Session = Depends(get_db)):
+    # 函数文档：写入存储后端并挂到报表或产品完整报表
+    """Attach the completed upload to a report or a product report. Safe to retry."""
+    # 查询会话
+    upload = _get_upload(db, upload_id)
+    # 完成上传
+    try:
+        finalize_upload(db, upload, payload.report_id, payload.product_report_id)
+    # 目标不存在
+    except LookupError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+    # 未收齐或已完成
+    except UploadConflict as exc:
+        raise HTTPException(status_code=409, detail=str(exc)) from exc
+    # 整文件校验失败
+    except ChecksumMismatch as exc:
+        raise HTTPException(status_code=CHECKSUM_MISMATCH_STATUS, detail=str(exc)) from exc
+    # 返回会话
+    return _upload_read(upload, response)
+
+
+# 定义取消上传的 DELETE 接口
+@router.delete("/{upload_id}", status_code=204)
+def delete_upload(upload_id: str, db: Session = Depends(get_db)):
+    # 函数文档：删除会话及已接收的数据
+    """Abandon an upload and delete the received bytes."""
+    # 删除会话
+    cancel_upload(db, _get_upload(db, upload_id))
+    # 无内容
+    return Response(status_code=204)
+
+
+# 写入分块（线程池中执行）
+def _put_chunk(
+    db: Session, upload_id: str, request: Request, response: Response, offset: int, checksum: Optional[bytes]
+) -> UploadSessionRead:
+    # 查询会话
+    upload = _get_upload(db, upload_id)
+    # 写入
+    try:
+        append_chunk(db, upload, offset, blocking_body(request), checksum)
+    # 偏移不符或已完成
+    except UploadConflict as exc:
+        raise HTTPException(status_code=409, detail=str(exc), headers={"upload-offset": str(upload.received)}) from exc
+    # 超出大小
+    except UploadTooLarge as exc:
+        raise HTTPException(status_code=413, detail=str(exc)) from exc
+    # 校验失败
+    except ChecksumMismatch as exc:
+        raise HTTPException(status_code=CHECKSUM_MISMATCH_STATUS, detail=str(exc)) from exc
+    # 返回会话
+    return _upload_read(db.get(UploadSession, upload_id), response)
+
+
+# 查询会话
+def _get_upload(db: Session, upload_id: str) -> UploadSession:
+    # 函数文档：不存在时抛出 404
+    """Load an upload session or raise 404."""
+    # 查询
+    upload = db.get(UploadSession, upload_id)
+    # 不存在
+    if upload is None:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    # 返回会话
+    return upload
+
+
+# 构建响应
+def _upload_read(upload: UploadSession, response: Response) -> UploadSessionRead:
+    # 函数文档：设置 Upload-Offset 响应头并转换为响应 schema
+    """Set the ``Upload-Offset`` header and convert a session to its response schema."""
+    # 续传偏移
+    response.headers["upload-offset"] = str(upload.received)
+    # 响应体
+    return UploadSessionRead(
+        # 会话 ID
+        id=upload.id,
+        # 文件名
+        filename=upload.filename,
+        # MIME 类型
+        content_type=upload.content_type,
+        # 总字节数
+        size=upload.size,
+        # 续传偏移
+        offset=upload.received,
+        # 状态
+        status=upload.status,
+        # 所属报表
+        report_id=upload.report_id,
+        # 报表附件
+        attachment_id=upload.attachment_id,
+        # 产品完整报表
+        product_report_id=upload.product_report_id,
+        # 过期时间
+        expires_at=expires_at(upload),
+    )
@@ -4,7 +4,7 @@
 # 导入日期时间类型
 from datetime import datetime
 # 导入类型注解
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Literal, Optional
 
 # 导入 Pydantic 基类与字段工具
 from pydantic import BaseModel, Field
@@ -51,6 +51,8 @@ class ReportTypeBase(BaseModel):
     name: str
     # 类型描述
     description: Optional[str] = None
+    # 字段值存储模式：eav（通用键值表）或 wide（每个类型一张宽表）
+    storage_mode: Literal["eav", "wide"] = "eav"
 
 
 # 创建报表类型的请求 Schema
@@ -82,8 +84,8 @@ class ReportCreate(BaseModel):
     report_type_id: int
     # 报表标题
     title: str
-    # 字段值映射
-    values: Dict[str, Optional[str]] = Field(
+    # 字段值映射（值按字段类型转换后存储）
+    values: Dict[str, Any] = Field(
         # 默认空字典
         default_factory=dict,
         # 描述字段 key 的含义
@@ -103,6 +105,14 @@ class ReportAttachmentRead(BaseModel):
     storage_path: str
     # MIME 类型
     content_type: Optional[str] = None
+    # 原始文件字节数
+    size: Optional[int] = None
+    # 存储时使用的压缩算法（下载时透明解压）
+    compression: Optional[str] = None
+    # 写入状态（pending / stored / failed）
+    status: str = "stored"
+    # 写入失败原因
+    error: Optional[str] = None
 
     # Pydantic 配置
     class Config:
@@ -131,3 +141,39 @@ class ReportRead(BaseModel):
     class Config:
         # 允许从 ORM 属性读取
         from_attributes = True
+
+
+# 报表分页响应 Schema
+class ReportPage(BaseModel):
+    # 类文档：键集分页的报表列表响应体
+    """Keyset-paginated page of reports."""
+    # 当前页的报表
+    items: List[ReportRead]
+    # 下一页游标（没有更多数据时为空）
+    next_cursor: Optional[str] = None
+
+
+# 批量创建中单个条目的结果 Schema
+class ReportBatchItemResult(BaseModel):
+    # 类文档：批量创建中某个条目的处理结果
+    """Outcome of a single item within a batch create."""
+    # 条目在请求中的序号
+    index: int
+    # 处理状态
+    status: Literal["created", "error"]
+    # 新建报表 ID（成功时）
+    id: Optional[int] = None
+    # 错误信息（失败时）
+    error: Optional[str] = None
+
+
+# 批量创建响应 Schema
+class ReportBatchResult(BaseModel):
+    # 类文档：批量创建的汇总结果
+    """Summary and per-item results of a batch create."""
+    # 成功条数
+    created: int
+    # 失败条数
+    failed: int
+    # 每个条目的结果，按请求顺序
+    results: List[ReportBatchItemResult]
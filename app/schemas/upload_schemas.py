@@ -0,0 +1,69 @@
+# 模块级文档字符串：可续传上传接口的 Pydantic Schema
+"""Pydantic schemas for the resumable upload endpoints."""
+
+# 导入时间类型
+from datetime import datetime
+# 导入可选类型注解
+from typing import Optional
+
+# 导入 Pydantic 基类、字段工具与模型校验器
+from pydantic import BaseModel, Field, model_validator
+
+
+# 创建上传会话的请求 Schema
+class UploadSessionCreate(BaseModel):
+    # 类文档：创建上传会话的请求体
+    """Payload schema for starting a resumable upload."""
+    # 文件名
+    filename: str = Field(min_length=1, max_length=255)
+    # MIME 类型
+    content_type: Optional[str] = Field(default=None, max_length=100)
+    # 总字节数（已知时填写，用于限制与完成校验）
+    size: Optional[int] = Field(default=None, ge=0)
+    # 整文件 SHA-256（十六进制，可选）
+    sha256: Optional[str] = Field(default=None, pattern=r"^[0-9a-fA-F]{64}$")
+
+
+# 完成上传的请求 Schema
+class UploadFinalize(BaseModel):
+    # 类文档：指定上传文件挂到哪个报表
+    """Payload schema for finalizing an upload into a report or a product report."""
+    # 报表 ID
+    report_id: Optional[int] = None
+    # 产品完整报表 ID
+    product_report_id: Optional[int] = None
+
+    # 两者必须且只能填一个
+    @model_validator(mode="after")
+    def _one_target(self) -> "UploadFinalize":
+        # 校验目标数量
+        if (self.report_id is None) == (self.product_report_id is None):
+            raise ValueError("Exactly one of report_id and product_report_id is required")
+        # 返回自身
+        return self
+
+
+# 上传会话响应 Schema
+class UploadSessionRead(BaseModel):
+    # 类文档：上传会话的状态
+    """Response schema describing an upload session."""
+    # 会话 ID
+    id: str
+    # 文件名
+    filename: str
+    # MIME 类型
+    content_type: Optional[str] = None
+    # 总字节数
+    size: Optional[int] = None
+    # 下一个分块的偏移（已接收字节数）
+    offset: int
+    # 状态（open / completed）
+    status: str
+    # 所属报表
+    report_id: Optional[int] = None
+    # 生成的报表附件
+    attachment_id: Optional[int] = None
+    # 所属产品完整报表
+    product_report_id: Optional[int] = None
+    # 会话过期时间（无活动时）
+    expires_at: datetime
@@ -0,0 +1,108 @@
+# 模块级文档字符串：附件下载响应
+"""
+Build streaming, Range-aware download responses for stored attachments.
+
+Compressed objects are inflated on the fly; ranges then refer to the
+original bytes and are served by decompressing from the start of the object.
+"""
+
+# 导入类型注解
+from typing import Iterator, Optional
+
+# 导入 FastAPI 异常与请求类型
+from fastapi import HTTPException, Request
+# 导入 SQLAlchemy 会话类型
+from sqlalchemy.orm import Session
+# 导入 Starlette 响应类型
+from starlette.responses import Response
+
+# 导入数据库会话工厂
+from app.core.database import SessionLocal
+# 导入 Range 解析与文件响应
+from app.core.file_responses import RangedFileResponse, RangeNotSatisfiable, parse_range
+# 导入流式解压
+from app.services.compression import decompressed_range
+# 导入存储后端
+from app.services.storage_backends import LocalFileBackend, get_storage_backend
+
+
+# 构建附件下载响应
+def attachment_response(
+    # 当前请求（读取 Range 头）
+    request: Request,
+    # 请求会话（用于查看对象大小）
+    db: Session,
+    # 存储后端名称
+    backend_name: str,
+    # 存储键
+    key: str,
+    # 下载文件名
+    filename: str,
+    # MIME 类型
+    media_type: Optional[str],
+    # 本地后端根目录（默认取配置）
+    local_root: Optional[str] = None,
+    # 压缩算法（未压缩为 None）
+    compression: Optional[str] = None,
+    # 原始内容字节数（压缩对象必须提供）
+    size: Optional[int] = None,
+) -> Response:
+    # 函数文档：查看对象大小、解析 Range 并返回流式响应
+    """
+    Return a 200/206 streaming response for a stored object, or 416 when the
+    requested range is outside the file. Raises 404 when the object is gone.
+    ``compression`` and ``size`` describe objects stored compressed, which
+    are sent decompressed.
+    """
+    # 存储后端
+    backend = get_storage_backend(db, backend_name, local_root)
+    # 对象信息
+    info = backend.stat(key)
+    # 不存在时 404
+    if info is None:
+        raise HTTPException(status_code=404, detail="Attachment content not found")
+    # 原始内容大小（压缩对象的后端大小是压缩后的）
+    total = size if compression else info.size
+    # 解析 Range
+    try:
+        byte_range = parse_range(request.headers.get("range"), total)
+    # 范围不可满足
+    except RangeNotSatisfiable:
+        return Response(status_code=416, headers={"content-range": f"bytes */{total}"})
+
+    # 按范围产出存储对象的内容
+    def stored_chunks(start: int, length: Optional[int]) -> Iterator[bytes]:
+        # 事务型后端在请求会话关闭后仍需读取，使用独立会话
+        if backend.transactional:
+            # 独立会话
+            with SessionLocal() as stream_db:
+                # 逐块产出
+                yield from get_storage_backend(stream_db, backend_name).open_range(key, start, length)
+        # 非事务后端直接读取
+        else:
+            yield from backend.open_range(key, start, length)
+
+    # 按原始内容的范围产出
+    def chunks(start: int, end: int) -> Iterator[bytes]:
+        # 压缩对象读取整个对象并边解压边截取
+        if compression:
+            yield from decompressed_range(stored_chunks(0, None), compression, start, end - start + 1)
+        # 未压缩对象直接按范围读取
+        else:
+            yield from stored_chunks(start, end - start + 1)
+
+    # 返回流式响应（本地文件可零拷贝）
+    return RangedFileResponse(
+        # 内容产出函数
+        chunks,
+        # 文件大小
+        total,
+        # 文件名
+        filename,
+        # MIME 类型
+        media_type=media_type,
+        # 字节范围
+        byte_range=byte_range,
+        # 本地文件路径（压缩对象需解压，不能零拷贝）
+        path=backend.path(key) if isinstance(backend, LocalFileBackend) and not compression else None,
+    )
@@ -0,0 +1,382 @@
+# 模块级文档字符串：后台附件写入队列
+"""
+In-process background ingestion of report attachments.
+
+With ``ATTACHMENT_INGEST_MODE=background``, ``POST /reports`` commits the
+report with ``pending`` attachment rows and only spools the uploads to
+``attachment_spool_dir`` (one file per attachment, named by its id). The
+:class:`AttachmentIngestQueue` then writes each spooled file to its storage
+backend from a bounded pool of worker threads, retrying with exponential
+backoff, and flips the row to ``stored`` or, after the last attempt,
+``failed``. No external broker is involved.
+
+A worker claims a spool file by renaming it before ingesting, so when
+several processes share the spool folder each file is ingested once.
+:meth:`AttachmentIngestQueue.recover` re-queues unclaimed spool files of
+pending attachments at startup.
+"""
+
+# 导入日志工具
+import logging
+# 导入操作系统工具
+import os
+# 导入队列工具
+import queue
+# 导入线程工具
+import threading
+# 导入类型注解
+from typing import BinaryIO, Iterable, List, Optional, Sequence, Tuple
+
+# 导入 FastAPI 上传文件类型
+from fastapi import UploadFile
+# 导入 SQLAlchemy 查询工具
+from sqlalchemy import select
+# 导入 SQLAlchemy 会话类型
+from sqlalchemy.orm import Session
+
+# 导入配置
+from app.core.config import settings
+# 导入数据库会话工厂
+from app.core.database import SessionLocal
+# 导入附件模型与状态
+from app.models.report_models import ATTACHMENT_FAILED, ATTACHMENT_PENDING, ATTACHMENT_STORED, ReportAttachment
+# 导入按内容寻址的存储
+from app.services.blob_store import BlobStore
+# 导入存储后端
+from app.services.storage_backends import get_storage_backend
+
+# 模块日志
+logger = logging.getLogger(__name__)
+# 工作线程正在写入的暂存文件后缀
+_CLAIMED_SUFFIX = ".claimed"
+# 错误信息的最大长度（与 error 列一致）
+_ERROR_LENGTH = 500
+
+
+# 后台写入队列
+class AttachmentIngestQueue:
+    # 类文档：暂存上传并由有界线程池写入存储后端
+    """Spools uploads to local disk and ingests them with a bounded pool of worker threads."""
+
+    # 初始化
+    def __init__(self, spool_dir: str, workers: int, max_attempts: int, retry_seconds: float) -> None:
+        # 暂存目录（绝对路径）
+        self.spool_dir = os.path.abspath(spool_dir)
+        # 工作线程数
+        self.workers = workers
+        # 最大尝试次数
+        self.max_attempts = max_attempts
+        # 首次重试前的等待时间（秒）
+        self.retry_seconds = retry_seconds
+        # 任务队列：(附件 ID, 第几次尝试)，None 表示停止
+        self._queue: "queue.Queue[Optional[Tuple[int, int]]]" = queue.Queue()
+        # 工作线程
+        self._threads: List[threading.Thread] = []
+        # 等待中的重试定时器
+        self._timers: List[threading.Timer] = []
+        # 保护线程与定时器列表
+        self._lock = threading.Lock()
+
+    # 暂存文件路径
+    def spool_path(self, attachment_id: int) -> str:
+        # 方法文档：附件暂存文件的路径
+        """Return the spool file path of an attachment."""
+        # 以附件 ID 命名
+        return os.path.join(self.spool_dir, str(attachment_id))
+
+    # 暂存上传
+    def spool(self, attachment_id: int, stream: BinaryIO) -> None:
+        # 方法文档：按块复制到临时文件后改名，避免队列读到半个文件
+        """Copy ``stream`` to the attachment's spool file in bounded chunks."""
+        # 创建目录
+        os.makedirs(self.spool_dir, exist_ok=True)
+        # 目标路径
+        path = self.spool_path(attachment_id)
+        # 临时路径
+        temp_path = f"{path}.part"
+        # 写入并在失败时清理
+        try:
+            # 打开临时文件
+            with open(temp_path, "wb") as destination:
+                # 逐块复制
+                while chunk := stream.read(settings.filetable_chunk_size):
+                    destination.write(chunk)
+            # 写完后原子改名
+            os.replace(temp_path, path)
+        # 失败时删除临时文件
+        except BaseException:
+            # 忽略不存在
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            # 继续抛出
+            raise
+
+    # 创建待写入的附件并暂存上传
+    def spool_uploads(self, db: Session, report_id: int, files: Sequence[UploadFile]) -> List[int]:
+        # 方法文档：在调用方事务中写入 pending 记录，提交后再调用 enqueue
+        """
+        Add ``pending`` attachment rows for ``files`` to the caller's
+        transaction and spool the uploads. Returns the attachment ids to
+        pass to :meth:`enqueue` after the commit, or to :meth:`discard` if
+        it fails.
+        """
+        # 待写入的附件记录
+        attachments = [
+            ReportAttachment(
+                # 报表 ID
+                report_id=report_id,
+                # 规范化文件名
+                filename=os.path.basename(upload.filename),
+                # 写入完成前没有存储键
+                storage_path="",
+                # 写入时使用的存储后端
+                storage_backend=settings.storage_backend,
+                # MIME 类型
+                content_type=upload.content_type,
+                # 等待写入
+                status=ATTACHMENT_PENDING,
+            )
+            # 遍历上传
+            for upload in files
+        ]
+        # 添加到会话
+        db.add_all(attachments)
+        # 写入以获得附件 ID
+        db.flush()
+        # 附件 ID
+        attachment_ids = [attachment.id for attachment in attachments]
+        # 逐个暂存
+        try:
+            for attachment_id, upload in zip(attachment_ids, files):
+                self.spool(attachment_id, upload.file)
+        # 暂存失败时删除已暂存的文件
+        except BaseException:
+            # 删除
+            self.discard(attachment_ids)
+            # 继续抛出
+            raise
+        # 返回附件 ID
+        return attachment_ids
+
+    # 删除暂存文件
+    def discard(self, attachment_ids: Iterable[int]) -> None:
+        # 方法文档：报表提交失败时删除已暂存的文件
+        """Remove the spool files of attachments whose report was not committed."""
+        # 逐个删除
+        for attachment_id in attachment_ids:
+            self._remove(self.spool_path(attachment_id))
+
+    # 加入队列
+    def enqueue(self, attachment_ids: Iterable[int]) -> None:
+        # 方法文档：提交后调用，必要时启动工作线程
+        """Queue committed pending attachments for ingestion, starting the workers if needed."""
+        # 确保工作线程已启动
+        self.start()
+        # 逐个加入队列
+        for attachment_id in attachment_ids:
+            self._queue.put((attachment_id, 1))
+
+    # 启动
+    def start(self) -> None:
+        # 方法文档：启动工作线程（重复调用无副作用）
+        """Start the worker threads; calling it again is a no-op."""
+        # 加锁
+        with self._lock:
+            # 已启动
+            if self._threads:
+                return
+            # 创建工作线程
+            for index in range(self.workers):
+                # 后台线程
+                thread = threading.Thread(target=self._run, name=f"attachment-ingest-{index}", daemon=True)
+                # 启动
+                thread.start()
+                # 记录
+                self._threads.append(thread)
+
+    # 停止
+    def stop(self, timeout: Optional[float] = None) -> None:
+        # 方法文档：取消重试并等待正在进行的写入完成
+        """Cancel scheduled retries and stop the workers after their current job."""
+        # 加锁
+        with self._lock:
+            # 取出线程与定时器
+            threads, self._threads = self._threads, []
+            timers, self._timers = self._timers, []
+        # 取消重试（附件保持 pending，重启后由 recover 继续）
+        for timer in timers:
+            timer.cancel()
+        # 每个线程一个停止信号
+        for _ in threads:
+            self._queue.put(None)
+        # 等待线程结束
+        for thread in threads:
+            thread.join(timeout)
+
+    # 恢复未完成的任务
+    def recover(self) -> int:
+        # 方法文档：启动时重新排队；暂存文件丢失的附件标记为失败
+        """
+        Re-queue pending attachments whose spool file is waiting and mark
+        those whose spool file is gone as failed. Files claimed by another
+        worker are left alone. Returns the number of queued attachments.
+        """
+        # 需要排队的附件
+        queued: List[int] = []
+        # 独立会话
+        with SessionLocal() as db:
+            # 遍历待写入的附件
+            for attachment in db.scalars(select(ReportAttachment).where(ReportAttachment.status == ATTACHMENT_PENDING)):
+                # 暂存文件路径
+                path = self.spool_path(attachment.id)
+                # 等待写入
+                if os.path.exists(path):
+                    queued.append(attachment.id)
+                # 其他进程正在写入
+                elif os.path.exists(path + _CLAIMED_SUFFIX):
+                    continue
+                # 文件已丢失
+                else:
+                    self._mark_failed(db, attachment, "Spooled upload is missing")
+            # 提交失败标记
+            db.commit()
+        # 加入队列
+        self.enqueue(queued)
+        # 返回数量
+        return len(queued)
+
+    # 工作线程主循环
+    def _run(self) -> None:
+        # 循环取任务
+        while True:
+            # 取任务
+            job = self._queue.get()
+            # 停止信号
+            if job is None:
+                return
+            # 处理任务，异常不终止线程
+            try:
+                self._ingest(*job)
+            # 记录意外错误
+            except Exception:
+                logger.exception("Attachment ingestion crashed for job %s", job)
+
+    # 写入一个附件
+    def _ingest(self, attachment_id: int, attempt: int) -> None:
+        # 暂存文件路径
+        path = self.spool_path(attachment_id)
+        # 认领文件（改名成功者负责写入）
+        claimed = path + _CLAIMED_SUFFIX
+        # 尝试认领
+        try:
+            os.replace(path, claimed)
+        # 已被其他工作线程认领或已删除
+        except FileNotFoundError:
+            return
+        # 独立会话
+        with SessionLocal() as db:
+            # 附件记录
+            attachment = db.get(ReportAttachment, attachment_id)
+            # 附件已不存在或不再等待写入
+            if attachment is None or attachment.status != ATTACHMENT_PENDING:
+                self._remove(claimed)
+                return
+            # 存储后端
+            backend = get_storage_backend(db, attachment.storage_backend)
+            # 本次新写入的存储键
+            created_key: Optional[str] = None
+            # 写入并更新记录
+            try:
+                # 打开暂存文件
+                with open(claimed, "rb") as stream:
+                    # 写入或复用相同内容
+                    blob, created = BlobStore(db, backend).store(stream, attachment.filename, attachment.content_type)
+                # 记录新写入的对象
+                created_key = blob.storage_key if created else None
+                # 填写存储信息
+                attachment.storage_path = blob.storage_key
+                # 共享数据 ID
+                attachment.blob_id = blob.id
+                # 原始大小
+                attachment.size = blob.size
+                # 压缩算法
+                attachment.compression = blob.compression
+                # 标记完成
+                attachment.status = ATTACHMENT_STORED
+                # 清除错误
+                attachment.error = None
+                # 提交
+                db.commit()
+            # 写入失败
+            except Exception as exc:
+                # 回滚
+                db.rollback()
+                # 非事务后端删除已写入的对象
+                if created_key and not backend.transactional:
+                    backend.delete(created_key)
+                # 记录失败
+                logger.warning("Attachment %s ingestion attempt %s failed: %s", attachment_id, attempt, exc)
+                # 还有重试机会
+                if attempt < self.max_attempts:
+                    # 放回待认领状态
+                    os.replace(claimed, path)
+                    # 退避后重试
+                    self._schedule_retry(attachment_id, attempt + 1)
+                    return
+                # 标记失败
+                self._mark_failed(db, db.get(ReportAttachment, attachment_id), str(exc))
+                # 提交失败标记
+                db.commit()
+        # 删除暂存文件（成功或最终失败）
+        self._remove(claimed)
+
+    # 安排重试
+    def _schedule_retry(self, attachment_id: int, attempt: int) -> None:
+        # 方法文档：等待后把任务放回队列，不占用工作线程
+        """Put the job back on the queue after an exponential backoff."""
+        # 第二次尝试等待 retry_seconds，之后每次翻倍
+        delay = self.retry_seconds * 2 ** (attempt - 2)
+        # 定时器
+        timer = threading.Timer(delay, self._queue.put, args=((attachment_id, attempt),))
+        # 不阻止进程退出
+        timer.daemon = True
+        # 记录并启动定时器（与 stop 互斥，避免漏取消）
+        with self._lock:
+            # 清理已触发的定时器
+            self._timers = [pending for pending in self._timers if pending.is_alive()] + [timer]
+            # 启动
+            timer.start()
+
+    # 标记失败
+    @staticmethod
+    def _mark_failed(db: Session, attachment: Optional[ReportAttachment], reason: str) -> None:
+        # 附件已被删除
+        if attachment is None:
+            return
+        # 状态
+        attachment.status = ATTACHMENT_FAILED
+        # 原因（截断到列长度）
+        attachment.error = reason[:_ERROR_LENGTH]
+
+    # 删除文件
+    @staticmethod
+    def _remove(path: str) -> None:
+        # 删除
+        try:
+            os.remove(path)
+        # 不存在时忽略
+        except FileNotFoundError:
+            pass
+
+
+# 全局后台写入队列
+attachment_ingest = AttachmentIngestQueue(
+    # 暂存目录
+    settings.attachment_spool_dir,
+    # 工作线程数
+    settings.attachment_ingest_workers,
+    # 最大尝试次数
+    settings.attachment_ingest_max_attempts,
+    # 首次重试等待
+    settings.attachment_ingest_retry_seconds,
+)
@@ -0,0 +1,381 @@
+# 模块级文档字符串：按内容寻址的附件去重存储
+"""
+Content-addressed attachment storage with reference counting.
+
+Uploads are identified by their SHA-256. Each unique content is written to a
+storage backend once and recorded as an :class:`AttachmentBlob`; further
+uploads of the same bytes only increment ``ref_count``. Seekable streams
+(``UploadFile`` spools to disk) are hashed in a first pass so duplicates cost
+no backend write; other streams are hashed while they are written and the
+duplicate copy is deleted afterwards.
+
+:meth:`BlobStore.store_many` persists several uploads with a bounded thread
+pool: hashing and backend writes run in the workers (through
+``put_detached``, since a session cannot be shared across threads), while
+every database statement still runs on the caller's session, in upload
+order.
+
+Compressible uploads are compressed on the way to the backend (see
+:mod:`app.services.compression`); the digest and ``size`` always describe
+the original bytes, so deduplication is unaffected by the setting.
+"""
+
+# 导入哈希工具
+import hashlib
+# 导入线程池工具
+from concurrent.futures import ThreadPoolExecutor
+# 导入计时工具
+from time import perf_counter
+# 导入类型注解
+from typing import BinaryIO, Dict, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+# 导入 SQLAlchemy 查询与更新工具
+from sqlalchemy import select, update
+# 导入 SQLAlchemy 异常
+from sqlalchemy.exc import IntegrityError
+# 导入 SQLAlchemy 会话类型
+from sqlalchemy.orm import Session
+
+# 导入存储写入耗时指标
+from app.core.metrics import storage_write_seconds
+# 导入附件数据模型
+from app.models.attachment_models import AttachmentBlob
+# 导入流式压缩
+from app.services.compression import CompressingReader, compression_for
+# 导入存储后端接口
+from app.services.storage_backends import StorageBackend
+
+# 哈希时每次读取的字节数
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+# 一次后端写入的结果
+class _Written(NamedTuple):
+    # 类文档：新写入对象的摘要、存储键与大小
+    """Digest, key and sizes of an object written to the backend."""
+
+    # 原始内容的 SHA-256
+    sha256: str
+    # 存储键
+    key: str
+    # 原始字节数
+    size: int
+    # 压缩算法（未压缩为 None）
+    compression: Optional[str]
+    # 后端中的字节数
+    stored_size: int
+
+
+# 边读边哈希的流
+class _HashingReader:
+    # 类文档：包装只读流，累计 SHA-256 与字节数
+    """Read-through wrapper that accumulates the SHA-256 and size of what was read."""
+
+    # 初始化
+    def __init__(self, stream: BinaryIO) -> None:
+        # 原始流
+        self.stream = stream
+        # 哈希对象
+        self.digest = hashlib.sha256()
+        # 已读字节数
+        self.size = 0
+
+    # 读取
+    def read(self, size: int = -1) -> bytes:
+        # 读取一块
+        chunk = self.stream.read(size)
+        # 更新哈希与大小
+        self.digest.update(chunk)
+        self.size += len(chunk)
+        # 返回本块
+        return chunk
+
+
+# 计算可定位流的哈希
+def _digest(stream: BinaryIO) -> Optional[Tuple[str, int]]:
+    # 函数文档：读完后回到起点；不可定位的流返回 None
+    """Return ``(sha256, size)`` of a seekable stream and rewind it; None for other streams."""
+    # 不可定位的流只能边写边哈希
+    if not stream.seekable():
+        return None
+    # 记录起点
+    origin = stream.tell()
+    # 包装流
+    reader = _HashingReader(stream)
+    # 读完整个流
+    while reader.read(_HASH_CHUNK_SIZE):
+        pass
+    # 回到起点
+    stream.seek(origin)
+    # 返回哈希与大小
+    return reader.digest.hexdigest(), reader.size
+
+
+# 按内容寻址的存储
+class BlobStore:
+    # 类文档：在调用方会话中写入或复用附件数据
+    """Stores attachment contents once per backend, inside the caller's transaction."""
+
+    # 初始化
+    def __init__(self, db: Session, backend: StorageBackend) -> None:
+        # 调用方会话
+        self.db = db
+        # 存储后端
+        self.backend = backend
+
+    # 写入或复用
+    def store(
+        self, stream: BinaryIO, filename: str, content_type: Optional[str] = None
+    ) -> Tuple[AttachmentBlob, bool]:
+        # 方法文档：返回数据记录及是否新写入了后端
+        """
+        Return ``(blob, created)`` for the content of ``stream``. ``created``
+        is True when this call wrote a new object to the backend, which a
+        non-transactional backend must delete again if the commit fails.
+        ``content_type`` decides whether new content is compressed.
+        """
+        # 可定位的流先计算哈希
+        digest = _digest(stream)
+        # 已有相同内容时直接引用，无需写入
+        if digest is not None:
+            # 查找并引用
+            blob = self._reference(digest[0])
+            # 命中
+            if blob is not None:
+                return blob, False
+        # 写入后端（不可定位的流同时计算哈希）
+        written = self._put(stream, filename, content_type, digest, detached=False)
+        # 已确认是新内容时直接记录
+        if digest is not None:
+            return self._insert(written, detached=False)
+        # 否则引用已有数据或记录新数据
+        return self._adopt(written, detached=False)
+
+    # 并发写入多个上传
+    def store_many(
+        self, uploads: Sequence[Tuple[BinaryIO, str, Optional[str]]], workers: int
+    ) -> List[Tuple[AttachmentBlob, bool]]:
+        # 方法文档：线程池中哈希与写入，会话操作按顺序在调用线程执行
+        """
+        Store several ``(stream, filename, content_type)`` uploads with at
+        most ``workers`` threads and return ``(blob, created)`` in the order
+        of ``uploads``.
+
+        With ``workers > 1`` new objects are written with ``put_detached``:
+        created objects are already durable and must be removed with
+        ``delete_detached`` if the caller's commit fails. Contents repeated
+        within ``uploads`` are written once. If a write fails, the objects
+        this call already wrote are removed before the error propagates.
+        """
+        # 单线程时逐个写入
+        if workers <= 1 or len(uploads) <= 1:
+            return [self.store(*upload) for upload in uploads]
+        # 有界线程池
+        with ThreadPoolExecutor(max_workers=min(workers, len(uploads)), thread_name_prefix="blob-store") as pool:
+            # 第一步：并发计算可定位流的哈希
+            digests = list(pool.map(_digest, [upload[0] for upload in uploads]))
+            # 第二步：一次查询已存在的内容
+            known = self._existing({digest[0] for digest in digests if digest})
+            # 每种新内容由首个上传写入
+            first: Dict[str, int] = {}
+            # 需要写入的上传序号
+            pending = [
+                index
+                for index, digest in enumerate(digests)
+                # 不可定位的流总是写入；新内容只写一次
+                if digest is None or (digest[0] not in known and first.setdefault(digest[0], index) == index)
+            ]
+            # 第三步：并发写入后端
+            futures = {
+                index: pool.submit(self._put, *uploads[index], digests[index], True)
+                for index in pending
+            }
+        # 收集写入结果
+        written: Dict[int, _Written] = {}
+        # 第一个错误
+        error: Optional[BaseException] = None
+        # 按顺序检查
+        for index, future in futures.items():
+            # 写入失败
+            if future.exception() is not None:
+                error = error or future.exception()
+            # 写入成功
+            else:
+                written[index] = future.result()
+        # 有写入失败时删除已写入的对象
+        if error is not None:
+            # 逐个删除
+            for item in written.values():
+                self.backend.delete_detached(item.key)
+            # 继续抛出
+            raise error
+        # 第四步：按上传顺序引用或记录
+        results: List[Tuple[AttachmentBlob, bool]] = []
+        # 数据库出错时删除本次写入的对象（已删除的副本会被忽略）
+        try:
+            # 遍历上传
+            for index, digest in enumerate(digests):
+                # 本次写入的新内容
+                if index in written and digest is not None:
+                    results.append(self._insert(written[index], detached=True))
+                # 本次边写边哈希的对象
+                elif index in written:
+                    results.append(self._adopt(written[index], detached=True))
+                # 已存在或已由前面的上传写入
+                else:
+                    results.append((self._reference(digest[0]), False))
+        # 清理并继续抛出
+        except BaseException:
+            # 逐个删除
+            for item in written.values():
+                self.backend.delete_detached(item.key)
+            # 继续抛出
+            raise
+        # 返回结果
+        return results
+
+    # 写入后端
+    def _put(
+        self,
+        stream: BinaryIO,
+        filename: str,
+        content_type: Optional[str],
+        digest: Optional[Tuple[str, int]],
+        detached: bool,
+    ) -> _Written:
+        # 方法文档：按需压缩，返回原始内容的哈希与大小
+        """Write ``stream`` (compressed when its type calls for it) to the backend."""
+        # 写入函数
+        put = self.backend.put_detached if detached else self.backend.put
+        # 未知哈希时边写边哈希（哈希的是原始内容）
+        source = stream if digest is not None else _HashingReader(stream)
+        # 压缩方式
+        compression = compression_for(content_type, filename)
+        # 写入的流
+        reader = CompressingReader(source, *compression) if compression else source
+        # 已知哈希时按哈希分目录
+        namespace = f"blobs/{digest[0][:2]}" if digest is not None else "blobs"
+        # 开始时间
+        started = perf_counter()
+        # 写入后端
+        key = put(reader, filename, namespace=namespace)
+        # 记录写入耗时
+        storage_write_seconds.observe(perf_counter() - started, self.backend.name)
+        # 原始内容的哈希与大小
+        sha256, size = digest if digest is not None else (source.digest.hexdigest(), source.size)
+        # 返回结果
+        return _Written(
+            # 哈希
+            sha256,
+            # 存储键
+            key,
+            # 原始字节数
+            size,
+            # 压缩算法
+            compression[0] if compression else None,
+            # 后端中的字节数
+            reader.size if compression else size,
+        )
+
+    # 采用刚写入的对象
+    def _adopt(self, written: _Written, detached: bool) -> Tuple[AttachmentBlob, bool]:
+        # 方法文档：内容已存在时删除刚写入的副本并引用已有数据
+        """Reference an existing blob with this digest (dropping the new copy) or record a new one."""
+        # 查找并引用
+        blob = self._reference(written.sha256)
+        # 已存在
+        if blob is not None:
+            # 删除副本
+            self._delete(written.key, detached)
+            # 返回已有数据
+            return blob, False
+        # 记录新数据
+        return self._insert(written, detached)
+
+    # 删除本次写入的对象
+    def _delete(self, key: str, detached: bool) -> None:
+        # 独立写入的对象在事务外删除
+        if detached:
+            self.backend.delete_detached(key)
+        # 否则随会话事务删除
+        else:
+            self.backend.delete(key)
+
+    # 查找已存在的内容
+    def _existing(self, digests: Set[str]) -> Set[str]:
+        # 方法文档：返回已记录的哈希集合
+        """Return the subset of ``digests`` that already has a blob on this backend."""
+        # 空集合无需查询
+        if not digests:
+            return set()
+        # 查询
+        return set(
+            self.db.execute(
+                # 按后端与哈希查找
+                select(AttachmentBlob.sha256).where(
+                    AttachmentBlob.storage_backend == self.backend.name, AttachmentBlob.sha256.in_(digests)
+                )
+            ).scalars()
+        )
+
+    # 引用已有数据
+    def _reference(self, sha256: str) -> Optional[AttachmentBlob]:
+        # 方法文档：存在时把引用计数加一并返回
+        """Increment and return the existing blob with this digest, if any."""
+        # 查询已有数据
+        blob = self.db.execute(
+            # 按后端与哈希查找
+            select(AttachmentBlob).where(
+                AttachmentBlob.storage_backend == self.backend.name, AttachmentBlob.sha256 == sha256
+            )
+        ).scalar_one_or_none()
+        # 不存在
+        if blob is None:
+            return None
+        # 原子递增引用计数
+        self.db.execute(
+            # 更新语句
+            update(AttachmentBlob)
+            # 限定记录
+            .where(AttachmentBlob.id == blob.id)
+            # 计数加一
+            .values(ref_count=AttachmentBlob.ref_count + 1)
+        )
+        # 返回记录
+        return blob
+
+    # 插入新数据
+    def _insert(self, written: _Written, detached: bool) -> Tuple[AttachmentBlob, bool]:
+        # 方法文档：并发写入同一内容时，后到者改为引用先到者
+        """Insert a blob row; if a concurrent upload won the race, reference its blob instead."""
+        # 新记录
+        blob = AttachmentBlob(
+            # 存储后端
+            storage_backend=self.backend.name,
+            # 原始内容哈希
+            sha256=written.sha256,
+            # 存储键
+            storage_key=written.key,
+            # 原始字节数
+            size=written.size,
+            # 压缩算法
+            compression=written.compression,
+            # 后端中的字节数
+            stored_size=written.stored_size,
+            # 首个引用
+            ref_count=1,
+        )
+        # 在保存点中插入，唯一约束冲突时只回滚这一步
+        try:
+            # 保存点
+            with self.db.begin_nested():
+                # 添加并写入
+                self.db.add(blob)
+        # 并发写入了相同内容
+        except IntegrityError:
+            # 删除本次写入的副本
+            self._delete(written.key, detached)
+            # 引用先写入的数据
+            return self._reference(written.sha256), False
+        # 返回新记录
+        return blob, True
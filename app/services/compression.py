@@ -0,0 +1,265 @@
+# 模块级文档字符串：附件的透明流式压缩
+"""
+Transparent streaming compression of stored attachments.
+
+:func:`compression_for` decides per content type whether an upload is worth
+compressing: text-like formats (CSV, logs, JSON, XML) and uncompressed
+binary formats (TIFF, BMP, legacy Office) are; formats that are compressed
+already (JPEG, PNG, PDF, ZIP and the ZIP-based DOCX/XLSX/PPTX) and unknown
+types are stored as-is. :class:`CompressingReader` compresses while the
+backend reads the upload, and :func:`decompressed_range` inflates a stored
+object on the fly when it is downloaded.
+
+``gzip`` uses the standard library; ``zstd`` needs the optional
+``zstandard`` package (``STORAGE_COMPRESSION=auto`` falls back to gzip
+without it).
+"""
+
+# 导入 gzip 流读取工具
+import gzip
+# 导入 MIME 类型推断工具
+import mimetypes
+# 导入 zlib 压缩工具
+import zlib
+# 导入类型注解
+from typing import Iterator, Optional, Tuple
+
+# 导入配置
+from app.core.config import settings
+
+# 可选依赖：zstandard
+try:
+    import zstandard
+# 未安装时只能使用 gzip
+except ImportError:  # pragma: no cover - 取决于运行环境
+    zstandard = None
+
+# 压缩算法：gzip
+CODEC_GZIP = "gzip"
+# 压缩算法：zstd
+CODEC_ZSTD = "zstd"
+
+# 按文本压缩的 MIME 类型（另含全部 text/*）
+_TEXT_TYPES = frozenset(
+    {
+        "application/json",
+        "application/x-ndjson",
+        "application/xml",
+        "application/javascript",
+        "application/rtf",
+        "application/sql",
+        "application/x-yaml",
+        "image/svg+xml",
+    }
+)
+# 未压缩的二进制格式（快速压缩）
+_BINARY_TYPES = frozenset(
+    {
+        "image/tiff",
+        "image/bmp",
+        "image/x-ms-bmp",
+        "application/msword",
+        "application/vnd.ms-excel",
+        "application/vnd.ms-powerpoint",
+        "application/x-tar",
+    }
+)
+# 各类内容的压缩级别：文本追求压缩率，二进制追求速度
+_LEVELS = {
+    # 文本
+    "text": {CODEC_GZIP: 6, CODEC_ZSTD: 9},
+    # 二进制
+    "binary": {CODEC_GZIP: 1, CODEC_ZSTD: 3},
+}
+
+
+# 选择压缩方式
+def compression_for(content_type: Optional[str], filename: Optional[str] = None) -> Optional[Tuple[str, int]]:
+    # 函数文档：返回 (算法, 级别)，不压缩时返回 None
+    """
+    Return ``(codec, level)`` for an upload of ``content_type`` (guessed from
+    ``filename`` when missing or generic), or None to store it uncompressed.
+    """
+    # 配置的压缩方式
+    mode = settings.storage_compression
+    # 未启用
+    if mode == "off":
+        return None
+    # 规范化 MIME 类型（去掉参数）
+    media_type = (content_type or "").split(";", 1)[0].strip().lower()
+    # 缺失或泛化的类型按扩展名推断
+    if (not media_type or media_type == "application/octet-stream") and filename:
+        media_type = (mimetypes.guess_type(filename)[0] or "").lower()
+    # 文本类
+    if media_type.startswith("text/") or media_type in _TEXT_TYPES or media_type.endswith(("+json", "+xml")):
+        profile = "text"
+    # 未压缩的二进制格式
+    elif media_type in _BINARY_TYPES:
+        profile = "binary"
+    # 已压缩或未知格式
+    else:
+        return None
+    # 选择算法
+    codec = _codec(mode)
+    # 返回算法与级别
+    return codec, _LEVELS[profile][codec]
+
+
+# 解析配置的算法
+def _codec(mode: str) -> str:
+    # 自动：有 zstandard 时用 zstd
+    if mode == "auto":
+        return CODEC_ZSTD if zstandard is not None else CODEC_GZIP
+    # 显式要求 zstd 时必须已安装
+    if mode == CODEC_ZSTD:
+        _require_zstandard()
+    # 返回算法
+    return mode
+
+
+# 检查 zstandard
+def _require_zstandard() -> None:
+    # 未安装时给出提示
+    if zstandard is None:
+        raise RuntimeError("zstd-compressed attachments require the 'zstandard' package")
+
+
+# 边读边压缩的流
+class CompressingReader:
+    # 类文档：包装只读流，读出的是压缩后的字节
+    """Read-through wrapper returning the compressed form of ``stream``; ``size`` counts output bytes."""
+
+    # 初始化
+    def __init__(self, stream, codec: str, level: int, chunk_size: Optional[int] = None) -> None:
+        # 原始流
+        self.stream = stream
+        # 每次从原始流读取的字节数
+        self.chunk_size = chunk_size or settings.filetable_chunk_size
+        # gzip 格式的 deflate 压缩器
+        if codec == CODEC_GZIP:
+            self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        # zstd 压缩器
+        else:
+            # 确认已安装
+            _require_zstandard()
+            # 流式压缩对象
+            self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+        # 已压缩未读出的数据
+        self._buffer = bytearray()
+        # 原始流是否已读完
+        self._eof = False
+        # 已读出的压缩字节数
+        self.size = 0
+
+    # 读取
+    def read(self, size: int = -1) -> bytes:
+        # 数据不足时继续压缩
+        while not self._eof and (size < 0 or len(self._buffer) < size):
+            # 读取一块原始数据
+            chunk = self.stream.read(self.chunk_size)
+            # 读完时输出剩余压缩数据
+            if not chunk:
+                self._buffer += self._compressor.flush()
+                self._eof = True
+            # 否则压缩本块
+            else:
+                self._buffer += self._compressor.compress(chunk)
+        # 本次返回的长度
+        length = len(self._buffer) if size < 0 else min(size, len(self._buffer))
+        # 取出数据
+        data = bytes(self._buffer[:length])
+        # 移除已读数据
+        del self._buffer[:length]
+        # 累计输出
+        self.size += length
+        # 返回数据
+        return data
+
+
+# 把块迭代器包装为只读流
+class _ChunkReader:
+    # 类文档：供解压器按需读取存储对象
+    """Minimal file-like view of an iterator of byte chunks."""
+
+    # 初始化
+    def __init__(self, chunks: Iterator[bytes]) -> None:
+        # 块迭代器
+        self._chunks = chunks
+        # 当前块剩余数据
+        self._buffer = b""
+
+    # 读取
+    def read(self, size: int = -1) -> bytes:
+        # 当前块用完时取下一块
+        while not self._buffer:
+            # 下一块
+            chunk = next(self._chunks, None)
+            # 读完
+            if chunk is None:
+                return b""
+            # 缓存
+            self._buffer = chunk
+        # 本次返回的长度
+        length = len(self._buffer) if size < 0 else min(size, len(self._buffer))
+        # 取出数据
+        data, self._buffer = self._buffer[:length], self._buffer[length:]
+        # 返回数据
+        return data
+
+
+# 按原始内容的范围解压
+def decompressed_range(
+    chunks: Iterator[bytes], codec: str, start: int = 0, length: Optional[int] = None, chunk_size: Optional[int] = None
+) -> Iterator[bytes]:
+    # 函数文档：解压并产出原始内容的 [start, start+length) 部分
+    """
+    Inflate a stored object read from ``chunks`` and yield ``length`` bytes
+    of the original content from ``start`` on (to the end when None).
+    Compressed objects cannot be seeked, so the bytes before ``start`` are
+    inflated and dropped; memory stays bounded by ``chunk_size``.
+    """
+    # 每次解压输出的字节数
+    chunk_size = chunk_size or settings.filetable_chunk_size
+    # 压缩数据流
+    source = _ChunkReader(iter(chunks))
+    # gzip 解压流
+    if codec == CODEC_GZIP:
+        reader = gzip.GzipFile(fileobj=source, mode="rb")
+    # zstd 解压流
+    elif codec == CODEC_ZSTD:
+        # 确认已安装
+        _require_zstandard()
+        # 解压流
+        reader = zstandard.ZstdDecompressor().stream_reader(source)
+    # 未知算法
+    else:
+        raise ValueError(f"Unknown attachment compression {codec!r}")
+    # 剩余需跳过的字节数
+    skip = start
+    # 剩余需产出的字节数（None 表示到末尾）
+    remaining = length
+    # 确保关闭解压流
+    with reader:
+        # 逐块解压
+        while remaining is None or remaining > 0:
+            # 解压一块
+            data = reader.read(chunk_size)
+            # 读完
+            if not data:
+                return
+            # 跳过起点之前的数据
+            if skip:
+                # 本块需跳过的字节数
+                dropped = min(skip, len(data))
+                # 去掉
+                data = data[dropped:]
+                skip -= dropped
+                # 本块已全部跳过
+                if not data:
+                    continue
+            # 截断到剩余长度
+            if remaining is not None:
+                data = data[:remaining]
+                remaining -= len(data)
+            # 产出
+            yield data
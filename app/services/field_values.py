@@ -0,0 +1,183 @@
+# 模块级文档字符串：报表字段值的存储形式转换
+"""Conversion of submitted report field values into their stored columns."""
+
+# 导入日期时间类型
+from datetime import date, datetime
+# 导入高精度小数类型
+from decimal import Decimal, InvalidOperation
+# 导入类型注解
+from typing import Any, Dict, Optional
+
+# 导入查找键长度
+from app.models.report_models import VALUE_KEY_LENGTH
+
+# 字段类型到类型化值列的映射（未列出的类型只存文本）
+TYPED_COLUMNS = {
+    # 整数类型
+    "int": "value_int",
+    # 整数类型（别名）
+    "integer": "value_int",
+    # 小数类型
+    "decimal": "value_decimal",
+    # 数值类型（别名）
+    "number": "value_decimal",
+    # 浮点类型（别名）
+    "float": "value_decimal",
+    # 日期类型
+    "date": "value_date",
+    # 日期时间类型
+    "datetime": "value_date",
+    # 布尔类型
+    "bool": "value_bool",
+    # 布尔类型（别名）
+    "boolean": "value_bool",
+}
+
+# 全部类型化列名（去重并保持顺序）
+_TYPED_COLUMN_NAMES = tuple(dict.fromkeys(TYPED_COLUMNS.values()))
+
+# 可识别的布尔文本
+_BOOL_TEXT = {"true": True, "1": True, "yes": True, "false": False, "0": False, "no": False}
+
+
+# 计算字段值的存储列
+def value_columns(field_type: str, value: Any) -> Dict[str, Any]:
+    # 函数文档：返回 ReportFieldValue 需要写入的列
+    """
+    Return the ReportFieldValue column values for a submitted value.
+
+    Besides the text form and lookup key, typed fields also fill their typed
+    column. Every typed column is present in the result (``None`` when
+    unused) so rows can be bulk-inserted together. Raises ``ValueError`` when
+    the value does not fit the field type.
+    """
+    # 空值保持为 None，其余转字符串
+    text = str(value) if value is not None else None
+    # 文本值、可索引的查找键与全部类型化列
+    columns: Dict[str, Any] = {"value": text, "value_key": value_key(text), **dict.fromkeys(_TYPED_COLUMN_NAMES)}
+    # 查找字段类型对应的类型化列
+    column = typed_column(field_type)
+    # 类型化字段写入对应列
+    if column is not None:
+        columns[column] = coerce_value(field_type, value)
+    # 返回列值
+    return columns
+
+
+# 查找字段类型对应的类型化列
+def typed_column(field_type: str) -> Optional[str]:
+    # 函数文档：返回字段类型对应的类型化列名
+    """Return the typed column name used by a field type, or None for text fields."""
+    # 大小写不敏感查找
+    return TYPED_COLUMNS.get((field_type or "text").lower())
+
+
+# 把值转换为字段类型对应的 Python 类型
+def coerce_value(field_type: str, value: Any) -> Any:
+    # 函数文档：按字段类型转换值
+    """Coerce a submitted value to the Python type of the field's typed column."""
+    # 空值不转换
+    if value is None:
+        return None
+    # 查找类型化列
+    column = typed_column(field_type)
+    # 整数
+    if column == "value_int":
+        return _to_int(value)
+    # 小数
+    if column == "value_decimal":
+        return _to_decimal(value)
+    # 日期时间
+    if column == "value_date":
+        return _to_datetime(value)
+    # 布尔
+    if column == "value_bool":
+        return _to_bool(value)
+    # 文本字段原样返回
+    return value
+
+
+# 计算查找键
+def value_key(text: Optional[str]) -> Optional[str]:
+    # 函数文档：截取文本值的可索引前缀
+    """Truncate a stored text value to its indexable lookup key."""
+    # 空值没有查找键
+    if text is None:
+        return None
+    # 截取前缀
+    return text[:VALUE_KEY_LENGTH]
+
+
+# 转换为整数
+def _to_int(value: Any) -> int:
+    # 函数文档：接受整数、整值浮点数与整数文本
+    """Convert ints, integral floats and integer strings to int."""
+    # 布尔值不视为整数
+    if isinstance(value, bool):
+        raise ValueError(f"Expected an integer, got {value!r}")
+    # 整数直接返回
+    if isinstance(value, int):
+        return value
+    # 整值浮点数
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    # 文本
+    if isinstance(value, str):
+        return int(value.strip())
+    # 其余类型不支持
+    raise ValueError(f"Expected an integer, got {value!r}")
+
+
+# 转换为小数
+def _to_decimal(value: Any) -> Decimal:
+    # 函数文档：接受数值与数值文本
+    """Convert numbers and numeric strings to Decimal."""
+    # 布尔值不视为数值
+    if isinstance(value, bool):
+        raise ValueError(f"Expected a number, got {value!r}")
+    # 尝试转换
+    try:
+        # 通过文本转换避免二进制浮点误差
+        result = Decimal(str(value).strip())
+    # 转换失败
+    except InvalidOperation as exc:
+        raise ValueError(f"Expected a number, got {value!r}") from exc
+    # 拒绝 NaN 与无穷大
+    if not result.is_finite():
+        raise ValueError(f"Expected a finite number, got {value!r}")
+    # 返回结果
+    return result
+
+
+# 转换为日期时间
+def _to_datetime(value: Any) -> datetime:
+    # 函数文档：接受 ISO 8601 日期或日期时间文本
+    """Convert ISO 8601 date or datetime strings to datetime."""
+    # 已是日期时间
+    if isinstance(value, datetime):
+        return value
+    # 纯日期补齐为零点
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    # 文本按 ISO 8601 解析
+    if isinstance(value, str):
+        return datetime.fromisoformat(value.strip())
+    # 其余类型不支持
+    raise ValueError(f"Expected an ISO 8601 date, got {value!r}")
+
+
+# 转换为布尔
+def _to_bool(value: Any) -> bool:
+    # 函数文档：接受布尔、0/1 与常见布尔文本
+    """Convert booleans, 0/1 and common boolean strings to bool."""
+    # 已是布尔值
+    if isinstance(value, bool):
+        return value
+    # 0 / 1
+    if isinstance(value, int) and value in (0, 1):
+        return bool(value)
+    # 文本
+    if isinstance(value, str) and value.strip().lower() in _BOOL_TEXT:
+        return _BOOL_TEXT[value.strip().lower()]
+    # 其余值不支持
+    raise ValueError(f"Expected a boolean, got {value!r}")
@@ -1,46 +1,68 @@
-# 模块级文档字符串：产品报表附件的文件系统存储
-"""Filesystem storage helpers for product report attachments."""
+# 模块级文档字符串：产品报表附件存储
+"""Storage helpers for product report attachments."""
 
 # 导入操作系统路径工具
 import os
-# 导入文件复制工具
-import shutil
 # 导入类型注解
-from typing import Optional
+from typing import Optional, Tuple
 
 # 导入 FastAPI 上传文件类型
 from fastapi import UploadFile
+# 导入 SQLAlchemy 会话类型
+from sqlalchemy.orm import Session
 
 # 导入配置
 from app.core.config import settings
+# 导入附件数据模型
+from app.models.attachment_models import AttachmentBlob
+# 导入按内容寻址的存储
+from app.services.blob_store import BlobStore
+# 导入存储后端接口与选择
+from app.services.storage_backends import BACKEND_LOCAL, BACKEND_PRODUCT_LOCAL, StorageBackend, get_storage_backend
 
 
-# 保存产品报表附件到本地
+# 产品报表附件的后端名称
+def product_report_backend_name() -> str:
+    # 函数文档：本地文件夹使用单独的名称，避免与报表附件的本地根目录共享数据
+    """
+    Return the backend name for ``PRODUCT_REPORT_STORAGE_BACKEND``: ``local``
+    maps to ``product_local`` (rooted at ``PRODUCT_REPORT_STORAGE_DIR``).
+    """
+    # 配置的后端
+    name = settings.product_report_storage_backend
+    # 本地文件夹
+    return BACKEND_PRODUCT_LOCAL if name == BACKEND_LOCAL else name
+
+
+# 产品报表附件的存储后端
+def product_report_backend(db: Session) -> StorageBackend:
+    # 函数文档：按产品报表配置构建后端
+    """Build the storage backend configured for product report attachments."""
+    # 构建后端
+    return get_storage_backend(db, product_report_backend_name())
+
+
+# 保存产品报表附件
 def save_product_report_file(
-    # 产品编码
-    product_code: str,
+    # 调用方会话
+    db: Session,
+    # 存储后端
+    backend: StorageBackend,
     # 会议报告文件（可选）
     meeting_report: Optional[UploadFile],
-) -> Optional[str]:
+) -> Optional[Tuple[AttachmentBlob, bool]]:
     # 函数文档：持久化上传的会议报告
-    """Persist an uploaded meeting report to the configured storage directory."""
+    """
+    Persist an uploaded meeting report, deduplicated by content, and return
+    ``(blob, created)`` (None when nothing was uploaded). Each upload gets its
+    own reference, so a second file with the same name never overwrites the
+    first.
+    """
     # 如果没有上传文件则返回 None
     if not meeting_report:
         return None
 
-    # 规范化文件名并限定到产品编码目录
-    safe_name = os.path.basename(meeting_report.filename)
-    # 构建目标目录路径
-    target_dir = os.path.join(settings.product_report_storage_dir, product_code)
-    # 创建目标目录
-    os.makedirs(target_dir, exist_ok=True)
-    # 构建目标文件路径
-    target_path = os.path.join(target_dir, safe_name)
-
-    # 将上传内容写入磁盘
-    with open(target_path, "wb") as destination:
-        # 复制文件流到目标文件
-        shutil.copyfileobj(meeting_report.file, destination)
-
-    # 返回保存后的路径
-    return target_path
+    # 写入或复用相同内容
+    return BlobStore(db, backend).store(
+        meeting_report.file, os.path.basename(meeting_report.filename), meeting_report.content_type
+    )
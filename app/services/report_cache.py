@@ -0,0 +1,437 @@
+# 模块级文档字符串：单个报表响应的读穿缓存
+"""
+Read-through cache of serialized ``ReportRead`` payloads for ``GET /reports/{id}``.
+
+Entries are the JSON bytes of the response, so a hit skips the ORM load and
+Pydantic serialization entirely. Two backends are available:
+
+* ``memory`` – a per-process LRU bounded by ``report_cache_max_entries`` with
+  an optional TTL;
+* ``redis`` – a shared backend built on any client exposing redis-py's
+  ``get``/``set(ex=)``/``delete``/``scan_iter`` (``fakeredis`` works as a local
+  stand-in). Capacity is then governed by the server's ``maxmemory`` policy.
+
+Every session created by ``SessionLocal`` records the reports touched by ORM
+flushes and drops them from the cache after commit; code that writes report
+rows with Core statements calls :meth:`ReportCache.invalidate_on_commit`.
+A reader takes a :meth:`ReportCache.token` before loading a report and
+passes it to :meth:`ReportCache.set`, which skips the fill when this
+process invalidated the report in the meantime, so a slow read cannot put
+back a payload that a concurrent write just dropped.
+
+With the memory backend each worker only sees its own invalidations, so use
+the shared backend (or a TTL) once reports are edited after creation. The
+fill check is per process as well: with several workers on the shared
+backend, a fill racing another worker's write can still leave a stale entry
+until ``REPORT_CACHE_TTL_SECONDS`` expires it.
+"""
+
+# 导入数学工具
+import math
+# 导入线程锁工具
+import threading
+# 导入计时工具
+import time
+# 导入抽象基类工具
+from abc import ABC, abstractmethod
+# 导入有序字典（LRU）
+from collections import OrderedDict
+# 导入数据类工具
+from dataclasses import asdict, dataclass
+# 导入类型注解
+from typing import Any, Iterable, Optional, Tuple
+
+# 导入 SQLAlchemy 事件工具
+from sqlalchemy import event
+# 导入 SQLAlchemy 会话类型
+from sqlalchemy.orm import Session
+
+# 导入配置
+from app.core.config import settings
+# 导入数据库会话工厂
+from app.core.database import SessionLocal
+# 导入 flush 涉及报表的收集工具
+from app.services.report_versions import flushed_report_ids
+
+# 会话 info 中待失效报表 ID 的键
+_PENDING_KEY = "report_cache_pending_ids"
+# 单独记录失效序号的报表数上限（更早的按下限处理）
+_TRACKED_INVALIDATIONS = 10000
+
+
+# 缓存后端接口
+class CacheBackend(ABC):
+    # 类文档：按字符串键存取字节值
+    """Byte-valued key/value store used by :class:`ReportCache`."""
+
+    # 累计淘汰条数（共享后端由服务端淘汰，无法统计）
+    evictions = 0
+
+    # 读取
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        # 方法文档：不存在或已过期时返回 None
+        """Return the stored value, or None when missing or expired."""
+
+    # 写入
+    @abstractmethod
+    def set(self, key: str, value: bytes) -> None:
+        # 方法文档：写入或覆盖
+        """Store or replace a value."""
+
+    # 删除
+    @abstractmethod
+    def delete(self, keys: Iterable[str]) -> None:
+        # 方法文档：删除多个键，不存在的忽略
+        """Remove the given keys; missing keys are ignored."""
+
+    # 清空
+    @abstractmethod
+    def clear(self) -> None:
+        # 方法文档：删除全部条目
+        """Remove every entry."""
+
+    # 当前条目数
+    def size(self) -> Optional[int]:
+        # 方法文档：无法统计时返回 None
+        """Return the number of entries, or None if the backend cannot tell."""
+        # 默认无法统计
+        return None
+
+
+# 进程内 LRU 后端
+class MemoryCacheBackend(CacheBackend):
+    # 类文档：带条数上限与可选 TTL 的线程安全 LRU
+    """Thread-safe in-process LRU with an entry limit and optional TTL."""
+
+    # 初始化
+    def __init__(self, max_entries: int, ttl_seconds: Optional[float] = None) -> None:
+        # 条数上限
+        self.max_entries = max_entries
+        # 过期时间（秒），None 表示不过期
+        self.ttl_seconds = ttl_seconds
+        # 键到（过期时刻，值），按最近使用排序
+        self._entries: "OrderedDict[str, Tuple[Optional[float], bytes]]" = OrderedDict()
+        # 保护条目的锁
+        self._lock = threading.Lock()
+        # 累计淘汰条数
+        self.evictions = 0
+
+    # 读取
+    def get(self, key: str) -> Optional[bytes]:
+        # 加锁访问
+        with self._lock:
+            # 查找条目
+            entry = self._entries.get(key)
+            # 不存在
+            if entry is None:
+                return None
+            # 过期时间与值
+            expires_at, value = entry
+            # 已过期则删除
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            # 标记为最近使用
+            self._entries.move_to_end(key)
+            # 返回值
+            return value
+
+    # 写入
+    def set(self, key: str, value: bytes) -> None:
+        # 计算过期时刻
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else None
+        # 加锁修改
+        with self._lock:
+            # 写入并移到末尾
+            self._entries[key] = (expires_at, value)
+            # 标记为最近使用
+            self._entries.move_to_end(key)
+            # 超出上限时淘汰最久未使用的条目
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    # 删除
+    def delete(self, keys: Iterable[str]) -> None:
+        # 加锁修改
+        with self._lock:
+            # 逐个删除
+            for key in keys:
+                self._entries.pop(key, None)
+
+    # 清空
+    def clear(self) -> None:
+        # 加锁修改
+        with self._lock:
+            self._entries.clear()
+
+    # 当前条目数
+    def size(self) -> Optional[int]:
+        # 返回条目数
+        return len(self._entries)
+
+
+# 共享键值后端
+class SharedCacheBackend(CacheBackend):
+    # 类文档：基于 redis 兼容客户端的共享缓存
+    """Shared cache on top of a redis-py compatible client."""
+
+    # 初始化
+    def __init__(self, client: Any, prefix: str = "rms:report:", ttl_seconds: Optional[float] = None) -> None:
+        # redis 兼容客户端
+        self.client = client
+        # 键前缀
+        self.prefix = prefix
+        # 过期时间（秒）
+        self.ttl_seconds = ttl_seconds
+
+    # 读取
+    def get(self, key: str) -> Optional[bytes]:
+        # 读取带前缀的键
+        return self.client.get(self.prefix + key)
+
+    # 写入
+    def set(self, key: str, value: bytes) -> None:
+        # 有 TTL 时设置过期（向上取整到秒）
+        self.client.set(self.prefix + key, value, ex=math.ceil(self.ttl_seconds) if self.ttl_seconds else None)
+
+    # 删除
+    def delete(self, keys: Iterable[str]) -> None:
+        # 带前缀的键
+        names = [self.prefix + key for key in keys]
+        # 有键时一次删除
+        if names:
+            self.client.delete(*names)
+
+    # 清空
+    def clear(self) -> None:
+        # 只删除本前缀下的键
+        names = list(self.client.scan_iter(match=self.prefix + "*"))
+        # 有键时一次删除
+        if names:
+            self.client.delete(*names)
+
+
+# 缓存统计
+@dataclass
+class CacheStats:
+    # 类文档：用于调优的命中/未命中/淘汰计数
+    """Counters exposed for tuning the cache size and TTL."""
+
+    # 后端名称
+    backend: str
+    # 是否启用
+    enabled: bool
+    # 命中次数
+    hits: int = 0
+    # 未命中次数
+    misses: int = 0
+    # 淘汰次数
+    evictions: int = 0
+    # 失效的报表数
+    invalidations: int = 0
+    # 当前条目数
+    size: Optional[int] = None
+
+    # 命中率
+    @property
+    def hit_ratio(self) -> float:
+        # 总访问次数
+        total = self.hits + self.misses
+        # 返回命中率
+        return self.hits / total if total else 0.0
+
+
+# 报表响应缓存
+class ReportCache:
+    # 类文档：在后端之上增加读穿、失效与统计
+    """Read-through report payload cache with invalidation and counters."""
+
+    # 初始化
+    def __init__(self, backend: Optional[CacheBackend], name: str) -> None:
+        # 缓存后端，None 表示禁用
+        self.backend = backend
+        # 统计计数
+        self._stats = CacheStats(backend=name, enabled=backend is not None)
+        # 保护计数的锁
+        self._lock = threading.Lock()
+        # 失效序号（每次失效递增）
+        self._sequence = 0
+        # 报表 ID 到最近一次失效的序号，按失效先后排序
+        self._invalidated: "OrderedDict[int, int]" = OrderedDict()
+        # 未单独记录的报表视为在此序号失效
+        self._floor = 0
+        # 保护失效序号与写入的锁
+        self._fill_lock = threading.Lock()
+
+    # 读取前的令牌
+    def token(self) -> int:
+        # 方法文档：在读取数据库前获取，写入时据此判断期间是否失效
+        """Return the invalidation sequence to pass to :meth:`set` after loading a report."""
+        # 加锁读取
+        with self._fill_lock:
+            return self._sequence
+
+    # 读取
+    def get(self, report_id: int) -> Optional[bytes]:
+        # 方法文档：返回缓存内容并记录命中或未命中
+        """Return the cached payload of a report, or None on a miss."""
+        # 未启用缓存
+        if self.backend is None:
+            return None
+        # 查询缓存
+        payload = self.backend.get(str(report_id))
+        # 记录命中或未命中
+        with self._lock:
+            # 命中
+            if payload is not None:
+                self._stats.hits += 1
+            # 未命中
+            else:
+                self._stats.misses += 1
+        # 返回结果
+        return payload
+
+    # 写入
+    def set(self, report_id: int, payload: bytes, token: Optional[int] = None) -> None:
+        # 方法文档：写入报表的序列化内容，取得令牌后报表已失效时跳过
+        """
+        Store the serialized payload of a report, unless the report was
+        invalidated after ``token`` (from :meth:`token`) was taken.
+        """
+        # 未启用缓存
+        if self.backend is None:
+            return
+        # 判断与写入在同一把锁内，失效不会插在两者之间
+        with self._fill_lock:
+            # 读取期间已失效：内容可能早于失效的写入
+            if token is not None and self._invalidated.get(report_id, self._floor) > token:
+                return
+            # 写入
+            self.backend.set(str(report_id), payload)
+
+    # 失效
+    def invalidate(self, report_ids: Iterable[int]) -> None:
+        # 方法文档：删除指定报表的缓存
+        """Drop the cached payloads of the given reports."""
+        # 去重后的键
+        keys = {str(report_id) for report_id in report_ids if report_id is not None}
+        # 未启用或没有键
+        if self.backend is None or not keys:
+            return
+        # 先记录失效序号，之后开始的写入才会被拒绝
+        with self._fill_lock:
+            # 递增序号
+            self._sequence += 1
+            # 逐个记录
+            for key in keys:
+                self._invalidated[int(key)] = self._sequence
+                self._invalidated.move_to_end(int(key))
+            # 超出上限时丢弃最早的记录并抬高下限
+            while len(self._invalidated) > _TRACKED_INVALIDATIONS:
+                self._floor = self._invalidated.popitem(last=False)[1]
+        # 删除缓存
+        self.backend.delete(keys)
+        # 记录失效数
+        with self._lock:
+            self._stats.invalidations += len(keys)
+
+    # 提交后失效
+    def invalidate_on_commit(self, db: Session, report_ids: Iterable[int]) -> None:
+        # 方法文档：登记在会话提交后失效的报表（用于 Core 写入）
+        """Invalidate the given reports once ``db`` commits (for Core-level writes)."""
+        # 登记到会话
+        db.info.setdefault(_PENDING_KEY, set()).update(report_ids)
+
+    # 清空
+    def clear(self) -> None:
+        # 方法文档：删除全部缓存条目
+        """Remove every cached payload."""
+        # 未启用缓存
+        if self.backend is None:
+            return
+        # 清空前开始的写入一律拒绝
+        with self._fill_lock:
+            # 递增序号
+            self._sequence += 1
+            # 全部报表视为此时失效
+            self._floor = self._sequence
+            self._invalidated.clear()
+        # 清空
+        self.backend.clear()
+
+    # 统计
+    def stats(self) -> dict:
+        # 方法文档：返回当前计数
+        """Return a snapshot of the counters."""
+        # 加锁复制计数
+        with self._lock:
+            # 复制计数
+            snapshot = CacheStats(**asdict(self._stats))
+        # 后端淘汰数与条目数
+        if self.backend is not None:
+            snapshot.evictions = self.backend.evictions
+            snapshot.size = self.backend.size()
+        # 返回字典（含命中率）
+        return {**asdict(snapshot), "hit_ratio": snapshot.hit_ratio}
+
+
+# 根据配置创建缓存
+def _build_cache() -> ReportCache:
+    # 函数文档：按 settings.report_cache_backend 选择后端
+    """Build the process-wide cache from settings."""
+    # 配置的后端
+    backend = settings.report_cache_backend
+    # 内存后端
+    if backend == "memory":
+        return ReportCache(
+            MemoryCacheBackend(settings.report_cache_max_entries, settings.report_cache_ttl_seconds), backend
+        )
+    # redis 共享后端（可选依赖）
+    if backend == "redis":
+        # 延迟导入
+        try:
+            import redis
+        # 未安装时给出提示
+        except ImportError as exc:
+            raise RuntimeError("REPORT_CACHE_BACKEND=redis requires the 'redis' package") from exc
+        # 创建客户端
+        client = redis.Redis.from_url(settings.report_cache_url)
+        # 返回共享缓存
+        return ReportCache(SharedCacheBackend(client, ttl_seconds=settings.report_cache_ttl_seconds), backend)
+    # 禁用缓存
+    return ReportCache(None, backend)
+
+
+# 全局单例缓存
+report_cache = _build_cache()
+
+
+# flush 后收集被修改的报表
+@event.listens_for(SessionLocal, "after_flush")
+def _collect_mutated_reports(session: Session, _flush_context) -> None:
+    # 函数文档：记录本次 flush 中新增、修改或删除的报表及其字段值、附件
+    """Record the reports whose rows, values or attachments were flushed."""
+    # 本次 flush 新建与修改的报表
+    created, changed = flushed_report_ids(session)
+    # 登记到待失效集合（新建的 ID 也清除，防止 ID 复用时读到旧内容）
+    session.info.setdefault(_PENDING_KEY, set()).update(created, changed)
+
+
+# 提交后失效
+@event.listens_for(SessionLocal, "after_commit")
+def _invalidate_committed_reports(session: Session) -> None:
+    # 函数文档：提交后删除已修改报表的缓存
+    """Drop the cached payloads of reports changed by the committed transaction."""
+    # 取出并清空待失效集合
+    report_cache.invalidate(session.info.pop(_PENDING_KEY, ()))
+
+
+# 回滚后丢弃
+@event.listens_for(SessionLocal, "after_soft_rollback")
+def _discard_pending_reports(session: Session, _previous_transaction) -> None:
+    # 函数文档：回滚的修改无需失效
+    """Forget pending invalidations of a rolled back transaction."""
+    # 清空待失效集合
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,412 @@
+# 模块级文档字符串：按字段值过滤报表的查询构建
+"""Query helpers that filter reports by field-value predicates."""
+
+# 导入 Base64 编码工具（用于游标）
+import base64
+# 导入 JSON 处理模块
+import json
+# 导入运算符函数
+import operator
+# 导入数据类工具
+from dataclasses import dataclass, field
+# 导入日期时间类型
+from datetime import datetime
+# 导入高精度小数类型
+from decimal import Decimal
+# 导入类型注解
+from typing import Any, Dict, List, Optional, Tuple
+
+# 导入 SQLAlchemy 查询构造工具
+from sqlalchemy import and_, or_, select
+# 导入 SQLAlchemy 会话类型与别名工具
+from sqlalchemy.orm import Session, aliased
+
+# 导入报表相关模型
+from app.models.report_models import (
+    # 宽表存储模式常量
+    STORAGE_MODE_WIDE,
+    # 查找键长度
+    VALUE_KEY_LENGTH,
+    # 报表模型
+    Report,
+    # 字段值模型
+    ReportFieldValue,
+)
+# 导入字段值转换工具
+from app.services.field_values import coerce_value, typed_column, value_key
+# 导入报表结构缓存
+from app.services.schema_registry import FieldSchema, schema_registry
+# 导入宽表定义工具
+from app.services.wide_tables import wide_column_name, wide_table
+
+# 支持的比较运算符
+SUPPORTED_OPERATORS = ("eq", "prefix", "in", "gt", "gte", "lt", "lte")
+# 范围运算符到比较函数的映射（需要类型化列）
+_RANGE_COMPARATORS = {"gt": operator.gt, "gte": operator.ge, "lt": operator.lt, "lte": operator.le}
+
+
+# 字段谓词
+@dataclass(frozen=True)
+class FieldPredicate:
+    # 类文档：针对某个字段名称的过滤条件
+    """A filter on a report field, e.g. ``device_model:eq:ABC-01``."""
+
+    # 字段名称
+    name: str
+    # 运算符
+    op: str
+    # 比较值（in 运算可有多个）
+    values: Tuple[str, ...]
+
+
+# 解析查询参数中的字段谓词
+def parse_field_predicates(raw_predicates: List[str]) -> List[FieldPredicate]:
+    # 函数文档：解析 name:op:value 形式的谓词
+    """
+    Parse ``name:op:value`` strings into predicates.
+
+    ``op`` is one of ``eq``, ``prefix``, ``in`` (comma-separated values) or
+    the range operators ``gt``/``gte``/``lt``/``lte``, which compare the
+    typed value column. Raises ``ValueError`` on bad input.
+    """
+    # 解析结果
+    predicates: List[FieldPredicate] = []
+    # 遍历原始谓词
+    for raw in raw_predicates:
+        # 最多分成三段，值中允许出现冒号
+        parts = raw.split(":", 2)
+        # 段数不足
+        if len(parts) != 3 or not parts[0]:
+            raise ValueError(f"Invalid field filter {raw!r}, expected name:op:value")
+        # 拆出字段名、运算符与值
+        name, op, value = parts
+        # 运算符不受支持
+        if op not in SUPPORTED_OPERATORS:
+            raise ValueError(f"Unsupported operator {op!r} in field filter {raw!r}")
+        # in 运算按逗号拆分多个值
+        values = tuple(value.split(",")) if op == "in" else (value,)
+        # 记录谓词
+        predicates.append(FieldPredicate(name=name, op=op, values=values))
+    # 返回解析结果
+    return predicates
+
+
+# 把字段谓词应用到报表查询
+def apply_field_predicates(
+    # 数据库会话
+    db: Session,
+    # 报表查询
+    query,
+    # 字段谓词
+    predicates: List[FieldPredicate],
+    # 报表类型 ID（可选，用于限定字段名称）
+    report_type_id: Optional[int] = None,
+):
+    # 函数文档：为每个谓词追加一个基于查找键索引的半连接条件
+    """
+    Restrict a Report query to reports matching every predicate.
+
+    Field names are resolved to ids up front so each predicate becomes a
+    seek on one of the ``(field_id, value_*, report_id)`` indexes. Raises
+    ``ValueError`` for unknown field names or uncomparable values.
+    """
+    # 没有谓词时直接返回
+    if not predicates:
+        return query
+    # 一次查询解析所有字段名称
+    fields = _resolve_fields(db, {predicate.name for predicate in predicates}, report_type_id)
+    # 逐个追加谓词
+    for predicate in predicates:
+        # 字段名称不存在
+        if predicate.name not in fields:
+            raise ValueError(f"Unknown field {predicate.name!r}")
+        # 该名称对应的字段
+        resolved = fields[predicate.name]
+        # 各存储位置的半连接条件
+        conditions = []
+        # EAV 字段：在字段值表上按索引查找
+        if resolved.eav_ids:
+            conditions.append(
+                Report.id.in_(
+                    # 子查询：满足条件的报表 ID
+                    select(ReportFieldValue.report_id).where(
+                        # 限定字段
+                        ReportFieldValue.field_id.in_(resolved.eav_ids),
+                        # 值条件
+                        _value_condition(predicate, resolved.field_type),
+                    )
+                )
+            )
+        # 宽表字段：在对应类型的宽表列上比较
+        for wide_field in resolved.wide_fields:
+            # 该字段所在的宽表
+            table = wide_table(wide_field.report_type_id, [wide_field])
+            # 宽表中的字段列
+            column = table.c[wide_column_name(wide_field.id)]
+            # 子查询：满足条件的报表 ID
+            conditions.append(
+                Report.id.in_(select(table.c.report_id).where(_wide_condition(predicate, wide_field.field_type, column)))
+            )
+        # 任一存储位置满足即可
+        query = query.filter(or_(*conditions))
+    # 返回过滤后的查询
+    return query
+
+
+# 报表列表的排序方式
+@dataclass(frozen=True)
+class ReportSort:
+    # 类文档：键集分页使用的排序键
+    """Sort key of a report listing; ties are always broken by Report.id."""
+
+    # 排序名称（created_at 或字段名称）
+    name: str
+    # 是否降序
+    descending: bool
+    # 排序键的 SQL 表达式
+    key: Any
+    # 字段类型（按创建时间排序时为 None）
+    field_type: Optional[str] = None
+
+
+# 解析排序参数并在需要时连接字段值表
+def apply_sort(db: Session, query, sort: Optional[str], report_type_id: Optional[int] = None):
+    # 函数文档：返回 (查询, 排序方式)
+    """
+    Resolve a ``sort`` parameter (``created_at`` or a typed field name,
+    prefixed with ``-`` for descending) and join the sort column if needed.
+
+    Sorting by a field only returns reports that have a value for it. Raises
+    ``ValueError`` for unknown or non-sortable fields.
+    """
+    # 默认按创建时间升序
+    sort = sort or "created_at"
+    # 前缀 - 表示降序
+    descending = sort.startswith("-")
+    # 去掉方向前缀
+    name = sort.lstrip("-")
+    # 按创建时间排序
+    if name == "created_at":
+        return query, ReportSort(name=name, descending=descending, key=Report.created_at)
+    # 解析字段
+    fields = _resolve_fields(db, {name}, report_type_id)
+    # 字段名称不存在
+    if name not in fields:
+        raise ValueError(f"Unknown field {name!r}")
+    # 解析结果
+    resolved = fields[name]
+    # 字段类型
+    field_type = resolved.field_type
+    # 只有类型化字段可以在数据库中排序
+    column = typed_column(field_type)
+    # 文本字段不支持排序
+    if column is None:
+        raise ValueError(f"Field {name!r} is not a typed field and cannot be sorted")
+    # 宽表字段：连接该类型的宽表
+    if resolved.wide_fields:
+        # 宽表字段不能与其他同名字段混合排序
+        if len(resolved.wide_fields) > 1 or resolved.eav_ids:
+            raise ValueError(f"Field {name!r} is stored in several report types; pass report_type_id")
+        # 宽表字段定义
+        wide_field = resolved.wide_fields[0]
+        # 该字段所在的宽表
+        table = wide_table(wide_field.report_type_id, [wide_field])
+        # 排序键表达式
+        key = table.c[wide_column_name(wide_field.id)]
+        # 连接宽表
+        query = query.join(table, and_(table.c.report_id == Report.id, key.isnot(None)))
+        # 返回查询与排序方式
+        return query, ReportSort(name=name, descending=descending, key=key, field_type=field_type)
+    # 字段值表别名
+    sort_value = aliased(ReportFieldValue)
+    # 排序键表达式
+    key = getattr(sort_value, column)
+    # 连接排序字段的值
+    query = query.join(
+        # 字段值别名
+        sort_value,
+        # 连接条件
+        and_(sort_value.report_id == Report.id, sort_value.field_id.in_(resolved.eav_ids), key.isnot(None)),
+    )
+    # 返回查询与排序方式
+    return query, ReportSort(name=name, descending=descending, key=key, field_type=field_type)
+
+
+# 按排序方式排序并附带排序键列
+def order_query(query, sort: ReportSort):
+    # 函数文档：结果行为 (Report, 排序键)
+    """Order a Report query by the sort key and id, yielding (Report, key) rows."""
+    # 排序方向
+    if sort.descending:
+        return query.add_columns(sort.key).order_by(sort.key.desc(), Report.id.desc())
+    # 升序
+    return query.add_columns(sort.key).order_by(sort.key, Report.id)
+
+
+# 追加键集分页条件
+def after_position(query, sort: ReportSort, last_key: Any, last_id: int):
+    # 函数文档：只保留排在 (last_key, last_id) 之后的报表
+    """Restrict a query to rows ordered after (last_key, last_id)."""
+    # SQL Server 不支持行值比较，展开为 OR 条件
+    if sort.descending:
+        return query.filter(or_(sort.key < last_key, and_(sort.key == last_key, Report.id < last_id)))
+    # 升序
+    return query.filter(or_(sort.key > last_key, and_(sort.key == last_key, Report.id > last_id)))
+
+
+# 生成分页游标
+def encode_cursor(sort: ReportSort, last_key: Any, last_id: int) -> str:
+    # 函数文档：把排序名称与最后一行位置编码为不透明游标
+    """Encode the sort name and the last row's (key, id) as an opaque cursor."""
+    # 日期时间与小数转为文本
+    if isinstance(last_key, (datetime, Decimal)):
+        last_key = last_key.isoformat() if isinstance(last_key, datetime) else str(last_key)
+    # 序列化为 JSON 数组
+    raw = json.dumps([sort.name, sort.descending, last_key, last_id])
+    # 使用 URL 安全的 Base64 编码
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+# 解析分页游标
+def decode_cursor(sort: ReportSort, cursor: str) -> Tuple[Any, int]:
+    # 函数文档：把游标还原为 (排序键, id)
+    """Decode a cursor into (key, id); raises ``ValueError`` if it is malformed or for another sort."""
+    # 尝试解码游标
+    try:
+        # Base64 解码并解析 JSON
+        name, descending, last_key, last_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    # 格式错误
+    except (ValueError, TypeError) as exc:
+        raise ValueError("Invalid cursor") from exc
+    # 游标与当前排序不一致
+    if name != sort.name or descending != sort.descending:
+        raise ValueError("Cursor does not match the requested sort")
+    # 按创建时间排序
+    if sort.field_type is None:
+        return datetime.fromisoformat(last_key), int(last_id)
+    # 按字段类型还原排序键
+    return coerce_value(sort.field_type, last_key), int(last_id)
+
+
+# 字段名称的解析结果
+@dataclass
+class _ResolvedField:
+    # 类文档：同名字段按存储位置分组
+    """Fields sharing one name, grouped by where their values are stored."""
+
+    # 字段类型（同名字段的类型化列一致）
+    field_type: str
+    # EAV 模式字段的 ID
+    eav_ids: List[int] = field(default_factory=list)
+    # 宽表模式的字段定义
+    wide_fields: List[FieldSchema] = field(default_factory=list)
+
+
+# 解析字段名称
+def _resolve_fields(db: Session, names: set, report_type_id: Optional[int]) -> Dict[str, _ResolvedField]:
+    # 函数文档：字段名称在不同报表类型中可能重复，因此按存储位置分组
+    """
+    Map field names to every matching field in the schema registry, grouped
+    by storage mode.
+
+    Raises ``ValueError`` if one name is typed differently across report types.
+    """
+    # 候选报表类型：指定类型或全部类型（来自结构缓存）
+    if report_type_id is not None:
+        schema = schema_registry.get(db, report_type_id)
+        # 类型不存在时没有可匹配的字段
+        schemas = [schema] if schema is not None else []
+    # 未指定类型时遍历全部类型
+    else:
+        schemas = schema_registry.all(db)
+    # 字段名称到解析结果
+    fields: Dict[str, _ResolvedField] = {}
+    # 遍历候选类型的同名字段
+    for schema in schemas:
+        # 遍历该类型中被引用的字段
+        for report_field in (schema.field_map[name] for name in names if name in schema.field_map):
+            # 取已有记录或新建
+            resolved = fields.setdefault(report_field.name, _ResolvedField(field_type=report_field.field_type))
+            # 同名字段的类型化列必须一致
+            if typed_column(resolved.field_type) != typed_column(report_field.field_type):
+                raise ValueError(
+                    f"Field {report_field.name!r} has different types across report types; pass report_type_id"
+                )
+            # 按存储模式分组
+            if schema.storage_mode == STORAGE_MODE_WIDE:
+                resolved.wide_fields.append(report_field)
+            # EAV 模式记录字段 ID
+            else:
+                resolved.eav_ids.append(report_field.id)
+    # 返回映射
+    return fields
+
+
+# 构建宽表列上的值条件
+def _wide_condition(predicate: FieldPredicate, field_type: str, column):
+    # 函数文档：宽表列直接比较，类型化字段先转换比较值
+    """Build the value condition for a predicate on a wide-table column."""
+    # 类型化列名
+    typed = typed_column(field_type)
+    # 范围比较
+    if predicate.op in _RANGE_COMPARATORS:
+        # 文本字段不支持范围比较
+        if typed is None:
+            raise ValueError(f"Field {predicate.name!r} is not a typed field; range filters are not supported")
+        # 比较转换后的值
+        return _RANGE_COMPARATORS[predicate.op](column, coerce_value(field_type, predicate.values[0]))
+    # 前缀匹配
+    if predicate.op == "prefix":
+        # 类型化字段不支持前缀匹配
+        if typed is not None:
+            raise ValueError(f"Field {predicate.name!r} is a typed field; prefix filters are not supported")
+        # 文本前缀
+        return column.startswith(predicate.values[0], autoescape=True)
+    # 等值 / IN：类型化字段先转换比较值
+    return column.in_([coerce_value(field_type, value) if typed else value for value in predicate.values])
+
+
+# 构建单个谓词的值条件
+def _value_condition(predicate: FieldPredicate, field_type: str):
+    # 函数文档：文本比较走查找键，范围比较走类型化列
+    """Build the value condition for a predicate on a field of ``field_type``."""
+    # 范围比较
+    if predicate.op in _RANGE_COMPARATORS:
+        # 类型化列名
+        column = typed_column(field_type)
+        # 文本字段不支持范围比较
+        if column is None:
+            raise ValueError(f"Field {predicate.name!r} is not a typed field; range filters are not supported")
+        # 比较类型化列与转换后的值
+        return _RANGE_COMPARATORS[predicate.op](
+            # 类型化列
+            getattr(ReportFieldValue, column),
+            # 按字段类型转换的比较值
+            coerce_value(field_type, predicate.values[0]),
+        )
+    # 前缀匹配
+    if predicate.op == "prefix":
+        # 比较值
+        prefix = predicate.values[0]
+        # 在查找键上做可走索引的 LIKE 'x%'
+        condition = ReportFieldValue.value_key.startswith(value_key(prefix), autoescape=True)
+        # 前缀超过查找键长度时回查完整文本
+        if len(prefix) > VALUE_KEY_LENGTH:
+            condition = and_(condition, ReportFieldValue.value.startswith(prefix, autoescape=True))
+        # 返回条件
+        return condition
+    # 等值 / IN：查找键相等，超长值回查完整文本
+    return or_(*(_equals(value) for value in predicate.values))
+
+
+# 构建等值条件
+def _equals(value: str):
+    # 函数文档：单个值的等值条件
+    """Equality on value_key, with a full-text recheck for values longer than the key."""
+    # 查找键等值
+    condition = ReportFieldValue.value_key == value_key(value)
+    # 超长值回查完整文本
+    if len(value) > VALUE_KEY_LENGTH:
+        condition = and_(condition, ReportFieldValue.value == value)
+    # 返回条件
+    return condition
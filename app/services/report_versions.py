@@ -0,0 +1,87 @@
+# 模块级文档字符串：报表内容版本号
+"""
+Report content versions, the cheap marker behind report ETags.
+
+``reports.version`` starts at 1 and is incremented in the same flush whenever
+an existing report, one of its field values or one of its attachments is
+changed through the ORM. Comparing it costs one primary-key lookup instead of
+loading and serializing the report.
+"""
+
+# 导入类型注解
+from typing import Set, Tuple
+
+# 导入 SQLAlchemy 事件与更新工具
+from sqlalchemy import event, update
+# 导入 SQLAlchemy 会话类型
+from sqlalchemy.orm import Session
+
+# 导入数据库会话工厂
+from app.core.database import SessionLocal
+# 导入报表相关模型
+from app.models.report_models import Report, ReportAttachment, ReportFieldValue
+
+# 会话 info 中待过期版本号的报表 ID 的键
+_STALE_KEY = "report_versions_stale_ids"
+
+
+# 本次 flush 涉及的报表
+def flushed_report_ids(session: Session) -> Tuple[Set[int], Set[int]]:
+    # 函数文档：在 after_flush 中调用，区分新建与已有报表
+    """
+    Return ``(created, changed)`` report ids touched by the current flush;
+    call from an ``after_flush`` hook. ``changed`` excludes ``created``.
+    """
+    # 本次新建的报表
+    created = {instance.id for instance in session.new if isinstance(instance, Report)}
+    # 被修改或删除的报表
+    changed: Set[int] = set()
+    # 遍历本次 flush 的对象
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        # 报表本身
+        if isinstance(instance, Report):
+            changed.add(instance.id)
+        # 报表的字段值或附件
+        elif isinstance(instance, (ReportFieldValue, ReportAttachment)):
+            changed.add(instance.report_id)
+    # 返回新建与已有报表
+    return created, changed - created
+
+
+# flush 后递增已有报表的版本号
+@event.listens_for(SessionLocal, "after_flush")
+def _bump_report_versions(session: Session, _flush_context) -> None:
+    # 函数文档：同一事务内递增版本号，并让会话中的对象重新读取
+    """Increment the version of every existing report changed by this flush."""
+    # 已有报表中被修改的部分
+    _, changed = flushed_report_ids(session)
+    # 删除的报表无需递增
+    changed.difference_update(instance.id for instance in session.deleted if isinstance(instance, Report))
+    # 没有修改
+    if not changed:
+        return
+    # 一条语句递增版本号
+    session.connection().execute(
+        # 更新报表表
+        update(Report.__table__)
+        # 限定报表
+        .where(Report.__table__.c.id.in_(changed))
+        # 版本号加一
+        .values(version=Report.__table__.c.version + 1)
+    )
+    # 会话中已加载的报表下次访问时重新读取版本号
+    session.info.setdefault(_STALE_KEY, set()).update(changed)
+
+
+# flush 完成后使版本号属性过期
+@event.listens_for(SessionLocal, "after_flush_postexec")
+def _expire_bumped_versions(session: Session, _flush_context) -> None:
+    # 函数文档：flush 结束后才能安全地使属性过期
+    """Expire ``Report.version`` on loaded reports whose version was bumped."""
+    # 遍历待过期的报表
+    for report_id in session.info.pop(_STALE_KEY, ()):
+        # 仅处理已在身份映射中的对象
+        report = session.identity_map.get(session.identity_key(Report, report_id))
+        # 使版本号过期
+        if report is not None:
+            session.expire(report, ["version"])
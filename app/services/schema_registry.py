@@ -0,0 +1,276 @@
+# 模块级文档字符串：进程内的报表类型结构缓存
+"""
+In-process registry of report type schemas (fields, types, required flags).
+
+Field definitions change rarely, so hot paths read them from this registry
+instead of querying ``report_fields`` on every request. Writers bump the
+``report_schema_versions`` counter in the same transaction as their change;
+each worker re-reads that counter at most every
+``settings.schema_registry_check_seconds`` and reloads when it moved, and
+the writing worker drops its cache as soon as the transaction commits.
+
+Replica sessions read the counter and schemas from the primary: the
+registry is shared by the whole process, and a lagging snapshot would make
+this worker reject fields it just created.
+"""
+
+# 导入线程锁工具
+import threading
+# 导入计时工具
+import time
+# 导入数据类工具
+from dataclasses import dataclass
+# 导入缓存属性工具
+from functools import cached_property
+# 导入类型注解
+from typing import Dict, List, Optional, Tuple
+
+# 导入 SQLAlchemy 事件、查询与更新工具
+from sqlalchemy import event, select, update
+# 导入 SQLAlchemy 会话类型
+from sqlalchemy.orm import Session
+
+# 导入配置
+from app.core.config import settings
+# 导入主库执行参数
+from app.core.database import primary_bind_arguments
+# 导入报表相关模型
+from app.models.report_models import STORAGE_MODE_WIDE, ReportField, ReportSchemaVersion, ReportType
+
+# 版本号所在行的主键
+_VERSION_ROW_ID = 1
+
+
+# 字段结构
+@dataclass(frozen=True)
+class FieldSchema:
+    # 类文档：ReportField 的不可变快照
+    """Immutable snapshot of a ReportField."""
+
+    # 字段 ID
+    id: int
+    # 所属报表类型 ID
+    report_type_id: int
+    # 字段内部名称
+    name: str
+    # 展示名称
+    label: str
+    # 字段类型
+    field_type: str
+    # 是否必填
+    required: bool
+
+
+# 报表类型结构
+@dataclass(frozen=True)
+class ReportTypeSchema:
+    # 类文档：ReportType 及其字段的不可变快照
+    """Immutable snapshot of a ReportType and its fields (ordered by id)."""
+
+    # 报表类型 ID
+    id: int
+    # 类型名称
+    name: str
+    # 类型描述
+    description: Optional[str]
+    # 字段值存储模式
+    storage_mode: str
+    # 字段列表
+    fields: Tuple[FieldSchema, ...]
+
+    # 字段名称到字段结构的映射
+    @cached_property
+    def field_map(self) -> Dict[str, FieldSchema]:
+        # 方法文档：按名称查找字段
+        """Fields keyed by name."""
+        # 构建映射
+        return {field.name: field for field in self.fields}
+
+
+# 结构注册表
+class SchemaRegistry:
+    # 类文档：带数据库版本号校验的进程内缓存
+    """Process-wide cache of report type schemas, versioned through the database."""
+
+    # 初始化方法
+    def __init__(self, check_seconds: float) -> None:
+        # 构造函数文档：设置版本检查间隔
+        """Initialize an empty registry that re-checks the version every ``check_seconds``."""
+        # 版本检查间隔
+        self.check_seconds = check_seconds
+        # 重新加载时使用的锁
+        self._lock = threading.Lock()
+        # 已加载的版本号（None 表示未加载）
+        self._version: Optional[int] = None
+        # 报表类型 ID 到结构
+        self._types: Dict[int, ReportTypeSchema] = {}
+        # 上次检查版本号的时间
+        self._checked_at = 0.0
+
+    # 获取单个报表类型
+    def get(self, db: Session, report_type_id: int) -> Optional[ReportTypeSchema]:
+        # 方法文档：返回报表类型结构，不存在时返回 None
+        """Return the schema of a report type, or None if it does not exist."""
+        # 确保缓存未过期后查找
+        return self._fresh(db).get(report_type_id)
+
+    # 获取用于写入字段值的报表类型
+    def get_for_write(self, db: Session, report_type_id: int) -> Optional[ReportTypeSchema]:
+        # 方法文档：EAV 类型在调用方事务中共享锁定类型行，并以数据库中的存储模式为准
+        """
+        Return the schema of a report type for writing its field values.
+
+        For an EAV type the type's row is re-read under a shared lock held
+        until the caller's transaction ends (``HOLDLOCK`` on SQL Server), so
+        ``app.commands.migrate_wide_table`` cannot switch the type to wide
+        while this transaction writes EAV rows. When the type was switched
+        already, the cache is reloaded and the wide schema returned.
+        """
+        # 缓存中的结构
+        schema = self.get(db, report_type_id)
+        # 不存在或已是宽表（宽表不会切回 EAV）
+        if schema is None or schema.storage_mode == STORAGE_MODE_WIDE:
+            return schema
+        # 加共享锁读取当前存储模式，直到事务结束
+        storage_mode = db.execute(
+            # 存储模式
+            select(ReportType.storage_mode)
+            # SQL Server 保持共享锁到事务结束
+            .with_hint(ReportType, "WITH (HOLDLOCK, ROWLOCK)", "mssql")
+            # 限定报表类型
+            .where(ReportType.id == report_type_id),
+            # 副本会话改走主库
+            bind_arguments=primary_bind_arguments(db),
+        ).scalar()
+        # 缓存仍然有效
+        if storage_mode == schema.storage_mode:
+            return schema
+        # 已切换：重新加载缓存
+        self.invalidate()
+        # 返回新结构
+        return self.get(db, report_type_id)
+
+    # 获取全部报表类型
+    def all(self, db: Session) -> List[ReportTypeSchema]:
+        # 方法文档：按 ID 顺序返回全部报表类型结构
+        """Return every report type schema ordered by id."""
+        # 确保缓存未过期后返回
+        return sorted(self._fresh(db).values(), key=lambda schema: schema.id)
+
+    # 当前版本号
+    def version(self, db: Session) -> int:
+        # 方法文档：返回当前缓存对应的结构版本号
+        """Return the schema version the cached snapshot corresponds to."""
+        # 确保缓存未过期
+        self._fresh(db)
+        # 返回版本号
+        return self._version or 0
+
+    # 递增版本号
+    def bump(self, db: Session) -> None:
+        # 方法文档：在调用方事务中递增版本号，提交后本进程立即失效
+        """
+        Increment the schema version inside the caller's transaction and drop
+        this process's cache once that transaction commits.
+        """
+        # 原子递增版本号（版本行由迁移 v0001 创建）
+        db.execute(
+            # 更新语句
+            update(ReportSchemaVersion)
+            # 固定行
+            .where(ReportSchemaVersion.id == _VERSION_ROW_ID)
+            # 版本号加一
+            .values(version=ReportSchemaVersion.version + 1)
+        )
+        # 提交后使本进程缓存失效
+        event.listen(db, "after_commit", lambda _session: self.invalidate(), once=True)
+
+    # 使缓存失效
+    def invalidate(self) -> None:
+        # 方法文档：下次访问时重新检查版本号并加载
+        """Force the next access to re-check the version and reload."""
+        # 加锁修改状态
+        with self._lock:
+            # 清空已加载版本
+            self._version = None
+            # 重置检查时间
+            self._checked_at = 0.0
+
+    # 确保缓存未过期
+    def _fresh(self, db: Session) -> Dict[int, ReportTypeSchema]:
+        # 方法文档：按间隔检查数据库版本号，变化时重新加载
+        """Return the cached types, reloading them if the database version moved."""
+        # 当前时间
+        now = time.monotonic()
+        # 检查间隔内直接返回
+        if self._version is not None and now - self._checked_at < self.check_seconds:
+            return self._types
+        # 读取数据库版本号（不持锁：异步会话的查询会让出事件循环，持锁等待会阻塞整个循环）
+        version = db.execute(
+            select(ReportSchemaVersion.version).where(ReportSchemaVersion.id == _VERSION_ROW_ID),
+            bind_arguments=primary_bind_arguments(db),
+        ).scalar() or 0
+        # 版本变化时重新加载（并发时可能重复加载，结果相同）
+        types = _load_types(db) if version != self._version else None
+        # 加锁替换快照
+        with self._lock:
+            # 只接受不旧于当前快照的版本
+            if types is not None and (self._version is None or version >= self._version):
+                # 替换快照
+                self._types = types
+                # 记录版本号
+                self._version = version
+            # 记录检查时间
+            self._checked_at = now
+            # 返回缓存
+            return self._types
+
+
+# 从数据库加载全部报表类型
+def _load_types(db: Session) -> Dict[int, ReportTypeSchema]:
+    # 函数文档：两次查询加载全部报表类型与字段
+    """Load every report type and its fields with two queries (on the primary)."""
+    # 副本会话改走主库
+    bind_arguments = primary_bind_arguments(db)
+    # 报表类型 ID 到字段列表
+    fields: Dict[int, List[FieldSchema]] = {}
+    # 按 ID 顺序读取全部字段
+    for field in db.execute(select(ReportField).order_by(ReportField.id), bind_arguments=bind_arguments).scalars():
+        fields.setdefault(field.report_type_id, []).append(
+            FieldSchema(
+                # 字段 ID
+                id=field.id,
+                # 所属报表类型 ID
+                report_type_id=field.report_type_id,
+                # 字段名称
+                name=field.name,
+                # 展示名称
+                label=field.label,
+                # 字段类型
+                field_type=field.field_type,
+                # 是否必填
+                required=bool(field.required),
+            )
+        )
+    # 构建报表类型结构
+    return {
+        # 报表类型 ID 到结构
+        report_type.id: ReportTypeSchema(
+            # 报表类型 ID
+            id=report_type.id,
+            # 类型名称
+            name=report_type.name,
+            # 类型描述
+            description=report_type.description,
+            # 字段值存储模式
+            storage_mode=report_type.storage_mode,
+            # 字段列表
+            fields=tuple(fields.get(report_type.id, ())),
+        )
+        # 遍历全部报表类型
+        for report_type in db.execute(select(ReportType), bind_arguments=bind_arguments).scalars()
+    }
+
+
+# 全局单例注册表
+schema_registry = SchemaRegistry(settings.schema_registry_check_seconds)
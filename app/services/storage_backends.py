@@ -0,0 +1,442 @@
+# 模块级文档字符串：可插拔的附件存储后端
+"""
+Pluggable attachment storage backends.
+
+Every backend stores opaque byte streams under string keys it generates:
+
+* ``filetable`` – SQL Server FILETABLE rows written through the session's
+  pooled connection, so they commit or roll back with the caller's
+  transaction (``transactional = True``);
+* ``local`` – plain files under a root directory, written to a temporary
+  name and renamed into place. Files are ordinary on-disk files, so
+  readers can ``mmap`` them or hand them to ``sendfile`` via :meth:`path`;
+* ``product_local`` – the same, rooted at ``PRODUCT_REPORT_STORAGE_DIR``
+  instead of ``STORAGE_LOCAL_ROOT``.
+
+The name identifies a storage location, not just a backend class: it is
+recorded on attachments and shared blobs and is part of the deduplication
+key, so content stored under one root is never reused from the other.
+
+Writes that cannot share the caller's transaction, such as uploads persisted
+by worker threads, use :meth:`StorageBackend.put_detached`.
+
+Backends are selected with :func:`get_storage_backend` from settings.
+"""
+
+# 导入操作系统工具
+import os
+# 导入正则工具
+import re
+# 导入唯一 ID 工具
+import uuid
+# 导入抽象基类工具
+from abc import ABC, abstractmethod
+# 导入数据类工具
+from dataclasses import dataclass
+# 导入类型注解
+from typing import TYPE_CHECKING, BinaryIO, Iterator, Optional
+
+# 导入 SQLAlchemy 会话类型
+from sqlalchemy.orm import Session
+
+# 导入配置
+from app.core.config import settings
+# 导入数据库会话工厂
+from app.core.database import SessionLocal
+
+# ODBC 驱动只用于类型注解：本地后端的部署不需要安装 unixODBC
+if TYPE_CHECKING:
+    import pyodbc
+
+# 后端名称：SQL Server FILETABLE
+BACKEND_FILETABLE = "filetable"
+# 后端名称：本地文件系统
+BACKEND_LOCAL = "local"
+# 后端名称：产品报表附件的本地文件夹（与报表附件的根目录不同）
+BACKEND_PRODUCT_LOCAL = "product_local"
+# 存储名称中的随机前缀
+_UNIQUE_PREFIX = re.compile(r"^[0-9a-f]{32}_")
+# varbinary(max) 的数据页大小：追加的块为其整数倍时 .WRITE 采用最少日志的追加
+_LOB_PAGE_BYTES = 8040
+
+
+# 由存储键还原原始文件名
+def original_filename(key: str) -> str:
+    # 函数文档：去掉目录与写入时加的随机前缀
+    """Return the uploaded filename behind a storage key (directory and random prefix removed)."""
+    # 取最后一段并去掉前缀
+    return _UNIQUE_PREFIX.sub("", key.replace("\\", "/").rsplit("/", 1)[-1])
+
+
+# 存储对象信息
+@dataclass(frozen=True)
+class ObjectStat:
+    # 类文档：已存储对象的元数据
+    """Metadata of a stored object."""
+
+    # 存储键
+    key: str
+    # 字节数
+    size: int
+
+
+# 存储后端接口
+class StorageBackend(ABC):
+    # 类文档：写入、按范围读取、查看与删除
+    """Put, ranged get, stat and delete of opaque byte streams."""
+
+    # 后端名称（写入附件记录，读取时据此选择后端）
+    name: str
+    # 写入是否随调用方数据库事务提交或回滚
+    transactional: bool = False
+
+    # 写入
+    @abstractmethod
+    def put(self, stream: BinaryIO, filename: str, namespace: str = "") -> str:
+        # 方法文档：写入整个流并返回新对象的键
+        """Store ``stream`` (read in bounded chunks) and return the new object's key."""
+
+    # 按范围读取
+    @abstractmethod
+    def open_range(self, key: str, start: int = 0, length: Optional[int] = None) -> Iterator[bytes]:
+        # 方法文档：按块产出 [start, start + length) 的内容
+        """Yield the bytes ``[start, start + length)`` of an object in bounded chunks."""
+
+    # 查看
+    @abstractmethod
+    def stat(self, key: str) -> Optional[ObjectStat]:
+        # 方法文档：对象不存在时返回 None
+        """Return the object's metadata, or None when it does not exist."""
+
+    # 删除
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        # 方法文档：删除对象，不存在时忽略
+        """Remove an object; missing objects are ignored."""
+
+    # 在调用方事务之外写入
+    def put_detached(self, stream: BinaryIO, filename: str, namespace: str = "") -> str:
+        # 方法文档：可在工作线程中调用，写入立即生效
+        """
+        Like :meth:`put`, but outside the caller's transaction and safe to call
+        from worker threads. The object survives a rollback of the caller, so
+        it must be removed with :meth:`delete_detached` if it is not used.
+        """
+        # 非事务后端的写入本就独立
+        return self.put(stream, filename, namespace)
+
+    # 在调用方事务之外删除
+    def delete_detached(self, key: str) -> None:
+        # 方法文档：删除 put_detached 写入的对象
+        """Remove an object written with :meth:`put_detached`."""
+        # 非事务后端的删除本就独立
+        self.delete(key)
+
+
+# FILETABLE 后端
+class FileTableBackend(StorageBackend):
+    # 类文档：在会话事务中读写 report_files
+    """
+    Stores objects as rows of the ``report_files`` FILETABLE.
+
+    Keys are the rows' ``path_locator`` rendered with ``ToString()``. Writes
+    use the DBAPI connection behind ``db``'s transaction. FILESTREAM data has
+    no partial updates (``file_stream.WRITE`` rewrites the whole file), so
+    the stream is appended in chunks to a ``VARBINARY(MAX)`` column of a
+    session temp table, where ``.WRITE`` appends in place, and copied into
+    ``report_files`` with a single ``INSERT ... SELECT``. At most one chunk
+    of an upload is held in memory and every byte is written twice, once to
+    tempdb and once to the FILESTREAM container. The temp table is created
+    inside the caller's transaction, so a rollback removes it as well.
+    """
+
+    # 后端名称
+    name = BACKEND_FILETABLE
+    # 随会话事务提交
+    transactional = True
+
+    # 初始化方法
+    def __init__(self, db: Session, chunk_size: Optional[int] = None) -> None:
+        # 调用方会话
+        self.db = db
+        # 每次写入/读取的块大小（字节）
+        self.chunk_size = chunk_size or settings.filetable_chunk_size
+
+    # 获取会话事务所在连接的游标
+    def _get_cursor(self) -> "pyodbc.Cursor":
+        # 方法文档：借用会话当前事务的池化 DBAPI 连接
+        """Return a cursor on the pooled DBAPI connection behind the session's transaction."""
+        # 会话连接背后的原始 pyodbc 连接
+        return self.db.connection().connection.driver_connection.cursor()
+
+    # 写入
+    def put(self, stream: BinaryIO, filename: str, namespace: str = "") -> str:
+        # 借用游标
+        cursor = self._get_cursor()
+        # 本次写入的会话临时表（连接内唯一）
+        staging = f"#upload_{uuid.uuid4().hex}"
+        # 追加块大小：不超过配置的块大小，取数据页大小的整数倍
+        append_size = max(_LOB_PAGE_BYTES, self.chunk_size // _LOB_PAGE_BYTES * _LOB_PAGE_BYTES)
+        # 确保游标关闭
+        try:
+            # 创建暂存表（随调用方事务回滚而删除）
+            cursor.execute(f"CREATE TABLE {staging} (data VARBINARY(MAX) NOT NULL)")
+            # 插入空值（.WRITE 不能作用于 NULL，因此写入 0x）
+            cursor.execute(f"INSERT INTO {staging} (data) VALUES (0x)")
+            # 逐块读取上传内容
+            while chunk := stream.read(append_size):
+                # 偏移为 NULL 时 .WRITE 原地追加到末尾（普通 LOB 列支持部分更新）
+                cursor.execute(
+                    # SQL 语句：追加一块
+                    f"UPDATE {staging} SET data.WRITE(?, NULL, NULL)",
+                    # 参数：本块二进制内容（bytes 直接按 varbinary 绑定，避免再复制一份）
+                    chunk,
+                )
+            # 一次写入 FILESTREAM；FILETABLE 内名称须唯一
+            cursor.execute(
+                # SQL 语句：从暂存表插入并输出路径
+                f"""
+                INSERT INTO report_files (name, file_stream)
+                OUTPUT INSERTED.path_locator.ToString()
+                SELECT ?, data FROM {staging}
+                """,
+                # 参数：唯一名称
+                f"{uuid.uuid4().hex}_{filename}",
+            )
+            # 读取存储路径
+            key = cursor.fetchone()[0]
+            # 删除暂存表，释放 tempdb 空间
+            cursor.execute(f"DROP TABLE {staging}")
+        # 最终关闭游标（连接归还由会话负责）
+        finally:
+            cursor.close()
+        # 返回存储键
+        return key
+
+    # 按范围读取
+    def open_range(self, key: str, start: int = 0, length: Optional[int] = None) -> Iterator[bytes]:
+        # 对象信息
+        info = self.stat(key)
+        # 不存在时不产出
+        if info is None:
+            return
+        # 读取终点（不含）
+        end = info.size if length is None else min(info.size, start + length)
+        # 借用游标
+        cursor = self._get_cursor()
+        # 确保游标关闭
+        try:
+            # 逐块读取
+            while start < end:
+                # 本块长度
+                size = min(self.chunk_size, end - start)
+                # SUBSTRING 的起点从 1 开始
+                cursor.execute(
+                    # SQL 语句：读取一块
+                    "SELECT SUBSTRING(file_stream, ?, ?) FROM report_files WHERE path_locator = CAST(? AS hierarchyid)",
+                    # 参数：起点
+                    start + 1,
+                    # 参数：长度
+                    size,
+                    # 参数：存储键
+                    key,
+                )
+                # 产出本块
+                yield cursor.fetchone()[0]
+                # 前进
+                start += size
+        # 最终关闭游标
+        finally:
+            cursor.close()
+
+    # 查看
+    def stat(self, key: str) -> Optional[ObjectStat]:
+        # 借用游标
+        cursor = self._get_cursor()
+        # 确保游标关闭
+        try:
+            # 查询文件大小
+            cursor.execute(
+                # SQL 语句：文件字节数
+                "SELECT DATALENGTH(file_stream) FROM report_files WHERE path_locator = CAST(? AS hierarchyid)",
+                # 参数：存储键
+                key,
+            )
+            # 读取结果
+            row = cursor.fetchone()
+        # 最终关闭游标
+        finally:
+            cursor.close()
+        # 返回对象信息
+        return ObjectStat(key=key, size=row[0] or 0) if row else None
+
+    # 在调用方事务之外写入
+    def put_detached(self, stream: BinaryIO, filename: str, namespace: str = "") -> str:
+        # 每个调用使用连接池中的独立连接并立即提交
+        with SessionLocal() as db:
+            # 写入
+            key = FileTableBackend(db, self.chunk_size).put(stream, filename, namespace)
+            # 提交
+            db.commit()
+        # 返回存储键
+        return key
+
+    # 在调用方事务之外删除
+    def delete_detached(self, key: str) -> None:
+        # 独立连接删除并提交
+        with SessionLocal() as db:
+            # 删除
+            FileTableBackend(db, self.chunk_size).delete(key)
+            # 提交
+            db.commit()
+
+    # 删除
+    def delete(self, key: str) -> None:
+        # 借用游标
+        cursor = self._get_cursor()
+        # 确保游标关闭
+        try:
+            # 删除文件行
+            cursor.execute("DELETE FROM report_files WHERE path_locator = CAST(? AS hierarchyid)", key)
+        # 最终关闭游标
+        finally:
+            cursor.close()
+
+
+# 本地文件系统后端
+class LocalFileBackend(StorageBackend):
+    # 类文档：根目录下的普通文件
+    """
+    Stores objects as files under ``root``.
+
+    Keys are ``/``-separated paths relative to ``root``
+    (``<namespace>/<random>_<filename>``), so two uploads with the same
+    filename never overwrite each other.
+    """
+
+    # 初始化方法
+    def __init__(self, root: str, chunk_size: Optional[int] = None, name: str = BACKEND_LOCAL) -> None:
+        # 后端名称（每个根目录一个名称）
+        self.name = name
+        # 根目录（绝对路径）
+        self.root = os.path.abspath(root)
+        # 每次读写的块大小（字节）
+        self.chunk_size = chunk_size or settings.filetable_chunk_size
+
+    # 键对应的文件路径
+    def path(self, key: str) -> str:
+        # 方法文档：返回对象的绝对路径，拒绝越出根目录的键
+        """Return the absolute file path of ``key`` (usable with mmap/sendfile)."""
+        # 拼接并规范化路径
+        path = os.path.abspath(os.path.join(self.root, *key.split("/")))
+        # 防止目录穿越
+        if os.path.commonpath([self.root, path]) != self.root:
+            raise ValueError(f"Storage key {key!r} escapes the storage root")
+        # 返回路径
+        return path
+
+    # 写入
+    def put(self, stream: BinaryIO, filename: str, namespace: str = "") -> str:
+        # 生成唯一键
+        key = "/".join(part for part in (namespace, f"{uuid.uuid4().hex}_{os.path.basename(filename)}") if part)
+        # 目标路径
+        path = self.path(key)
+        # 创建目录
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # 先写临时文件
+        temp_path = f"{path}.part"
+        # 写入并在失败时清理
+        try:
+            # 打开临时文件
+            with open(temp_path, "wb") as destination:
+                # 逐块复制
+                while chunk := stream.read(self.chunk_size):
+                    destination.write(chunk)
+            # 写完后原子改名
+            os.replace(temp_path, path)
+        # 失败时删除临时文件
+        except BaseException:
+            # 忽略不存在
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            # 继续抛出
+            raise
+        # 返回存储键
+        return key
+
+    # 按范围读取
+    def open_range(self, key: str, start: int = 0, length: Optional[int] = None) -> Iterator[bytes]:
+        # 打开文件
+        try:
+            handle = open(self.path(key), "rb")
+        # 不存在时不产出
+        except FileNotFoundError:
+            return
+        # 确保文件关闭
+        with handle:
+            # 定位到起点
+            handle.seek(start)
+            # 剩余字节数（None 表示读到末尾）
+            remaining = length
+            # 逐块读取
+            while remaining is None or remaining > 0:
+                # 读取一块
+                chunk = handle.read(self.chunk_size if remaining is None else min(self.chunk_size, remaining))
+                # 读到末尾
+                if not chunk:
+                    break
+                # 扣减剩余
+                if remaining is not None:
+                    remaining -= len(chunk)
+                # 产出本块
+                yield chunk
+
+    # 查看
+    def stat(self, key: str) -> Optional[ObjectStat]:
+        # 读取文件信息
+        try:
+            size = os.stat(self.path(key)).st_size
+        # 不存在
+        except FileNotFoundError:
+            return None
+        # 返回对象信息
+        return ObjectStat(key=key, size=size)
+
+    # 删除
+    def delete(self, key: str) -> None:
+        # 删除文件
+        try:
+            os.remove(self.path(key))
+        # 不存在时忽略
+        except FileNotFoundError:
+            pass
+
+
+# 根据配置创建后端
+def get_storage_backend(
+    # 调用方会话（FILETABLE 后端需要）
+    db: Optional[Session] = None,
+    # 后端名称，默认取 settings.storage_backend
+    name: Optional[str] = None,
+    # 本地后端根目录，默认取 settings.storage_local_root
+    local_root: Optional[str] = None,
+) -> StorageBackend:
+    # 函数文档：按名称构建存储后端
+    """Build the storage backend called ``name`` (default: ``settings.storage_backend``)."""
+    # 后端名称
+    name = name or settings.storage_backend
+    # FILETABLE 后端
+    if name == BACKEND_FILETABLE:
+        # 需要会话
+        if db is None:
+            raise ValueError("The filetable storage backend needs a database session")
+        # 返回后端
+        return FileTableBackend(db)
+    # 本地文件系统后端
+    if name == BACKEND_LOCAL:
+        return LocalFileBackend(local_root or settings.storage_local_root)
+    # 产品报表附件的本地文件夹
+    if name == BACKEND_PRODUCT_LOCAL:
+        return LocalFileBackend(local_root or settings.product_report_storage_dir, name=BACKEND_PRODUCT_LOCAL)
+    # 未知后端
+    raise ValueError(f"Unknown storage backend {name!r}")
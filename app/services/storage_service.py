@@ -1,97 +1,134 @@
-# 模块级文档字符串：SQL Server FILETABLE 附件存储服务
-"""Services for storing report attachments in SQL Server FILETABLE."""
+# 模块级文档字符串：报表附件存储服务
+"""Services for storing report attachments through a storage backend."""
 
 # 导入操作系统路径工具
 import os
 # 导入类型注解
-from typing import Iterable, List
+from typing import BinaryIO, List, Optional, Sequence
 
-# 导入 ODBC 驱动
-import pyodbc
 # 导入 FastAPI 上传文件类型
 from fastapi import UploadFile
+# 导入 SQLAlchemy 会话类型
+from sqlalchemy.orm import Session
 
 # 导入配置
 from app.core.config import settings
+# 导入附件数据模型
+from app.models.attachment_models import AttachmentBlob
+# 导入按内容寻址的存储
+from app.services.blob_store import BlobStore
+# 导入存储后端接口
+from app.services.storage_backends import StorageBackend
 
 
-# FILETABLE 存储服务类
-class FileTableStorage:
-    # 类文档：封装 FILETABLE 持久化逻辑
-    """Encapsulates FILETABLE persistence logic."""
+# 附件存储服务类
+class AttachmentStorage:
+    # 类文档：把上传文件去重写入存储后端并生成附件元数据
+    """Writes uploaded report attachments to a storage backend, deduplicated by content."""
 
     # 初始化方法
-    def __init__(self, connection_string: str | None = None) -> None:
-        # 构造函数文档：允许覆盖 ODBC 连接字符串
-        """Initialize with an optional override for the ODBC connection string."""
-        # 优先使用传入连接字符串，否则使用配置默认值
-        self.connection_string = connection_string or settings.odbc_connection_string
-
-    # 获取原始 ODBC 连接
-    def _get_raw_connection(self) -> pyodbc.Connection:
-        # 方法文档：开启自动提交的 ODBC 连接
-        """Open a raw pyodbc connection with autocommit enabled."""
-        # 返回新的 ODBC 连接
-        return pyodbc.connect(self.connection_string, autocommit=True)
+    def __init__(self, db: Session, backend: StorageBackend, concurrency: Optional[int] = None) -> None:
+        # 构造函数文档：绑定会话、存储后端与并发写入数
+        """
+        Initialize with the caller's session, the backend the files are
+        written to, and how many files are written at once (default:
+        ``settings.storage_upload_concurrency``).
+        """
+        # 存储后端
+        self.backend = backend
+        # 按内容寻址的存储
+        self.blobs = BlobStore(db, backend)
+        # 同时写入的文件数
+        self.concurrency = concurrency or settings.storage_upload_concurrency
+        # 本次在会话事务中新写入的存储键（非事务后端提交失败时需删除）
+        self.created_keys: List[str] = []
+        # 本次在事务之外新写入的存储键（提交失败时总需删除）
+        self.detached_keys: List[str] = []
 
-    # 保存附件到 FILETABLE
-    def save_files(self, report_id: int, files: Iterable[UploadFile]) -> List[dict]:
-        # 方法文档：保存文件到 SQL Server FILETABLE
+    # 保存附件
+    def save_files(self, report_id: int, files: Sequence[UploadFile]) -> List[dict]:
+        # 方法文档：并发写入文件并按上传顺序返回附件元数据
         """
-        Save files into SQL Server FILETABLE.
+        Save files to the backend and return ``ReportAttachment`` column dicts
+        in upload order.
 
-        You need to:
-        1. Enable FILESTREAM on SQL Server.
-        2. Create FILETABLE (see scripts/sqlserver_init.sql).
-        3. Grant INSERT/UPDATE permissions.
+        Up to ``concurrency`` files are written at once. With a single file,
+        or ``concurrency == 1``, a transactional backend (FILETABLE) writes on
+        the caller's transaction and ``db.commit()`` persists the files with
+        the report. Concurrent writes each commit on their own pooled
+        connection instead. Either way, call :meth:`discard` if the commit
+        fails.
         """
         # 如果没有附件则返回空列表
         if not files:
             return []
 
-        # 准备保存结果列表
-        saved: List[dict] = []
-        # 打开 ODBC 连接并自动关闭
-        with self._get_raw_connection() as connection:
-            # 获取数据库游标
-            cursor = connection.cursor()
-            # 遍历上传的文件
-            for upload in files:
-                # 规范化文件名并读取内容
-                filename = os.path.basename(upload.filename)
-                # 读取文件二进制内容
-                content = upload.file.read()
+        # 规范化文件名
+        filenames = [os.path.basename(upload.filename) for upload in files]
+        # 是否并发写入
+        concurrent = self.concurrency > 1 and len(files) > 1
+        # 写入或复用相同内容（结果与上传顺序一致）
+        stored = self.blobs.store_many(
+            [(upload.file, filename, upload.content_type) for upload, filename in zip(files, filenames)],
+            self.concurrency,
+        )
+        # 遍历上传的文件，构建 ORM 需要的元数据
+        return [
+            {**self._metadata(filename, upload.content_type, blob, created, concurrent), "report_id": report_id}
+            for upload, filename, (blob, created) in zip(files, filenames, stored)
+        ]
+
+    # 保存一个流式上传
+    def save_stream(self, filename: str, content_type: Optional[str], stream: BinaryIO) -> dict:
+        # 方法文档：用于流式表单解析，报表 ID 由调用方补充
+        """
+        Save one attachment read from ``stream`` (e.g. a streamed multipart
+        part) and return its ``ReportAttachment`` column dict without
+        ``report_id``. Commit semantics are those of a sequential
+        :meth:`save_files`.
+        """
+        # 规范化文件名
+        filename = os.path.basename(filename)
+        # 写入或复用相同内容
+        blob, created = self.blobs.store(stream, filename, content_type)
+        # 返回元数据
+        return self._metadata(filename, content_type, blob, created, detached=False)
 
-                # 向 FILETABLE 插入二进制并返回路径
-                cursor.execute(
-                    # SQL 语句：插入并输出路径
-                    """
-                    INSERT INTO report_files (name, file_stream)
-                    OUTPUT INSERTED.path_locator
-                    VALUES (?, ?)
-                    """,
-                    # 参数：文件名
-                    filename,
-                    # 参数：二进制内容
-                    pyodbc.Binary(content),
-                )
-                # 读取插入后的结果行
-                row = cursor.fetchone()
-                # 获取存储路径
-                storage_path = row[0]
-                # 构建 ORM 需要的元数据
-                saved.append(
-                    {
-                        # 保存文件名
-                        "filename": filename,
-                        # 保存存储路径
-                        "storage_path": storage_path,
-                        # 保存内容类型
-                        "content_type": upload.content_type,
-                        # 保存报表 ID
-                        "report_id": report_id,
-                    }
-                )
+    # 记录并构建附件元数据
+    def _metadata(
+        self, filename: str, content_type: Optional[str], blob: AttachmentBlob, created: bool, detached: bool
+    ) -> dict:
+        # 记录新写入的对象
+        if created:
+            (self.detached_keys if detached else self.created_keys).append(blob.storage_key)
+        # 附件列值
+        return {
+            # 保存文件名
+            "filename": filename,
+            # 保存存储键
+            "storage_path": blob.storage_key,
+            # 保存存储后端
+            "storage_backend": self.backend.name,
+            # 保存共享数据 ID
+            "blob_id": blob.id,
+            # 保存内容类型
+            "content_type": content_type,
+            # 保存原始大小
+            "size": blob.size,
+            # 保存压缩算法
+            "compression": blob.compression,
+        }
 
-        # 返回保存结果列表
-        return saved
+    # 丢弃已写入的文件
+    def discard(self) -> None:
+        # 方法文档：事务失败后删除非事务后端中新写入的文件
+        """Delete the objects this instance newly wrote, after the caller's commit failed."""
+        # 事务之外写入的对象不会随回滚撤销
+        for key in self.detached_keys:
+            self.backend.delete_detached(key)
+        # 事务型后端的其余写入随回滚撤销
+        if self.backend.transactional:
+            return
+        # 逐个删除（复用的已有数据不删除）
+        for key in self.created_keys:
+            self.backend.delete(key)
@@ -0,0 +1,471 @@
+# 模块级文档字符串：可续传分块上传
+"""
+Resumable chunked uploads.
+
+An upload session keeps the bytes received so far in
+``<upload_session_dir>/<session id>``. Each chunk is streamed to that file at
+its offset, optionally verified against a SHA-256 checksum, flushed to disk
+and only then acknowledged by advancing ``received`` with a conditional
+update, so a retried or concurrent chunk can never move the offset twice.
+Finalizing stores the file through the regular attachment services
+(deduplicated by content) and links it to a report or a product report.
+Sessions idle for longer than ``upload_session_ttl_seconds`` are removed by
+:func:`purge_expired_uploads`.
+"""
+
+# 导入 Base64 工具
+import base64
+# 导入哈希工具
+import hashlib
+# 导入操作系统工具
+import os
+# 导入线程工具
+import threading
+# 导入计时工具
+import time
+# 导入唯一 ID 工具
+import uuid
+# 导入时间工具
+from datetime import datetime, timedelta
+# 导入类型注解
+from typing import Iterable, Optional
+
+# 导入 SQLAlchemy 查询与更新工具
+from sqlalchemy import select, update
+# 导入 SQLAlchemy 会话类型
+from sqlalchemy.orm import Session
+
+# 导入配置
+from app.core.config import settings
+# 导入附件数据模型
+from app.models.attachment_models import AttachmentBlob
+# 导入产品报表模型
+from app.models.product_report_models import ProductFullReport
+# 导入报表模型
+from app.models.report_models import Report, ReportAttachment
+# 导入上传会话模型与状态
+from app.models.upload_models import UPLOAD_COMPLETED, UPLOAD_OPEN, UploadSession
+# 导入按内容寻址的存储
+from app.services.blob_store import BlobStore
+# 导入产品报表附件后端
+from app.services.product_report_storage import product_report_backend
+# 导入存储后端选择
+from app.services.storage_backends import get_storage_backend
+# 导入附件存储服务
+from app.services.storage_service import AttachmentStorage
+
+# 上次清理过期会话的时间（monotonic 秒）
+_last_purge = 0.0
+# 保护清理时间
+_purge_lock = threading.Lock()
+
+
+# 偏移或状态冲突
+class UploadConflict(Exception):
+    # 类文档：分块偏移与已接收字节数不符，或会话已完成
+    """Raised when a chunk offset does not match the session, or the session is already finalized."""
+
+
+# 校验和不符
+class ChecksumMismatch(Exception):
+    # 类文档：分块或整文件的 SHA-256 与客户端声明不符
+    """Raised when a chunk or the finished file does not match its declared SHA-256."""
+
+
+# 超出大小限制
+class UploadTooLarge(Exception):
+    # 类文档：写入会超出声明的大小或上限
+    """Raised when a chunk would grow the upload beyond its declared size or the configured maximum."""
+
+
+# 解析分块校验和请求头
+def parse_checksum(header: Optional[str]) -> Optional[bytes]:
+    # 函数文档：格式为 "sha256 <base64 摘要>"
+    """
+    Parse an ``Upload-Checksum: sha256 <base64 digest>`` header into the raw
+    digest; None when the header is absent. Raises ValueError otherwise.
+    """
+    # 没有请求头
+    if not header:
+        return None
+    # 拆分算法与摘要
+    algorithm, _, encoded = header.strip().partition(" ")
+    # 只支持 SHA-256
+    if algorithm.lower() != "sha256":
+        raise ValueError("Only sha256 upload checksums are supported")
+    # 解码摘要
+    try:
+        digest = base64.b64decode(encoded.strip(), validate=True)
+    # 非法 Base64
+    except ValueError as exc:
+        raise ValueError("Upload-Checksum digest is not valid base64") from exc
+    # 长度必须为 32 字节
+    if len(digest) != hashlib.sha256().digest_size:
+        raise ValueError("Upload-Checksum digest has the wrong length")
+    # 返回摘要
+    return digest
+
+
+# 会话数据文件路径
+def upload_path(upload_id: str) -> str:
+    # 函数文档：会话已接收字节所在的本地文件
+    """Return the local file holding the received bytes of an upload."""
+    # 以会话 ID 命名
+    return os.path.join(os.path.abspath(settings.upload_session_dir), upload_id)
+
+
+# 会话过期时间
+def expires_at(upload: UploadSession) -> datetime:
+    # 函数文档：最后活动时间加保留期
+    """Return when an idle upload session becomes eligible for garbage collection."""
+    # 最后活动时间加保留期
+    return upload.updated_at + timedelta(seconds=settings.upload_session_ttl_seconds)
+
+
+# 创建上传会话
+def create_upload(
+    db: Session, filename: str, content_type: Optional[str], size: Optional[int], sha256: Optional[str]
+) -> UploadSession:
+    # 函数文档：创建空数据文件与会话记录并提交
+    """Start an upload session with an empty data file; commits."""
+    # 声明的大小超过上限
+    if size is not None and size > settings.upload_max_bytes:
+        raise UploadTooLarge(f"Uploads are limited to {settings.upload_max_bytes} bytes")
+    # 会话记录
+    upload = UploadSession(
+        # 随机 ID
+        id=uuid.uuid4().hex,
+        # 文件名（去掉目录部分）
+        filename=os.path.basename(filename),
+        # MIME 类型
+        content_type=content_type,
+        # 总字节数
+        size=size,
+        # 整文件摘要
+        sha256=sha256.lower() if sha256 else None,
+        # 尚未接收
+        received=0,
+        # 接收中
+        status=UPLOAD_OPEN,
+    )
+    # 创建目录
+    os.makedirs(os.path.dirname(upload_path(upload.id)), exist_ok=True)
+    # 创建空数据文件
+    open(upload_path(upload.id), "wb").close()
+    # 保存记录
+    db.add(upload)
+    # 提交
+    try:
+        db.commit()
+    # 失败时删除数据文件
+    except Exception:
+        # 回滚
+        db.rollback()
+        # 删除文件
+        _remove(upload_path(upload.id))
+        # 继续抛出
+        raise
+    # 返回会话
+    return upload
+
+
+# 写入一个分块
+def append_chunk(
+    db: Session, upload: UploadSession, offset: int, chunks: Iterable[bytes], checksum: Optional[bytes]
+) -> int:
+    # 函数文档：流式写入偏移处，校验并落盘后才推进偏移
+    """
+    Write the chunk streamed by ``chunks`` at ``offset`` and return the new
+    offset. The chunk is flushed to disk and verified against ``checksum``
+    (raw SHA-256) before the offset advances; on any failure the offset is
+    unchanged and the client retries from it.
+    """
+    # 会话已完成
+    if upload.status != UPLOAD_OPEN:
+        raise UploadConflict("Upload is already finalized")
+    # 偏移不符
+    if offset != upload.received:
+        raise UploadConflict(f"Expected offset {upload.received}")
+    # 允许的最大字节数
+    limit = upload.size if upload.size is not None else settings.upload_max_bytes
+    # 分块哈希
+    digest = hashlib.sha256()
+    # 本次写入的字节数
+    written = 0
+    # 打开数据文件
+    try:
+        handle = open(upload_path(upload.id), "r+b")
+    # 数据文件已被清理
+    except FileNotFoundError as exc:
+        raise UploadConflict("Upload data is gone; start a new upload") from exc
+    # 写入分块
+    with handle:
+        # 定位到偏移
+        handle.seek(offset)
+        # 逐块写入
+        for chunk in chunks:
+            # 超出大小
+            if offset + written + len(chunk) > limit:
+                raise UploadTooLarge(f"Upload would exceed {limit} bytes")
+            # 写入
+            handle.write(chunk)
+            # 更新哈希
+            digest.update(chunk)
+            # 累计字节数
+            written += len(chunk)
+        # 刷新缓冲
+        handle.flush()
+        # 落盘后再确认偏移
+        os.fsync(handle.fileno())
+    # 校验分块
+    if checksum is not None and digest.digest() != checksum:
+        raise ChecksumMismatch("Chunk checksum does not match")
+    # 条件更新：只有偏移未变时才推进
+    result = db.execute(
+        # 更新语句
+        update(UploadSession)
+        # 限定会话、偏移与状态
+        .where(UploadSession.id == upload.id, UploadSession.received == offset, UploadSession.status == UPLOAD_OPEN)
+        # 推进偏移并刷新活动时间
+        .values(received=offset + written, updated_at=datetime.utcnow())
+    )
+    # 并发请求已推进偏移
+    if result.rowcount != 1:
+        db.rollback()
+        raise UploadConflict("Upload offset changed concurrently")
+    # 提交
+    db.commit()
+    # 返回新偏移
+    return offset + written
+
+
+# 完成上传
+def finalize_upload(
+    db: Session, upload: UploadSession, report_id: Optional[int] = None, product_report_id: Optional[int] = None
+) -> UploadSession:
+    # 函数文档：写入存储后端并挂到报表或产品完整报表；重复调用返回相同结果
+    """
+    Store the uploaded file and attach it to ``report_id`` or
+    ``product_report_id``; commits. Finalizing a completed session again
+    for the same target returns it unchanged, including when a concurrent
+    call completes it first. Raises LookupError when the target does not
+    exist.
+    """
+    # 已完成
+    if upload.status == UPLOAD_COMPLETED:
+        # 同一目标时幂等
+        if upload.report_id == report_id and upload.product_report_id == product_report_id:
+            return upload
+        # 不同目标
+        raise UploadConflict("Upload is already finalized")
+    # 未收齐
+    if upload.size is not None and upload.received != upload.size:
+        raise UploadConflict(f"Upload is incomplete: {upload.received} of {upload.size} bytes received")
+    # 条件更新认领会话：并发的完成请求（如客户端重试）等到本事务结束后更新 0 行
+    # 挂载失败回滚时恢复为 open
+    result = db.execute(
+        # 更新语句
+        update(UploadSession)
+        # 限定会话与状态
+        .where(UploadSession.id == upload.id, UploadSession.status == UPLOAD_OPEN)
+        # 偏移未变
+        .where(UploadSession.received == upload.received)
+        # 标记为完成
+        .values(status=UPLOAD_COMPLETED, updated_at=datetime.utcnow())
+    )
+    # 其他请求已完成或推进了偏移
+    if result.rowcount != 1:
+        # 回滚并重新读取会话
+        db.rollback()
+        # 同一目标已由并发请求完成时幂等
+        if upload.status == UPLOAD_COMPLETED and upload.report_id == report_id:
+            # 产品报表也相同
+            if upload.product_report_id == product_report_id:
+                return upload
+        # 其他情况冲突
+        raise UploadConflict("Upload changed concurrently")
+    # 数据文件
+    path = upload_path(upload.id)
+    # 丢弃中断的分块留下的多余字节
+    try:
+        os.truncate(path, upload.received)
+    # 数据文件已被清理
+    except FileNotFoundError as exc:
+        # 释放认领
+        db.rollback()
+        raise UploadConflict("Upload data is gone; start a new upload") from exc
+    # 挂载；目标不存在等失败时释放认领
+    try:
+        # 挂到报表
+        if report_id is not None:
+            _attach_to_report(db, upload, path, report_id)
+        # 挂到产品完整报表
+        else:
+            _attach_to_product_report(db, upload, path, product_report_id)
+    # 回滚认领
+    except Exception:
+        db.rollback()
+        raise
+    # 删除数据文件
+    _remove(path)
+    # 返回会话
+    return upload
+
+
+# 挂到报表
+def _attach_to_report(db: Session, upload: UploadSession, path: str, report_id: int) -> None:
+    # 报表必须存在
+    if db.get(Report, report_id) is None:
+        raise LookupError("Report not found")
+    # 附件存储服务
+    storage = AttachmentStorage(db, get_storage_backend(db))
+    # 写入并提交
+    try:
+        # 打开数据文件（可定位，重复内容无需写入）
+        with open(path, "rb") as stream:
+            attachment = storage.save_stream(upload.filename, upload.content_type, stream)
+        # 校验整文件摘要
+        _verify(db, upload, attachment["blob_id"])
+        # 附件记录
+        row = ReportAttachment(**attachment, report_id=report_id)
+        # 添加并写入以获得 ID
+        db.add(row)
+        db.flush()
+        # 记录结果
+        _complete(upload, report_id=report_id, attachment_id=row.id)
+        # 提交
+        db.commit()
+    # 失败时回滚并删除新写入的对象
+    except Exception:
+        # 回滚
+        db.rollback()
+        # 清理
+        storage.discard()
+        # 继续抛出
+        raise
+
+
+# 挂到产品完整报表
+def _attach_to_product_report(db: Session, upload: UploadSession, path: str, product_report_id: int) -> None:
+    # 产品完整报表必须存在
+    report = db.get(ProductFullReport, product_report_id)
+    # 不存在
+    if report is None:
+        raise LookupError("Product report not found")
+    # 已有附件时不覆盖
+    if report.file_name:
+        raise UploadConflict("Product report already has a file")
+    # 存储后端
+    backend = product_report_backend(db)
+    # 本次新写入的存储键
+    created_key: Optional[str] = None
+    # 写入并提交
+    try:
+        # 打开数据文件
+        with open(path, "rb") as stream:
+            blob, created = BlobStore(db, backend).store(stream, upload.filename, upload.content_type)
+        # 记录新写入的对象
+        created_key = blob.storage_key if created else None
+        # 校验整文件摘要
+        _verify(db, upload, blob.id)
+        # 附件存储键
+        report.file_name = blob.storage_key
+        # 共享数据 ID
+        report.blob_id = blob.id
+        # 记录结果
+        _complete(upload, product_report_id=product_report_id)
+        # 提交
+        db.commit()
+    # 失败时回滚并删除新写入的对象
+    except Exception:
+        # 回滚
+        db.rollback()
+        # 非事务后端需删除
+        if created_key and not backend.transactional:
+            backend.delete(created_key)
+        # 继续抛出
+        raise
+
+
+# 校验整文件摘要
+def _verify(db: Session, upload: UploadSession, blob_id: int) -> None:
+    # 未声明摘要
+    if upload.sha256 is None:
+        return
+    # 数据记录（已在身份映射中）
+    blob = db.get(AttachmentBlob, blob_id)
+    # 摘要不符
+    if blob.sha256 != upload.sha256:
+        raise ChecksumMismatch("File checksum does not match the declared sha256")
+
+
+# 标记完成
+def _complete(upload: UploadSession, **target: int) -> None:
+    # 状态
+    upload.status = UPLOAD_COMPLETED
+    # 目标
+    for name, value in target.items():
+        setattr(upload, name, value)
+    # 活动时间
+    upload.updated_at = datetime.utcnow()
+
+
+# 取消上传
+def cancel_upload(db: Session, upload: UploadSession) -> None:
+    # 函数文档：删除会话记录与数据文件
+    """Delete an upload session and its data; commits."""
+    # 删除记录
+    db.delete(upload)
+    # 提交
+    db.commit()
+    # 删除文件
+    _remove(upload_path(upload.id))
+
+
+# 清理过期会话
+def purge_expired_uploads(db: Session, now: Optional[datetime] = None) -> int:
+    # 函数文档：删除超过保留期未活动的会话及其数据
+    """Delete upload sessions idle for longer than ``upload_session_ttl_seconds``; commits. Returns the count."""
+    # 过期时间点
+    cutoff = (now or datetime.utcnow()) - timedelta(seconds=settings.upload_session_ttl_seconds)
+    # 过期会话
+    expired = list(db.scalars(select(UploadSession).where(UploadSession.updated_at < cutoff)))
+    # 删除记录
+    for upload in expired:
+        db.delete(upload)
+    # 提交
+    db.commit()
+    # 删除数据文件
+    for upload in expired:
+        _remove(upload_path(upload.id))
+    # 返回数量
+    return len(expired)
+
+
+# 按间隔清理过期会话
+def maybe_purge_expired_uploads(db: Session) -> None:
+    # 函数文档：每个进程最多每 upload_gc_interval_seconds 清理一次
+    """Run :func:`purge_expired_uploads` at most once per ``upload_gc_interval_seconds`` in this process."""
+    # 全局时间戳
+    global _last_purge
+    # 当前时间
+    current = time.monotonic()
+    # 加锁判断
+    with _purge_lock:
+        # 间隔未到
+        if current - _last_purge < settings.upload_gc_interval_seconds:
+            return
+        # 记录时间
+        _last_purge = current
+    # 清理
+    purge_expired_uploads(db)
+
+
+# 删除文件
+def _remove(path: str) -> None:
+    # 删除
+    try:
+        os.remove(path)
+    # 不存在时忽略
+    except FileNotFoundError:
+        pass
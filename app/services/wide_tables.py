@@ -0,0 +1,217 @@
+# 模块级文档字符串：按报表类型生成的宽表存储
+"""
+Wide-table storage: one generated table per report type, one column per field.
+
+A report type in ``wide`` storage mode keeps its field values in
+``report_data_<report_type_id>`` (primary key ``report_id``) with a column
+``f_<field_id>`` per FieldSchema, typed from ``field_type``. Tables are
+described with SQLAlchemy Core on a private MetaData so they never take part
+in ``Base.metadata.create_all``.
+"""
+
+# 导入日期时间类型
+from datetime import datetime
+# 导入高精度小数类型
+from decimal import Decimal
+# 导入类型注解
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+# 导入 SQLAlchemy Core 工具
+from sqlalchemy import (
+    # 大整数类型
+    BigInteger,
+    # 布尔类型
+    Boolean,
+    # 列定义
+    Column,
+    # 日期时间类型
+    DateTime,
+    # 外键
+    ForeignKey,
+    # 整数类型
+    Integer,
+    # 元数据容器
+    MetaData,
+    # 高精度小数类型
+    Numeric,
+    # 表定义
+    Table,
+    # 文本类型
+    Text,
+    # 原始 SQL 文本
+    text,
+)
+# 导入 SQLAlchemy 连接类型
+from sqlalchemy.engine import Connection
+
+# 导入报表模型
+from app.models.report_models import Report
+# 导入字段值转换工具
+from app.services.field_values import typed_column, value_columns
+# 导入字段结构
+from app.services.schema_registry import FieldSchema
+
+# 类型化列到宽表列类型的映射
+_COLUMN_TYPES = {
+    # 整数
+    "value_int": BigInteger,
+    # 小数
+    "value_decimal": lambda: Numeric(38, 10),
+    # 日期时间
+    "value_date": DateTime,
+    # 布尔
+    "value_bool": Boolean,
+}
+
+
+# 宽表名称
+def wide_table_name(report_type_id: int) -> str:
+    # 函数文档：返回报表类型对应的宽表名称
+    """Return the physical table name for a report type."""
+    # 按类型 ID 命名，避免名称转义问题
+    return f"report_data_{report_type_id}"
+
+
+# 宽表列名称
+def wide_column_name(field_id: int) -> str:
+    # 函数文档：返回字段对应的列名称
+    """Return the column name for a field; ids keep names stable across renames."""
+    # 按字段 ID 命名
+    return f"f_{field_id}"
+
+
+# 构建宽表列
+def wide_column(field: FieldSchema) -> Column:
+    # 函数文档：按字段类型构建可空列
+    """Build the nullable column for a field, typed from its field_type."""
+    # 查找类型化列
+    column = typed_column(field.field_type)
+    # 文本字段使用 Text，其余按类型
+    column_type = _COLUMN_TYPES[column]() if column else Text()
+    # 返回列定义
+    return Column(wide_column_name(field.id), column_type, nullable=True)
+
+
+# 构建宽表定义
+def wide_table(report_type_id: int, fields: Iterable[FieldSchema]) -> Table:
+    # 函数文档：描述报表类型的宽表（不访问数据库）
+    """Describe the wide table of a report type with the given fields."""
+    # 返回表定义
+    return Table(
+        # 表名
+        wide_table_name(report_type_id),
+        # 私有元数据，不参与 create_all
+        MetaData(),
+        # 主键：报表 ID
+        Column("report_id", Integer, ForeignKey(Report.__table__.c.id), primary_key=True, autoincrement=False),
+        # 每个字段一列
+        *(wide_column(field) for field in fields),
+    )
+
+
+# 创建宽表
+def create_wide_table(connection: Connection, report_type_id: int, fields: Iterable[FieldSchema]) -> Table:
+    # 函数文档：在当前事务中创建宽表（已存在则跳过）
+    """Create the wide table inside the caller's transaction if it does not exist."""
+    # 构建表定义
+    table = wide_table(report_type_id, fields)
+    # 只创建本表（外键直接引用 reports 表的列对象）
+    table.create(connection, checkfirst=True)
+    # 返回表定义
+    return table
+
+
+# 为宽表增加列
+def add_wide_column(connection: Connection, report_type_id: int, field: FieldSchema) -> None:
+    # 函数文档：在当前事务中为新字段增加一列
+    """Add a nullable column for a new field inside the caller's transaction."""
+    # 构建列定义
+    column = wide_column(field)
+    # 标识符转义器
+    preparer = connection.dialect.identifier_preparer
+    # 执行 ALTER TABLE（SQL Server 不支持 ADD COLUMN 关键字）
+    connection.execute(
+        text(
+            f"ALTER TABLE {preparer.quote(wide_table_name(report_type_id))} "
+            f"ADD {preparer.quote(column.name)} {column.type.compile(dialect=connection.dialect)} NULL"
+        )
+    )
+
+
+# 组装宽表行
+def wide_row(report_id: int, fields: Sequence[FieldSchema], values: Dict[str, Any]) -> Dict[str, Any]:
+    # 函数文档：把提交的字段值转换为一行宽表参数
+    """
+    Convert submitted values into one wide-table row. Every field column is
+    present so rows can be bulk-inserted; raises ``ValueError`` for values
+    that do not fit their field type.
+    """
+    # 行参数，先全部置空
+    row: Dict[str, Any] = {"report_id": report_id, **{wide_column_name(field.id): None for field in fields}}
+    # 遍历字段
+    for field in fields:
+        # 未提交的字段保持为空
+        if field.name not in values:
+            continue
+        # 按字段类型转换
+        try:
+            columns = value_columns(field.field_type, values[field.name])
+        # 附带字段名称重新抛出
+        except ValueError as exc:
+            raise ValueError(f"Invalid value for field {field.name!r}: {exc}") from exc
+        # 查找类型化列
+        column = typed_column(field.field_type)
+        # 类型化字段取类型化值，文本字段取文本值
+        row[wide_column_name(field.id)] = columns[column] if column else columns["value"]
+    # 返回行参数
+    return row
+
+
+# 批量读取宽表中的字段值
+def load_wide_values(
+    # 数据库连接
+    connection: Connection,
+    # 报表类型 ID
+    report_type_id: int,
+    # 字段定义
+    fields: Sequence[FieldSchema],
+    # 报表 ID 列表
+    report_ids: List[int],
+) -> Dict[int, Dict[str, Optional[str]]]:
+    # 函数文档：一次查询读取多份报表的字段值
+    """Read the values of many reports with one query, as {report_id: {name: text}}."""
+    # 构建表定义
+    table = wide_table(report_type_id, fields)
+    # 查询报表行
+    rows = connection.execute(table.select().where(table.c.report_id.in_(report_ids)))
+    # 转换为字段名到文本值的映射（与 EAV 一样省略空值）
+    return {
+        # 报表 ID
+        row.report_id: {
+            # 字段名称到文本值
+            field.name: format_wide_value(field.field_type, row._mapping[wide_column_name(field.id)])
+            # 遍历字段
+            for field in fields
+            # 只保留有值的字段
+            if row._mapping[wide_column_name(field.id)] is not None
+        }
+        # 遍历查询结果
+        for row in rows
+    }
+
+
+# 把宽表中的类型化值格式化为文本
+def format_wide_value(field_type: str, value: Any) -> Optional[str]:
+    # 函数文档：类型化值转为与 ReportRead.values 一致的文本
+    """Render a typed wide-table value as the text form used by ReportRead.values."""
+    # 空值
+    if value is None:
+        return None
+    # 小数去掉多余的尾随零
+    if isinstance(value, Decimal):
+        return format(value.normalize(), "f")
+    # 日期字段只输出日期部分
+    if isinstance(value, datetime):
+        return value.date().isoformat() if (field_type or "").lower() == "date" else value.isoformat()
+    # 其余直接转文本
+    return str(value)
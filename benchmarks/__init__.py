@@ -0,0 +1,2 @@
+# 模块级文档字符串：性能基准脚本
+"""Benchmark scripts for the RMS backend (run with ``python -m benchmarks.<name>``)."""
@@ -0,0 +1,79 @@
+# 模块级文档字符串：基准脚本共用的工具
+"""Shared helpers for benchmark scripts."""
+
+# 导入操作系统工具
+import os
+# 导入临时目录工具
+import tempfile
+# 导入计时工具
+import time
+# 导入上下文管理工具
+from contextlib import contextmanager
+# 导入类型注解
+from typing import Iterator, List
+
+
+# 切换到本地 SQLite 数据库
+def use_sqlite(name: str = "bench.db") -> str:
+    # 函数文档：在导入应用前把数据库指向临时 SQLite 文件
+    """
+    Point the app at a fresh SQLite file in a temporary directory.
+
+    Must be called before anything under ``app`` is imported, because the
+    settings object and engine are created at import time.
+    """
+    # 创建临时目录
+    workdir = tempfile.mkdtemp(prefix="rms-bench-")
+    # 构建数据库文件路径
+    path = os.path.join(workdir, name)
+    # 设置数据库连接字符串
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    # 返回临时目录
+    return workdir
+
+
+# 创建数据库结构
+def migrate_schema() -> None:
+    # 函数文档：应用启动不再建表，基准在使用应用前先执行迁移
+    """
+    Apply the schema migrations to the configured database. The app does not
+    create tables at startup; call this after :func:`use_sqlite` (and any
+    other environment setup) and before the first request.
+    """
+    # 延迟导入数据库引擎（依赖前面设置的环境变量）
+    from app.core.database import engine
+    # 延迟导入迁移工具
+    from app.migrations import migrate
+
+    # 执行迁移
+    migrate(engine)
+
+
+# 计时上下文
+@contextmanager
+def timer(samples: List[float]) -> Iterator[None]:
+    # 函数文档：把代码块耗时（秒）追加到 samples
+    """Append the elapsed wall time of the block, in seconds, to ``samples``."""
+    # 记录开始时间
+    started = time.perf_counter()
+    # 执行代码块
+    try:
+        yield
+    # 记录耗时
+    finally:
+        samples.append(time.perf_counter() - started)
+
+
+# 计算分位数
+def percentile(samples: List[float], pct: float) -> float:
+    # 函数文档：最近秩法计算分位数
+    """Return the nearest-rank percentile of ``samples``."""
+    # 空样本返回 0
+    if not samples:
+        return 0.0
+    # 排序样本
+    ordered = sorted(samples)
+    # 计算秩
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    # 返回对应值
+    return ordered[rank]
@@ -0,0 +1,203 @@
+# 模块级文档字符串：同步与异步处理器在高并发下的吞吐与尾延迟
+"""
+Compare requests/sec and tail latency of the read routes with
+``DATABASE_ASYNC=false`` (sync handlers in the thread pool) and ``true``
+(async handlers on the async engine) at high concurrency.
+
+Usage::
+
+    python -m benchmarks.bench_async_handlers [--concurrency 50 200 500]
+        [--requests 2000] [--latency-ms 5] [--reports 200] [--pool N]
+
+Each mode runs in its own process (settings are read at import time) on a
+temporary SQLite database, driven in-process through httpx's ASGI
+transport. ``--latency-ms`` adds a delay to every SQL statement to stand in
+for SQL Server round trips: a blocking sleep on the sync engine, an awaited
+one on the async engine. The report cache is disabled so every request
+reaches the database.
+
+``--pool`` sizes both connection pools (default: the highest concurrency
+plus the 40 thread-pool threads). In sync mode a finished request keeps its
+connection until ``get_db`` is closed, which itself needs a thread-pool
+thread; with a smaller pool the threads can all end up waiting for a
+connection and requests fail after ``DB_POOL_TIMEOUT`` (10 s here). Failed
+requests are counted in ``errors``.
+"""
+
+# 导入命令行参数解析
+import argparse
+# 导入异步工具
+import asyncio
+# 导入 JSON 工具
+import json
+# 导入操作系统工具
+import os
+# 导入子进程工具
+import subprocess
+# 导入解释器信息
+import sys
+# 导入计时工具
+import time
+# 导入类型注解
+from typing import List
+
+# 导入基准公共工具
+from benchmarks._common import migrate_schema, percentile, use_sqlite
+
+
+# 单个模式的测量（在子进程中运行）
+async def _measure(args: argparse.Namespace) -> dict:
+    # 延迟导入 HTTP 客户端
+    import httpx
+    # 延迟导入 SQLAlchemy 事件与 greenlet 等待工具
+    from sqlalchemy import event
+    from sqlalchemy.util import await_
+
+    # 延迟导入应用
+    from app.core.database import async_engine, engine
+    from app.main import app
+
+    # 创建数据库结构
+    migrate_schema()
+    # 每条语句的模拟延迟（秒）
+    delay = args.latency_ms / 1000
+    # 同步引擎：阻塞休眠（占住线程池线程）
+    if delay:
+        event.listen(engine, "before_cursor_execute", lambda *_: time.sleep(delay))
+    # 异步引擎：在 greenlet 中等待（让出事件循环）
+    if delay and async_engine is not None:
+        event.listen(async_engine.sync_engine, "before_cursor_execute", lambda *_: await_(asyncio.sleep(delay)))
+    # 进程内 ASGI 客户端
+    transport = httpx.ASGITransport(app=app)
+    # 创建客户端
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        # 报表类型与字段
+        await client.post("/report-types", json={"name": "bench"})
+        await client.post("/report-types/1/fields", json={"name": "serial", "label": "Serial", "field_type": "text"})
+        # 批量写入报表
+        await client.post(
+            "/reports/batch",
+            json=[
+                {"report_type_id": 1, "title": f"r{index}", "values": {"serial": f"S{index:05d}"}}
+                for index in range(args.reports)
+            ],
+        )
+        # 请求路径：单个报表与分页列表交替
+        paths = [
+            f"/reports/{index % args.reports + 1}" if index % 2 else "/reports?report_type_id=1&limit=20"
+            for index in range(args.requests)
+        ]
+        # 结果
+        results: dict = {}
+        # 逐个并发度
+        for concurrency in args.concurrency:
+            # 并发上限
+            gate = asyncio.Semaphore(concurrency)
+            # 延迟样本
+            samples: List[float] = []
+            # 失败请求数
+            errors = 0
+
+            # 单个请求
+            async def call(path: str) -> None:
+                # 累计失败数
+                nonlocal errors
+                # 限制并发
+                async with gate:
+                    # 开始时间
+                    started = time.perf_counter()
+                    # 发送请求（应用异常也计为失败）
+                    try:
+                        ok = (await client.get(path)).is_success
+                    # 应用内未处理的异常
+                    except Exception:
+                        ok = False
+                    # 记录耗时
+                    samples.append(time.perf_counter() - started)
+                    # 记录失败
+                    errors += not ok
+
+            # 开始时间
+            started = time.perf_counter()
+            # 并发发送全部请求
+            await asyncio.gather(*(call(path) for path in paths))
+            # 总耗时
+            elapsed = time.perf_counter() - started
+            # 记录
+            results[str(concurrency)] = {
+                # 吞吐
+                "rps": round(len(paths) / elapsed, 1),
+                # 中位延迟
+                "p50_ms": round(percentile(samples, 50) * 1000, 1),
+                # 尾延迟
+                "p99_ms": round(percentile(samples, 99) * 1000, 1),
+                # 失败请求数
+                "errors": errors,
+            }
+    # 返回结果
+    return results
+
+
+# 基准入口
+def main() -> None:
+    # 函数文档：分别以两种模式运行并打印结果
+    """Run the benchmark in both modes and print a JSON summary."""
+    # 定义命令行参数
+    parser = argparse.ArgumentParser(description=__doc__)
+    # 并发度
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[50, 200, 500])
+    # 每个并发度的请求数
+    parser.add_argument("--requests", type=int, default=2000)
+    # 每条语句的模拟延迟（毫秒）
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    # 预置报表数
+    parser.add_argument("--reports", type=int, default=200)
+    # 连接池大小（默认最高并发度加线程池大小）
+    parser.add_argument("--pool", type=int, default=None)
+    # 子进程内部使用：只运行当前模式
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    # 解析参数
+    args = parser.parse_args()
+
+    # 子进程：测量当前环境变量指定的模式
+    if args.child:
+        # 临时 SQLite 数据库
+        use_sqlite()
+        # 关闭报表缓存，每次请求都访问数据库
+        os.environ["REPORT_CACHE_BACKEND"] = "none"
+        # 连接池大小（不使用溢出连接）
+        os.environ["DB_POOL_SIZE"] = str(args.pool or max(args.concurrency) + 40)
+        os.environ["DB_MAX_OVERFLOW"] = "0"
+        # 等待连接的超时
+        os.environ["DB_POOL_TIMEOUT"] = "10"
+        # 输出结果
+        print(json.dumps(asyncio.run(_measure(args))))
+        return
+
+    # 汇总
+    summary: dict = {"requests": args.requests, "latency_ms": args.latency_ms}
+    # 两种模式
+    for label, flag in (("sync", "false"), ("async", "true")):
+        # 在子进程中运行
+        output = subprocess.run(
+            # 同样的参数加上子进程标记
+            [sys.executable, "-m", "benchmarks.bench_async_handlers", *sys.argv[1:], "--child"],
+            # 指定模式
+            env={**os.environ, "DATABASE_ASYNC": flag},
+            # 捕获输出
+            capture_output=True,
+            # 文本模式
+            text=True,
+            # 失败时抛出
+            check=True,
+        )
+        # 最后一行是结果
+        summary[label] = json.loads(output.stdout.strip().splitlines()[-1])
+
+    # 输出结果
+    print(json.dumps(summary, indent=2))
+
+
+# 脚本入口
+if __name__ == "__main__":
+    main()
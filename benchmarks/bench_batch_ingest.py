@@ -0,0 +1,109 @@
+# 模块级文档字符串：单条创建与批量创建的吞吐对比
+"""
+Compare report ingestion throughput of POST /reports and POST /reports/batch.
+
+Usage::
+
+    python -m benchmarks.bench_batch_ingest --reports 2000 --fields 20
+"""
+
+# 导入命令行参数解析
+import argparse
+# 导入 JSON 工具
+import json
+
+# 导入基准公共工具
+from benchmarks._common import migrate_schema, timer, use_sqlite
+
+
+# 基准入口
+def main() -> None:
+    # 函数文档：运行基准并打印结果
+    """Run the benchmark and print a JSON summary."""
+    # 定义命令行参数
+    parser = argparse.ArgumentParser(description=__doc__)
+    # 报表数量
+    parser.add_argument("--reports", type=int, default=2000)
+    # 每个报表类型的字段数量
+    parser.add_argument("--fields", type=int, default=20)
+    # 每个批次的报表数量
+    parser.add_argument("--batch-size", type=int, default=1000)
+    # 解析参数
+    args = parser.parse_args()
+
+    # 在导入应用前切换到 SQLite
+    use_sqlite()
+    # 延迟导入测试客户端
+    from fastapi.testclient import TestClient
+
+    # 延迟导入应用
+    from app.main import app
+
+    # 创建数据库结构
+    migrate_schema()
+    # 创建测试客户端
+    client = TestClient(app)
+    # 创建报表类型
+    report_type = client.post("/report-types", json={"name": "bench"}).json()
+    # 创建字段
+    for index in range(args.fields):
+        client.post(
+            # 字段创建接口
+            f"/report-types/{report_type['id']}/fields",
+            # 字段定义
+            json={"name": f"f{index}", "label": f"F{index}"},
+        )
+    # 每个报表的字段值
+    values = {f"f{index}": f"value-{index}" for index in range(args.fields)}
+
+    # 单条路径耗时
+    single: list = []
+    # 逐条创建报表
+    with timer(single):
+        for index in range(args.reports):
+            client.post(
+                # 单条创建接口
+                "/reports",
+                # 表单字段
+                data={"report_type_id": report_type["id"], "title": f"s{index}", "values": json.dumps(values)},
+            )
+
+    # 批量路径耗时
+    batched: list = []
+    # 按批次创建报表
+    with timer(batched):
+        for start in range(0, args.reports, args.batch_size):
+            client.post(
+                # 批量创建接口
+                "/reports/batch",
+                # 当前批次条目
+                json=[
+                    {"report_type_id": report_type["id"], "title": f"b{index}", "values": values}
+                    # 遍历当前批次序号
+                    for index in range(start, min(start + args.batch_size, args.reports))
+                ],
+            )
+
+    # 打印结果
+    print(
+        json.dumps(
+            {
+                # 报表数量
+                "reports": args.reports,
+                # 字段数量
+                "fields": args.fields,
+                # 单条路径吞吐
+                "single_reports_per_sec": round(args.reports / single[0], 1),
+                # 批量路径吞吐
+                "batch_reports_per_sec": round(args.reports / batched[0], 1),
+                # 加速比
+                "speedup": round(single[0] / batched[0], 1),
+            },
+            indent=2,
+        )
+    )
+
+
+# 脚本入口
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+# 模块级文档字符串：附件压缩的空间节省与 CPU 开销
+"""
+Measure storage saved against CPU cost of attachment compression.
+
+Synthetic CSV, log, uncompressed TIFF-like and already-compressed (random)
+payloads are compressed with every available codec at the level
+:func:`app.services.compression.compression_for` picks for their content
+type, then inflated again the way a download does. ``policy`` shows what
+``STORAGE_COMPRESSION=auto`` would store each type as.
+
+Usage::
+
+    python -m benchmarks.bench_compression [--mb 16] [--repeat 3]
+"""
+
+# 导入命令行参数解析
+import argparse
+# 导入内存流
+import io
+# 导入 JSON 工具
+import json
+# 导入操作系统工具
+import os
+# 导入随机数工具
+import random
+# 导入类型注解
+from typing import Dict, List
+
+# 导入基准公共工具
+from benchmarks._common import percentile, timer, use_sqlite
+
+
+# 生成 CSV 样本
+def _csv(size: int, rng: random.Random) -> bytes:
+    # 行缓冲
+    lines: List[str] = ["timestamp,sensor,value,status"]
+    # 累计长度
+    total = 0
+    # 直到达到目标大小
+    while total < size:
+        # 一行
+        line = f"2024-03-{rng.randint(1, 28):02d}T{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:00," \
+            f"sensor-{rng.randint(1, 40)},{rng.uniform(10, 90):.3f},{rng.choice(['OK', 'OK', 'OK', 'WARN'])}"
+        # 追加
+        lines.append(line)
+        total += len(line) + 1
+    # 返回字节
+    return "\n".join(lines).encode()[:size]
+
+
+# 生成日志样本
+def _log(size: int, rng: random.Random) -> bytes:
+    # 消息模板
+    messages = ["request completed", "cache miss for report", "retrying upload chunk", "connection returned to pool"]
+    # 行缓冲
+    lines: List[str] = []
+    # 累计长度
+    total = 0
+    # 直到达到目标大小
+    while total < size:
+        # 一行
+        line = f"2024-03-01 12:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d} " \
+            f"{rng.choice(['INFO', 'INFO', 'DEBUG', 'WARNING'])} app.worker[{rng.randint(1, 8)}] " \
+            f"{rng.choice(messages)} id={rng.randint(1, 10 ** 6)} elapsed_ms={rng.randint(1, 900)}"
+        # 追加
+        lines.append(line)
+        total += len(line) + 1
+    # 返回字节
+    return "\n".join(lines).encode()[:size]
+
+
+# 生成未压缩图像样本
+def _raster(size: int, rng: random.Random) -> bytes:
+    # 图像宽度
+    width = 2048
+    # 行缓冲
+    rows = bytearray()
+    # 逐行生成平滑渐变加少量噪声
+    for row in range(size // width + 1):
+        rows += bytes(((column + row) // 8 + rng.randint(0, 3)) & 0xFF for column in range(width))
+    # 截断到目标大小
+    return bytes(rows[:size])
+
+
+# 基准入口
+def main() -> None:
+    # 函数文档：运行基准并打印结果
+    """Run the benchmark and print a JSON summary."""
+    # 定义命令行参数
+    parser = argparse.ArgumentParser(description=__doc__)
+    # 每个样本大小（MB）
+    parser.add_argument("--mb", type=int, default=16)
+    # 重复次数
+    parser.add_argument("--repeat", type=int, default=3)
+    # 解析参数
+    args = parser.parse_args()
+
+    # 在导入应用前切换到 SQLite
+    use_sqlite()
+    # 延迟导入应用
+    from app.core.config import settings
+    from app.services import compression
+
+    # 样本字节数
+    size = args.mb * 1024 * 1024
+    # 固定随机种子
+    rng = random.Random(0)
+    # 样本：(名称, MIME 类型, 内容)
+    samples = [
+        ("csv", "text/csv", _csv(size, rng)),
+        ("log", "text/plain", _log(size, rng)),
+        ("tiff", "image/tiff", _raster(size, rng)),
+        ("jpeg", "image/jpeg", os.urandom(size)),
+    ]
+    # 可用算法
+    codecs = [compression.CODEC_GZIP] + ([compression.CODEC_ZSTD] if compression.zstandard is not None else [])
+    # 结果
+    summary: Dict[str, dict] = {}
+    # 逐个样本
+    for name, content_type, payload in samples:
+        # 按 auto 的策略
+        settings.storage_compression = "auto"
+        # 策略选择
+        policy = compression.compression_for(content_type)
+        # 本样本结果
+        result: dict = {"content_type": content_type, "policy": policy[0] if policy else "stored as-is"}
+        # 逐个算法（已压缩格式也强制测量一次，说明为何跳过）
+        for codec in codecs:
+            # 该类型的级别（已压缩格式按二进制级别）
+            settings.storage_compression = codec
+            level = (compression.compression_for(content_type) or (codec, compression._LEVELS["binary"][codec]))[1]
+            # 压缩与解压耗时
+            compress_samples: List[float] = []
+            inflate_samples: List[float] = []
+            # 压缩后大小
+            stored = 0
+            # 重复测量
+            for _ in range(args.repeat):
+                # 计时压缩
+                with timer(compress_samples):
+                    # 压缩流
+                    reader = compression.CompressingReader(io.BytesIO(payload), codec, level)
+                    # 按后端的块大小读取
+                    parts = list(iter(lambda: reader.read(settings.filetable_chunk_size), b""))
+                # 压缩后大小
+                stored = reader.size
+                # 计时解压
+                with timer(inflate_samples):
+                    # 解压全部内容
+                    inflated = sum(len(chunk) for chunk in compression.decompressed_range(iter(parts), codec))
+                # 确认无损
+                assert inflated == len(payload)
+            # 中位耗时
+            compress_s = percentile(compress_samples, 50)
+            inflate_s = percentile(inflate_samples, 50)
+            # 记录
+            result[codec] = {
+                # 压缩级别
+                "level": level,
+                # 压缩后占原大小的比例
+                "ratio": round(stored / len(payload), 3),
+                # 节省的 MB
+                "saved_mb": round((len(payload) - stored) / 1024 / 1024, 1),
+                # 压缩吞吐
+                "compress_mb_s": round(args.mb / compress_s, 1),
+                # 解压吞吐
+                "inflate_mb_s": round(args.mb / inflate_s, 1),
+            }
+        # 记录样本
+        summary[name] = result
+
+    # 输出结果
+    print(json.dumps({"mb_per_sample": args.mb, "results": summary}, indent=2))
+
+
+# 脚本入口
+if __name__ == "__main__":
+    main()
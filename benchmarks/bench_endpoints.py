@@ -0,0 +1,645 @@
+# 模块级文档字符串：各主要接口的负载基准，结果写入 JSON 文件并可与基线比较
+"""
+Load benchmark of the main endpoints on a seeded SQLite database.
+
+Usage::
+
+    python -m benchmarks.bench_endpoints [--reports 100000] [--report-types 5] [--fields 40]
+        [--attachments 1000] [--concurrency 1 16 64] [--requests 500] [--latency-ms 0]
+        [--scenarios reports_get reports_list ...] [--seed 1] [--seed-cache DIR]
+        [--output bench_endpoints.json] [--baseline old.json] [--tolerance 0.1]
+
+The app runs in-process behind httpx's ASGI transport on a temporary
+SQLite database, with the local storage backend (a temporary folder) for
+report attachments and product report files. Seeding goes through the API:
+``--report-types`` types (alternately ``eav`` and ``wide``) with
+``--fields`` typed fields each, ``--reports`` reports via
+``POST /reports/batch`` and ``--attachments`` more via ``POST /reports``
+with one file each. Seeding 100k reports takes minutes; with
+``--seed-cache`` the seeded database and files are saved to that folder and
+copied into the temporary folder by later runs with the same seeding
+arguments, so every run starts from identical data.
+
+Every scenario runs ``--requests`` requests (after a few warm-up requests)
+at each ``--concurrency``, and reports requests/sec, p50/p95/p99 latency,
+failed requests and the SQL round trips per request read from the
+``Server-Timing`` header (``SQL_INSTRUMENTATION``). Request parameters are
+drawn from a random generator seeded per scenario and concurrency, so two
+runs with the same arguments send the same requests. ``--latency-ms`` adds a
+delay to every SQL statement after seeding, to stand in for SQL Server
+round trips (blocking on the sync engine, awaited on the async engine when
+``DATABASE_ASYNC`` is on).
+
+The summary is printed and written to ``--output``. With ``--baseline``,
+every figure is compared with the same scenario and concurrency of an
+earlier output; a throughput drop, latency rise or query count rise of more
+than ``--tolerance`` (relative) is listed under ``regressions`` and the
+script exits with status 1.
+"""
+
+# 导入命令行参数解析
+import argparse
+# 导入异步工具
+import asyncio
+# 导入日期工具
+import datetime
+# 导入 JSON 工具
+import json
+# 导入操作系统工具
+import os
+# 导入平台信息
+import platform
+# 导入随机数工具
+import random
+# 导入正则表达式
+import re
+# 导入文件复制工具
+import shutil
+# 导入子进程工具
+import subprocess
+# 导入解释器信息
+import sys
+# 导入计时工具
+import time
+# 导入类型注解
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# 导入基准公共工具
+from benchmarks._common import migrate_schema, percentile, use_sqlite
+
+# 从 Server-Timing 头读取语句数
+_QUERIES = re.compile(r'desc="(\d+) queries')
+# 每个场景在计时前的预热请求数
+_WARMUP = 20
+# 等级字段的取值（低基数，用于过滤）
+_GRADES = ("A", "B", "C", "D", "E")
+# 与基线比较的指标：名称与方向（1 越大越好，-1 越小越好）
+_COMPARED = {"rps": 1, "p50_ms": -1, "p95_ms": -1, "p99_ms": -1, "queries_mean": -1}
+# 决定预置数据内容的参数（预置缓存按此匹配）
+_SEED_ARGS = ("reports", "report_types", "fields", "attachments", "attachment_kb")
+# 请求描述：方法、路径与 httpx 参数
+RequestSpec = Tuple[str, str, Dict[str, Any]]
+
+
+# 报表类型的字段定义
+def _field_definitions(count: int) -> List[dict]:
+    # 函数文档：前几个字段供过滤与排序，其余按类型轮换
+    """Return ``count`` field definitions: fixed lookup fields, then a rotation of types."""
+    # 固定字段：唯一编号、低基数等级、整数、日期、布尔
+    fixed = [
+        {"name": "serial", "label": "Serial", "field_type": "text"},
+        {"name": "grade", "label": "Grade", "field_type": "text"},
+        {"name": "quantity", "label": "Quantity", "field_type": "int"},
+        {"name": "measured_on", "label": "Measured on", "field_type": "date"},
+        {"name": "passed", "label": "Passed", "field_type": "bool"},
+    ]
+    # 其余字段轮换的类型
+    rotation = ("text", "decimal", "text", "int")
+    # 补足字段数
+    extra = [
+        {"name": f"f{index}", "label": f"F{index}", "field_type": rotation[index % len(rotation)]}
+        for index in range(len(fixed), count)
+    ]
+    # 返回定义
+    return (fixed + extra)[:count]
+
+
+# 单个报表的字段值
+def _field_values(fields: List[dict], number: int) -> Dict[str, Any]:
+    # 函数文档：按编号确定的字段值，重复运行数据相同
+    """Return deterministic values of ``fields`` for report ``number``."""
+    # 字段值
+    values: Dict[str, Any] = {}
+    # 逐个字段
+    for field in fields:
+        # 字段名称
+        name = field["name"]
+        # 唯一编号
+        if name == "serial":
+            values[name] = f"SN{number:08d}"
+        # 低基数等级
+        elif name == "grade":
+            values[name] = _GRADES[number % len(_GRADES)]
+        # 布尔值
+        elif field["field_type"] == "bool":
+            values[name] = number % 3 != 0
+        # 日期
+        elif field["field_type"] == "date":
+            values[name] = (datetime.date(2024, 1, 1) + datetime.timedelta(days=number % 365)).isoformat()
+        # 整数
+        elif field["field_type"] == "int":
+            values[name] = number % 1000
+        # 小数
+        elif field["field_type"] == "decimal":
+            values[name] = f"{number % 997}.{number % 100:02d}"
+        # 文本
+        else:
+            values[name] = f"{name}-value-{number % 50}"
+    # 返回字段值
+    return values
+
+
+# 预置数据
+async def _seed(client: Any, args: argparse.Namespace) -> dict:
+    # 函数文档：通过接口创建报表类型、字段、报表与带附件的报表
+    """Create the report types, fields, reports and attachments through the API."""
+    # 延迟导入配置（批量上限）
+    from app.core.config import settings
+
+    # 开始时间
+    started = time.perf_counter()
+    # 字段定义（所有类型相同）
+    fields = _field_definitions(args.fields)
+    # 报表类型 ID
+    type_ids: List[int] = []
+    # 逐个报表类型
+    for index in range(args.report_types):
+        # 交替使用两种存储模式
+        mode = ("eav", "wide")[index % 2]
+        # 创建报表类型
+        response = await client.post("/report-types", json={"name": f"bench-{index}", "storage_mode": mode})
+        response.raise_for_status()
+        # 记录 ID
+        type_ids.append(response.json()["id"])
+        # 创建字段
+        for field in fields:
+            (await client.post(f"/report-types/{type_ids[-1]}/fields", json=field)).raise_for_status()
+    # 每批报表数
+    batch_size = settings.report_batch_max_items
+    # 批量创建报表
+    for start in range(0, args.reports, batch_size):
+        # 本批条目（类型轮换）
+        items = [
+            {
+                "report_type_id": type_ids[number % len(type_ids)],
+                "title": f"report {number}",
+                "values": _field_values(fields, number),
+            }
+            for number in range(start, min(start + batch_size, args.reports))
+        ]
+        # 发送批量请求
+        response = await client.post("/reports/batch", json=items)
+        response.raise_for_status()
+    # 逐条创建带附件的报表
+    for number in range(args.reports, args.reports + args.attachments):
+        # 发送表单请求
+        response = await client.post(
+            # 单条创建接口
+            "/reports",
+            # 表单字段
+            data={
+                "report_type_id": str(type_ids[number % len(type_ids)]),
+                "title": f"report {number}",
+                "values": json.dumps(_field_values(fields, number)),
+            },
+            # 附件（内容各不相同，避免去重）
+            files={"files": (f"scan-{number}.txt", _attachment(number, args.attachment_kb), "text/plain")},
+        )
+        response.raise_for_status()
+    # 返回预置数据概况
+    return {
+        # 报表类型 ID
+        "report_type_ids": type_ids,
+        # 报表总数
+        "reports": args.reports + args.attachments,
+        # 耗时（秒）
+        "seconds": round(time.perf_counter() - started, 1),
+    }
+
+
+# 附件内容
+def _attachment(number: int, kb: int) -> bytes:
+    # 函数文档：编号确定、内容互不相同的文本
+    """Return ``kb`` KiB of text that differs for every ``number``."""
+    # 一行文本
+    line = f"report {number} measurement log line\n".encode()
+    # 重复到目标大小
+    return (line * (kb * 1024 // len(line) + 1))[: kb * 1024]
+
+
+# 各场景的请求生成器
+def _scenarios(seed: dict, args: argparse.Namespace) -> Dict[str, Callable[[random.Random, int], RequestSpec]]:
+    # 函数文档：每个场景根据随机数与序号生成一个请求
+    """Return the request builders of every scenario, keyed by scenario name."""
+    # 报表类型 ID
+    type_ids = seed["report_type_ids"]
+    # 报表总数
+    total = seed["reports"]
+    # 字段定义
+    fields = _field_definitions(args.fields)
+
+    # 报表类型列表
+    def report_types_list(rng: random.Random, number: int) -> RequestSpec:
+        # 返回请求
+        return "GET", "/report-types", {}
+
+    # 字段列表
+    def report_fields_list(rng: random.Random, number: int) -> RequestSpec:
+        # 返回请求
+        return "GET", f"/report-types/{rng.choice(type_ids)}/fields", {}
+
+    # 单个报表（随机 ID，多数不在缓存中）
+    def reports_get(rng: random.Random, number: int) -> RequestSpec:
+        # 返回请求
+        return "GET", f"/reports/{rng.randint(1, total)}", {}
+
+    # 报表列表第一页
+    def reports_list(rng: random.Random, number: int) -> RequestSpec:
+        # 返回请求
+        return "GET", "/reports", {"params": {"report_type_id": rng.choice(type_ids), "limit": 50}}
+
+    # 按字段过滤并按整数字段排序的列表
+    def reports_list_filtered(rng: random.Random, number: int) -> RequestSpec:
+        # 查询参数
+        params = {
+            "report_type_id": rng.choice(type_ids),
+            "field": f"grade:eq:{rng.choice(_GRADES)}",
+            "sort": "-quantity",
+            "limit": 50,
+        }
+        # 返回请求
+        return "GET", "/reports", {"params": params}
+
+    # 创建带附件的报表
+    def reports_create(rng: random.Random, number: int) -> RequestSpec:
+        # 报表编号（与预置数据不重复）
+        unique = rng.randrange(10**9)
+        # 返回请求
+        return "POST", "/reports", {
+            # 表单字段
+            "data": {
+                "report_type_id": str(rng.choice(type_ids)),
+                "title": f"bench {unique}",
+                "values": json.dumps(_field_values(fields, unique)),
+            },
+            # 附件
+            "files": {"files": (f"scan-{unique}.txt", _attachment(unique, args.attachment_kb), "text/plain")},
+        }
+
+    # 提交产品完整报表
+    def product_full_report(rng: random.Random, number: int) -> RequestSpec:
+        # 报表编号
+        unique = rng.randrange(10**9)
+        # 返回请求
+        return "POST", "/product-reports/full-report", {
+            # 表单字段
+            "data": {
+                "rp_number": f"RP{unique:09d}",
+                "creator": "bench",
+                "product_name": f"product {unique % 100}",
+                "product_code": f"P{unique % 100:03d}",
+                "creatorTime": "2024-06-01",
+                "verification_man": "reviewer",
+                "pro_leader": "leader",
+                "recipe_leader": "recipe",
+            },
+            # 会议报告附件
+            "files": {
+                "meetingReport": (f"meeting-{unique}.txt", _attachment(unique, args.attachment_kb), "text/plain"),
+            },
+        }
+
+    # 返回全部场景（按此顺序运行）
+    return {
+        "report_types_list": report_types_list,
+        "report_fields_list": report_fields_list,
+        "reports_get": reports_get,
+        "reports_list": reports_list,
+        "reports_list_filtered": reports_list_filtered,
+        "reports_create": reports_create,
+        "product_full_report": product_full_report,
+    }
+
+
+# 单个场景在一个并发度下的测量
+async def _run(
+    # 客户端与请求生成器
+    client: Any,
+    build: Callable[[random.Random, int], RequestSpec],
+    # 随机数、参数与并发度
+    rng: random.Random,
+    args: argparse.Namespace,
+    concurrency: int,
+) -> dict:
+    # 函数文档：预热后并发发送请求，统计吞吐、分位延迟、失败数与语句数
+    """Send ``args.requests`` requests at ``concurrency`` and summarize them."""
+    # 预先生成全部请求（不计入耗时）
+    specs = [build(rng, number) for number in range(_WARMUP + args.requests)]
+    # 并发上限
+    gate = asyncio.Semaphore(concurrency)
+    # 延迟样本
+    samples: List[float] = []
+    # 每个请求的语句数
+    queries: List[int] = []
+    # 失败请求数
+    errors = 0
+
+    # 单个请求
+    async def call(spec: RequestSpec, record: bool) -> None:
+        # 累计失败数
+        nonlocal errors
+        # 请求描述
+        method, path, options = spec
+        # 限制并发
+        async with gate:
+            # 开始时间
+            started = time.perf_counter()
+            # 发送请求（应用异常也计为失败）
+            try:
+                response = await client.request(method, path, **options)
+            # 应用内未处理的异常
+            except Exception:
+                response = None
+            # 耗时
+            elapsed = time.perf_counter() - started
+        # 预热请求不记录
+        if not record:
+            return
+        # 记录耗时
+        samples.append(elapsed)
+        # 记录失败
+        if response is None or not response.is_success:
+            errors += 1
+            return
+        # 语句数
+        match = _QUERIES.search(response.headers.get("server-timing", ""))
+        if match:
+            queries.append(int(match.group(1)))
+
+    # 预热
+    await asyncio.gather(*(call(spec, False) for spec in specs[:_WARMUP]))
+    # 开始时间
+    started = time.perf_counter()
+    # 并发发送全部请求
+    await asyncio.gather(*(call(spec, True) for spec in specs[_WARMUP:]))
+    # 总耗时
+    elapsed = time.perf_counter() - started
+    # 返回结果
+    return {
+        # 吞吐
+        "rps": round(len(samples) / elapsed, 1),
+        # 中位延迟
+        "p50_ms": round(percentile(samples, 50) * 1000, 2),
+        # 尾延迟
+        "p95_ms": round(percentile(samples, 95) * 1000, 2),
+        "p99_ms": round(percentile(samples, 99) * 1000, 2),
+        # 失败请求数
+        "errors": errors,
+        # 每个请求的语句数（未开启 SQL 统计时为 None）
+        "queries_mean": round(sum(queries) / len(queries), 2) if queries else None,
+        "queries_max": max(queries) if queries else None,
+    }
+
+
+# 测量全部场景
+async def _measure(args: argparse.Namespace, workdir: str, seed: Optional[dict]) -> dict:
+    # 函数文档：预置数据后逐个场景、逐个并发度测量
+    """
+    Seed the database in ``workdir`` unless ``seed`` describes data copied
+    from the seed cache, then measure every selected scenario at every
+    concurrency.
+    """
+    # 延迟导入 HTTP 客户端
+    import httpx
+    # 延迟导入 SQLAlchemy 事件与 greenlet 等待工具
+    from sqlalchemy import event
+    from sqlalchemy.util import await_
+
+    # 延迟导入应用
+    from app.core.database import async_engine, engine
+    from app.main import app
+
+    # 创建数据库结构（从预置缓存复制的数据库已是最新时不执行任何迁移）
+    migrate_schema()
+    # 进程内 ASGI 客户端
+    transport = httpx.ASGITransport(app=app)
+    # 创建客户端
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        # 预置数据：已从缓存复制时直接使用
+        if seed is None:
+            # 通过接口预置
+            seed = await _seed(client, args)
+            # 保存到预置缓存
+            if args.seed_cache:
+                _save_seed_cache(args, workdir, seed, engine)
+        # 每条语句的模拟延迟（秒），预置完成后再加
+        delay = args.latency_ms / 1000
+        # 同步引擎：阻塞休眠
+        if delay:
+            event.listen(engine, "before_cursor_execute", lambda *_: time.sleep(delay))
+        # 异步引擎：在 greenlet 中等待
+        if delay and async_engine is not None:
+            event.listen(async_engine.sync_engine, "before_cursor_execute", lambda *_: await_(asyncio.sleep(delay)))
+        # 全部场景
+        scenarios = _scenarios(seed, args)
+        # 结果
+        results: Dict[str, Dict[str, dict]] = {}
+        # 逐个选中的场景
+        for name in args.scenarios or scenarios:
+            # 逐个并发度
+            results[name] = {
+                str(concurrency): await _run(
+                    # 客户端与请求生成器
+                    client,
+                    scenarios[name],
+                    # 按场景与并发度确定的随机数
+                    random.Random(f"{args.seed}:{name}:{concurrency}"),
+                    # 参数与并发度
+                    args,
+                    concurrency,
+                )
+                for concurrency in args.concurrency
+            }
+    # 预置概况（不输出类型 ID）
+    seed = {key: value for key, value in seed.items() if key != "report_type_ids"}
+    # 返回结果
+    return {"seed": seed, "results": results}
+
+
+# 从预置缓存复制数据
+def _load_seed_cache(args: argparse.Namespace, workdir: str) -> Optional[dict]:
+    # 函数文档：缓存的预置参数与本次相同时复制到临时目录
+    """
+    Copy the cached database and files into ``workdir`` when the cache was
+    seeded with the same arguments; return its seed description, or None.
+    """
+    # 缓存说明文件
+    marker = os.path.join(args.seed_cache, "seed.json")
+    # 没有缓存
+    if not os.path.exists(marker):
+        return None
+    # 读取说明
+    with open(marker, encoding="utf-8") as handle:
+        cached = json.load(handle)
+    # 预置参数不同
+    if cached["args"] != {name: getattr(args, name) for name in _SEED_ARGS}:
+        return None
+    # 开始时间
+    started = time.perf_counter()
+    # 复制数据库与文件
+    shutil.copytree(args.seed_cache, workdir, dirs_exist_ok=True, ignore=shutil.ignore_patterns("seed.json"))
+    # 返回预置概况（耗时为复制耗时）
+    return {**cached["seed"], "seconds": round(time.perf_counter() - started, 1), "cached": True}
+
+
+# 保存预置缓存
+def _save_seed_cache(args: argparse.Namespace, workdir: str, seed: dict, engine: Any) -> None:
+    # 函数文档：关闭连接后复制临时目录，写入预置参数
+    """Copy the freshly seeded ``workdir`` to the seed cache, replacing an outdated one."""
+    # 关闭池中连接，数据库文件处于一致状态
+    engine.dispose()
+    # 删除旧缓存
+    shutil.rmtree(args.seed_cache, ignore_errors=True)
+    # 复制数据库与文件
+    shutil.copytree(workdir, args.seed_cache)
+    # 写入说明文件
+    with open(os.path.join(args.seed_cache, "seed.json"), "w", encoding="utf-8") as handle:
+        json.dump({"args": {name: getattr(args, name) for name in _SEED_ARGS}, "seed": seed}, handle, indent=2)
+
+
+# 与基线比较
+def _compare(results: Dict[str, Dict[str, dict]], baseline: Dict[str, Dict[str, dict]], tolerance: float) -> dict:
+    # 函数文档：相对变化与超出容差的退化项
+    """Return the relative change of every figure against ``baseline`` and the regressions beyond ``tolerance``."""
+    # 相对变化
+    changes: Dict[str, Dict[str, dict]] = {}
+    # 退化项
+    regressions: List[str] = []
+    # 逐个场景与并发度
+    for name, levels in results.items():
+        for concurrency, figures in levels.items():
+            # 基线中没有的组合跳过
+            previous = baseline.get(name, {}).get(concurrency)
+            if previous is None:
+                continue
+            # 逐个指标
+            for metric, direction in _COMPARED.items():
+                # 当前值与基线值
+                now, before = figures.get(metric), previous.get(metric)
+                # 缺失或基线为 0 时无法比较
+                if not now or not before:
+                    continue
+                # 相对变化
+                change = (now - before) / before
+                # 记录
+                changes.setdefault(name, {}).setdefault(concurrency, {})[metric] = round(change, 3)
+                # 朝不利方向变化超过容差
+                if change * direction < -tolerance:
+                    regressions.append(f"{name}@{concurrency}: {metric} {before} -> {now} ({change:+.1%})")
+    # 返回比较结果
+    return {"tolerance": tolerance, "changes": changes, "regressions": regressions}
+
+
+# 当前代码版本
+def _git_revision() -> Optional[str]:
+    # 函数文档：不在 git 仓库中时返回 None
+    """Return the current git commit, or None outside a git checkout."""
+    # 读取提交号
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    # 没有 git 或不是仓库
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# 基准入口
+def main() -> None:
+    # 函数文档：运行全部场景，写入结果文件并与基线比较
+    """Run the suite, write the JSON summary and compare it with a baseline."""
+    # 定义命令行参数
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    # 预置报表数（批量创建）
+    parser.add_argument("--reports", type=int, default=100000)
+    # 报表类型数
+    parser.add_argument("--report-types", type=int, default=5)
+    # 每个类型的字段数
+    parser.add_argument("--fields", type=int, default=40)
+    # 另外逐条创建的带附件报表数
+    parser.add_argument("--attachments", type=int, default=1000)
+    # 附件大小（KB）
+    parser.add_argument("--attachment-kb", type=int, default=16)
+    # 并发度
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 64])
+    # 每个场景每个并发度的请求数
+    parser.add_argument("--requests", type=int, default=500)
+    # 每条语句的模拟延迟（毫秒）
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    # 运行的场景（默认全部）
+    parser.add_argument("--scenarios", nargs="+", default=None)
+    # 随机数种子
+    parser.add_argument("--seed", type=int, default=1)
+    # 预置数据缓存目录
+    parser.add_argument("--seed-cache", default=None)
+    # 结果文件
+    parser.add_argument("--output", default="bench_endpoints.json")
+    # 基线结果文件
+    parser.add_argument("--baseline", default=None)
+    # 允许的相对变化
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    # 解析参数
+    args = parser.parse_args()
+    # 已知场景名称
+    known = list(_scenarios({"report_type_ids": [1], "reports": 1}, args))
+    # 未知场景
+    unknown = sorted(set(args.scenarios or ()) - set(known))
+    if unknown:
+        parser.error(f"unknown scenarios {unknown}; choose from {known}")
+
+    # 读取基线（先于耗时的测量，文件有误时尽早失败）
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as handle:
+            baseline = json.load(handle)
+
+    # 临时 SQLite 数据库（须在导入应用前）
+    workdir = use_sqlite()
+    # 附件与产品报表文件使用本地存储
+    os.environ["STORAGE_BACKEND"] = "local"
+    os.environ["STORAGE_LOCAL_ROOT"] = os.path.join(workdir, "files")
+    os.environ["PRODUCT_REPORT_STORAGE_BACKEND"] = "local"
+    os.environ["PRODUCT_REPORT_STORAGE_DIR"] = os.path.join(workdir, "product")
+    # 附件在请求内写入
+    os.environ["ATTACHMENT_INGEST_MODE"] = "sync"
+    # 每个请求的语句数来自 Server-Timing 头
+    os.environ["SQL_INSTRUMENTATION"] = "true"
+    # 连接池容量不小于并发度加线程池大小（未显式配置时）
+    os.environ.setdefault("DB_POOL_SIZE", str(max(args.concurrency) + 40))
+    os.environ.setdefault("DB_MAX_OVERFLOW", "0")
+    # 从预置缓存复制数据（须在导入应用前）
+    seed = _load_seed_cache(args, workdir) if args.seed_cache else None
+
+    # 汇总
+    summary: dict = {
+        # 运行环境与参数
+        "meta": {
+            "revision": _git_revision(),
+            "started_at": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database_async": os.environ.get("DATABASE_ASYNC", "false"),
+            "args": {
+                key: value for key, value in vars(args).items() if key not in ("output", "baseline", "seed_cache")
+            },
+        },
+        # 预置数据与测量结果
+        **asyncio.run(_measure(args, workdir, seed)),
+    }
+    # 与基线比较
+    if baseline is not None:
+        summary["comparison"] = _compare(summary["results"], baseline.get("results", {}), args.tolerance)
+
+    # 写入结果文件
+    with open(args.output, "w", encoding="utf-8") as handle:
+        json.dump(summary, handle, indent=2)
+    # 输出结果
+    print(json.dumps(summary, indent=2))
+    # 有退化时以状态 1 退出
+    if baseline is not None and summary["comparison"]["regressions"]:
+        sys.exit(1)
+
+
+# 脚本入口
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+# 模块级文档字符串：FILETABLE 分块写入的内存占用检查
+"""
+Check that peak memory while saving a large attachment stays within the
+FILETABLE chunk size.
+
+Usage::
+
+    python -m benchmarks.bench_filetable_memory --size-mb 500 --chunk-kb 1024 [--odbc]
+
+Without ``--odbc`` the SQL statements go to a cursor that discards the
+data, so only the application side is measured; with ``--odbc`` the file is
+written to the configured SQL Server FILETABLE, its stored size is checked
+and the write is rolled back afterwards. Only ``--odbc`` exercises the
+server side (tempdb staging and the single FILESTREAM insert); run it on a
+real FILETABLE after changing :class:`FileTableBackend`. Python allocations are
+traced with ``tracemalloc``; the script exits non-zero when the peak exceeds
+the bound or the stored size differs from the file.
+"""
+
+# 导入命令行参数解析
+import argparse
+# 导入 JSON 工具
+import json
+# 导入操作系统工具
+import os
+# 导入系统工具
+import sys
+# 导入临时文件工具
+import tempfile
+# 导入计时工具
+import time
+# 导入内存跟踪工具
+import tracemalloc
+
+# 导入 FastAPI 上传文件类型
+from fastapi import UploadFile
+
+# 导入 FILETABLE 存储后端
+from app.services.storage_backends import FileTableBackend
+
+# 允许的额外开销（驱动参数副本与解释器杂项）
+_OVERHEAD_BYTES = 256 * 1024
+
+
+# 丢弃数据的游标
+class _DiscardCursor:
+    # 类文档：模拟 INSERT/UPDATE，只统计收到的字节数
+    """Accepts the storage statements and only counts the bytes it receives."""
+
+    # 初始化
+    def __init__(self) -> None:
+        # 收到的字节数
+        self.received = 0
+        # 执行的语句数
+        self.statements = 0
+
+    # 执行语句
+    def execute(self, _sql: str, *params) -> None:
+        # 计数语句
+        self.statements += 1
+        # 累计二进制参数大小
+        self.received += sum(len(param) for param in params if isinstance(param, (bytes, bytearray, memoryview)))
+
+    # 返回插入结果
+    def fetchone(self):
+        # 存储路径
+        return ("/report_files/bench",)
+
+    # 关闭
+    def close(self) -> None:
+        pass
+
+
+# 使用丢弃游标的存储后端
+class _DiscardBackend(FileTableBackend):
+    # 类文档：只测量应用侧内存
+    """FileTableBackend that writes to a discarding cursor instead of a session."""
+
+    # 初始化
+    def __init__(self, chunk_size: int) -> None:
+        # 初始化父类（不需要会话）
+        super().__init__(None, chunk_size=chunk_size)
+        # 唯一游标
+        self.cursor = _DiscardCursor()
+
+    # 返回丢弃游标
+    def _get_cursor(self):
+        # 返回游标
+        return self.cursor
+
+
+# 基准入口
+def main() -> None:
+    # 函数文档：写入一个大文件并检查内存峰值
+    """Save one large file and report the peak traced memory."""
+    # 定义命令行参数
+    parser = argparse.ArgumentParser(description=__doc__)
+    # 文件大小（MB）
+    parser.add_argument("--size-mb", type=int, default=500)
+    # 块大小（KB）
+    parser.add_argument("--chunk-kb", type=int, default=1024)
+    # 写入真实 FILETABLE
+    parser.add_argument("--odbc", action="store_true")
+    # 解析参数
+    args = parser.parse_args()
+    # 块大小（字节）
+    chunk_size = args.chunk_kb * 1024
+
+    # 生成测试文件
+    with tempfile.TemporaryFile() as handle:
+        # 1 MiB 随机块，重复写入
+        block = os.urandom(1024 * 1024)
+        # 写满指定大小
+        for _ in range(args.size_mb):
+            handle.write(block)
+        # 释放随机块
+        del block
+        # 回到开头
+        handle.seek(0)
+        # 包装为上传文件
+        upload = UploadFile(file=handle, filename="bench.bin")
+        # 选择存储服务与会话
+        if args.odbc:
+            # 延迟导入会话工厂
+            from app.core.database import SessionLocal
+
+            # 真实会话与后端
+            db = SessionLocal()
+            # 真实后端
+            backend = FileTableBackend(db, chunk_size=chunk_size)
+        # 丢弃模式不需要会话
+        else:
+            db, backend = None, _DiscardBackend(chunk_size)
+
+        # 开始跟踪内存
+        tracemalloc.start()
+        # 记录开始时间
+        started = time.perf_counter()
+        # 保存文件
+        key = backend.put(upload.file, upload.filename)
+        # 计算耗时
+        elapsed = time.perf_counter() - started
+        # 写入的字节数：真实模式读取 FILETABLE 中的文件大小
+        written = backend.stat(key).size if db is not None else backend.cursor.received
+        # 真实模式下回滚，不留下测试文件
+        if db is not None:
+            db.rollback()
+            db.close()
+        # 读取峰值
+        _, peak = tracemalloc.get_traced_memory()
+        # 停止跟踪
+        tracemalloc.stop()
+
+    # 内存上限
+    bound = chunk_size * 2 + _OVERHEAD_BYTES
+    # 汇总结果
+    summary = {
+        # 文件大小
+        "file_bytes": args.size_mb * 1024 * 1024,
+        # 块大小
+        "chunk_bytes": chunk_size,
+        # 内存峰值
+        "peak_traced_bytes": peak,
+        # 上限
+        "bound_bytes": bound,
+        # 是否通过
+        "within_bound": peak <= bound,
+        # 写入的字节数
+        "bytes_written": written,
+        # 吞吐（MB/s）
+        "mb_per_second": round(args.size_mb / elapsed, 1) if elapsed else None,
+    }
+    # 输出结果
+    print(json.dumps(summary, indent=2))
+    # 超出上限或未完整写入时以非零状态退出
+    if peak > bound or written != summary["file_bytes"]:
+        sys.exit(1)
+
+
+# 脚本入口
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+# 模块级文档字符串：指标采集对热路径的开销
+"""
+Measure the cost of metrics collection on the hot path.
+
+Usage::
+
+    python -m benchmarks.bench_metrics_overhead [--requests 5000] [--rounds 20] [--threads 8] [--ops 200000]
+
+Two parts:
+
+- requests: ``GET /reports/{id}`` served from the report cache (the
+  cheapest route, where fixed per-request costs show most), sent one at a
+  time through httpx's ASGI transport to two apps on the same temporary
+  SQLite database, one built with ``METRICS_ENABLED`` off and one with it
+  on. The apps take turns in ``--rounds`` blocks so machine noise affects
+  both alike; the SQL instrumentation is off in both so only the metrics
+  differ.
+- recording: nanoseconds per ``Histogram.observe`` and ``Counter.inc``
+  from one thread and from ``--threads`` threads at once (per-thread shards
+  mean the threads never wait for each other).
+"""
+
+# 导入命令行参数解析
+import argparse
+# 导入异步工具
+import asyncio
+# 导入 JSON 工具
+import json
+# 导入操作系统工具
+import os
+# 导入线程工具
+import threading
+# 导入计时工具
+import time
+
+# 导入基准公共工具
+from benchmarks._common import migrate_schema, percentile, use_sqlite
+
+
+# 请求测量
+async def _measure_requests(requests: int, rounds: int) -> dict:
+    # 延迟导入 HTTP 客户端
+    import httpx
+
+    # 延迟导入配置与应用工厂
+    from app.core.config import settings
+    from app.main import create_app
+
+    # 创建数据库结构
+    migrate_schema()
+    # 两个应用：关闭与开启指标（create_app 在创建时读取配置）
+    apps = {}
+    # 逐个模式
+    for label, enabled in (("metrics_off", False), ("metrics_on", True)):
+        # 设置开关
+        settings.metrics_enabled = enabled
+        # 创建应用
+        apps[label] = create_app()
+    # 客户端
+    clients = {
+        label: httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench")
+        for label, app in apps.items()
+    }
+    # 报表类型与报表（两个应用共用数据库）
+    await clients["metrics_off"].post("/report-types", json={"name": "bench"})
+    await clients["metrics_off"].post("/reports/batch", json=[{"report_type_id": 1, "title": "r", "values": {}}])
+    # 延迟样本
+    samples = {label: [] for label in clients}
+    # 每轮每个模式的请求数
+    per_round = max(1, requests // rounds)
+    # 交替进行，抵消机器负载的漂移
+    for round_index in range(rounds + 1):
+        # 逐个模式
+        for label, client in clients.items():
+            # 本轮请求
+            for _ in range(per_round):
+                # 开始时间
+                begin = time.perf_counter()
+                # 发送请求
+                await client.get("/reports/1")
+                # 第一轮为预热（填充缓存），不记录
+                if round_index:
+                    samples[label].append(time.perf_counter() - begin)
+    # 关闭客户端
+    for client in clients.values():
+        await client.aclose()
+    # 返回结果
+    return {
+        label: {
+            # 吞吐（按请求耗时之和）
+            "rps": round(len(values) / sum(values), 1),
+            # 中位延迟（微秒）
+            "p50_us": round(percentile(values, 50) * 1e6, 1),
+            # 尾延迟（微秒）
+            "p99_us": round(percentile(values, 99) * 1e6, 1),
+        }
+        for label, values in samples.items()
+    }
+
+
+# 记录操作的耗时
+def _measure_recording(ops: int, threads: int) -> dict:
+    # 延迟导入指标类型
+    from app.core.metrics import Counter, Histogram
+
+    # 独立的直方图与计数器（不登记到全局注册表）
+    histogram = Histogram("bench_seconds", "bench", ("method", "route"))
+    counter = Counter("bench_total", "bench", ("method", "route", "status"))
+
+    # 单个线程的循环
+    def loop() -> None:
+        # 重复记录
+        for index in range(ops):
+            histogram.observe(index * 1e-6, "GET", "/reports/{report_id}")
+            counter.inc("GET", "/reports/{report_id}", "200")
+
+    # 单线程
+    started = time.perf_counter()
+    loop()
+    single = time.perf_counter() - started
+    # 多线程同时记录
+    workers = [threading.Thread(target=loop) for _ in range(threads)]
+    # 开始时间
+    started = time.perf_counter()
+    # 启动
+    for worker in workers:
+        worker.start()
+    # 等待
+    for worker in workers:
+        worker.join()
+    # 多线程耗时
+    parallel = time.perf_counter() - started
+    # 每对操作（observe + inc）的纳秒数
+    return {
+        # 单线程
+        "single_thread_ns_per_request": round(single / ops * 1e9, 1),
+        # 多线程（按总操作数平均）
+        f"{threads}_threads_ns_per_request": round(parallel / (ops * threads) * 1e9, 1),
+        # 计数器总数正确（没有丢失更新）
+        "counter_exact": counter.render()[-1].endswith(f" {ops * (threads + 1)}"),
+    }
+
+
+# 基准入口
+def main() -> None:
+    # 函数文档：比较关闭与开启指标的请求延迟，并测量记录操作
+    """Run the request benchmark with metrics off and on, then the recording microbenchmark."""
+    # 定义命令行参数
+    parser = argparse.ArgumentParser(description=__doc__)
+    # 请求数
+    parser.add_argument("--requests", type=int, default=5000)
+    # 记录微基准的线程数
+    parser.add_argument("--threads", type=int, default=8)
+    # 每个线程的记录次数
+    parser.add_argument("--ops", type=int, default=200000)
+    # 交替轮数
+    parser.add_argument("--rounds", type=int, default=20)
+    # 解析参数
+    args = parser.parse_args()
+
+    # 临时 SQLite 数据库（须在导入应用前）
+    use_sqlite()
+    # 只比较指标的开销
+    os.environ["SQL_INSTRUMENTATION"] = "false"
+    # 请求测量
+    summary: dict = {"requests": args.requests, **asyncio.run(_measure_requests(args.requests, args.rounds))}
+    # 中位延迟的差值
+    summary["p50_overhead_us"] = round(summary["metrics_on"]["p50_us"] - summary["metrics_off"]["p50_us"], 1)
+    # 记录操作的耗时
+    summary["recording"] = _measure_recording(args.ops, args.threads)
+
+    # 输出结果
+    print(json.dumps(summary, indent=2))
+
+
+# 脚本入口
+if __name__ == "__main__":
+    main()
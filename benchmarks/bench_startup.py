@@ -0,0 +1,162 @@
+# 模块级文档字符串：应用冷启动耗时
+"""
+Measure cold-start latency: importing ``app.main`` and serving the first
+request, each run in a fresh interpreter.
+
+Usage::
+
+    python -m benchmarks.bench_startup [--runs 10] [--latency-ms 0] [--create-all]
+
+The database is migrated once with ``python -m app.commands.migrate``
+before the runs, as a deployment would. Each run reports the import time,
+the time from the start of the import to the first ``GET /report-types``
+response, and how many SQL statements were executed before the first
+request. ``--latency-ms`` delays every connection and statement to stand in
+for a slow SQL Server; ``--create-all`` repeats the former
+``Base.metadata.create_all`` call at import to compare against.
+"""
+
+# 导入命令行参数解析
+import argparse
+# 导入 JSON 工具
+import json
+# 导入子进程工具
+import subprocess
+# 导入解释器信息
+import sys
+# 导入计时工具
+import time
+
+# 导入基准公共工具
+from benchmarks._common import percentile, use_sqlite
+
+
+# 单次冷启动（在子进程中运行）
+def _measure(args: argparse.Namespace) -> dict:
+    # 延迟导入 SQLAlchemy 事件、引擎与连接池类型（在应用之前）
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    from sqlalchemy.pool import Pool
+
+    # 每次往返的模拟延迟（秒）
+    delay = args.latency_ms / 1000
+    # 已执行的语句数
+    statements = 0
+
+    # 统计每条语句（对之后创建的全部引擎生效）
+    @event.listens_for(Engine, "before_cursor_execute")
+    def _count(*_):
+        # 累计语句数
+        nonlocal statements
+        statements += 1
+        # 模拟往返延迟
+        if delay:
+            time.sleep(delay)
+
+    # 模拟建立连接的延迟
+    @event.listens_for(Pool, "connect")
+    def _connect(*_):
+        # 模拟往返延迟
+        if delay:
+            time.sleep(delay)
+
+    # 开始时间
+    started = time.perf_counter()
+    # 导入应用
+    from app.main import app
+
+    # 模拟旧行为：导入时建表
+    if args.create_all:
+        # 延迟导入声明式基类与引擎
+        from app.core.database import Base, engine
+
+        # 检查并创建全部表
+        Base.metadata.create_all(bind=engine)
+    # 导入耗时
+    imported = time.perf_counter() - started
+    # 启动阶段的语句数
+    startup_statements = statements
+    # 延迟导入测试客户端
+    from fastapi.testclient import TestClient
+
+    # 运行生命周期并发送第一个请求
+    with TestClient(app) as client:
+        # 第一个请求
+        response = client.get("/report-types")
+        # 首次响应耗时
+        first = time.perf_counter() - started
+    # 请求必须成功
+    response.raise_for_status()
+    # 返回测量结果
+    return {"import_s": imported, "first_request_s": first, "startup_statements": startup_statements}
+
+
+# 基准入口
+def main() -> None:
+    # 函数文档：多次冷启动并打印中位数
+    """Run several cold starts and print a JSON summary."""
+    # 定义命令行参数
+    parser = argparse.ArgumentParser(description=__doc__)
+    # 冷启动次数
+    parser.add_argument("--runs", type=int, default=10)
+    # 每次往返的模拟延迟（毫秒）
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    # 模拟旧的导入时建表
+    parser.add_argument("--create-all", action="store_true")
+    # 子进程内部使用：只运行一次测量
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    # 解析参数
+    args = parser.parse_args()
+
+    # 子进程：测量一次冷启动
+    if args.child:
+        print(json.dumps(_measure(args)))
+        return
+
+    # 临时 SQLite 数据库（子进程继承环境变量）
+    use_sqlite()
+    # 部署时执行迁移
+    subprocess.run([sys.executable, "-m", "app.commands.migrate"], check=True, capture_output=True)
+    # 每次运行的结果
+    runs = []
+    # 逐次冷启动
+    for _ in range(args.runs):
+        # 在新的解释器中运行
+        output = subprocess.run(
+            # 同样的参数加上子进程标记
+            [sys.executable, "-m", "benchmarks.bench_startup", *sys.argv[1:], "--child"],
+            # 捕获输出
+            capture_output=True,
+            # 文本模式
+            text=True,
+            # 失败时抛出
+            check=True,
+        )
+        # 最后一行是结果
+        runs.append(json.loads(output.stdout.strip().splitlines()[-1]))
+
+    # 输出结果
+    print(
+        json.dumps(
+            {
+                # 运行次数
+                "runs": args.runs,
+                # 模拟延迟
+                "latency_ms": args.latency_ms,
+                # 是否模拟导入时建表
+                "create_all": args.create_all,
+                # 导入耗时中位数
+                "import_p50_ms": round(percentile([run["import_s"] for run in runs], 50) * 1000, 1),
+                # 首次响应耗时中位数
+                "first_request_p50_ms": round(percentile([run["first_request_s"] for run in runs], 50) * 1000, 1),
+                # 首个请求前执行的语句数
+                "startup_statements": max(run["startup_statements"] for run in runs),
+            },
+            indent=2,
+        )
+    )
+
+
+# 脚本入口
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+# 模块级文档字符串：附件存储后端吞吐对比
+"""
+Compare write and read throughput of the attachment storage backends for
+small and large files.
+
+Usage::
+
+    python -m benchmarks.bench_storage_backends [--small-count 500 --small-kb 64]
+        [--large-count 4 --large-mb 64] [--odbc]
+
+The local backend writes to a temporary directory. With ``--odbc`` the
+FILETABLE backend is measured too, against the configured SQL Server; its
+writes are rolled back at the end.
+"""
+
+# 导入命令行参数解析
+import argparse
+# 导入内存字节流
+import io
+# 导入 JSON 工具
+import json
+# 导入操作系统工具
+import os
+# 导入临时目录工具
+import tempfile
+# 导入类型注解
+from typing import List
+
+# 导入基准公共工具
+from benchmarks._common import timer
+
+
+# 测量一个后端
+def _measure(backend, payload: bytes, count: int) -> dict:
+    # 函数文档：写入 count 个文件后全部读回
+    """Write ``count`` copies of ``payload`` then read them all back; return MB/s."""
+    # 写入耗时
+    write_samples: List[float] = []
+    # 读取耗时
+    read_samples: List[float] = []
+    # 写入得到的键
+    keys: List[str] = []
+    # 写入全部文件
+    with timer(write_samples):
+        for index in range(count):
+            keys.append(backend.put(io.BytesIO(payload), f"file-{index}.bin", namespace="bench"))
+    # 读回全部文件
+    with timer(read_samples):
+        for key in keys:
+            for _ in backend.open_range(key):
+                pass
+    # 总 MB
+    megabytes = len(payload) * count / (1024 * 1024)
+    # 返回吞吐
+    return {
+        # 写入吞吐
+        "write_mb_s": round(megabytes / write_samples[0], 1),
+        # 读取吞吐
+        "read_mb_s": round(megabytes / read_samples[0], 1),
+        # 每个文件平均写入耗时（毫秒）
+        "write_ms_per_file": round(write_samples[0] / count * 1000, 3),
+    }
+
+
+# 基准入口
+def main() -> None:
+    # 函数文档：运行基准并打印结果
+    """Run the benchmark and print a JSON summary."""
+    # 定义命令行参数
+    parser = argparse.ArgumentParser(description=__doc__)
+    # 小文件数量
+    parser.add_argument("--small-count", type=int, default=500)
+    # 小文件大小（KB）
+    parser.add_argument("--small-kb", type=int, default=64)
+    # 大文件数量
+    parser.add_argument("--large-count", type=int, default=4)
+    # 大文件大小（MB）
+    parser.add_argument("--large-mb", type=int, default=64)
+    # 同时测量 FILETABLE
+    parser.add_argument("--odbc", action="store_true")
+    # 解析参数
+    args = parser.parse_args()
+
+    # 延迟导入存储后端
+    from app.services.storage_backends import FileTableBackend, LocalFileBackend
+
+    # 测试数据
+    small = os.urandom(args.small_kb * 1024)
+    # 大文件数据
+    large = os.urandom(args.large_mb * 1024 * 1024)
+    # 结果汇总
+    summary: dict = {
+        # 小文件配置与结果
+        "small": {"count": args.small_count, "kb": args.small_kb},
+        # 大文件配置与结果
+        "large": {"count": args.large_count, "mb": args.large_mb},
+    }
+
+    # 本地后端
+    with tempfile.TemporaryDirectory(prefix="rms-storage-") as root:
+        # 创建后端
+        backend = LocalFileBackend(root)
+        # 小文件
+        summary["small"]["local"] = _measure(backend, small, args.small_count)
+        # 大文件
+        summary["large"]["local"] = _measure(backend, large, args.large_count)
+
+    # FILETABLE 后端
+    if args.odbc:
+        # 延迟导入会话工厂
+        from app.core.database import SessionLocal
+
+        # 创建会话
+        db = SessionLocal()
+        # 确保回滚
+        try:
+            # 创建后端
+            backend = FileTableBackend(db)
+            # 小文件
+            summary["small"]["filetable"] = _measure(backend, small, args.small_count)
+            # 大文件
+            summary["large"]["filetable"] = _measure(backend, large, args.large_count)
+        # 不留下测试文件
+        finally:
+            db.rollback()
+            db.close()
+
+    # 输出结果
+    print(json.dumps(summary, indent=2))
+
+
+# 脚本入口
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+# 模块级文档字符串：EAV 与宽表两种存储布局的读写延迟对比
+"""
+Compare read and write latency of the EAV and wide-table storage layouts.
+
+Usage::
+
+    python -m benchmarks.bench_storage_layouts --reports 2000 --fields 40
+"""
+
+# 导入命令行参数解析
+import argparse
+# 导入 JSON 工具
+import json
+# 导入随机数工具
+import random
+
+# 导入基准公共工具
+from benchmarks._common import migrate_schema, percentile, timer, use_sqlite
+
+
+# 运行单个布局
+def run_layout(client, storage_mode: str, reports: int, fields: int, samples: int) -> dict:
+    # 函数文档：创建一个布局的报表类型并测量读写延迟
+    """Create a report type in ``storage_mode`` and measure its latencies (ms)."""
+    # 创建报表类型
+    report_type = client.post("/report-types", json={"name": f"bench-{storage_mode}", "storage_mode": storage_mode}).json()
+    # 创建字段：文本、整数与日期交替
+    for index in range(fields):
+        client.post(
+            # 字段创建接口
+            f"/report-types/{report_type['id']}/fields",
+            # 字段定义
+            json={"name": f"f{index}", "label": f"F{index}", "field_type": ("text", "int", "date")[index % 3]},
+        )
+    # 按字段类型生成字段值
+    values = {
+        # 字段名称到值
+        f"f{index}": ("value", index, "2024-01-01")[index % 3]
+        # 遍历字段
+        for index in range(fields)
+    }
+    # 批量预置数据
+    for start in range(0, reports, 1000):
+        client.post(
+            # 批量创建接口
+            "/reports/batch",
+            # 当前批次条目
+            json=[
+                {"report_type_id": report_type["id"], "title": f"r{index}", "values": values}
+                # 遍历当前批次序号
+                for index in range(start, min(start + 1000, reports))
+            ],
+        )
+    # 写延迟样本
+    writes: list = []
+    # 逐条创建报表
+    for index in range(samples):
+        with timer(writes):
+            client.post(
+                # 单条创建接口
+                "/reports",
+                # 表单字段
+                data={"report_type_id": report_type["id"], "title": f"w{index}", "values": json.dumps(values)},
+            )
+    # 该类型的报表 ID
+    ids = [item["id"] for item in client.get("/reports", params={"report_type_id": report_type["id"], "limit": 500}).json()["items"]]
+    # 单条读延迟样本
+    reads: list = []
+    # 随机读取报表
+    for _ in range(samples):
+        with timer(reads):
+            client.get(f"/reports/{random.choice(ids)}")
+    # 分页读延迟样本
+    pages: list = []
+    # 读取 100 条一页
+    for _ in range(max(1, samples // 10)):
+        with timer(pages):
+            client.get("/reports", params={"report_type_id": report_type["id"], "limit": 100})
+    # 汇总毫秒级分位数
+    return {
+        # 单条写 p50
+        "write_p50_ms": round(percentile(writes, 50) * 1000, 2),
+        # 单条写 p95
+        "write_p95_ms": round(percentile(writes, 95) * 1000, 2),
+        # 单条读 p50
+        "get_p50_ms": round(percentile(reads, 50) * 1000, 2),
+        # 单条读 p95
+        "get_p95_ms": round(percentile(reads, 95) * 1000, 2),
+        # 分页读 p50
+        "page100_p50_ms": round(percentile(pages, 50) * 1000, 2),
+    }
+
+
+# 基准入口
+def main() -> None:
+    # 函数文档：运行基准并打印结果
+    """Run the benchmark and print a JSON summary."""
+    # 定义命令行参数
+    parser = argparse.ArgumentParser(description=__doc__)
+    # 预置报表数量
+    parser.add_argument("--reports", type=int, default=2000)
+    # 每个报表类型的字段数量
+    parser.add_argument("--fields", type=int, default=40)
+    # 每项测量的样本数
+    parser.add_argument("--samples", type=int, default=200)
+    # 解析参数
+    args = parser.parse_args()
+
+    # 在导入应用前切换到 SQLite
+    use_sqlite()
+    # 延迟导入测试客户端
+    from fastapi.testclient import TestClient
+
+    # 延迟导入应用
+    from app.main import app
+
+    # 创建数据库结构
+    migrate_schema()
+    # 创建测试客户端
+    client = TestClient(app)
+    # 依次测量两种布局
+    results = {mode: run_layout(client, mode, args.reports, args.fields, args.samples) for mode in ("eav", "wide")}
+    # 打印结果
+    print(json.dumps({"reports": args.reports, "fields": args.fields, **results}, indent=2))
+
+
+# 脚本入口
+if __name__ == "__main__":
+    main()
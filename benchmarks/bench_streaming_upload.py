@@ -0,0 +1,101 @@
+# 模块级文档字符串：普通表单与流式表单上传的对比
+"""
+Compare ``POST /reports`` (Starlette spools each file to a temporary file
+first) with ``POST /reports/stream`` (parts are piped into the storage
+backend) for large attachments.
+
+Usage::
+
+    python -m benchmarks.bench_streaming_upload [--mb 64] [--files 2] [--repeat 3]
+
+Runs against a temporary SQLite database and the local storage backend.
+"""
+
+# 导入命令行参数解析
+import argparse
+# 导入 JSON 工具
+import json
+# 导入操作系统工具
+import os
+# 导入类型注解
+from typing import List
+
+# 导入基准公共工具
+from benchmarks._common import migrate_schema, percentile, timer, use_sqlite
+
+
+# 基准入口
+def main() -> None:
+    # 函数文档：运行基准并打印结果
+    """Run the benchmark and print a JSON summary."""
+    # 定义命令行参数
+    parser = argparse.ArgumentParser(description=__doc__)
+    # 每个文件大小（MB）
+    parser.add_argument("--mb", type=int, default=64)
+    # 每个请求的文件数
+    parser.add_argument("--files", type=int, default=2)
+    # 重复次数
+    parser.add_argument("--repeat", type=int, default=3)
+    # 解析参数
+    args = parser.parse_args()
+
+    # 在导入应用前切换到 SQLite 与本地后端
+    workdir = use_sqlite()
+    # 本地后端
+    os.environ["STORAGE_BACKEND"] = "local"
+    # 本地后端根目录
+    os.environ["STORAGE_LOCAL_ROOT"] = os.path.join(workdir, "files")
+    # 延迟导入测试客户端
+    from fastapi.testclient import TestClient
+
+    # 延迟导入应用
+    from app.main import app
+
+    # 创建数据库结构
+    migrate_schema()
+    # 创建测试客户端
+    client = TestClient(app)
+    # 创建报表类型
+    report_type = client.post("/report-types", json={"name": "bench"}).json()
+    # 结果
+    summary: dict = {"mb_per_file": args.mb, "files": args.files}
+    # 两个接口
+    for label, path in (("spooled", "/reports"), ("streamed", "/reports/stream")):
+        # 耗时样本
+        samples: List[float] = []
+        # 重复测量
+        for index in range(args.repeat):
+            # 每次内容不同，避免去重
+            files = [
+                ("files", (f"f{number}.bin", os.urandom(args.mb * 1024 * 1024), "application/octet-stream"))
+                for number in range(args.files)
+            ]
+            # 计时上传
+            with timer(samples):
+                response = client.post(
+                    # 上传接口
+                    path,
+                    # 表单字段（在文件之前）
+                    data={"report_type_id": report_type["id"], "title": f"{label}-{index}"},
+                    # 附件
+                    files=files,
+                )
+            # 确认成功
+            response.raise_for_status()
+        # 总 MB
+        megabytes = args.mb * args.files
+        # 记录中位数
+        summary[label] = {
+            # 中位耗时（毫秒）
+            "p50_ms": round(percentile(samples, 50) * 1000, 1),
+            # 吞吐
+            "mb_s": round(megabytes / percentile(samples, 50), 1),
+        }
+
+    # 输出结果
+    print(json.dumps(summary, indent=2))
+
+
+# 脚本入口
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+# 模块级文档字符串：附件并发写入的延迟曲线
+"""
+Measure how long ``AttachmentStorage.save_files`` takes for one request as
+the number of attached files grows, for several concurrency settings.
+
+Usage::
+
+    python -m benchmarks.bench_upload_concurrency [--files 1 2 5 10 20]
+        [--concurrency 1 2 4 8] [--kb 256] [--latency-ms 5] [--repeat 3]
+
+Files go to the local backend in a temporary directory, with blob records
+in a temporary SQLite database. ``--latency-ms`` adds a sleep per written
+chunk to stand in for the round trips of a remote store such as FILETABLE.
+"""
+
+# 导入命令行参数解析
+import argparse
+# 导入内存字节流
+import io
+# 导入 JSON 工具
+import json
+# 导入操作系统工具
+import os
+# 导入时间工具
+import time
+# 导入类型注解
+from typing import BinaryIO, List
+
+# 导入基准公共工具
+from benchmarks._common import migrate_schema, percentile, timer, use_sqlite
+
+
+# 读取前休眠的流
+class _SlowReader:
+    # 类文档：模拟每块一次网络往返
+    """Read-through wrapper that sleeps before each read."""
+
+    # 初始化
+    def __init__(self, stream: BinaryIO, delay: float) -> None:
+        # 原始流
+        self.stream = stream
+        # 每次读取的延迟（秒）
+        self.delay = delay
+
+    # 读取
+    def read(self, size: int = -1) -> bytes:
+        # 模拟往返
+        time.sleep(self.delay)
+        # 读取一块
+        return self.stream.read(size)
+
+
+# 基准入口
+def main() -> None:
+    # 函数文档：运行基准并打印结果
+    """Run the benchmark and print a JSON summary."""
+    # 定义命令行参数
+    parser = argparse.ArgumentParser(description=__doc__)
+    # 每个请求的文件数
+    parser.add_argument("--files", type=int, nargs="+", default=[1, 2, 5, 10, 20])
+    # 并发写入数
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8])
+    # 每个文件大小（KB）
+    parser.add_argument("--kb", type=int, default=256)
+    # 每块写入的模拟延迟（毫秒）
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    # 每个组合重复次数
+    parser.add_argument("--repeat", type=int, default=3)
+    # 解析参数
+    args = parser.parse_args()
+
+    # 在导入应用前切换到 SQLite
+    workdir = use_sqlite()
+    # 延迟导入 FastAPI 上传文件类型
+    from fastapi import UploadFile
+
+    # 延迟导入数据库会话
+    from app.core.database import SessionLocal
+    # 延迟导入存储后端
+    from app.services.storage_backends import LocalFileBackend
+    # 延迟导入附件存储服务
+    from app.services.storage_service import AttachmentStorage
+
+    # 带模拟延迟的本地后端
+    class _SlowLocalBackend(LocalFileBackend):
+        # 类文档：每块写入前休眠
+        """Local backend that sleeps before every written chunk."""
+
+        # 写入
+        def put(self, stream: BinaryIO, filename: str, namespace: str = "") -> str:
+            # 包装流后写入
+            return super().put(_SlowReader(stream, args.latency_ms / 1000), filename, namespace)
+
+    # 创建数据库结构
+    migrate_schema()
+    # 存储后端（64 KiB 一块，模拟多次往返）
+    backend = _SlowLocalBackend(os.path.join(workdir, "files"), chunk_size=64 * 1024)
+    # 结果
+    rows: List[dict] = []
+    # 遍历文件数
+    for count in args.files:
+        # 一行结果
+        row: dict = {"files": count}
+        # 遍历并发数
+        for workers in args.concurrency:
+            # 耗时样本
+            samples: List[float] = []
+            # 重复测量
+            for _ in range(args.repeat):
+                # 每个文件内容不同，避免去重
+                uploads = [
+                    UploadFile(io.BytesIO(os.urandom(args.kb * 1024)), filename=f"photo-{index}.jpg")
+                    for index in range(count)
+                ]
+                # 每次测量独立会话
+                with SessionLocal() as db:
+                    # 计时写入
+                    with timer(samples):
+                        AttachmentStorage(db, backend, concurrency=workers).save_files(1, uploads)
+                    # 不保留记录
+                    db.rollback()
+            # 记录中位数（毫秒）
+            row[f"c{workers}_ms"] = round(percentile(samples, 50) * 1000, 1)
+        # 追加一行
+        rows.append(row)
+
+    # 输出结果
+    print(json.dumps({"kb": args.kb, "latency_ms": args.latency_ms, "latency_curve": rows}, indent=2))
+
+
+# 脚本入口
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+-- 说明：已有的 SQL Server 数据库在首次执行 python -m app.commands.migrate 前运行本脚本补齐列与索引
+-- 新库直接执行 python -m app.commands.migrate 建表，无需运行本脚本
+-- Upgrade an existing database in place before its first migrate; every step is idempotent.
+
+-- 步骤：reports 的键集分页索引（GET /reports 与 /reports/export）
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'ix_reports_created_at_id')
+-- 开始条件块
+BEGIN
+    -- 全量列表的分页索引
+    CREATE INDEX ix_reports_created_at_id ON reports (created_at, id);
+-- 结束条件块
+END;
+-- 批处理分隔符
+GO
+-- 按报表类型过滤时的分页索引
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'ix_reports_type_created_at_id')
+-- 开始条件块
+BEGIN
+    -- 创建索引
+    CREATE INDEX ix_reports_type_created_at_id ON reports (report_type_id, created_at, id);
+-- 结束条件块
+END;
+-- 批处理分隔符
+GO
+
+-- 步骤：report_field_values 增加可索引的查找键列
+IF COL_LENGTH('report_field_values', 'value_key') IS NULL
+-- 开始条件块
+BEGIN
+    -- 新增 value_key 列
+    ALTER TABLE report_field_values ADD value_key VARCHAR(450) NULL;
+-- 结束条件块
+END;
+-- 批处理分隔符
+GO
+
+-- 回填已有字段值的查找键
+UPDATE report_field_values
+-- 取 value 的前 450 个字符
+SET value_key = LEFT(value, 450)
+-- 只处理尚未回填的行
+WHERE value_key IS NULL AND value IS NOT NULL;
+-- 批处理分隔符
+GO
+
+-- 创建 (field_id, value_key, report_id) 组合索引
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'ix_report_field_values_field_key')
+-- 开始条件块
+BEGIN
+    -- 创建索引
+    CREATE INDEX ix_report_field_values_field_key
+        -- 索引列
+        ON report_field_values (field_id, value_key, report_id);
+-- 结束条件块
+END;
+-- 批处理分隔符
+GO
+
+-- 步骤：report_field_values 增加类型化值列
+IF COL_LENGTH('report_field_values', 'value_int') IS NULL
+-- 开始条件块
+BEGIN
+    -- 新增整数、小数、日期与布尔列
+    ALTER TABLE report_field_values ADD
+        -- 整数值
+        value_int BIGINT NULL,
+        -- 小数值
+        value_decimal NUMERIC(38, 10) NULL,
+        -- 日期值
+        value_date DATETIME NULL,
+        -- 布尔值
+        value_bool BIT NULL;
+-- 结束条件块
+END;
+-- 批处理分隔符
+GO
+
+-- 创建类型化值的范围查询与排序索引
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'ix_report_field_values_field_int')
+-- 开始条件块
+BEGIN
+    -- 整数值索引
+    CREATE INDEX ix_report_field_values_field_int ON report_field_values (field_id, value_int, report_id);
+    -- 小数值索引
+    CREATE INDEX ix_report_field_values_field_decimal ON report_field_values (field_id, value_decimal, report_id);
+    -- 日期值索引
+    CREATE INDEX ix_report_field_values_field_date ON report_field_values (field_id, value_date, report_id);
+    -- 布尔值索引
+    CREATE INDEX ix_report_field_values_field_bool ON report_field_values (field_id, value_bool, report_id);
+-- 结束条件块
+END;
+-- 批处理分隔符
+GO
+-- 列与索引就绪后执行：python -m app.commands.backfill_typed_values
+
+-- 步骤：report_types 增加字段值存储模式列
+IF COL_LENGTH('report_types', 'storage_mode') IS NULL
+-- 开始条件块
+BEGIN
+    -- 新增 storage_mode 列，已有类型默认 eav
+    ALTER TABLE report_types ADD storage_mode VARCHAR(20) NOT NULL
+        -- 默认值约束
+        CONSTRAINT df_report_types_storage_mode DEFAULT 'eav';
+-- 结束条件块
+END;
+-- 批处理分隔符
+GO
+-- 切换到宽表存储：python -m app.commands.migrate_wide_table --report-type-id <id>
+
+-- 步骤：报表结构版本计数（各进程据此刷新结构缓存）
+IF OBJECT_ID('report_schema_versions', 'U') IS NULL
+-- 开始条件块
+BEGIN
+    -- 单行版本表
+    CREATE TABLE report_schema_versions (
+        -- 固定主键
+        id INT NOT NULL PRIMARY KEY,
+        -- 版本号
+        version INT NOT NULL
+    );
+    -- 初始版本
+    INSERT INTO report_schema_versions (id, version) VALUES (1, 1);
+-- 结束条件块
+END;
+-- 批处理分隔符
+GO
+
+-- 步骤：reports 增加内容版本号列（ETag 依据）
+IF COL_LENGTH('reports', 'version') IS NULL
+-- 开始条件块
+BEGIN
+    -- 新增 version 列，已有报表从 1 开始
+    ALTER TABLE reports ADD version INT NOT NULL
+        -- 默认值约束
+        CONSTRAINT df_reports_version DEFAULT 1;
+-- 结束条件块
+END;
+-- 批处理分隔符
+GO
+
+-- 步骤：report_attachments 增加存储后端列（已有附件均在 FILETABLE）
+IF COL_LENGTH('report_attachments', 'storage_backend') IS NULL
+-- 开始条件块
+BEGIN
+    -- 新增 storage_backend 列
+    ALTER TABLE report_attachments ADD storage_backend VARCHAR(20) NOT NULL
+        -- 默认值约束
+        CONSTRAINT df_report_attachments_storage_backend DEFAULT 'filetable';
+-- 结束条件块
+END;
+-- 批处理分隔符
+GO
+
+-- 步骤：按内容寻址的附件数据表（相同内容只存一份）
+IF OBJECT_ID('attachment_blobs', 'U') IS NULL
+-- 开始条件块
+BEGIN
+    -- 创建附件数据表
+    CREATE TABLE attachment_blobs (
+        -- 主键
+        id INT IDENTITY(1, 1) NOT NULL PRIMARY KEY,
+        -- 存储后端名称
+        storage_backend VARCHAR(20) NOT NULL,
+        -- 内容 SHA-256
+        sha256 VARCHAR(64) NOT NULL,
+        -- 存储键
+        storage_key VARCHAR(500) NOT NULL,
+        -- 字节数
+        size BIGINT NOT NULL,
+        -- 引用计数
+        ref_count INT NOT NULL,
+        -- 首次写入时间
+        created_at DATETIMEOFFSET NULL,
+        -- 同一后端中内容唯一
+        CONSTRAINT uq_attachment_blobs_backend_sha256 UNIQUE (storage_backend, sha256)
+    );
+-- 结束条件块
+END;
+-- 批处理分隔符
+GO
+
+-- 步骤：附件与产品报表引用共享数据
+IF COL_LENGTH('report_attachments', 'blob_id') IS NULL
+-- 开始条件块
+BEGIN
+    -- 报表附件引用
+    ALTER TABLE report_attachments ADD blob_id INT NULL
+        -- 外键约束
+        CONSTRAINT fk_report_attachments_blob REFERENCES attachment_blobs (id);
+    -- 引用索引
+    CREATE INDEX ix_report_attachments_blob_id ON report_attachments (blob_id);
+-- 结束条件块
+END;
+-- 批处理分隔符
+GO
+-- 产品报表引用
+IF COL_LENGTH('product_full_reports', 'blob_id') IS NULL
+    -- 新增 blob_id 列
+    ALTER TABLE product_full_reports ADD blob_id INT NULL
+        -- 外键约束
+        CONSTRAINT fk_product_full_reports_blob REFERENCES attachment_blobs (id);
+-- 批处理分隔符
+GO
+
+-- 步骤：附件后台写入状态
+IF COL_LENGTH('report_attachments', 'status') IS NULL
+    -- 新增状态列（已有附件均已写入）
+    ALTER TABLE report_attachments ADD status VARCHAR(20) NOT NULL
+        -- 默认约束
+        CONSTRAINT df_report_attachments_status DEFAULT 'stored';
+-- 批处理分隔符
+GO
+-- 写入失败原因
+IF COL_LENGTH('report_attachments', 'error') IS NULL
+    -- 新增错误列
+    ALTER TABLE report_attachments ADD error VARCHAR(500) NULL;
+-- 批处理分隔符
+GO
+
+-- 步骤：可续传上传会话
+IF OBJECT_ID('upload_sessions', 'U') IS NULL
+-- 开始条件块
+BEGIN
+    -- 创建上传会话表
+    CREATE TABLE upload_sessions (
+        -- 主键：随机 ID
+        id VARCHAR(32) NOT NULL PRIMARY KEY,
+        -- 文件名
+        filename VARCHAR(255) NOT NULL,
+        -- MIME 类型
+        content_type VARCHAR(100) NULL,
+        -- 声明的总字节数
+        size BIGINT NULL,
+        -- 声明的整文件 SHA-256
+        sha256 VARCHAR(64) NULL,
+        -- 已接收字节数
+        received BIGINT NOT NULL,
+        -- 状态
+        status VARCHAR(20) NOT NULL,
+        -- 所属报表
+        report_id INT NULL REFERENCES reports (id),
+        -- 生成的报表附件
+        attachment_id INT NULL REFERENCES report_attachments (id),
+        -- 所属产品完整报表
+        product_report_id INT NULL REFERENCES product_full_reports (id),
+        -- 创建时间
+        created_at DATETIMEOFFSET NULL,
+        -- 最后活动时间
+        updated_at DATETIMEOFFSET NULL
+    );
+    -- 过期清理索引
+    CREATE INDEX ix_upload_sessions_updated_at ON upload_sessions (updated_at);
+-- 结束条件块
+END;
+-- 批处理分隔符
+GO
+
+-- 步骤：附件透明压缩
+IF COL_LENGTH('attachment_blobs', 'compression') IS NULL
+    -- 压缩算法（未压缩为空）
+    ALTER TABLE attachment_blobs ADD compression VARCHAR(10) NULL;
+-- 批处理分隔符
+GO
+-- 后端中实际占用的字节数
+IF COL_LENGTH('attachment_blobs', 'stored_size') IS NULL
+    -- 新增存储大小列
+    ALTER TABLE attachment_blobs ADD stored_size BIGINT NULL;
+-- 批处理分隔符
+GO
+-- 附件原始大小
+IF COL_LENGTH('report_attachments', 'size') IS NULL
+    -- 新增原始大小列
+    ALTER TABLE report_attachments ADD size BIGINT NULL;
+-- 批处理分隔符
+GO
+-- 附件压缩算法
+IF COL_LENGTH('report_attachments', 'compression') IS NULL
+    -- 新增压缩算法列
+    ALTER TABLE report_attachments ADD compression VARCHAR(10) NULL;
+-- 批处理分隔符
+GO